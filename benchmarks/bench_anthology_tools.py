@@ -0,0 +1,175 @@
+"""Per tool call latency of ``AnthologyToolExecutor``: linear scans vs the grouping index.
+
+Seeds a throwaway database with ``--groupings`` single post groupings of two
+to four topics each, then times every anthology tool the way the executor
+ran them before, a scan of all topic entries per call, against the lookups
+of the ``GroupingIndex``. Also reports building the index for a run and
+getting it from the cache on the next run.
+
+    python -m benchmarks.bench_anthology_tools --port 8765 --groupings 50000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.llm import anthology_tools
+from rsstag.llm.anthology_tools import AnthologyToolExecutor
+from rsstag.post_grouping import RssTagPostGrouping
+from rsstag.posts import RssTagPosts
+from rsstag.topics_index import RssTagTopicsIndex
+from tests.test_anthology_tools_index import reference_score_topic_match
+
+
+def _seed(db: Any, owner: str, count: int, seed: int) -> List[str]:
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(20000, seed)
+    topics = [
+        " > ".join(word.title() for word in rnd.sample(vocabulary, rnd.randint(1, 3)))
+        for _ in range(count // 5)
+    ]
+    grouping = RssTagPostGrouping(db)
+    posts: List[dict] = []
+    groupings: List[dict] = []
+    for i in range(count):
+        pid = str(i)
+        posts.append({"owner": owner, "pid": pid, "feed_id": f"feed-{i % 50}", "read": False})
+        sentences = [
+            {"number": n, "text": synthetic_text(rnd, vocabulary, 12), "read": False}
+            for n in range(6)
+        ]
+        groupings.append(
+            {
+                "owner": owner,
+                "post_ids": [pid],
+                "post_ids_hash": grouping._generate_post_ids_hash([pid]),
+                "sentences": sentences,
+                "groups": {topic: [n, n + 1] for n, topic in enumerate(rnd.sample(topics, 3))},
+                "updated_at": time.time(),
+            }
+        )
+    db.posts.insert_many(posts)
+    db.post_grouping.insert_many(groupings)
+    RssTagPosts(db).prepare()
+    grouping.prepare()
+    RssTagTopicsIndex(db).prepare()
+    return topics
+
+
+def _legacy_search(executor: AnthologyToolExecutor, query: str, limit: int) -> list:
+    terms = executor._tokenize(query)
+    results = []
+    for item in executor._load_grouping_entries():
+        score, matched = (
+            reference_score_topic_match(item, terms, executor._seed_tag) if terms else (1, [])
+        )
+        if score > 0:
+            results.append({"topic_path": item["topic_path"], "score": score, "terms": matched})
+    results.sort(key=lambda row: (-row["score"], row["topic_path"]))
+    return results[:limit]
+
+
+def _legacy_topic_entries(executor: AnthologyToolExecutor, topic_path: str) -> list:
+    return [
+        item for item in executor._load_grouping_entries() if item["topic_path"] == topic_path
+    ]
+
+
+def _legacy_overview(executor: AnthologyToolExecutor, limit: int) -> list:
+    counts: Counter = Counter()
+    for entry in executor._load_grouping_entries():
+        counts[entry["topic_path"]] += len(entry["post_ids"])
+    return counts.most_common(limit)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(host: str, port: int, count: int, repeat: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    owner = "bench-owner"
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        db = client[db_name]
+        topics = _seed(db, owner, count, seed=1)
+        seed_tag = topics[0].split(" > ")[0].lower()
+        anthology_tools.grouping_index_cache.clear()
+
+        started = time.perf_counter()
+        executor = AnthologyToolExecutor(db, owner, seed_tag, None)
+        executor._load_grouping_index()
+        built = time.perf_counter() - started
+        cached = _time(
+            lambda: AnthologyToolExecutor(db, owner, seed_tag, None)._load_grouping_index(),
+            repeat,
+        )
+        entries = executor._load_grouping_entries()
+        print(
+            f"groupings={count} entries={len(entries)} build={built:.2f}s "
+            f"next_run={cached * 1000:.0f}ms"
+        )
+
+        rnd = random.Random(2)
+        topic = rnd.choice(topics)
+        entry = executor._load_grouping_index().by_topic[topic][0]
+        query = " ".join(word.lower() for word in rnd.choice(topics).split(" > "))
+        calls: Dict[str, tuple] = {
+            "search_related_topics": (
+                lambda: _legacy_search(executor, query, 8),
+                lambda: executor.search_related_topics(query, 8),
+            ),
+            "get_topic_details": (
+                lambda: _legacy_topic_entries(executor, topic)[:8],
+                lambda: executor.get_topic_details(topic, 8),
+            ),
+            "validate_source_ref": (
+                lambda: [
+                    item
+                    for item in _legacy_topic_entries(executor, topic)
+                    if entry["post_ids"][0] in item["post_ids"]
+                ],
+                lambda: executor._load_grouping_index().by_topic.get(topic, []),
+            ),
+            "get_corpus_overview": (
+                lambda: _legacy_overview(executor, 8),
+                lambda: executor._load_grouping_index().topic_post_counts.most_common(8),
+            ),
+        }
+        for name, (legacy_call, indexed_call) in calls.items():
+            legacy = _time(legacy_call, repeat)
+            indexed = _time(indexed_call, repeat)
+            print(
+                f"{name} groupings={count} scan={legacy * 1000:.1f}ms "
+                f"index={indexed * 1000:.2f}ms speedup={legacy / max(indexed, 1e-9):.0f}x"
+            )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--groupings", default="50000", help="Comma separated sizes.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for count in args.groupings.split(","):
+        run(args.host, args.port, int(count), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
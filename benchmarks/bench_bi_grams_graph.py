@@ -0,0 +1,118 @@
+"""Latency of the bi-grams graph of a tag: per-neighbour queries vs batched.
+
+Seeds a throwaway database with a tag that has ``--bi-grams`` bi-grams (a
+share of them in both word orders) and a tag doc for every neighbour, then
+times the graph as the endpoint built it before, one ``get_by_tag`` per
+neighbour and a scan of the edge list per bi-gram, against
+``build_bi_grams_graph`` at depth 1 and 2.
+
+    python -m benchmarks.bench_bi_grams_graph --port 8765 --bi-grams 5000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_vocabulary
+from rsstag.bi_grams import RssTagBiGrams
+from rsstag.tags import RssTagTags
+from rsstag.web.bigrams import build_bi_grams_graph
+
+
+def _seed(db: Any, owner: str, tag: str, count: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    vocabulary = [word for word in synthetic_vocabulary(count * 2, seed) if word != tag]
+    neighbours = vocabulary[:count]
+    tags = [{"owner": owner, "tag": tag, "posts_count": count * 10}]
+    bi_grams = []
+    for i, word in enumerate(neighbours):
+        tags.append({"owner": owner, "tag": word, "posts_count": rnd.randint(1, 1000)})
+        pair = [tag, word] if i % 2 else [word, tag]
+        bi_grams.append({"tag": " ".join(pair), "tags": pair})
+        if i % 5 == 0:
+            bi_grams.append({"tag": " ".join(pair[::-1]), "tags": pair[::-1]})
+        # Bi-grams between neighbours for the second level
+        other = rnd.choice(vocabulary)
+        bi_grams.append({"tag": f"{word} {other}", "tags": [word, other]})
+    for bi_gram in bi_grams:
+        bi_gram.update({"owner": owner, "posts_count": rnd.randint(1, 100)})
+    db.tags.insert_many(tags)
+    db.bi_grams.insert_many(bi_grams)
+    RssTagTags(db).prepare()
+    RssTagBiGrams(db).prepare()
+
+
+def _legacy_graph(app: Any, owner: str, tag: str) -> List[dict]:
+    """Nodes and edges the way on_get_tag_bi_grams_graph built them before."""
+    nodes = {tag: app.tags.get_by_tag(owner, tag)}
+    edges: List[dict] = []
+    for bi_gram in app.bi_grams.get_by_tags(owner, [tag], False):
+        freq = bi_gram.get("posts_count") or 1
+        words = bi_gram["tag"].split()
+        if len(words) != 2:
+            continue
+        for other in (word for word in words if word != tag):
+            if other not in nodes:
+                nodes[other] = app.tags.get_by_tag(owner, other)
+            existing = None
+            for i, edge in enumerate(edges):
+                if {edge["source"], edge["target"]} == {tag, other}:
+                    existing = i
+                    break
+            if existing is not None:
+                edges[existing]["weight"] += freq
+            else:
+                edges.append({"source": tag, "target": other, "weight": freq})
+    return edges
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(host: str, port: int, count: int, repeat: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    owner = "bench-owner"
+    tag = "graphtag"
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        db = client[db_name]
+        _seed(db, owner, tag, count, seed=1)
+        app = SimpleNamespace(tags=RssTagTags(db), bi_grams=RssTagBiGrams(db))
+        legacy = _time(lambda: _legacy_graph(app, owner, tag), repeat)
+        print(f"bi_grams={count} per_neighbour={legacy * 1000:.0f}ms")
+        for depth in (1, 2):
+            batched = _time(lambda: build_bi_grams_graph(app, owner, tag, depth), repeat)
+            print(
+                f"bi_grams={count} depth={depth} batched={batched * 1000:.0f}ms "
+                f"speedup={legacy / batched:.0f}x"
+            )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bi-grams", default="5000", help="Comma separated sizes.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for count in args.bi_grams.split(","):
+        run(args.host, args.port, int(count), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
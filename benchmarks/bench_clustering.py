@@ -0,0 +1,181 @@
+"""Time, peak RSS and stability of the DBSCAN and minibatch post clustering.
+
+Generates posts drawn from ``--topics`` synthetic topics and clusters them
+with the DBSCAN engine (TF-IDF of all posts at once, what TASK_CLUSTERING
+always did) and with the minibatch engine (hashed features, sparse random
+projection, mini-batch k-means on a sample, streamed assignment). Every run
+happens in a fresh process, which reports its time and how much its peak RSS
+grew over the generated corpus; DBSCAN is skipped above ``--dbscan-max``
+posts. Stability of the minibatch engine is the adjusted Rand index between
+two fits with different seeds, and, for the last ``--new`` share of posts,
+between assigning them to a model fitted without them and fitting on all
+posts. No MongoDB is needed.
+
+    python -m benchmarks.bench_clustering --posts 10000,100000
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.corpus import synthetic_vocabulary
+from rsstag.post_clustering import (
+    BATCH_SIZE,
+    ClusteringModel,
+    PostVectorizer,
+    assign_posts,
+    fit_model,
+)
+
+
+def _topic_posts(args: argparse.Namespace, size: int) -> List[str]:
+    rnd = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(50000, args.seed)
+    topic_words = [rnd.sample(vocabulary, 80) for _ in range(args.topics)]
+    posts: List[str] = []
+    for _ in range(size):
+        if posts and rnd.random() < args.reposts:
+            # A repost of an earlier post with a fifth of its lemmas changed
+            words = [
+                word if rnd.random() < 0.8 else rnd.choice(vocabulary)
+                for word in rnd.choice(posts).split()
+            ]
+        else:
+            own = topic_words[rnd.randrange(args.topics)]
+            words = [
+                rnd.choice(own) if rnd.random() < args.topic_share else rnd.choice(vocabulary)
+                for _ in range(args.words)
+            ]
+        posts.append(" ".join(words))
+    return posts
+
+
+def _batches(texts: List[str]) -> Iterator[Tuple[List[str], List[str]]]:
+    for start in range(0, len(texts), BATCH_SIZE):
+        chunk = texts[start : start + BATCH_SIZE]
+        yield [str(start + i) for i in range(len(chunk))], chunk
+
+
+def _labels(model: ClusteringModel, texts: List[str]) -> np.ndarray:
+    labels = np.full(len(texts), -1)
+    clusters = assign_posts(model, _batches(texts), PostVectorizer([]))
+    for label, pids in clusters.items():
+        for pid in pids:
+            labels[int(pid)] = label
+    return labels
+
+
+def _minibatch(texts: List[str], seed: int = 0) -> Tuple[ClusteringModel, np.ndarray]:
+    model = fit_model(_batches(texts), len(texts), PostVectorizer([]), time.time(), seed)
+    return model, _labels(model, texts)
+
+
+def _dbscan(texts: List[str]) -> np.ndarray:
+    dbs = DBSCAN(eps=0.9, min_samples=2, n_jobs=1)
+    dbs.fit(TfidfVectorizer().fit_transform(texts))
+    return dbs.labels_
+
+
+def _run(
+    args: argparse.Namespace, size: int, engine: str
+) -> Tuple[np.ndarray, float, int, int]:
+    """Labels, seconds, RSS with the corpus and peak RSS in bytes of a run."""
+    texts = _topic_posts(args, size)
+    PostVectorizer([])  # the projection is built once per process
+    split = int(size * (1 - args.new))
+    if engine == "assign":
+        old_model, _ = _minibatch(texts[:split])
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if engine == "dbscan":
+        labels = _dbscan(texts)
+    elif engine == "assign":
+        labels = _labels(old_model, texts[split:])
+    else:
+        _, labels = _minibatch(texts, seed=1 if engine == "minibatch-seed" else 0)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KB on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return labels, elapsed, base_rss * 1024, peak_rss * 1024
+
+
+def _measure(
+    args: argparse.Namespace, size: int, engine: str
+) -> Tuple[np.ndarray, float, int, int]:
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+        return executor.submit(_run, args, size, engine).result()
+
+
+def _pairs_kept(reference: np.ndarray, labels: np.ndarray) -> float:
+    """Share of the post pairs clustered together in ``reference`` kept together."""
+    together = kept = 0
+    for label in np.unique(reference[reference >= 0]):
+        members = labels[reference == label]
+        together += len(members) * (len(members) - 1) // 2
+        _, counts = np.unique(members[members >= 0], return_counts=True)
+        kept += int((counts * (counts - 1) // 2).sum())
+    return kept / together if together else 0.0
+
+
+def _summary(labels: np.ndarray) -> str:
+    clustered = labels[labels >= 0]
+    return f"clusters={len(np.unique(clustered))} clustered={len(clustered) / len(labels):.0%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", default="10000,100000", help="Comma separated sizes.")
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--words", type=int, default=80, help="Lemmas per post.")
+    parser.add_argument(
+        "--topic-share", type=float, default=0.5, help="Share of lemmas from the topic."
+    )
+    parser.add_argument("--reposts", type=float, default=0.2, help="Share of reposts.")
+    parser.add_argument("--new", type=float, default=0.1)
+    parser.add_argument("--dbscan-max", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.posts.split(",")):
+        dbscan_labels = None
+        if size <= args.dbscan_max:
+            dbscan_labels, elapsed, base, peak = _measure(args, size, "dbscan")
+            print(
+                f"dbscan    posts={size} time={elapsed:.1f}s "
+                f"RSS corpus={base / 1e6:.0f}MB peak={peak / 1e6:.0f}MB "
+                f"{_summary(dbscan_labels)}"
+            )
+
+        labels, elapsed, base, peak = _measure(args, size, "minibatch")
+        other_seed = _measure(args, size, "minibatch-seed")[0]
+        line = (
+            f"minibatch posts={size} time={elapsed:.1f}s "
+            f"RSS corpus={base / 1e6:.0f}MB peak={peak / 1e6:.0f}MB "
+            f"{_summary(labels)} seed ARI={adjusted_rand_score(labels, other_seed):.2f} "
+            f"seed pairs kept={_pairs_kept(labels, other_seed):.0%}"
+        )
+        if dbscan_labels is not None:
+            line += f" dbscan pairs kept={_pairs_kept(dbscan_labels, labels):.0%}"
+        print(line)
+
+        split = int(size * (1 - args.new))
+        new_labels, elapsed, _, peak = _measure(args, size, "assign")
+        print(
+            f"          new posts={size - split} assign={elapsed:.1f}s "
+            f"peak={peak / 1e6:.0f}MB "
+            f"assigned vs refit ARI={adjusted_rand_score(new_labels, labels[split:]):.2f} "
+            f"pairs kept={_pairs_kept(labels[split:], new_labels):.0%}"
+        )
+
+if __name__ == "__main__":
+    main()
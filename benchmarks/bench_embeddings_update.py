@@ -0,0 +1,54 @@
+"""Time of a Word2Vec/FastText update on new posts vs a full retrain.
+
+Trains a model from scratch on ``--posts`` synthetic posts (what every
+TASK_W2V/TASK_FASTTEXT run did), then updates it with ``--new`` posts
+tagged since, the way the incremental mode does (``build_vocab(update=True)``
+and training on the new posts only). Reports both times per model. No
+MongoDB is needed, the learners get the texts as lists.
+
+    python -m benchmarks.bench_embeddings_update --posts 20000 --new 500
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.fasttext import FastTextLearn
+from rsstag.w2v import W2VLearn
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--new", type=int, default=500)
+    parser.add_argument("--words", type=int, default=100, help="Lemmas per post.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(30000, args.seed)
+    posts = [(synthetic_text(rnd, vocabulary, args.words), 0) for _ in range(args.posts)]
+    new_posts = [(synthetic_text(rnd, vocabulary, args.words), 0) for _ in range(args.new)]
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        for name, learn_cls in (("w2v", W2VLearn), ("fasttext", FastTextLearn)):
+            path = os.path.join(model_dir, f"model.{name}")
+            started = time.perf_counter()
+            learn_cls(path).learn(posts, time.time())
+            full = time.perf_counter() - started
+
+            started = time.perf_counter()
+            learn_cls(path).update(new_posts, time.time())
+            update = time.perf_counter() - started
+            print(
+                f"{name:<9} posts={args.posts} new={args.new} "
+                f"full retrain={full:.1f}s update={update:.1f}s "
+                f"({full / update:.0f}x faster)"
+            )
+
+
+if __name__ == "__main__":
+    main()
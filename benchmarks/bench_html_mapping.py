@@ -0,0 +1,69 @@
+"""Time of build_html_mapping: char by char vs tokenized, and html_to_text.
+
+Generates synthetic post HTML (paragraphs, links, line breaks and entities)
+of every ``--sizes`` size and times the char by char ``build_html_mapping``
+the tests keep as reference, the tokenized ``build_html_mapping`` and
+``html_to_text``, which the pages use since they never read the mapping.
+
+    python -m benchmarks.bench_html_mapping --sizes 1000,100000,1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Any, Callable, List
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.html_utils import build_html_mapping, html_to_text
+from tests.test_html_utils import reference_build_html_mapping
+
+
+def _html(rnd: random.Random, vocabulary: List[str], size: int) -> str:
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        words = synthetic_text(rnd, vocabulary, rnd.randint(20, 80)).split()
+        for _ in range(3):
+            pos = rnd.randrange(len(words))
+            words[pos] = f'<a href="https://example.com/{words[pos]}">{words[pos]}</a>'
+        words.insert(rnd.randrange(len(words)), rnd.choice(["&amp;", "&nbsp;", "&quot;"]))
+        part = f"<p>{' '.join(words)}<br/>\n</p>"
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)[:size]
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma separated sizes.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(20000, args.seed)
+    for size in (int(value) for value in args.sizes.split(",")):
+        html = _html(rnd, vocabulary, size)
+        assert build_html_mapping(html) == reference_build_html_mapping(html)
+        reference = _time(lambda: reference_build_html_mapping(html), args.repeat)
+        tokenized = _time(lambda: build_html_mapping(html), args.repeat)
+        text_only = _time(lambda: html_to_text(html), args.repeat)
+        print(
+            f"size={size} char_by_char={reference * 1000:.2f}ms "
+            f"tokenized={tokenized * 1000:.2f}ms ({reference / tokenized:.1f}x) "
+            f"html_to_text={text_only * 1000:.2f}ms ({reference / text_only:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Contention benchmark for batched item claiming.
+
+Runs N worker processes that all claim TASK_TAGS-style post batches for one
+owner and reports how many posts were handed out more than once. The legacy
+find-then-update_many claim is run as a baseline next to ``claim_items``.
+
+Needs a reachable Mongo server (``docker-compose.test.yml`` exposes one on
+port 8765):
+
+    python -m benchmarks.bench_item_claim --port 8765 --workers 8 --posts 20000
+"""
+
+import argparse
+import time
+import uuid
+from collections import Counter
+from multiprocessing import Process, Queue
+from typing import Any, Callable, Dict, List
+
+from pymongo import MongoClient
+
+from rsstag.tasks import claim_items, claimable_item_processing
+
+OWNER = "bench-owner"
+
+
+def legacy_claim(collection: Any, query: Dict[str, Any], limit: int) -> List[dict]:
+    """The pre-``claim_items`` shape: read candidates, then lock them blindly."""
+    data = list(
+        collection.find({**query, "processing": claimable_item_processing()}).limit(
+            limit
+        )
+    )
+    if data:
+        collection.update_many(
+            {"_id": {"$in": [item["_id"] for item in data]}},
+            {"$set": {"processing": time.time()}},
+        )
+    return data
+
+
+CLAIMERS: Dict[str, Callable[[Any, Dict[str, Any], int], List[dict]]] = {
+    "legacy": legacy_claim,
+    "claim_items": claim_items,
+}
+
+
+def _worker(
+    host: str, port: int, db_name: str, mode: str, batch: int, out: Queue
+) -> None:
+    client: MongoClient = MongoClient(host=host, port=port)
+    posts = client[db_name].posts
+    claim = CLAIMERS[mode]
+    claimed: List[Any] = []
+    query = {"owner": OWNER, "tags": []}
+    while True:
+        data = claim(posts, query, batch)
+        if not data:
+            if posts.count_documents(query) == 0:
+                break
+            continue
+        ids = [item["_id"] for item in data]
+        claimed.extend(ids)
+        posts.update_many(
+            {"_id": {"$in": ids}}, {"$set": {"tags": ["done"], "processing": 0}}
+        )
+    client.close()
+    out.put(claimed)
+
+
+def run(host: str, port: int, mode: str, workers: int, posts: int, batch: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        collection = client[db_name].posts
+        collection.create_index([("owner", 1), ("tags", 1), ("processing", 1)])
+        collection.insert_many(
+            [{"owner": OWNER, "tags": [], "processing": 0} for _ in range(posts)]
+        )
+        out: Queue = Queue()
+        procs = [
+            Process(target=_worker, args=(host, port, db_name, mode, batch, out))
+            for _ in range(workers)
+        ]
+        started = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        counts: Counter = Counter()
+        for _ in procs:
+            counts.update(out.get())
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+        duplicates = sum(count - 1 for count in counts.values() if count > 1)
+        print(
+            f"{mode:12s} workers={workers} posts={posts} batch={batch} "
+            f"elapsed={elapsed:.2f}s claimed={sum(counts.values())} "
+            f"duplicate_claims={duplicates}"
+        )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+    for mode in CLAIMERS:
+        run(args.host, args.port, mode, args.workers, args.posts, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Memory and scan time of post lemmas as str lists vs vocabulary id arrays.
+
+Holds the lemmas of ``--posts`` synthetic posts the way analytics handlers
+used to (``decode_words`` lists) and as ``rsstag.lemma_vocab`` id arrays,
+reports the traced memory of both and the time of a "find every occurrence
+of a word" scan over each representation. No MongoDB is needed.
+
+    python -m benchmarks.bench_lemma_arrays --posts 100000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.lemma_vocab import LemmaVocabulary, ids_view
+from rsstag.text_codec import CODEC_RAW, decode_words, encode_text
+
+
+def _traced(build: Callable[[], object]) -> Tuple[object, int]:
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=150, help="Mean words per post.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(50000, args.seed)
+    blobs: List[bytes] = [
+        encode_text(
+            synthetic_text(rnd, vocabulary, rnd.randint(args.words // 2, args.words * 3 // 2)),
+            CODEC_RAW,
+        )
+        for _ in range(args.posts)
+    ]
+
+    lists, lists_size = _traced(lambda: [decode_words(blob) for blob in blobs])
+
+    vocab = LemmaVocabulary()
+    for words in lists:
+        for word in words:
+            if word not in vocab.ids:
+                vocab.add(word, vocab.next_id)
+    arrays, arrays_size = _traced(lambda: [vocab.to_ids(words) for words in lists])
+    vocab_size = sum(len(word) + 49 for word in vocab.ids) + len(vocab.ids) * 16
+
+    word = lists[0][0]
+    started = time.perf_counter()
+    found_lists = sum(
+        len([i for i, lemma in enumerate(words) if lemma == word]) for words in lists
+    )
+    lists_time = time.perf_counter() - started
+
+    word_id = vocab.get_id(word)
+    started = time.perf_counter()
+    found_arrays = sum(
+        len(np.flatnonzero(ids_view(word_ids) == word_id)) for word_ids in arrays
+    )
+    arrays_time = time.perf_counter() - started
+    assert found_lists == found_arrays
+
+    tokens = sum(len(words) for words in lists)
+    print(f"posts={args.posts} tokens={tokens} vocabulary={len(vocab)}")
+    print(f"str lists:  {lists_size / 1e6:8.1f}MB scan={lists_time:6.2f}s")
+    print(
+        f"id arrays:  {arrays_size / 1e6:8.1f}MB (+~{vocab_size / 1e6:.1f}MB vocabulary) "
+        f"scan={arrays_time:6.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
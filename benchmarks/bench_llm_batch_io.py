@@ -0,0 +1,179 @@
+"""Peak memory of a batch round trip, in-memory JSONL vs streamed.
+
+Starts a local fake of the OpenAI files/batches API and runs one batch of
+``--items`` requests of ``--prompt-words`` words through it: upload the
+input, create the batch, download a result file with one line per request
+and parse it. The in-memory variant is what ``LlmBatchProvider`` did before
+(join the JSONL into one string, upload it, read the whole result text and
+split it); the streamed one writes ``BatchInput`` and reads
+``iter_file_lines``. Reports the traced peak memory of each.
+
+    python -m benchmarks.bench_llm_batch_io --items 10000
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.llm.batch import NebiusBatchProvider
+
+_RESULT_TEXT = "sport"
+
+
+class _FakeBatchApi(BaseHTTPRequestHandler):
+    items = 0
+    uploaded = 0
+    result_words = 150
+
+    def _send_json(self, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        if self.path.endswith("/files"):
+            # Drained in blocks, the fake keeps no copy of the upload
+            remaining = length
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 1 << 16)))
+            _FakeBatchApi.uploaded = length
+            self._send_json(
+                {
+                    "id": "file-in",
+                    "object": "file",
+                    "bytes": length,
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                }
+            )
+            return
+        request = json.loads(self.rfile.read(length))
+        self._send_json(
+            {
+                "id": "batch-1",
+                "object": "batch",
+                "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"],
+                "completion_window": request["completion_window"],
+                "status": "validating",
+                "created_at": 0,
+            }
+        )
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/jsonl")
+        self.end_headers()
+        rnd = random.Random(2)
+        vocabulary = synthetic_vocabulary(5000, 2)
+        for i in range(self.items):
+            line = {
+                "custom_id": f"row:{i}",
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "choices": [
+                            {
+                                "message": {
+                                    "content": synthetic_text(
+                                        rnd, vocabulary, self.result_words
+                                    )
+                                }
+                            }
+                        ]
+                    },
+                },
+            }
+            self.wfile.write(json.dumps(line).encode("utf-8") + b"\n")
+        self.close_connection = True
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def _requests(provider: NebiusBatchProvider, items: int, words: int) -> Iterator[dict]:
+    rnd = random.Random(1)
+    vocabulary = synthetic_vocabulary(20000, 1)
+    for i in range(items):
+        yield provider.build_request(f"row:{i}", synthetic_text(rnd, vocabulary, words))
+
+
+def _in_memory(provider: NebiusBatchProvider, args: argparse.Namespace) -> int:
+    requests = list(_requests(provider, args.items, args.prompt_words))
+    jsonl = "\n".join(json.dumps(req, ensure_ascii=False) for req in requests)
+    file_obj = io.BytesIO(jsonl.encode("utf-8"))
+    file_obj.name = "batch.jsonl"
+    file_resp = provider._client.files.create(file=file_obj, purpose="batch")
+    provider._client.batches.create(
+        input_file_id=file_resp.id,
+        endpoint=provider.batch_endpoint,
+        completion_window="24h",
+    )
+    output_text = provider.get_file_content("file-out")
+    lines = [line for line in output_text.splitlines() if line.strip()]
+    return sum(1 for line in lines if json.loads(line)["response"]["status_code"] == 200)
+
+
+def _streamed(provider: NebiusBatchProvider, args: argparse.Namespace) -> int:
+    provider.create_batch(
+        _requests(provider, args.items, args.prompt_words), provider.batch_endpoint
+    )
+    return sum(
+        1
+        for line in provider.iter_file_lines("file-out")
+        if json.loads(line)["response"]["status_code"] == 200
+    )
+
+
+def _measure(run: Callable[[], int]) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    parsed = run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return parsed, peak, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--prompt-words", type=int, default=400)
+    parser.add_argument("--result-words", type=int, default=150)
+    args = parser.parse_args()
+
+    _FakeBatchApi.items = args.items
+    _FakeBatchApi.result_words = args.result_words
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeBatchApi)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    provider = NebiusBatchProvider(
+        "token",
+        "fake-model",
+        batch_host=f"http://127.0.0.1:{server.server_address[1]}/v1/",
+    )
+    try:
+        for name, run in (("in-memory", _in_memory), ("streamed", _streamed)):
+            parsed, peak, elapsed = _measure(lambda: run(provider, args))
+            print(
+                f"{name:<10} items={args.items} upload={_FakeBatchApi.uploaded / 1e6:.1f}MB "
+                f"parsed={parsed} peak={peak / 1e6:.1f}MB time={elapsed:.2f}s"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Small LLM HTTP calls, a new connection per call vs the keep-alive pool.
+
+Starts a local stub of llama.cpp's ``/v1/chat/completions`` (HTTP/1.1,
+keep-alive) and sends ``--calls`` short completions through ``LLamaCPP``,
+first opening a connection per call like the client used to, then through
+an ``HTTPConnectionPool``, from ``--threads`` threads each time. Reports the
+wall time, the mean call latency and the TCP connections the server saw.
+
+    python -m benchmarks.bench_llm_http_pool --calls 1000 --threads 4
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from rsstag.llm.http_pool import HTTPConnectionPool, PooledResponse
+from rsstag.llm.llamacpp import LLamaCPP
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Like llama.cpp's server; with Nagle on, a kept-alive socket stalls on
+    # delayed ACKs between the headers and the body write
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self) -> None:
+        super().setup()
+        with _Stub.lock:
+            _Stub.connections += 1
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"choices": [{"message": {"content": "ok"}}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _NewConnectionPool(HTTPConnectionPool):
+    """The old behaviour: connect, send, read, close."""
+
+    def __init__(self, netloc: str) -> None:
+        super().__init__()
+        self._netloc = netloc
+
+    def request(
+        self,
+        url: str,
+        method: str,
+        path: str,
+        body: Any = None,
+        headers: Any = None,
+        timeout: float = 300.0,
+    ) -> PooledResponse:
+        conn = HTTPConnection(self._netloc, timeout=timeout)
+        try:
+            conn.request(method, path, body, dict(headers or {}))
+            res = conn.getresponse()
+            return PooledResponse(res.status, res.reason, res.read())
+        finally:
+            conn.close()
+
+
+def _run(llm: LLamaCPP, calls: int, threads: int) -> Dict[str, float]:
+    latencies: List[float] = []
+
+    def one(i: int) -> None:
+        started = time.perf_counter()
+        assert llm.call([json.dumps({"n": i})]) == "ok"
+        latencies.append(time.perf_counter() - started)
+
+    _Stub.connections = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(one, range(calls)))
+    return {
+        "wall": time.perf_counter() - started,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "connections": _Stub.connections,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    netloc = f"127.0.0.1:{server.server_address[1]}"
+    pool = HTTPConnectionPool(max_per_host=args.threads)
+    try:
+        for name, llm_pool in (
+            ("new connection", _NewConnectionPool(netloc)),
+            ("keep-alive pool", pool),
+        ):
+            llm = LLamaCPP(f"http://{netloc}", pool=llm_pool)
+            result = _run(llm, args.calls, args.threads)
+            print(
+                f"{name:<16} calls={args.calls} threads={args.threads} "
+                f"wall={result['wall']:.2f}s mean={result['mean_ms']:.2f}ms "
+                f"connections={result['connections']}"
+            )
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Pids sent to Mongo by download dedup, with and without the pid filter.
+
+Fills a ``PidFilter`` with the pids of an owner holding ``--posts`` posts
+and replays sync chunks of ``--chunk`` posts where ``--seen`` of them are
+re-delivered. Reports the filter size, the in-memory check time per chunk
+and how many pids each chunk still looks up in Mongo (all of them before
+the filter). No MongoDB is needed.
+
+    python -m benchmarks.bench_pid_filter --posts 1000000 --seen 0.5
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from rsstag.pid_filter import PidFilter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--seen", type=float, default=0.5, help="Re-delivered share.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    stored = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(args.posts)]
+    pid_filter = PidFilter(args.posts * 2)
+    started = time.perf_counter()
+    for i in range(0, len(stored), 10000):
+        pid_filter.add(stored[i : i + 10000])
+    build_time = time.perf_counter() - started
+
+    looked_up = check_time = 0.0
+    seen_count = int(args.chunk * args.seen)
+    for _ in range(args.chunks):
+        chunk = rnd.sample(stored, seen_count) + [
+            str(uuid.UUID(int=rnd.getrandbits(128)))
+            for _ in range(args.chunk - seen_count)
+        ]
+        started = time.perf_counter()
+        hits = pid_filter.might_contain(chunk)
+        check_time += time.perf_counter() - started
+        looked_up += sum(hits)
+
+    print(
+        f"posts={args.posts} filter={pid_filter.nbytes / 1e6:.1f}MB "
+        f"hashes={pid_filter.hashes_count} build={build_time:.2f}s"
+    )
+    print(
+        f"chunk={args.chunk} seen={args.seen:.0%}: "
+        f"pids looked up per chunk {looked_up / args.chunks:.0f} "
+        f"(was {args.chunk}), check {check_time / args.chunks * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Wall clock of a PostSplitter session, sequential vs concurrent requests.
+
+Starts a fake llama.cpp server that answers ``/v1/chat/completions`` after
+``--latency`` seconds and drives ``PostSplitter._run_pipeline_session`` with a
+session shaped like a long post: ``--rounds`` rounds of ``--chunks``
+independent requests (``OverlapChunker`` chunks, then topic requests). The
+requests go through the real ``LLamaCPP`` handler, once with one request in
+flight (the old behaviour) and once with ``--in-flight``. Needs txt_splitt.
+
+    python -m benchmarks.bench_post_splitter --chunks 6 --latency 0.5
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+from rsstag.llm.llamacpp import LLamaCPP
+from rsstag.post_splitter import LLMHandlerAdapter, PostSplitter
+
+
+class _FakeLlamaCpp(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        prompt = json.loads(self.rfile.read(length))["messages"][0]["content"]
+        time.sleep(self.latency)
+        body = json.dumps(
+            {"choices": [{"message": {"content": f"topics of {prompt}"}}]}
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _Request:
+    def __init__(self, prompt: str) -> None:
+        self.prompt = prompt
+        self.temperature = 0.0
+
+
+class _Session:
+    def __init__(self, rounds: int, chunks: int) -> None:
+        self._rounds = rounds
+        self._chunks = chunks
+        self.responses: List[Any] = []
+
+    def is_complete(self) -> bool:
+        return len(self.responses) >= self._rounds * self._chunks
+
+    def pending_requests(self) -> tuple:
+        done_round = len(self.responses) // self._chunks
+        return tuple(
+            _Request(f"round {done_round} chunk {i}") for i in range(self._chunks)
+        )
+
+    def submit_responses(self, responses: List[Any]) -> None:
+        self.responses.extend(responses)
+
+    def result(self) -> int:
+        return len(self.responses)
+
+
+class _Pipeline:
+    def __init__(self, rounds: int, chunks: int) -> None:
+        self._rounds = rounds
+        self._chunks = chunks
+
+    def start(self, text: str) -> _Session:
+        return _Session(self._rounds, self._chunks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--in-flight", type=int, default=PostSplitter.DEFAULT_MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    _FakeLlamaCpp.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeLlamaCpp)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm = LLMHandlerAdapter(LLamaCPP(f"http://127.0.0.1:{server.server_address[1]}"))
+    try:
+        for in_flight in (1, args.in_flight):
+            splitter = PostSplitter(llm, max_in_flight=in_flight)
+            started = time.perf_counter()
+            answered = splitter._run_pipeline_session(
+                _Pipeline(args.rounds, args.chunks), "text", llm
+            )
+            elapsed = time.perf_counter() - started
+            print(
+                f"in_flight={in_flight:<3} requests={answered} "
+                f"latency={args.latency}s wall={elapsed:6.2f}s"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
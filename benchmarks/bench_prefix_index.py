@@ -0,0 +1,115 @@
+"""Memory, build time and query latency: ``PrefixTreeBuilder`` vs ``PrefixIndex``.
+
+Generates synthetic post texts of every ``--words`` size (words per corpus)
+and, in a fresh process per structure, builds the dict trie the prefixes
+pages kept per user and the sorted-array ``PrefixIndex`` with its stored
+doc, reporting build time and how much the peak RSS grew. Query latency is
+the median of the three prefixes page queries over random prefixes; the
+first ``get_top_n`` is reported apart, ``PrefixIndex`` keeps its result. No
+MongoDB is needed.
+
+    python -m benchmarks.bench_prefix_index --words 100000,1000000
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.prefix_index import PrefixIndex
+from rsstag.prefix_tree import PrefixTreeBuilder, text2words
+
+
+def _texts(size: int, seed: int) -> List[str]:
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(50000, seed)
+    return [synthetic_text(rnd, vocabulary, 200) for _ in range(max(1, size // 200))]
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _run(size: int, seed: int, structure: str, repeat: int) -> Dict[str, Any]:
+    texts = _texts(size, seed)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if structure == "trie":
+        index: Any = PrefixTreeBuilder()
+        for text in texts:
+            index.add_words_from_doc(text)
+    else:
+        counts: Counter = Counter()
+        for text in texts:
+            counts.update(text2words(text))
+        index = PrefixIndex.from_counts(counts)
+    built = time.perf_counter() - started
+    # ru_maxrss is in KB on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result: Dict[str, Any] = {"build": built, "rss": (peak_rss - base_rss) * 1024}
+    if structure == "index":
+        doc = index.to_doc()
+        result["nbytes"] = index.nbytes
+        result["doc"] = len(doc["words"]) + len(doc["counts"])
+        result["load"] = _time(lambda: PrefixIndex.from_doc(doc), repeat)
+
+    rnd = random.Random(seed)
+    words = [word for text in texts[:50] for word in text2words(text)]
+    prefixes = [rnd.choice(words)[: rnd.randint(1, 3)] for _ in range(repeat)]
+    result["top_n_first"] = _time(lambda: index.get_top_n(2), 1)
+    result["top_n"] = _time(lambda: index.get_top_n(2), repeat)
+    result["tails"] = statistics.median(
+        _time(lambda: index.get_tails(prefix), 1) for prefix in prefixes
+    )
+    result["tree"] = statistics.median(
+        _time(lambda: index.get_compact_tree(prefix), 1) for prefix in prefixes
+    )
+    return result
+
+
+def _measure(size: int, seed: int, structure: str, repeat: int) -> Dict[str, Any]:
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+        return executor.submit(_run, size, seed, structure, repeat).result()
+
+
+def _queries(result: Dict[str, Any]) -> Tuple[str, ...]:
+    keys = ("top_n_first", "top_n", "tails", "tree")
+    return tuple(f"{result[key] * 1000:.2f}ms" for key in keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", default="100000,1000000", help="Comma separated sizes.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.words.split(",")):
+        trie = _measure(size, args.seed, "trie", args.repeat)
+        index = _measure(size, args.seed, "index", args.repeat)
+        print(
+            f"trie  words={size} build={trie['build']:.2f}s RSS={trie['rss'] / 1e6:.1f}MB "
+            "top_n=%s (then %s) tails=%s tree=%s" % _queries(trie)
+        )
+        print(
+            f"index words={size} build={index['build']:.2f}s RSS={index['rss'] / 1e6:.1f}MB "
+            f"nbytes={index['nbytes'] / 1e6:.2f}MB doc={index['doc'] / 1e6:.2f}MB "
+            f"load={index['load'] * 1000:.1f}ms "
+            "top_n=%s (then %s) tails=%s tree=%s" % _queries(index)
+        )
+
+
+if __name__ == "__main__":
+    main()
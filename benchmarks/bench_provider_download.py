@@ -0,0 +1,131 @@
+"""Peak memory of a bazqux download, streamed in chunks vs held whole.
+
+Serves ``--items`` synthetic reader API items from a local HTTP server,
+paged with continuations like bazqux, and consumes
+``BazquxProvider.download`` the way ``ProviderWorker.handle_download`` does:
+each chunk is dropped once "stored". Reports the traced peak memory for
+``--chunk-size`` and for a chunk size above the item count, which is what
+the old single-yield download held.
+
+    python -m benchmarks.bench_provider_download --items 50000
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.providers.bazqux import BazquxProvider
+from rsstag.providers.providers import BAZQUX
+
+_RND = random.Random(1)
+_VOCABULARY = synthetic_vocabulary(20000)
+# Distinct bodies so every stored post compresses like real text
+_BODIES = ["<p>" + synthetic_text(_RND, _VOCABULARY, 250) + "</p>" for _ in range(500)]
+
+
+class _ReaderApi(BaseHTTPRequestHandler):
+    items_per_stream = 0
+    page_size = 1000
+
+    def do_GET(self) -> None:
+        query = parse_qs(urlparse(self.path).query)
+        stream = query["s"][0]
+        start = int(query.get("c", ["0"])[0])
+        end = min(start + self.page_size, self.items_per_stream)
+        page: Dict[str, Any] = {
+            "items": [
+                {
+                    "id": f"{stream}-{number}",
+                    "title": f"Post {number}",
+                    "summary": {"content": _BODIES[number % len(_BODIES)]},
+                    "canonical": [{"href": f"http://example.com/{number}"}],
+                    "origin": {"streamId": stream, "title": stream},
+                    "published": 1700000000 + number,
+                }
+                for number in range(start, end)
+            ]
+        }
+        if end < self.items_per_stream:
+            page["continuation"] = str(end)
+        body = json.dumps(page).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _LocalBazqux(BazquxProvider):
+    def __init__(self, config: dict, streams: int) -> None:
+        super().__init__(config)
+        self._streams = streams
+
+    def _require_subscriptions(self, user: dict) -> dict:
+        return {
+            "subscriptions": [
+                {"id": f"feed/{i}", "title": str(i), "categories": [{"label": f"c{i}"}]}
+                for i in range(self._streams)
+            ]
+        }
+
+    def _stream_request(self, headers: dict, stream: str, limit: int, category: str) -> dict:
+        request = super()._stream_request(headers, stream, limit, category)
+        request["url"] = request["url"].replace("https://", "http://", 1)
+        return request
+
+
+def _run(address: str, streams: int, chunk_size: int) -> None:
+    config = {
+        "settings": {
+            "host_name": "localhost",
+            "no_category_name": "",
+            "download_chunk_size": chunk_size,
+        },
+        BAZQUX: {"api_host": address},
+    }
+    provider = _LocalBazqux(config, streams)
+    tracemalloc.start()
+    started = time.perf_counter()
+    received = chunks = 0
+    for posts, _ in provider.download({"sid": "bench", "token": ""}):
+        received += len(posts)
+        chunks += 1
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"chunk_size={chunk_size:>10} posts={received} chunks={chunks} "
+        f"peak={peak / 1e6:7.1f}MB time={elapsed:6.2f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--streams", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    _ReaderApi.items_per_stream = args.items // args.streams
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ReaderApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"127.0.0.1:{server.server_address[1]}"
+    try:
+        _run(address, args.streams, args.chunk_size)
+        _run(address, args.streams, args.items + 1)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Throughput of TASK_RAW_TO_POSTS: serial batches vs the staged pipeline.
+
+Archives ``--messages`` synthetic Telegram messages into ``raw_posts`` of a
+scratch database and converts them with the pre-pipeline loop (read 500,
+transform, store, mark, repeat) and with ``ProviderWorker.handle_raw_to_posts``
+for every ``--pools`` size. Each run starts from unconverted raw docs and an
+empty posts collection; posts/sec is reported per run.
+
+Needs a reachable Mongo server (``docker-compose.test.yml`` exposes one on
+port 8765):
+
+    python -m benchmarks.bench_raw_to_posts --port 8765 --messages 100000
+"""
+
+import argparse
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+from unittest.mock import MagicMock
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.providers.providers import TELEGRAM
+from rsstag.providers.telegram import TelegramProvider
+from rsstag.workers.provider_worker import ProviderWorker
+
+OWNER = "bench-owner"
+CHATS = 50
+
+
+def _raw_docs(count: int, seed: int) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(20000, seed)
+    docs: List[Dict[str, Any]] = []
+    for msg_id in range(1, count + 1):
+        chat_id = -1000000000000 - msg_id % CHATS
+        text = synthetic_text(rnd, vocabulary, rnd.randint(20, 200))
+        docs.append(
+            {
+                "owner": OWNER,
+                "provider": TELEGRAM,
+                "stream_id": str(chat_id),
+                "external_id": f"{chat_id}:{msg_id}",
+                "msg_id": msg_id,
+                "raw": {
+                    "id": msg_id << 20,
+                    "chat_id": chat_id,
+                    "date": 1700000000 + msg_id,
+                    "content": {
+                        "@type": "messageText",
+                        "text": {
+                            "text": text,
+                            "entities": [
+                                {
+                                    "@type": "textEntity",
+                                    "offset": 0,
+                                    "length": 5,
+                                    "type": {"@type": "textEntityTypeBold"},
+                                }
+                            ],
+                        },
+                    },
+                },
+            }
+        )
+    return docs
+
+
+def serial_raw_to_posts(worker: ProviderWorker, db: Any, provider: Any) -> None:
+    """The pre-pipeline handle_raw_to_posts loop."""
+    chat_by_stream = {
+        str(doc["stream_id"]): doc.get("raw_chat", {})
+        for doc in db.raw_download_state.find({"owner": OWNER, "provider": TELEGRAM})
+    }
+    while True:
+        raw_docs = list(
+            db.raw_posts.find(
+                {
+                    "owner": OWNER,
+                    "provider": TELEGRAM,
+                    "posts_converted": {"$exists": False},
+                },
+                projection={"raw": True},
+            ).limit(500)
+        )
+        if not raw_docs:
+            break
+        messages = [d["raw"] for d in raw_docs if isinstance(d.get("raw"), dict)]
+        posts, feeds = provider.raw_messages_to_posts(OWNER, messages, chat_by_stream)
+        worker._store_converted_posts(OWNER, TELEGRAM, posts, feeds)
+        db.raw_posts.update_many(
+            {"_id": {"$in": [d["_id"] for d in raw_docs]}},
+            {"$set": {"posts_converted": 1}},
+        )
+        if len(raw_docs) < 500:
+            break
+
+
+def _reset(db: Any) -> None:
+    db.posts.delete_many({})
+    db.feeds.delete_many({})
+    db.raw_posts.update_many({}, {"$unset": {"posts_converted": ""}})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--pools", default="0,2,4", help="Comma separated pool sizes.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    client: MongoClient = MongoClient(host=args.host, port=args.port)
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    db = client[db_name]
+    try:
+        db.posts.create_index([("owner", 1), ("pid", 1)])
+        db.feeds.create_index([("owner", 1), ("feed_id", 1)])
+        db.raw_posts.insert_many(_raw_docs(args.messages, args.seed))
+        config = {"settings": {"host_name": "localhost", "no_category_name": ""}}
+        provider = TelegramProvider(config, db)
+        runs: List[Any] = [("serial", None)]
+        runs.extend((f"pipeline pool={size}", int(size)) for size in args.pools.split(","))
+        for name, pool_size in runs:
+            _reset(db)
+            run_config = {
+                "settings": dict(config["settings"], raw_to_posts_pool_size=pool_size or 0)
+            }
+            worker = ProviderWorker(
+                db, run_config, {TELEGRAM: provider}, MagicMock(), MagicMock(), MagicMock()
+            )
+            started = time.perf_counter()
+            if pool_size is None:
+                serial_raw_to_posts(worker, db, provider)
+            else:
+                worker.handle_raw_to_posts(
+                    {"user": {"sid": OWNER}, "data": {"provider": TELEGRAM}}
+                )
+            elapsed = time.perf_counter() - started
+            stored = db.posts.count_documents({"owner": OWNER})
+            print(
+                f"{name:20s} posts={stored} elapsed={elapsed:6.2f}s "
+                f"posts/sec={stored / elapsed:8.0f}"
+            )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
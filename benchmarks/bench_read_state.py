@@ -0,0 +1,171 @@
+"""Latency of marking posts read: per-post round-trips vs ``ReadStateService``.
+
+Seeds a throwaway database with posts carrying tags and bi-grams, their
+single post groupings, tag, bi-gram and letter counters, then for every
+``--posts`` count times marking that many posts read (and back unread) the
+way the endpoints did it before, one post at a time, against the bulk
+``ReadStateService.mark_posts`` and ``mark_sentences``.
+
+    python -m benchmarks.bench_read_state --port 8765 --posts 10,500,5000
+"""
+
+import argparse
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, List
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_vocabulary
+from rsstag.bi_grams import RssTagBiGrams
+from rsstag.letters import RssTagLetters
+from rsstag.post_grouping import RssTagPostGrouping
+from rsstag.posts import RssTagPosts
+from rsstag.read_state import POST_PROJECTION, ReadStateService
+from rsstag.tags import RssTagTags
+from rsstag.tasks import TASK_MARK, TASK_NOT_IN_PROCESSING, RssTagTasks
+
+
+def _seed(db: Any, owner: str, count: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(5000, seed)
+    grouping = RssTagPostGrouping(db)
+    posts: List[dict] = []
+    groupings: List[dict] = []
+    for i in range(count):
+        tags = rnd.sample(vocabulary, 20)
+        posts.append(
+            {
+                "owner": owner,
+                "pid": str(i),
+                "id": f"provider-{i}",
+                "read": False,
+                "tags": tags,
+                "bi_grams": [f"{a} {b}" for a, b in zip(tags, tags[1:])],
+            }
+        )
+        groupings.append(
+            {
+                "owner": owner,
+                "post_ids": [str(i)],
+                "post_ids_hash": grouping._generate_post_ids_hash([str(i)]),
+                "sentences": [{"number": n, "text": "Text.", "read": False} for n in range(10)],
+                "groups": {"Topic": list(range(10))},
+            }
+        )
+    db.posts.insert_many(posts)
+    db.post_grouping.insert_many(groupings)
+    db.tags.insert_many([{"owner": owner, "tag": word, "unread_count": 0} for word in vocabulary])
+    db.letters.insert_one({"owner": owner, "letters": {}})
+    RssTagPosts(db).prepare()
+    RssTagTags(db).prepare()
+    RssTagBiGrams(db).prepare()
+    grouping.prepare()
+
+
+def _legacy_mark_posts(
+    service: ReadStateService, owner: str, pids: List[str], readed: bool
+) -> None:
+    """What on_read_posts_post did: counters in bulk, groupings one by one."""
+    tags, bi_grams, letters = defaultdict(int), defaultdict(int), defaultdict(int)
+    for_insert = []
+    for post in service._posts.get_by_pids(owner, pids, POST_PROJECTION):
+        if post["read"] != readed:
+            for_insert.append(
+                {
+                    "user": owner,
+                    "id": post["id"],
+                    "status": readed,
+                    "processing": TASK_NOT_IN_PROCESSING,
+                    "type": TASK_MARK,
+                    "provider": "",
+                }
+            )
+            for tag in post["tags"]:
+                tags[tag] += 1
+                letters[tag[0]] += 1
+            for bi_gram in post["bi_grams"]:
+                bi_grams[bi_gram] += 1
+    service._tasks.add_task({"type": TASK_MARK, "user": owner, "data": for_insert})
+    service._posts.change_status(owner, pids, readed)
+    service._tags.change_unread(owner, tags, readed)
+    service._bi_grams.change_unread(owner, bi_grams, readed)
+    service._letters.change_unread(owner, letters, readed)
+    for pid in pids:
+        service._post_grouping.mark_sequences_read(owner, pid, readed)
+
+
+def _legacy_mark_sentences(
+    service: ReadStateService, owner: str, pids: List[str], readed: bool
+) -> None:
+    """What mark_sentences did: every step once per post."""
+    for pid in pids:
+        all_read = service._post_grouping.update_snippets_read_status(
+            owner, pid, list(range(10)), readed
+        )
+        post = service._posts.get_by_pid(owner, pid, POST_PROJECTION)
+        if all_read is None or not post or post["read"] == readed:
+            continue
+        service._change_posts(owner, "", [post], readed)
+
+
+def _time(fn: Callable[[bool], Any]) -> float:
+    """Seconds to mark read and back unread, the state is restored after."""
+    started = time.perf_counter()
+    fn(True)
+    fn(False)
+    return (time.perf_counter() - started) / 2
+
+
+def run(host: str, port: int, count: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    owner = "bench-owner"
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        db = client[db_name]
+        _seed(db, owner, count, seed=1)
+        service = ReadStateService(
+            RssTagPosts(db),
+            RssTagTags(db),
+            RssTagBiGrams(db),
+            RssTagLetters(db),
+            RssTagTasks(db),
+            RssTagPostGrouping(db),
+        )
+        pids = [str(i) for i in range(count)]
+        selections = [{"post_id": pid, "sentence_indices": list(range(10))} for pid in pids]
+        timings = {
+            "posts_legacy": _time(lambda readed: _legacy_mark_posts(service, owner, pids, readed)),
+            "posts_bulk": _time(lambda readed: service.mark_posts(owner, "", pids, readed)),
+            "sentences_legacy": _time(
+                lambda readed: _legacy_mark_sentences(service, owner, pids, readed)
+            ),
+            "sentences_bulk": _time(
+                lambda readed: service.mark_sentences(owner, "", selections, readed)
+            ),
+        }
+        for kind in ("posts", "sentences"):
+            legacy, bulk = timings[f"{kind}_legacy"], timings[f"{kind}_bulk"]
+            print(
+                f"mark_{kind} posts={count} per_post={legacy * 1000:.0f}ms "
+                f"bulk={bulk * 1000:.0f}ms speedup={legacy / bulk:.1f}x"
+            )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", default="10,500,5000", help="Comma separated sizes.")
+    args = parser.parse_args()
+    for count in args.posts.split(","):
+        run(args.host, args.port, int(count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Related tags latency: per-request recomputation vs the co-occurrence store.
+
+Seeds a throwaway database with synthetic posts (lemmas, tags and keywords),
+backfills ``tag_cooccurrence`` and times, for a sample of frequent tags, the
+old ``on_get_tag_pmi`` counting (fetch and scan the lemmas of every post of
+the tag) against ``RssTagCooccurrence.get_related``.
+
+    python -m benchmarks.bench_tag_stats --port 8765 --posts 10000,100000
+"""
+
+import argparse
+import gzip
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, List
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.cooccurrence import RssTagCooccurrence, post_keywords
+from rsstag.posts import RssTagPosts
+from rsstag.stopwords import stopwords
+
+
+def _legacy_pmi_counts(db: Any, owner: str, tag: str) -> int:
+    # Counting part of the pre-store on_get_tag_pmi.
+    req_tags = {tag}
+    stopw = set(stopwords.words("english") + stopwords.words("russian"))
+    cursor = RssTagPosts(db).get_by_tags(owner, [tag], False, {"lemmas": True})
+    bigrams: Counter = Counter()
+    window = 5
+    for post in cursor:
+        text = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+        words_l = [w for w in text.split() if w not in stopw and w not in req_tags]
+        bi_grams = []
+        for word_pos, word in enumerate(words_l):
+            for i in range(1, window + 1):
+                for pos in (word_pos - i, word_pos + i):
+                    if 0 <= pos < len(words_l) and words_l[pos] != word:
+                        bi_grams.append(" ".join(sorted((word, words_l[pos]))))
+        bigrams.update(bi_grams)
+    return len(bigrams)
+
+
+def _seed(db: Any, owner: str, count: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(20000, seed)
+    batch = []
+    for i in range(count):
+        lemmas = synthetic_text(rnd, vocabulary, rnd.randint(100, 300)).lower()
+        lemmas = lemmas.replace(".", "")
+        keywords = post_keywords(lemmas)
+        batch.append(
+            {
+                "owner": owner,
+                "pid": str(i),
+                "read": False,
+                "feed_id": f"feed-{i % 50}",
+                "unix_date": 1700000000 + i * 60,
+                "lemmas": gzip.compress(lemmas.encode("utf-8")),
+                "tags": keywords,
+            }
+        )
+        if len(batch) >= 5000:
+            db.posts.insert_many(batch)
+            batch = []
+    if batch:
+        db.posts.insert_many(batch)
+    RssTagPosts(db).prepare()
+    store = RssTagCooccurrence(db)
+    store.prepare()
+    store.rebuild(owner)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run(host: str, port: int, posts: int, tags: int, repeat: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    owner = "bench-owner"
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        db = client[db_name]
+        started = time.perf_counter()
+        _seed(db, owner, posts, seed=1)
+        seeded = time.perf_counter() - started
+        freq: Counter = Counter()
+        for post in db.posts.find({"owner": owner}, projection={"tags": True}):
+            freq.update(post["tags"])
+        sample = [tag for tag, _ in freq.most_common(tags)]
+        store = RssTagCooccurrence(db)
+        legacy: List[float] = []
+        stored: List[float] = []
+        for tag in sample:
+            legacy.extend(_time(lambda: _legacy_pmi_counts(db, owner, tag), repeat))
+            stored.extend(_time(lambda: store.get_related(owner, tag), repeat))
+        print(
+            f"posts={posts} seed+backfill={seeded:.1f}s "
+            f"pairs={db.tag_cooccurrence.count_documents({})} "
+            f"legacy_median={statistics.median(legacy) * 1000:.1f}ms "
+            f"store_median={statistics.median(stored) * 1000:.1f}ms "
+            f"speedup={statistics.median(legacy) / statistics.median(stored):.0f}x"
+        )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", default="10000,100000")
+    parser.add_argument("--tags", type=int, default=5, help="Frequent tags to query.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for posts in args.posts.split(","):
+        run(args.host, args.port, int(posts), args.tags, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""LLM calls of TASK_TAGS_CLASSIFICATION with and without snippet dedup.
+
+Builds a channel-like corpus of ``--posts`` synthetic posts where a share
+are reposts/forwards (the same text, re-spaced or re-cased) and quotes (an
+earlier post plus a comment). For every tag that occurs in enough posts,
+cuts the same context windows as the worker and counts the prompts sent
+before (one per snippet) and after (one per distinct normalized snippet),
+then the calls of a re-run after ``--new`` more posts arrive, with the
+cached categories of the first run. No MongoDB or LLM is needed.
+
+    python -m benchmarks.bench_tags_classification_dedup --posts 20000
+"""
+
+import argparse
+import random
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.workers.llm_worker import _merge_context_windows, _normalize_snippet
+
+
+def _corpus(
+    rnd: random.Random,
+    vocabulary: List[str],
+    count: int,
+    args: argparse.Namespace,
+    posts: List[str],
+) -> None:
+    for _ in range(count):
+        roll = rnd.random()
+        if posts and roll < args.reposts:
+            text = rnd.choice(posts)
+            if rnd.random() < 0.5:
+                text = "  ".join(text.split(" "))
+            else:
+                text = text.upper()
+        elif posts and roll < args.reposts + args.quotes:
+            comment = synthetic_text(rnd, vocabulary, rnd.randint(10, 40))
+            text = comment + " " + rnd.choice(posts)
+        else:
+            text = synthetic_text(rnd, vocabulary, rnd.randint(30, 200))
+        posts.append(text)
+
+
+def _snippets(posts: List[str], tags: List[str]) -> List[Tuple[str, str]]:
+    snippets: List[Tuple[str, str]] = []
+    for tag in tags:
+        for text in posts:
+            words = np.array(text.split())
+            tag_indices = np.flatnonzero(np.char.lower(words) == tag)
+            if not len(tag_indices):
+                continue
+            for start, end in _merge_context_windows(tag_indices, len(words)):
+                snippets.append((tag, " ".join(words[start:end].tolist())))
+    return snippets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--new", type=int, default=2000)
+    parser.add_argument("--reposts", type=float, default=0.2)
+    parser.add_argument("--quotes", type=float, default=0.1)
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(30000, args.seed)
+    posts: List[str] = []
+    _corpus(rnd, vocabulary, args.posts, args, posts)
+    frequency: Counter = Counter(
+        word for text in posts for word in set(text.lower().split())
+    )
+    # Mid-frequency tags: frequent enough to classify, not stop-word like
+    tags = [word for word, _ in frequency.most_common(200)[100 : 100 + args.tags]]
+
+    first = _snippets(posts, tags)
+    cached: Set[Tuple[str, str]] = {(tag, _normalize_snippet(s)) for tag, s in first}
+    _corpus(rnd, vocabulary, args.new, args, posts)
+    second = _snippets(posts, tags)
+    second_distinct: Dict[Tuple[str, str], int] = Counter(
+        (tag, _normalize_snippet(s)) for tag, s in second
+    )
+    uncached = sum(1 for key in second_distinct if key not in cached)
+
+    print(
+        f"posts={args.posts} reposts={args.reposts:.0%} quotes={args.quotes:.0%} "
+        f"tags={len(tags)}"
+    )
+    print(
+        f"first run: {len(first)} LLM calls before, {len(cached)} after "
+        f"({1 - len(cached) / len(first):.0%} saved)"
+    )
+    print(
+        f"re-run with +{args.new} posts: {len(second)} calls before, {uncached} "
+        f"after ({1 - uncached / len(second):.0%} saved)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""TagsBuilder.build_tags_and_bi_grams: python engine vs numpy engine.
+
+Runs both engines over the same synthetic corpus, checks that they produce
+identical tags, words, bi-grams, bi-gram words and prepared text, and reports
+posts/sec. The identity check also warms the stem cache, so only the engines
+are timed.
+
+    python -m benchmarks.bench_tags_engine --posts 10000
+"""
+
+import argparse
+import random
+import time
+from typing import Any, List, Tuple
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.tags_builder import ENGINE_NUMPY, ENGINE_PYTHON, TagsBuilder
+
+
+def _snapshot(builder: TagsBuilder) -> Tuple[Any, ...]:
+    return (
+        list(builder.get_tags().items()),
+        list(builder.get_words().items()),
+        list(builder.get_bi_grams().items()),
+        list(builder.get_bi_grams_words().items()),
+        builder.get_prepared_text(),
+    )
+
+
+def _run(engine: str, texts: List[str]) -> float:
+    builder = TagsBuilder(engine=engine)
+    started = time.perf_counter()
+    for text in texts:
+        builder.purge()
+        builder.build_tags_and_bi_grams(text)
+    return time.perf_counter() - started
+
+
+def _identical(texts: List[str]) -> bool:
+    python, numpy = TagsBuilder(engine=ENGINE_PYTHON), TagsBuilder(engine=ENGINE_NUMPY)
+    for text in texts:
+        for builder in (python, numpy):
+            builder.purge()
+            builder.build_tags_and_bi_grams(text)
+        if _snapshot(python) != _snapshot(numpy):
+            return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=200, help="Mean words per post.")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    vocabulary = synthetic_vocabulary(args.vocabulary)
+    texts = [
+        synthetic_text(rnd, vocabulary, rnd.randint(args.words // 2, args.words * 3 // 2))
+        for _ in range(args.posts)
+    ]
+    identical = _identical(texts)
+
+    timings = {}
+    for engine in (ENGINE_PYTHON, ENGINE_NUMPY):
+        timings[engine] = _run(engine, texts)
+        print(
+            f"engine={engine:6s} posts={len(texts)} elapsed={timings[engine]:.2f}s "
+            f"posts_per_sec={len(texts) / timings[engine]:.0f}"
+        )
+    print(
+        f"identical={identical} "
+        f"speedup={timings[ENGINE_PYTHON] / timings[ENGINE_NUMPY]:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
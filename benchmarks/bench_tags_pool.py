@@ -0,0 +1,53 @@
+"""TASK_TAGS tag building: in-process vs ``TagsPool`` fan-out.
+
+Builds tags for a synthetic corpus in ``tags_pool_size``-sized batches, the
+way ``TagWorker.make_tags`` does, and reports posts/sec per pool size. No
+database is needed.
+
+    python -m benchmarks.bench_tags_pool --posts 20000 --pool-sizes 0,2,4,8
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import synthetic_posts
+from rsstag.html_cleaner import HTMLCleaner
+from rsstag.tags_builder import TagsBuilder
+from rsstag.workers.tags_pipeline import TagsPool, build_posts_tags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--pool-sizes", default="0,2,4")
+    args = parser.parse_args()
+
+    posts = synthetic_posts(args.posts)
+    batches = [posts[i : i + args.batch] for i in range(0, len(posts), args.batch)]
+    for raw_size in args.pool_sizes.split(","):
+        size = int(raw_size)
+        pool = TagsPool(size) if size > 0 else None
+        builder, cleaner = TagsBuilder(), HTMLCleaner()
+        try:
+            if pool is not None:
+                # Spawning processes is a one-off cost per worker, not per batch.
+                pool.build(batches[0])
+            started = time.perf_counter()
+            for batch in batches:
+                if pool is not None:
+                    pool.build(batch)
+                else:
+                    build_posts_tags(batch, builder, cleaner)
+            elapsed = time.perf_counter() - started
+        finally:
+            if pool is not None:
+                pool.close()
+        print(
+            f"tags_pool_size={size} posts={len(posts)} batch={args.batch} "
+            f"elapsed={elapsed:.2f}s posts_per_sec={len(posts) / elapsed:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
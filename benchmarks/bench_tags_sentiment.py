@@ -0,0 +1,125 @@
+"""Latency of a tags sentiment pass: parsed dictionaries vs the compiled lexicon.
+
+Seeds a throwaway database with ``--tags`` tags, a share of them words of
+the sentiment dictionaries, then times ``make_tags_sentiment`` the way it
+ran before, parsing RuSentiLex and WordNet-Affect and writing one update
+per tag, against the compiled lexicon with one bulk write: the first pass
+compiles the lexicon file, the next ones map it.
+
+    python -m benchmarks.bench_tags_sentiment --port 8765 --tags 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, List
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_vocabulary
+from rsstag import sentiment_lexicon
+from rsstag.sentiment import RuSentiLex, SentimentConverter, WordNetAffectRuRom
+from rsstag.sentiment_lexicon import compile_sentiment_lexicon
+from rsstag.tags import RssTagTags
+from rsstag.workers.tag_worker import TagWorker
+
+SENTILEX = "./data/rusentilex.txt"
+WORDNET_DIR = "./data/wordnet/lilu.fcim.utm.md"
+
+
+def _seed(db: Any, owner: str, count: int, share: float, seed: int) -> None:
+    rnd = random.Random(seed)
+    words = sorted(compile_sentiment_lexicon(SENTILEX, WORDNET_DIR))
+    known = rnd.sample(words, min(len(words), int(count * share)))
+    tags = set(known)
+    for word in synthetic_vocabulary(count * 2, seed):
+        if len(tags) >= count:
+            break
+        tags.add(word)
+    db.tags.insert_many([{"owner": owner, "tag": tag, "unread_count": 1} for tag in tags])
+    RssTagTags(db).prepare()
+
+
+def _legacy_pass(db: Any, owner: str) -> None:
+    """make_tags_sentiment before the lexicon: parse, then update per tag."""
+    with open(SENTILEX, "r", encoding="utf-8") as f:
+        strings = f.read().splitlines()
+    ru_sent = RuSentiLex()
+    ru_sent.load(strings, ",", "!")
+    tags = RssTagTags(db)
+    wn_en = WordNetAffectRuRom("en", 4)
+    wn_en.load_dicts_from_dir(WORDNET_DIR)
+    wn_ru = WordNetAffectRuRom("ru", 4)
+    wn_ru.load_dicts_from_dir(WORDNET_DIR)
+    conv = SentimentConverter()
+    for tag in tags.get_all(owner, projection={"tag": True}):
+        sentiment = ru_sent.get_sentiment(tag["tag"])
+        if not sentiment:
+            affects = wn_en.get_affects_by_word(tag["tag"])
+            if not affects:
+                affects = wn_ru.get_affects_by_word(tag["tag"])
+            if affects:
+                sentiment = conv.convert_sentiment(affects)
+        if sentiment:
+            tags.add_sentiment(owner, tag["tag"], sorted(sentiment))
+
+
+def _time(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def run(host: str, port: int, count: int, share: float, repeat: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    owner = "bench-owner"
+    client: MongoClient = MongoClient(host=host, port=port)
+    with tempfile.TemporaryDirectory() as directory:
+        config = {
+            "settings": {
+                "host_name": "localhost",
+                "sentilex": SENTILEX,
+                "lilu_wordnet": WORDNET_DIR,
+                "sentiment_lexicon_path": os.path.join(directory, "sentiment_lexicon.bin"),
+            }
+        }
+        try:
+            db = client[db_name]
+            _seed(db, owner, count, share, seed=1)
+            worker = TagWorker(db, config)
+            legacy = min(_time(lambda: _legacy_pass(db, owner)) for _ in range(repeat))
+            sentiment_lexicon._lexicon = None
+            first = _time(lambda: worker.make_tags_sentiment(owner))
+            timings: List[float] = []
+            for _ in range(repeat):
+                # A fresh process maps the compiled file
+                sentiment_lexicon._lexicon = None
+                timings.append(_time(lambda: worker.make_tags_sentiment(owner)))
+            compiled = min(timings)
+            print(
+                f"tags={count} known={share:.0%} per_tag_updates={legacy:.2f}s "
+                f"compile_and_bulk={first:.2f}s mapped_and_bulk={compiled:.2f}s "
+                f"speedup={legacy / compiled:.1f}x"
+            )
+        finally:
+            client.drop_database(db_name)
+            client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tags", default="100000", help="Comma separated sizes.")
+    parser.add_argument("--known", type=float, default=0.1, help="Share of dictionary words.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for count in args.tags.split(","):
+        run(args.host, args.port, int(count), args.known, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
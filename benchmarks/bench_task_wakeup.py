@@ -0,0 +1,132 @@
+"""Queue latency and idle query rate: sleep-polling vs push-based wakeup.
+
+Starts N idle worker processes that loop ``claim`` -> ``complete`` on the
+``tasks`` collection, waiting between empty polls with the listener chosen by
+``task_wakeup``. A producer enqueues tasks at random intervals; for each mode
+the benchmark reports enqueue-to-claim latency and how many claim queries the
+idle workers issued per second.
+
+    python -m benchmarks.bench_task_wakeup --port 8765 --modes off,socket
+    # change_stream needs a replica set:
+    python -m benchmarks.bench_task_wakeup --port 8765 --modes change_stream
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+from multiprocessing import Event, Process, Queue
+from typing import Any, Dict, List
+
+from pymongo import MongoClient
+
+from rsstag.task_state import TaskStateMachine
+from rsstag.task_wakeup import ENQUEUED_AT_FIELD, configure_task_wakeup, open_task_wakeup
+
+
+def _worker(
+    host: str, port: int, db_name: str, config: Dict[str, Any], stop: Any, out: Queue
+) -> None:
+    client: MongoClient = MongoClient(host=host, port=port)
+    db = client[db_name]
+    sm = TaskStateMachine(db)
+    wakeup = open_task_wakeup(db, config)
+    polls = 0
+    latencies: List[float] = []
+    try:
+        while not stop.is_set():
+            polls += 1
+            task = sm.claim()
+            if not task:
+                wakeup.wait()
+                continue
+            latencies.append(time.time() - task[ENQUEUED_AT_FIELD])
+            sm.complete(task["_id"])
+    finally:
+        wakeup.close()
+        client.close()
+    out.put((polls, latencies))
+
+
+def run(
+    host: str, port: int, mode: str, workers: int, tasks: int, interval: float
+) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    wakeup_dir = tempfile.mkdtemp(prefix="rsstag-wakeup-bench-")
+    config = {
+        "settings": {
+            "task_wakeup": mode,
+            "task_wakeup_dir": wakeup_dir,
+            "task_wakeup_max_wait_seconds": "30",
+        }
+    }
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        db = client[db_name]
+        sm = TaskStateMachine(db)
+        sm.ensure_indexes()
+        configure_task_wakeup(config)
+        stop = Event()
+        out: Queue = Queue()
+        procs = [
+            Process(target=_worker, args=(host, port, db_name, config, stop, out))
+            for _ in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        # Let listeners open their stream/socket before the first enqueue.
+        time.sleep(2)
+        started = time.time()
+        for i in range(tasks):
+            time.sleep(random.uniform(0, 2 * interval))
+            sm.enqueue({"user": "bench", "type": 3, "n": i}, {"manual": True})
+        while db.tasks.count_documents({}) and time.time() - started < 600:
+            time.sleep(0.1)
+        elapsed = time.time() - started
+        stop.set()
+        # Nudge blocked listeners so they notice the stop flag quickly.
+        sm.enqueue({"user": "bench", "type": -1}, {"manual": True})
+
+        polls = 0
+        latencies: List[float] = []
+        for _ in procs:
+            worker_polls, worker_latencies = out.get()
+            polls += worker_polls
+            latencies.extend(worker_latencies)
+        for proc in procs:
+            proc.join()
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        print(
+            f"{mode:14s} workers={workers} tasks={len(latencies)} "
+            f"latency_mean={statistics.mean(latencies or [0.0]) * 1000:.0f}ms "
+            f"latency_p95={p95 * 1000:.0f}ms "
+            f"claim_queries_per_sec={polls / elapsed:.2f}"
+        )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+        shutil.rmtree(wakeup_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=30)
+    parser.add_argument(
+        "--interval", type=float, default=1.0, help="Mean seconds between enqueues."
+    )
+    parser.add_argument("--modes", default="off,socket,change_stream")
+    args = parser.parse_args()
+    for mode in args.modes.split(","):
+        run(args.host, args.port, mode.strip(), args.workers, args.tasks, args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Decode throughput and size of post blobs per text codec.
+
+Encodes synthetic lemma strings and HTML contents with every codec of
+``rsstag.text_codec`` and reports, per codec, the stored size relative to the
+UTF-8 text and the MB/s (of decoded text) of ``decode_text`` and, for lemmas,
+``decode_words``.
+
+    python -m benchmarks.bench_text_codec --posts 5000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.text_codec import (
+    CODECS,
+    CONTENT_CODECS,
+    decode_text,
+    decode_words,
+    encode_text,
+)
+
+
+def _mb_per_sec(fn: Callable[[bytes], object], blobs: List[bytes], size: int) -> float:
+    started = time.perf_counter()
+    for blob in blobs:
+        fn(blob)
+    return size / (time.perf_counter() - started) / 1e6
+
+
+def _report(kind: str, codecs: tuple, texts: List[str], words: bool) -> None:
+    size = sum(len(text.encode("utf-8")) for text in texts)
+    for codec in codecs:
+        blobs = [encode_text(text, codec) for text in texts]
+        stored = sum(len(blob) for blob in blobs)
+        line = (
+            f"{kind:8s} {codec:7s} size={stored / size:5.2f}x "
+            f"decode_text={_mb_per_sec(decode_text, blobs, size):7.1f}MB/s"
+        )
+        if words:
+            line += f" decode_words={_mb_per_sec(decode_words, blobs, size):7.1f}MB/s"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300, help="Mean words per post.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(50000, args.seed)
+    contents: List[str] = []
+    lemmas: List[str] = []
+    for _ in range(args.posts):
+        text = synthetic_text(rnd, vocabulary, rnd.randint(args.words // 2, args.words * 3 // 2))
+        contents.append("<p>" + text.replace(". ", ".</p><p>") + "</p>")
+        lemmas.append(text.lower().replace(".", ""))
+
+    _report("lemmas", CODECS, lemmas, words=True)
+    _report("content", CONTENT_CODECS, contents, words=False)
+
+
+if __name__ == "__main__":
+    main()
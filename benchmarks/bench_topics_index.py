@@ -0,0 +1,142 @@
+"""Topics page latency: per-request ``_build_topics_index`` vs the topics index.
+
+Seeds a throwaway database with synthetic posts and their post groupings,
+builds ``topics_index`` once and times, for every grouping count, what the
+topics pages computed per request (read every grouping and grouped post and
+count the topics) against ``RssTagTopicsIndex.get_topics``, for all and for
+unread only topics. A few posts are marked read between the repeats, so the
+index timings include refreshing the groupings they touched.
+
+    python -m benchmarks.bench_topics_index --port 8765 --groupings 1000,20000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+from pymongo import MongoClient
+
+from benchmarks.corpus import synthetic_text, synthetic_vocabulary
+from rsstag.feeds import RssTagFeeds
+from rsstag.post_grouping import RssTagPostGrouping
+from rsstag.posts import RssTagPosts
+from rsstag.topic_aliases import RssTagTopicAliases
+from rsstag.topics_index import RssTagTopicsIndex
+from rsstag.web.posts import _build_topics_index
+
+
+def _seed(db: Any, owner: str, count: int, topics: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(20000, seed)
+    roots = [f"Topic {i}" for i in range(max(1, topics // 10))]
+    topic_paths = [f"{rnd.choice(roots)} > Subtopic {i}" for i in range(topics)]
+    post_grouping = RssTagPostGrouping(db)
+    db.feeds.insert_one({"owner": owner, "feed_id": "feed", "title": "Feed"})
+    posts: List[dict] = []
+    groupings: List[dict] = []
+    for i in range(count):
+        posts.append({"owner": owner, "pid": str(i), "feed_id": "feed", "read": False})
+        sentences = [
+            {"number": n, "text": synthetic_text(rnd, vocabulary, 20), "read": False}
+            for n in range(rnd.randint(5, 30))
+        ]
+        post_topics = rnd.sample(topic_paths, rnd.randint(1, 5))
+        groups: dict = {}
+        for sentence in sentences:
+            groups.setdefault(rnd.choice(post_topics), []).append(sentence["number"])
+        groupings.append(
+            {
+                "owner": owner,
+                "post_ids": [str(i)],
+                "post_ids_hash": post_grouping._generate_post_ids_hash([str(i)]),
+                "sentences": sentences,
+                "groups": groups,
+            }
+        )
+        if len(posts) >= 5000:
+            db.posts.insert_many(posts)
+            db.post_grouping.insert_many(groupings)
+            posts, groupings = [], []
+    if posts:
+        db.posts.insert_many(posts)
+        db.post_grouping.insert_many(groupings)
+    RssTagPosts(db).prepare()
+    post_grouping.prepare()
+
+
+def _time(fn: Callable[[], Any], repeat: int, between: Callable[[], Any]) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        between()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run(host: str, port: int, groupings: int, topics: int, repeat: int) -> None:
+    db_name = f"rsstag_bench_{uuid.uuid4().hex}"
+    owner = "bench-owner"
+    client: MongoClient = MongoClient(host=host, port=port)
+    try:
+        db = client[db_name]
+        _seed(db, owner, groupings, topics, seed=1)
+        index = RssTagTopicsIndex(db)
+        index.prepare()
+        started = time.perf_counter()
+        index.refresh(owner)
+        built = time.perf_counter() - started
+
+        app = SimpleNamespace(
+            db=db,
+            posts=RssTagPosts(db),
+            feeds=RssTagFeeds(db),
+            post_grouping=RssTagPostGrouping(db),
+            topic_aliases=RssTagTopicAliases(db),
+        )
+        user = {"sid": owner, "settings": {}}
+        rnd = random.Random(2)
+
+        def read_some() -> None:
+            pids = [str(rnd.randrange(groupings)) for _ in range(5)]
+            app.posts.change_status(owner, pids, True)
+
+        for only_unread in (False, True):
+            legacy = _time(
+                lambda: _build_topics_index(app, user, None, only_unread=only_unread),
+                repeat,
+                read_some,
+            )
+            stored = _time(
+                lambda: index.get_topics(owner, only_unread=only_unread), repeat, read_some
+            )
+            print(
+                f"groupings={groupings} only_unread={only_unread} build={built:.1f}s "
+                f"topics={db.topics_index.count_documents({'owner': owner})} "
+                f"per_request_median={statistics.median(legacy) * 1000:.1f}ms "
+                f"index_median={statistics.median(stored) * 1000:.1f}ms "
+                f"speedup={statistics.median(legacy) / statistics.median(stored):.0f}x"
+            )
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--groupings", default="1000,20000")
+    parser.add_argument("--topics", type=int, default=300, help="Distinct topic paths.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for groupings in args.groupings.split(","):
+        run(args.host, args.port, int(groupings), args.topics, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Synthetic post corpora shared by the benchmarks."""
+
+import gzip
+import random
+from typing import Any, Dict, List
+
+_LATIN = "abcdefghijklmnopqrstuvwxyz"
+_CYRILLIC = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+_SUFFIXES = ["", "s", "ed", "ing", "er", "ly", "ation"]
+
+
+def synthetic_vocabulary(size: int, seed: int = 1) -> List[str]:
+    """Mixed latin/cyrillic/numeric words with shared stems, like real text."""
+    rnd = random.Random(seed)
+    words: List[str] = []
+    while len(words) < size:
+        alphabet = _LATIN if rnd.random() < 0.7 else _CYRILLIC
+        stem = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(3, 9)))
+        if alphabet is _LATIN:
+            words.extend(stem + suffix for suffix in rnd.sample(_SUFFIXES, 3))
+        else:
+            words.append(stem)
+        if rnd.random() < 0.02:
+            words.append(str(rnd.randint(1, 3000)))
+    return words[:size]
+
+
+def synthetic_text(
+    rnd: random.Random, vocabulary: List[str], words_count: int
+) -> str:
+    # Zipf-like skew so frequent words repeat across posts.
+    picked = [
+        vocabulary[min(int(rnd.paretovariate(1.1)) - 1, len(vocabulary) - 1)]
+        if rnd.random() < 0.5
+        else rnd.choice(vocabulary)
+        for _ in range(words_count)
+    ]
+    sentences = []
+    for i in range(0, len(picked), 12):
+        sentences.append(" ".join(picked[i : i + 12]).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def synthetic_posts(
+    count: int,
+    owner: str = "bench-owner",
+    words_per_post: int = 200,
+    vocabulary_size: int = 50000,
+    seed: int = 1,
+) -> List[Dict[str, Any]]:
+    """Post docs shaped like ``posts`` rows, with gzip-compressed HTML."""
+    rnd = random.Random(seed)
+    vocabulary = synthetic_vocabulary(vocabulary_size, seed)
+    posts: List[Dict[str, Any]] = []
+    for i in range(count):
+        body = synthetic_text(rnd, vocabulary, rnd.randint(words_per_post // 2, words_per_post * 3 // 2))
+        html = "<p>" + body.replace(". ", ".</p><p>") + "</p>"
+        posts.append(
+            {
+                "_id": i,
+                "pid": str(i),
+                "owner": owner,
+                "feed_id": f"feed-{i % 50}",
+                "category_id": f"category-{i % 5}",
+                "read": False,
+                "unix_date": 1700000000 + i * 60,
+                "content": {
+                    "title": synthetic_text(rnd, vocabulary, 8),
+                    "content": gzip.compress(html.encode("utf-8")),
+                },
+            }
+        )
+    return posts
@@ -2,6 +2,8 @@ import logging
 from typing import Optional, List, Iterator
 from pymongo import MongoClient, DESCENDING, UpdateOne
 
+from rsstag.indexes import create_compound_indexes
+
 
 class RssTagBiGrams:
     indexes = ["owner", "tag", "tags", "unread_count", "posts_count", "temperature"]
@@ -18,6 +20,7 @@ class RssTagBiGrams:
                 self.log.warning(
                     "Can`t create index %s. May be already exists. Info: %s", index, e
                 )
+        create_compound_indexes(self.db.bi_grams, "bi_grams", self.log)
 
     def get_by_bi_gram(self, owner: str, bi_gram: str) -> Optional[dict]:
         query = {"owner": owner, "tag": bi_gram}
@@ -30,6 +33,7 @@ class RssTagBiGrams:
         tags: List[str],
         only_unread: Optional[bool] = None,
         projection: Optional[dict] = None,
+        limit: int = 0,
     ) -> Iterator[dict]:
         query = {"owner": owner, "tags": {"$all": tags}}
         sort_data = []
@@ -39,11 +43,35 @@ class RssTagBiGrams:
         else:
             sort_data.append(("posts_count", DESCENDING))
 
-        return (
+        cursor = (
             self.db.bi_grams.find(query, projection=projection)
             .allow_disk_use(True)
             .sort(sort_data)
         )
+        if limit:
+            cursor = cursor.limit(limit)
+
+        return cursor
+
+    def get_by_any_tags(
+        self,
+        owner: str,
+        tags: List[str],
+        projection: Optional[dict] = None,
+        limit: int = 0,
+    ) -> Iterator[dict]:
+        """Bi-grams containing at least one of ``tags``, most frequent first."""
+        query = {"owner": owner, "tags": {"$in": tags}}
+
+        cursor = (
+            self.db.bi_grams.find(query, projection=projection)
+            .allow_disk_use(True)
+            .sort([("posts_count", DESCENDING)])
+        )
+        if limit:
+            cursor = cursor.limit(limit)
+
+        return cursor
 
     def change_unread(self, owner: str, tags: dict, readed: bool) -> bool:
         updates = []
@@ -0,0 +1,296 @@
+"""Per-owner tag co-occurrence counts, maintained as posts are tagged.
+
+Each post contributes its ``keywords`` - the most frequent non-stopword lemmas
+of the post - and every pair of them counts as one co-occurrence, in all posts
+and in unread posts. Keeping only a few keywords per post bounds the store to
+``k * (k - 1) / 2`` pairs per post, so the related tags endpoints can read a
+tag's neighbours from it instead of pulling and re-tokenizing every post of
+the tag on each request.
+
+Tagging, feed deletion and read state changes update the counts. Posts tagged
+before this store existed have no ``keywords``: TASK_TAG_COOCCURRENCE counts
+them once with ``rebuild``, which the endpoints queue on their first request.
+Until then, and for several tags, the endpoints count ``related_counts`` over
+the keywords of the tags' posts, which is the same statistic. To backfill all
+owners at once::
+
+    python -m rsstag.cooccurrence rsscloud.conf
+"""
+
+import logging
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateOne
+
+from rsstag.lemma_vocab import LemmaVocabulary
+from rsstag.stopwords import stopwords
+from rsstag.utils import load_config
+from rsstag.text_codec import decode_text
+
+POST_KEYWORDS_LIMIT = 10
+RELATED_LIMIT = 200
+
+_stopwords: Optional[Set[str]] = None
+
+
+def _get_stopwords() -> Set[str]:
+    global _stopwords
+    if _stopwords is None:
+        _stopwords = set(stopwords.words("english") + stopwords.words("russian"))
+    return _stopwords
+
+
+def post_keywords(lemmas: str, limit: int = POST_KEYWORDS_LIMIT) -> List[str]:
+    """Most frequent lemmas of a post, ties broken by first occurrence."""
+    stopw = _get_stopwords()
+    freq = Counter(
+        lemma for lemma in lemmas.split() if len(lemma) > 1 and lemma not in stopw
+    )
+    return [lemma for lemma, _ in freq.most_common(limit)]
+
+
+def ids_keywords(
+    word_ids: Iterable[int], vocab: LemmaVocabulary, limit: int = POST_KEYWORDS_LIMIT
+) -> List[str]:
+    """``post_keywords`` of a post stored as a lemma id array."""
+    stopw = _get_stopwords()
+    keywords = []
+    for word_id, _ in Counter(word_ids).most_common():
+        word = vocab.word(word_id)
+        if len(word) > 1 and word not in stopw:
+            keywords.append(word)
+            if len(keywords) == limit:
+                break
+
+    return keywords
+
+
+def keyword_pairs(keywords: Iterable[str]) -> Iterator[str]:
+    """Pairs of keywords as sorted, space-joined keys."""
+    for first, second in combinations(sorted(set(keywords)), 2):
+        yield first + " " + second
+
+
+def related_counts(posts_keywords: Iterable[Iterable[str]], tags: Iterable[str]) -> Counter:
+    """In how many posts each keyword co-occurs with all ``tags`` as keywords.
+
+    For a single tag it is what the store keeps; requests the store can't
+    answer count it over the keywords of the tags' posts.
+    """
+    tags = set(tags)
+    related: Counter = Counter()
+    for keywords in posts_keywords:
+        keywords = set(keywords)
+        if tags <= keywords:
+            related.update(keywords - tags)
+
+    return related
+
+
+def top_related(related: Dict[str, int], limit: int = RELATED_LIMIT) -> Dict[str, int]:
+    """The ``limit`` most co-occurring keywords of ``related``."""
+    return dict(sorted(related.items(), key=lambda kv: (-kv[1], kv[0]))[:limit])
+
+
+class RssTagCooccurrence:
+    indexes = [
+        [("owner", ASCENDING), ("pair", ASCENDING)],
+        [("owner", ASCENDING), ("tags", ASCENDING), ("posts_count", DESCENDING)],
+        [("owner", ASCENDING), ("tags", ASCENDING), ("unread_count", DESCENDING)],
+    ]
+
+    def __init__(self, db: MongoClient) -> None:
+        self._db = db
+        self._log = logging.getLogger("cooccurrence")
+
+    def prepare(self) -> None:
+        for index in self.indexes:
+            try:
+                self._db.tag_cooccurrence.create_index(index)
+            except Exception as e:
+                self._log.warning(
+                    "Can`t create index %s. May be already exists. Info: %s", index, e
+                )
+        try:
+            self._db.tag_cooccurrence_builds.create_index("owner", unique=True)
+        except Exception as e:
+            self._log.warning(
+                "Can`t create index %s. May be already exists. Info: %s", "owner", e
+            )
+
+    def is_built(self, owner: str) -> bool:
+        """Whether ``rebuild`` counted the posts tagged before the store."""
+        return self._db.tag_cooccurrence_builds.find_one({"owner": owner}) is not None
+
+    def make_updates(
+        self, owner: str, pairs: Dict[str, int], unread: Optional[Dict[str, int]] = None
+    ) -> List[UpdateOne]:
+        """``$inc`` updates for pair counts; negative counts remove posts.
+
+        ``unread`` counts the pairs of the unread posts among them.
+        """
+        unread = unread or {}
+        updates = []
+        for pair, count in pairs.items():
+            if not count:
+                continue
+            updates.append(
+                UpdateOne(
+                    {"owner": owner, "pair": pair},
+                    {
+                        "$setOnInsert": {"tags": pair.split(" ")},
+                        "$inc": {"posts_count": count, "unread_count": unread.get(pair, 0)},
+                    },
+                    upsert=count > 0,
+                )
+            )
+
+        return updates
+
+    def remove_posts(
+        self, owner: str, pairs: Dict[str, int], unread: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Take deleted posts out of the counts and drop emptied pairs."""
+        unread = unread or {}
+        updates = self.make_updates(
+            owner,
+            {pair: -n for pair, n in pairs.items()},
+            {pair: -n for pair, n in unread.items()},
+        )
+        if not updates:
+            return
+        self._db.tag_cooccurrence.bulk_write(updates, ordered=False)
+        self._db.tag_cooccurrence.delete_many(
+            {"owner": owner, "posts_count": {"$lte": 0}}
+        )
+
+    def change_unread(self, owner: str, pairs: Dict[str, int], readed: bool) -> bool:
+        updates = [
+            UpdateOne(
+                {"owner": owner, "pair": pair},
+                {"$inc": {"unread_count": -pairs[pair] if readed else pairs[pair]}},
+            )
+            for pair in pairs
+        ]
+        if updates:
+            self._db.tag_cooccurrence.bulk_write(updates, ordered=False)
+
+        return True
+
+    def get_related(
+        self,
+        owner: str,
+        tag: str,
+        only_unread: bool = False,
+        limit: int = RELATED_LIMIT,
+    ) -> Dict[str, int]:
+        """The ``limit`` tags co-occurring most with ``tag`` and in how many posts."""
+        field = "unread_count" if only_unread else "posts_count"
+        cursor = (
+            self._db.tag_cooccurrence.find(
+                {"owner": owner, "tags": tag, field: {"$gt": 0}},
+                projection={"tags": True, field: True, "_id": False},
+            )
+            .sort(field, DESCENDING)
+            .limit(limit)
+        )
+        related: Dict[str, int] = {}
+        for doc in cursor:
+            for other in doc["tags"]:
+                if other != tag:
+                    related[other] = doc[field]
+
+        return related
+
+    def _count_legacy_posts(self, owner: str, posts: List[dict]) -> int:
+        """Set the keywords of posts tagged without them and count their pairs.
+
+        Each post is claimed by setting its keywords only while it still has
+        none and its read state is the one counted: a post tagged or marked
+        meanwhile is left to those updates.
+        """
+        pairs: Counter = Counter()
+        unread: Counter = Counter()
+        for post in posts:
+            keywords = post_keywords(decode_text(post["lemmas"]))
+            claimed = self._db.posts.update_one(
+                {
+                    "_id": post["_id"],
+                    "keywords": {"$exists": False},
+                    "read": post.get("read"),
+                },
+                {"$set": {"keywords": keywords}},
+            )
+            if not claimed.modified_count:
+                continue
+            post_pairs = list(keyword_pairs(keywords))
+            pairs.update(post_pairs)
+            if not post.get("read"):
+                unread.update(post_pairs)
+        updates = self.make_updates(owner, pairs, unread)
+        for i in range(0, len(updates), 10000):
+            self._db.tag_cooccurrence.bulk_write(updates[i : i + 10000], ordered=False)
+
+        return len(posts)
+
+    def rebuild(self, owner: str) -> int:
+        """Count the posts of ``owner`` tagged before this store existed.
+
+        Only ``$inc`` is used, so counts written meanwhile by tagging or read
+        state changes are kept. Returns posts processed.
+        """
+        processed = 0
+        posts = []
+        cursor = self._db.posts.find(
+            {
+                "owner": owner,
+                "tags": {"$ne": []},
+                "keywords": {"$exists": False},
+                "lemmas": {"$exists": True},
+            },
+            projection={"lemmas": True, "read": True},
+        )
+        for post in cursor:
+            posts.append(post)
+            if len(posts) >= 1000:
+                processed += self._count_legacy_posts(owner, posts)
+                posts = []
+        if posts:
+            processed += self._count_legacy_posts(owner, posts)
+        self._db.tag_cooccurrence_builds.update_one(
+            {"owner": owner}, {"$set": {"built_at": time.time()}}, upsert=True
+        )
+
+        return processed
+
+    def remove_owner(self, owner: str) -> None:
+        self._db.tag_cooccurrence.delete_many({"owner": owner})
+        self._db.tag_cooccurrence_builds.delete_many({"owner": owner})
+        # Posts keeping their keywords would be skipped by the next rebuild
+        self._db.posts.update_many(
+            {"owner": owner, "keywords": {"$exists": True}}, {"$unset": {"keywords": ""}}
+        )
+
+
+if __name__ == "__main__":
+    config = load_config(sys.argv[1] if len(sys.argv) > 1 else "rsscloud.conf")
+    cl = MongoClient(
+        config["settings"]["db_host"],
+        int(config["settings"]["db_port"]),
+        username=config["settings"]["db_login"]
+        if config["settings"]["db_login"]
+        else None,
+        password=config["settings"]["db_password"]
+        if config["settings"]["db_password"]
+        else None,
+    )
+    db = cl[config["settings"]["db_name"]]
+    store = RssTagCooccurrence(db)
+    store.prepare()
+    for owner in db.posts.distinct("owner"):
+        print(owner, store.rebuild(owner))
+    cl.close()
@@ -0,0 +1,149 @@
+"""Incremental training shared by the Word2Vec and FastText learners.
+
+A model is trained from scratch once, then updated with the posts tagged
+since its watermark: the vocabulary grows with ``build_vocab(update=True)``
+and only the new sentences are trained. Updates drift away from what a full
+pass over the archive would learn, so a full retrain still runs when the
+last one is older than ``full_retrain_days`` or the vocabulary grew by more
+than ``full_retrain_drift`` since.
+"""
+
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from rsstag.posts import PostLemmaSentence
+
+# Posts tagged this long before the watermark are trained again, in case
+# worker clocks disagree; a post seen twice does no harm.
+TAGGED_AT_OVERLAP = 60.0
+DEFAULT_FULL_RETRAIN_DAYS = 7.0
+DEFAULT_FULL_RETRAIN_DRIFT = 0.2
+
+Texts = Union[List[Tuple[str, int]], PostLemmaSentence]
+
+
+class TrainingState:
+    """Watermark and vocabulary size at the last full training of a model.
+
+    Kept in a JSON file next to the model, so both go away together.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path + ".state"
+        self.trained_until: Optional[float] = None
+        self.full_at: float = 0.0
+        self.vocab_at_full: int = 0
+        if os.path.exists(self._path):
+            try:
+                with open(self._path, "r", encoding="utf-8") as f:
+                    doc: Dict[str, Any] = json.load(f)
+                self.trained_until = doc.get("trained_until")
+                self.full_at = float(doc.get("full_at", 0.0))
+                self.vocab_at_full = int(doc.get("vocab_at_full", 0))
+            except (OSError, ValueError, TypeError) as e:
+                logging.warning("Can`t read training state %s. Info: %s", self._path, e)
+                self.trained_until = None
+
+    def save(self) -> None:
+        with open(self._path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "trained_until": self.trained_until,
+                    "full_at": self.full_at,
+                    "vocab_at_full": self.vocab_at_full,
+                },
+                f,
+            )
+
+    def drift(self, vocab_size: int) -> float:
+        """Share of the vocabulary added by updates since the full training."""
+        return (vocab_size - self.vocab_at_full) / max(self.vocab_at_full, 1)
+
+
+class EmbeddingLearn(ABC):
+    """Gensim model of one user, trained in full or updated incrementally."""
+
+    def __init__(self, path: str, model_cls: Any, n_epochs: int = 30) -> None:
+        self._path = path
+        self._model_cls = model_cls
+        self._n_epochs = n_epochs
+        if os.path.exists(self._path):
+            self._model = model_cls.load(self._path)
+        else:
+            self._model = None
+        self._state = TrainingState(path)
+
+    @abstractmethod
+    def _new_model(self, words: Iterable[List[str]]) -> Any:
+        """Model of the learner's class trained on ``words``."""
+
+    @staticmethod
+    def _sentences(texts: Texts) -> Tuple[Iterable[List[str]], int]:
+        if isinstance(texts, PostLemmaSentence):
+            return texts, texts.count()
+        words = [tagged_text[0].split() for tagged_text in texts]
+        return words, len(words)
+
+    def learn(self, texts: Texts, trained_until: Optional[float] = None) -> None:
+        """Train a new model on ``texts``, the whole corpus."""
+        words, _ = self._sentences(texts)
+        self._model = self._new_model(words)
+        self._model.save(self._path)
+        self._state.trained_until = trained_until
+        self._state.full_at = time.time()
+        self._state.vocab_at_full = len(self._model.wv)
+        self._state.save()
+
+    def update(self, texts: Texts, trained_until: Optional[float] = None) -> None:
+        """Add ``texts``, only the new sentences, to the existing model."""
+        if self._model is None:
+            self.learn(texts, trained_until)
+            return
+        words, total = self._sentences(texts)
+        self._model.build_vocab(corpus_iterable=words, update=True)
+        self._model.train(
+            corpus_iterable=words, total_examples=total, epochs=self._n_epochs
+        )
+        self._model.save(self._path)
+        self._state.trained_until = trained_until
+        self._state.save()
+
+    def full_retrain_due(self, full_retrain_days: float, full_retrain_drift: float) -> bool:
+        if self._model is None or self._state.trained_until is None:
+            return True
+        if time.time() - self._state.full_at >= full_retrain_days * 86400:
+            return True
+        return self._state.drift(len(self._model.wv)) >= full_retrain_drift
+
+    def train_posts(
+        self,
+        db: Any,
+        owner: str,
+        full_retrain_days: float = DEFAULT_FULL_RETRAIN_DAYS,
+        full_retrain_drift: float = DEFAULT_FULL_RETRAIN_DRIFT,
+    ) -> int:
+        """Bring the model up to date with the posts of ``owner``.
+
+        Returns how many posts were trained on, 0 if nothing changed.
+        """
+        started = time.time()
+        if self.full_retrain_due(full_retrain_days, full_retrain_drift):
+            sentences = PostLemmaSentence(db, owner, split=True)
+            count = sentences.count()
+            if count:
+                self.learn(sentences, started)
+            return count
+        sentences = PostLemmaSentence(
+            db,
+            owner,
+            split=True,
+            tagged_since=self._state.trained_until - TAGGED_AT_OVERLAP,
+        )
+        count = sentences.count()
+        if count:
+            self.update(sentences, started)
+        return count
@@ -5,6 +5,7 @@ import unicodedata
 from collections import defaultdict
 from rsstag.html_cleaner import HTMLCleaner
 from rsstag.stopwords import stopwords
+from rsstag.stem_cache import STEMS_EN, STEMS_RU, stem_cache
 import nltk
 
 
@@ -15,7 +16,6 @@ class RssTagEntityExtractor:
 
     def __init__(self):
         self._html_cleaner = HTMLCleaner()
-        self._lemmer_ru = nltk.stem.snowball.RussianStemmer()
         self._stemmer_ru = nltk.stem.snowball.RussianStemmer()
         self._stemmer_en = nltk.stem.PorterStemmer()
         self._only_cyrillic = re.compile("^[А-яЁё_-]*$")
@@ -24,6 +24,15 @@ class RssTagEntityExtractor:
         self._stopwords = set(stopwords.words("english") + stopwords.words("russian"))
         self._words_stat = defaultdict(lambda: {"u": 0, "l": 0})
         self._log = logging.getLogger("RssTagEntityExtractor")
+        self._stems_ru = stem_cache.table(STEMS_RU)
+        self._stems_en = stem_cache.table(STEMS_EN)
+
+    def _stem_ru(self, word: str) -> str:
+        return self._stems_ru.get(word, self._stemmer_ru.stem)
+
+    def _stem_en(self, word: str) -> str:
+        # Porter raises on some inputs; get() caches nothing when stem raises
+        return self._stems_en.get(word, self._stemmer_en.stem)
 
     def tokenize_text(self, text: str) -> Iterator:
         self._html_cleaner.purge()
@@ -69,10 +78,10 @@ class RssTagEntityExtractor:
                 new_word = ""
                 if len(word) > 2:
                     if self._only_cyrillic.match(word):
-                        new_word = self._lemmer_ru.stem(word)
+                        new_word = self._stem_ru(word)
                     elif self._only_latin.match(word):
                         try:
-                            new_word = self._stemmer_en.stem(word)
+                            new_word = self._stem_en(word)
                         except Exception as e:
                             new_word = word
                             self._log.error(
@@ -96,9 +105,9 @@ class RssTagEntityExtractor:
             if len(word) > 1:
                 try:
                     if self._only_cyrillic.match(word):
-                        s_word = self._stemmer_ru.stem(word)
+                        s_word = self._stem_ru(word)
                     elif self._only_latin.match(word):
-                        s_word = self._stemmer_en.stem(word)
+                        s_word = self._stem_en(word)
                     else:
                         s_word = word
                 except Exception as e:
@@ -115,9 +124,9 @@ class RssTagEntityExtractor:
     def add_to_stat(self, word: str):
         try:
             if self._only_cyrillic.match(word):
-                s_word = self._stemmer_ru.stem(word)
+                s_word = self._stem_ru(word)
             elif self._only_latin.match(word):
-                s_word = self._stemmer_en.stem(word)
+                s_word = self._stem_en(word)
             else:
                 s_word = word
 
@@ -1,44 +1,22 @@
 import os
 import logging
-from typing import List, Tuple, Union
+from typing import Iterable, List
 
 from gensim.models.fasttext import FastText
-from .posts import PostLemmaSentence
+from .embedding_training import EmbeddingLearn
 
 
-class FastTextLearn:
+class FastTextLearn(EmbeddingLearn):
     def __init__(self, path: str) -> None:
         self._log = logging.getLogger("FastTextLearn")
-        self._path = path
-        if os.path.exists(self._path):
-            self._model = FastText.load(self._path)
-        else:
-            self._model = None
-
-        self.__n_epochs = 30
+        super().__init__(path, FastText)
         self.__window = 5
 
-    def learn(self, texts: Union[List[Tuple[str, int]], PostLemmaSentence]):
-        if isinstance(texts, PostLemmaSentence):
-            words = texts
-            total = texts.count()
-        else:
-            words = []
-            for i, tagged_text in enumerate(texts):
-                words.append(tagged_text[0].split())
-            total = len(words)
-
-        if self._model:
-            self._model.build_vocab(corpus_iterable=words, update=True)
-            self._model.train(
-                corpus_iterable=words, total_examples=total, epochs=self.__n_epochs
-            )
-        else:
-            self._model = FastText(
-                sentences=words,
-                window=self.__window,
-                epochs=self.__n_epochs,
-                min_count=1,
-                workers=os.cpu_count(),
-            )
-        self._model.save(self._path)
+    def _new_model(self, words: Iterable[List[str]]) -> FastText:
+        return FastText(
+            sentences=words,
+            window=self.__window,
+            epochs=self._n_epochs,
+            min_count=1,
+            workers=os.cpu_count(),
+        )
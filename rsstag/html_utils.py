@@ -2,7 +2,7 @@
 
 import re
 from html import unescape
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 BLOCK_TAGS = {
     "p",
@@ -31,102 +31,99 @@ BLOCK_TAGS = {
 }
 
 
-def build_html_mapping(html_text: str) -> Tuple[str, List[int]]:
-    """Build a mapping between normalized plain text indices and original HTML indices.
+# One token per match, tried in order at every position: a tag, an entity
+# (``&`` up to the first ``;`` at most 9 chars away and before the next
+# ``<``), a whitespace run, or a run of words separated by single spaces,
+# which is already normalized text. A ``<`` or ``&`` that starts neither a
+# tag nor an entity is a one char text token.
+_TOKEN_PATTERN = re.compile(
+    r"</?([a-zA-Z0-9]+)[^>]*>"
+    r"|(&[^<;]{0,8};)"
+    r"|(\s+)"
+    r"|[^<&\s]+(?: [^<&\s]+)*|[<&]"
+)
+_TAG, _ENTITY, _SPACES = 1, 2, 3
 
-    Adds synthetic newlines for block-level tags to ensure correct sentence splitting.
 
-    Returns:
-        Tuple of (plain_text, mapping) where mapping[i] is the HTML index
-        corresponding to plain_text[i].
-    """
-    mapping: List[int] = []
-    plain_accum: List[str] = []
+def _html_to_text(html_text: str, mapping: Optional[List[int]]) -> str:
+    """Plain text of ``html_text``; fills ``mapping`` with one HTML index per char.
 
-    n = len(html_text)
-    i = 0
+    Works on whole tokens of ``_TOKEN_PATTERN`` instead of single chars, so
+    text runs are copied and mapped by slices and ``range``.
+    """
+    pieces: List[str] = []
+    last_char = ""
     last_was_space = True
 
-    tag_pattern = re.compile(r"<(/?)([a-zA-Z0-9]+)([^>]*)>")
-
-    while i < n:
-        if html_text[i] == "<":
-            match = tag_pattern.match(html_text, i)
-            if match:
-                tag_name = match.group(2).lower()
-                is_block = tag_name in BLOCK_TAGS
-
-                if is_block:
-                    if plain_accum and plain_accum[-1] != "\n":
-                        if plain_accum[-1] == " ":
-                            plain_accum[-1] = "\n"
-                        else:
-                            plain_accum.append("\n")
-                            mapping.append(i)
-                    last_was_space = True
-
-                i = match.end()
+    for match in _TOKEN_PATTERN.finditer(html_text):
+        start = match.start()
+        kind = match.lastindex
+        if kind == _TAG:
+            if match.group(_TAG).lower() in BLOCK_TAGS:
+                if last_char == " ":
+                    pieces[-1] = pieces[-1][:-1] + "\n"
+                    last_char = "\n"
+                elif last_char and last_char != "\n":
+                    pieces.append("\n")
+                    if mapping is not None:
+                        mapping.append(start)
+                    last_char = "\n"
+                last_was_space = True
+            continue
+
+        if kind == _ENTITY:
+            text = unescape(match.group(_ENTITY))
+            if not text:
                 continue
-            else:
-                char = html_text[i]
-                if char.isspace():
-                    if not last_was_space:
-                        plain_accum.append(" ")
-                        mapping.append(i)
-                        last_was_space = True
-                else:
-                    plain_accum.append(char)
-                    mapping.append(i)
-                    last_was_space = False
-                i += 1
+            if not text.isspace():
+                pieces.append(text)
+                if mapping is not None:
+                    mapping.extend([start] * len(text))
+                last_char = text[-1]
+                last_was_space = False
                 continue
+            kind = _SPACES
 
-        next_tag = html_text.find("<", i)
-        chunk_end = next_tag if next_tag != -1 else n
-        chunk = html_text[i:chunk_end]
-
-        j = 0
-        while j < len(chunk):
-            char = chunk[j]
-            if char == "&":
-                ent_end = chunk.find(";", j)
-                if ent_end != -1 and ent_end - j < 10:
-                    entity = chunk[j : ent_end + 1]
-                    decoded_char = unescape(entity)
-                    if decoded_char.isspace():
-                        if not last_was_space:
-                            plain_accum.append(" ")
-                            mapping.append(i + j)
-                            last_was_space = True
-                    else:
-                        for dc in decoded_char:
-                            plain_accum.append(dc)
-                            mapping.append(i + j)
-                            last_was_space = False
-                    j = ent_end + 1
-                    continue
-
-            if char.isspace():
-                if not last_was_space:
-                    plain_accum.append(" ")
-                    mapping.append(i + j)
-                    last_was_space = True
-            else:
-                plain_accum.append(char)
-                mapping.append(i + j)
-                last_was_space = False
-            j += 1
-        i = chunk_end
+        if kind == _SPACES:
+            if not last_was_space:
+                pieces.append(" ")
+                if mapping is not None:
+                    mapping.append(start)
+                last_char = " "
+                last_was_space = True
+            continue
+
+        text = match.group()
+        pieces.append(text)
+        if mapping is not None:
+            mapping.extend(range(start, match.end()))
+        last_char = text[-1]
+        last_was_space = False
+
+    plain = "".join(pieces).rstrip(" \n")
+    if mapping is not None:
+        del mapping[len(plain) :]
+    return plain
 
-    while plain_accum and plain_accum[-1] in (" ", "\n"):
-        plain_accum.pop()
-        mapping.pop()
 
-    final_plain = "".join(plain_accum)
+def html_to_text(html_text: str) -> str:
+    """Plain text of ``build_html_mapping`` without building the mapping."""
+    return _html_to_text(html_text, None)
 
+
+def build_html_mapping(html_text: str) -> Tuple[str, List[int]]:
+    """Build a mapping between normalized plain text indices and original HTML indices.
+
+    Adds synthetic newlines for block-level tags to ensure correct sentence splitting.
+
+    Returns:
+        Tuple of (plain_text, mapping) where mapping[i] is the HTML index
+        corresponding to plain_text[i].
+    """
+    mapping: List[int] = []
+    plain = _html_to_text(html_text, mapping)
     if mapping:
-        mapping.append(n)
+        mapping.append(len(html_text))
     else:
-        mapping = [0]
-
-    return final_plain, mapping
+        mapping.append(0)
+    return plain, mapping
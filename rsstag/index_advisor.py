@@ -0,0 +1,203 @@
+"""Report how MongoDB plans the main per-owner queries.
+
+Runs ``explain()`` on the cursors built by the posts/tags/bi_grams query
+builders and on the item claim queries, and flags plans that scan the whole
+collection (``COLLSCAN``) or sort in memory (``SORT``)::
+
+    python -m rsstag.index_advisor rsscloud.conf --owner <sid> --create-indexes
+
+Point it at a local database holding a realistic amount of data: on a nearly
+empty collection the planner may prefer a scan even when an index exists.
+Exits with 1 when any query has a flagged stage.
+"""
+
+import argparse
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import MongoClient
+
+from rsstag.bi_grams import RssTagBiGrams
+from rsstag.posts import RssTagPosts
+from rsstag.tags import RssTagTags
+from rsstag.tasks import claimable_item_processing
+from rsstag.utils import load_config
+
+PROBLEM_STAGES = ("COLLSCAN", "SORT")
+
+QueryBuilder = Callable[[Any, str, Dict[str, str]], Any]
+
+
+def _claim_query(collection: str, query: Dict[str, Any]) -> QueryBuilder:
+    def build(db: Any, owner: str, sample: Dict[str, str]) -> Any:
+        return db[collection].find(
+            {"owner": owner, **query, "processing": claimable_item_processing()}
+        )
+
+    return build
+
+
+# (label, builder); a builder returns a cursor for ``owner``. ``sample`` holds
+# a real category/feed/tag of the owner so the plans reflect actual data.
+QUERY_BUILDERS: List[Tuple[str, QueryBuilder]] = [
+    (
+        "posts.get_by_category",
+        lambda db, owner, s: RssTagPosts(db).get_by_category(owner),
+    ),
+    (
+        "posts.get_by_category(only_unread)",
+        lambda db, owner, s: RssTagPosts(db).get_by_category(owner, only_unread=True),
+    ),
+    (
+        "posts.get_by_category(category)",
+        lambda db, owner, s: RssTagPosts(db).get_by_category(
+            owner, category=s["category_id"]
+        ),
+    ),
+    (
+        "posts.get_by_category(category, only_unread)",
+        lambda db, owner, s: RssTagPosts(db).get_by_category(
+            owner, only_unread=True, category=s["category_id"]
+        ),
+    ),
+    (
+        "posts.get_by_feed_id(only_unread)",
+        lambda db, owner, s: RssTagPosts(db).get_by_feed_id(
+            owner, s["feed_id"], only_unread=True
+        ),
+    ),
+    (
+        "posts.get_by_tags(only_unread)",
+        lambda db, owner, s: RssTagPosts(db).get_by_tags(
+            owner, [s["tag"]], only_unread=True
+        ),
+    ),
+    (
+        "posts.get_all(only_unread)",
+        lambda db, owner, s: RssTagPosts(db).get_all(owner, only_unread=True),
+    ),
+    ("tags.get_all", lambda db, owner, s: RssTagTags(db).get_all(owner)),
+    (
+        "tags.get_all(only_unread)",
+        lambda db, owner, s: RssTagTags(db).get_all(owner, only_unread=True),
+    ),
+    (
+        "tags.get_all(hot_tags, only_unread)",
+        lambda db, owner, s: RssTagTags(db).get_all(
+            owner, only_unread=True, hot_tags=True
+        ),
+    ),
+    ("bi_grams.get_all", lambda db, owner, s: RssTagBiGrams(db).get_all(owner)),
+    (
+        "bi_grams.get_all(only_unread)",
+        lambda db, owner, s: RssTagBiGrams(db).get_all(owner, only_unread=True),
+    ),
+    (
+        "bi_grams.get_by_tags(only_unread)",
+        lambda db, owner, s: RssTagBiGrams(db).get_by_tags(
+            owner, [s["tag"]], only_unread=True
+        ),
+    ),
+    ("claim TASK_TAGS", _claim_query("posts", {"tags": []})),
+    ("claim TASK_TAGS_RANK", _claim_query("tags", {"temperature": 0})),
+    ("claim TASK_BIGRAMS_RANK", _claim_query("bi_grams", {"temperature": 0})),
+]
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    children: List[Dict[str, Any]] = []
+    if "inputStage" in node:
+        children.append(node["inputStage"])
+    children.extend(node.get("inputStages", []))
+    # Slot-based engine (5.0+) nests the classic tree under "queryPlan"
+    if "queryPlan" in node:
+        children.append(node["queryPlan"])
+    for child in children:
+        yield from _plan_nodes(child)
+
+
+def plan_summary(explain: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Stages and indexes of the winning plan of an ``explain()`` result."""
+    winning: Dict[str, Any] = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages: List[str] = []
+    indexes: List[str] = []
+    for node in _plan_nodes(winning):
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "indexName" in node:
+            indexes.append(node["indexName"])
+    problems = [stage for stage in stages if stage in PROBLEM_STAGES]
+    return {"stages": stages, "indexes": indexes, "problems": problems}
+
+
+def _sample_values(db: Any, owner: str) -> Dict[str, str]:
+    post = db.posts.find_one(
+        {"owner": owner, "tags.0": {"$exists": True}},
+        projection={"category_id": True, "feed_id": True, "tags": True},
+    ) or {}
+    tags = post.get("tags") or [""]
+    return {
+        "category_id": post.get("category_id", ""),
+        "feed_id": post.get("feed_id", ""),
+        "tag": tags[0],
+    }
+
+
+def advise(db: Any, owner: str) -> List[Dict[str, Any]]:
+    """Explain every registered query for ``owner``."""
+    sample = _sample_values(db, owner)
+    report: List[Dict[str, Any]] = []
+    for label, build in QUERY_BUILDERS:
+        try:
+            summary = plan_summary(build(db, owner, sample).explain())
+        except Exception as e:
+            summary = {"stages": [], "indexes": [], "problems": [f"ERROR: {e}"]}
+        report.append({"query": label, **summary})
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("config_path", nargs="?", default="rsscloud.conf")
+    parser.add_argument("--owner", required=True, help="User sid to explain for.")
+    parser.add_argument(
+        "--create-indexes",
+        action="store_true",
+        help="Create the registered indexes before explaining.",
+    )
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config_path)
+    if "settings" not in config:
+        parser.error(f"Unable to load config from: {args.config_path}")
+    settings = config["settings"]
+    cl = MongoClient(
+        settings["db_host"],
+        int(settings["db_port"]),
+        username=settings["db_login"] if settings["db_login"] else None,
+        password=settings["db_password"] if settings["db_password"] else None,
+    )
+    try:
+        db = cl[settings["db_name"]]
+        if args.create_indexes:
+            RssTagPosts(db).prepare()
+            RssTagTags(db).prepare()
+            RssTagBiGrams(db).prepare()
+        report = advise(db, args.owner)
+    finally:
+        cl.close()
+
+    for row in report:
+        status = "FLAG " + ",".join(row["problems"]) if row["problems"] else "ok"
+        print(
+            f"{status:16s} {row['query']:48s} "
+            f"stages={'>'.join(row['stages'])} indexes={','.join(row['indexes'])}"
+        )
+
+    return 1 if any(row["problems"] for row in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Compound indexes for the per-owner collections.
+
+Almost every read is ``{"owner": X, ...}`` plus a sort, which the old
+single-field indexes (``owner``, ``read``, ``unread_count``...) can only serve
+by intersecting indexes or by sorting in memory. Each entry here is shaped by
+the equality-sort-range rule after one query builder: equality fields first,
+then the sort keys in the same directions, then range filters.
+"""
+
+import logging
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+IndexKeys = List[Tuple[str, int]]
+
+COMPOUND_INDEXES: Dict[str, Dict[str, IndexKeys]] = {
+    "posts": {
+        # get_by_category(only_unread=None), get_all, get_neighbors_by_unix_date
+        "owner_date": [("owner", ASCENDING), ("unix_date", DESCENDING)],
+        "owner_category_date": [
+            ("owner", ASCENDING),
+            ("category_id", ASCENDING),
+            ("unix_date", DESCENDING),
+        ],
+        # get_by_category/get_by_feed_id with only_unread: sort feed, date
+        "owner_read_feed_date": [
+            ("owner", ASCENDING),
+            ("read", ASCENDING),
+            ("feed_id", DESCENDING),
+            ("unix_date", DESCENDING),
+        ],
+        "owner_category_read_feed_date": [
+            ("owner", ASCENDING),
+            ("category_id", ASCENDING),
+            ("read", ASCENDING),
+            ("feed_id", DESCENDING),
+            ("unix_date", DESCENDING),
+        ],
+        # get_by_tags, and TASK_TAGS claims ({"tags": []} + processing)
+        "owner_tags_read_feed_date": [
+            ("owner", ASCENDING),
+            ("tags", ASCENDING),
+            ("read", ASCENDING),
+            ("feed_id", DESCENDING),
+            ("unix_date", DESCENDING),
+        ],
+        # get_by_pid, get_by_pids, change_status
+        "owner_pid": [("owner", ASCENDING), ("pid", ASCENDING)],
+        # PostLemmaSentence(tagged_since=...), incremental w2v/fasttext
+        "owner_tagged_at": [("owner", ASCENDING), ("tagged_at", ASCENDING)],
+    },
+    "tags": {
+        # get_by_tag, get_by_tags
+        "owner_tag": [("owner", ASCENDING), ("tag", ASCENDING)],
+        # get_all/get_by_* sorted by unread_count (with unread_count > 0)
+        "owner_unread": [("owner", ASCENDING), ("unread_count", DESCENDING)],
+        "owner_posts": [("owner", ASCENDING), ("posts_count", DESCENDING)],
+        # get_all(hot_tags=True); the owner+temperature prefix also serves
+        # TASK_TAGS_RANK claims ({"temperature": 0} + processing)
+        "owner_temperature_unread": [
+            ("owner", ASCENDING),
+            ("temperature", DESCENDING),
+            ("unread_count", DESCENDING),
+        ],
+        "owner_temperature_posts": [
+            ("owner", ASCENDING),
+            ("temperature", DESCENDING),
+            ("posts_count", DESCENDING),
+        ],
+    },
+    "bi_grams": {
+        "owner_tag": [("owner", ASCENDING), ("tag", ASCENDING)],
+        "owner_unread": [("owner", ASCENDING), ("unread_count", DESCENDING)],
+        "owner_posts": [("owner", ASCENDING), ("posts_count", DESCENDING)],
+        # get_all(hot_tags=True); the owner+temperature prefix also serves
+        # TASK_BIGRAMS_RANK claims ({"temperature": 0} + processing)
+        "owner_temperature_unread": [
+            ("owner", ASCENDING),
+            ("temperature", DESCENDING),
+            ("unread_count", DESCENDING),
+        ],
+        "owner_temperature_posts": [
+            ("owner", ASCENDING),
+            ("temperature", DESCENDING),
+            ("posts_count", DESCENDING),
+        ],
+        # get_by_tags
+        "owner_tags_unread": [
+            ("owner", ASCENDING),
+            ("tags", ASCENDING),
+            ("unread_count", DESCENDING),
+        ],
+        "owner_tags_posts": [
+            ("owner", ASCENDING),
+            ("tags", ASCENDING),
+            ("posts_count", DESCENDING),
+        ],
+    },
+}
+
+
+def create_compound_indexes(
+    collection: Any, name: str, log: logging.Logger
+) -> None:
+    """Create the compound indexes registered for collection ``name``."""
+    for index_name, keys in COMPOUND_INDEXES.get(name, {}).items():
+        try:
+            collection.create_index(keys, name=index_name)
+        except Exception as e:
+            log.warning(
+                "Can`t create index %s. May be already exists. Info: %s", index_name, e
+            )
@@ -0,0 +1,262 @@
+"""Per-owner lemma vocabulary and token-id arrays of post lemmas.
+
+Handlers that scan lemmas word by word used to split every post into a list
+of ``str``: each token is a separate string object plus a list slot, which
+for a user with 100k posts means gigabytes in a single request. Instead every
+owner gets a vocabulary (lemma -> int, in ``lemma_vocab``) and each post
+stores its lemma sequence as ids (``lemma_ids``, ``array('I')`` bytes, 4 bytes
+per token). Scans then compare ints, or run vectorized over
+``numpy.frombuffer`` views, and only turn the few ids they output back into
+words.
+
+Ids are never reused or renumbered, so arrays stay valid as the vocabulary
+grows. Ranges of ids are reserved with ``$inc`` on a per-owner counter; when
+two workers add the same word concurrently the unique ``(owner, word)`` index
+keeps the first one and the other's reserved id is simply left unused.
+"""
+
+import logging
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pymongo import ASCENDING, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from rsstag.text_codec import decode_words
+
+LEMMA_IDS_FIELD = "lemma_ids"
+
+_DUPLICATE_KEY = 11000
+# pids per posts query, keeps "$in" far from the BSON document limit
+PIDS_CHUNK = 5000
+# owners whose vocabularies a process keeps, least recently used evicted first
+VOCABULARIES_CACHE_SIZE = 16
+
+
+def ids_to_bytes(ids: array) -> bytes:
+    if sys.byteorder != "little":
+        ids = array("I", ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def ids_from_bytes(blob: bytes) -> array:
+    ids = array("I")
+    ids.frombytes(blob)
+    if sys.byteorder != "little":
+        ids.byteswap()
+    return ids
+
+
+def ids_view(ids: array) -> np.ndarray:
+    """Zero-copy numpy view of an id array."""
+    return np.frombuffer(ids, dtype=np.uint32)
+
+
+class LemmaVocabulary:
+    """In-memory lemma <-> id map of one owner."""
+
+    __slots__ = ("ids", "words")
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        # Reserved ids that lost an insert race are never filled.
+        self.words: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def next_id(self) -> int:
+        return len(self.words)
+
+    def add(self, word: str, word_id: int) -> None:
+        if word_id >= len(self.words):
+            self.words.extend([None] * (word_id + 1 - len(self.words)))
+        self.words[word_id] = word
+        self.ids[word] = word_id
+
+    def get_id(self, word: str) -> Optional[int]:
+        return self.ids.get(word)
+
+    def word(self, word_id: int) -> str:
+        return self.words[word_id] or ""
+
+    def to_ids(self, words: Iterable[str]) -> array:
+        """Ids of ``words``; all of them must be in the vocabulary."""
+        ids = self.ids
+        return array("I", [ids[word] for word in words])
+
+    def to_words(self, word_ids: Iterable[int]) -> List[str]:
+        words = self.words
+        return [words[word_id] or "" for word_id in word_ids]
+
+
+# (database name, owner) -> vocabulary, shared by the handlers of a process
+_vocabularies: "OrderedDict[Tuple[str, str], LemmaVocabulary]" = OrderedDict()
+_vocabularies_lock = threading.Lock()
+
+
+class RssTagLemmaVocab:
+    indexes = [
+        ([("owner", ASCENDING), ("word", ASCENDING)], {"unique": True}),
+        ([("owner", ASCENDING), ("id", ASCENDING)], {}),
+    ]
+
+    def __init__(self, db: MongoClient) -> None:
+        self._db = db
+        self._log = logging.getLogger("lemma_vocab")
+
+    def prepare(self) -> None:
+        for index, options in self.indexes:
+            try:
+                self._db.lemma_vocab.create_index(index, **options)
+            except Exception as e:
+                self._log.warning(
+                    "Can`t create index %s. May be already exists. Info: %s", index, e
+                )
+
+    def _cached(self, owner: str) -> LemmaVocabulary:
+        key = (self._db.name, owner)
+        with _vocabularies_lock:
+            vocab = _vocabularies.get(key)
+            if vocab is None:
+                vocab = LemmaVocabulary()
+                _vocabularies[key] = vocab
+                while len(_vocabularies) > VOCABULARIES_CACHE_SIZE:
+                    _vocabularies.popitem(last=False)
+            else:
+                _vocabularies.move_to_end(key)
+        return vocab
+
+    def _load(self, owner: str, vocab: LemmaVocabulary, query: Dict[str, Any]) -> None:
+        cursor = self._db.lemma_vocab.find(
+            {"owner": owner, **query},
+            projection={"word": True, "id": True, "_id": False},
+        )
+        for doc in cursor:
+            vocab.add(doc["word"], doc["id"])
+
+    def vocabulary(self, owner: str) -> LemmaVocabulary:
+        """Vocabulary of ``owner``, with ids added since the last call."""
+        vocab = self._cached(owner)
+        self._load(owner, vocab, {"id": {"$gte": vocab.next_id}})
+        return vocab
+
+    def assign(self, owner: str, words: Iterable[str]) -> LemmaVocabulary:
+        """Make sure every word of ``words`` has an id."""
+        vocab = self.vocabulary(owner)
+        missing = [word for word in set(words) if word not in vocab.ids]
+        if missing:
+            # Ids below next_id added concurrently are not loaded yet.
+            self._load(owner, vocab, {"word": {"$in": missing}})
+            missing = [word for word in missing if word not in vocab.ids]
+        if not missing:
+            return vocab
+
+        counter = self._db.lemma_vocab_state.find_one_and_update(
+            {"owner": owner},
+            {"$inc": {"next_id": len(missing)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        first_id = counter["next_id"] - len(missing)
+        docs = [
+            {"owner": owner, "word": word, "id": first_id + i}
+            for i, word in enumerate(missing)
+        ]
+        try:
+            self._db.lemma_vocab.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = (e.details or {}).get("writeErrors", [])
+            if any(error.get("code") != _DUPLICATE_KEY for error in errors):
+                raise
+        self._load(owner, vocab, {"word": {"$in": missing}})
+
+        return vocab
+
+    def _ensure_ids(
+        self, owner: str, vocab: LemmaVocabulary, arrays: Iterable[array]
+    ) -> None:
+        ids = [ids_view(word_ids) for word_ids in arrays if len(word_ids)]
+        if not ids:
+            return
+        unique = np.unique(np.concatenate(ids))
+        words = vocab.words
+        unknown = [
+            int(word_id)
+            for word_id in unique
+            if word_id >= len(words) or words[word_id] is None
+        ]
+        if unknown:
+            self._load(owner, vocab, {"id": {"$in": unknown}})
+
+    def _convert(
+        self, owner: str, post_ids: List[Any], arrays: Dict[str, array]
+    ) -> None:
+        """Build and store the arrays of posts that have only lemmas."""
+        pending: List[Tuple[Any, str, List[str]]] = []
+        cursor = self._db.posts.find(
+            {"_id": {"$in": post_ids}}, projection={"pid": True, "lemmas": True}
+        )
+        for post in cursor:
+            if not post.get("lemmas"):
+                continue
+            try:
+                pending.append((post["_id"], post["pid"], decode_words(post["lemmas"])))
+            except (EOFError, OSError, ValueError) as e:
+                self._log.error(
+                    "Can`t decode lemmas of post %s. Info: %s", post["pid"], e
+                )
+        if not pending:
+            return
+
+        vocab = self.assign(owner, (word for _, _, words in pending for word in words))
+        updates = []
+        for post_id, pid, words in pending:
+            arrays[pid] = vocab.to_ids(words)
+            updates.append(
+                UpdateOne(
+                    {"_id": post_id},
+                    {"$set": {LEMMA_IDS_FIELD: ids_to_bytes(arrays[pid])}},
+                )
+            )
+        self._db.posts.bulk_write(updates, ordered=False)
+
+    def load_arrays(
+        self, owner: str, pids: Sequence[str]
+    ) -> Tuple[LemmaVocabulary, Dict[str, array]]:
+        """Lemma id arrays of the posts ``pids`` of ``owner``, by pid.
+
+        Posts tagged before ``lemma_ids`` existed get them computed from
+        their lemmas and stored, so each post is converted only once.
+        """
+        arrays: Dict[str, array] = {}
+        pids = list(pids)
+        for start in range(0, len(pids), PIDS_CHUNK):
+            cursor = self._db.posts.find(
+                {"owner": owner, "pid": {"$in": pids[start : start + PIDS_CHUNK]}},
+                projection={"pid": True, LEMMA_IDS_FIELD: True},
+            )
+            missing = []
+            for post in cursor:
+                if post.get(LEMMA_IDS_FIELD) is None:
+                    missing.append(post["_id"])
+                else:
+                    arrays[post["pid"]] = ids_from_bytes(post[LEMMA_IDS_FIELD])
+            if missing:
+                self._convert(owner, missing, arrays)
+        vocab = self.vocabulary(owner)
+        self._ensure_ids(owner, vocab, arrays.values())
+
+        return vocab, arrays
+
+    def remove_owner(self, owner: str) -> None:
+        self._db.lemma_vocab.delete_many({"owner": owner})
+        self._db.lemma_vocab_state.delete_many({"owner": owner})
+        with _vocabularies_lock:
+            _vocabularies.pop((self._db.name, owner), None)
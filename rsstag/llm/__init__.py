@@ -1,7 +1,9 @@
 import hashlib
 import logging
 import time
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, Optional
+
+from pymongo import UpdateOne
 
 from rsstag.llm.base import LLMResponse, ToolCall, ToolDefinition
 
@@ -9,6 +11,9 @@ from rsstag.llm.base import LLMResponse, ToolCall, ToolDefinition
 class LLMCache:
     """Persistent, user-scoped cache for deterministic LLM results."""
 
+    # Keys per bulk lookup, keeps "$in" far from the BSON document limit
+    KEYS_CHUNK = 5000
+
     def __init__(self, db: Any) -> None:
         self._collection: Any = db.llm_cache
         self._log: logging.Logger = logging.getLogger(__name__)
@@ -49,4 +54,44 @@ class LLMCache:
         except Exception as exc:
             self._log.warning("Unable to write the LLM cache: %s", exc)
 
+    def get_many(self, owner: str, keys: Iterable[str]) -> Dict[str, str]:
+        """Cached values of ``keys``; missing keys are left out."""
+        keys = list(keys)
+        values: Dict[str, str] = {}
+        try:
+            for start in range(0, len(keys), self.KEYS_CHUNK):
+                cursor = self._collection.find(
+                    {"owner": owner, "key": {"$in": keys[start : start + self.KEYS_CHUNK]}},
+                    {"key": 1, "value": 1},
+                )
+                for cached in cursor:
+                    value: Any = cached.get("value")
+                    if isinstance(value, str) and value:
+                        values[cached["key"]] = value
+        except Exception as exc:
+            self._log.warning("Unable to read the LLM cache: %s", exc)
+        return values
+
+    def set_many(self, owner: str, values: Dict[str, str]) -> None:
+        if not values:
+            return
+        now: float = time.time()
+        try:
+            self._collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"owner": owner, "key": key},
+                        {
+                            "$set": {"value": value, "updated_at": now},
+                            "$setOnInsert": {"owner": owner, "key": key},
+                        },
+                        upsert=True,
+                    )
+                    for key, value in values.items()
+                ],
+                ordered=False,
+            )
+        except Exception as exc:
+            self._log.warning("Unable to write the LLM cache: %s", exc)
+
 __all__ = ["LLMCache", "LLMResponse", "ToolCall", "ToolDefinition"]
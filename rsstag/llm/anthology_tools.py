@@ -5,13 +5,19 @@ from __future__ import annotations
 import json
 import logging
 import re
-from collections import Counter, defaultdict
+import threading
+from collections import Counter, OrderedDict, defaultdict
 from typing import Any, Iterable, Optional
 
 from rsstag.llm.base import ToolDefinition
 from rsstag.post_grouping import RssTagPostGrouping
 from rsstag.posts import RssTagPosts
 from rsstag.topic_aliases import RssTagTopicAliases
+from rsstag.topics_index import RssTagTopicsIndex
+
+# Grouping indexes kept for the next runs, least recently used dropped first
+GROUPING_INDEX_CACHE_SIZE = 8
+_INFLECTION_SUFFIXES = ("s", "es", "ed", "d", "ing", "er", "ers", "ly")
 
 
 def get_anthology_tools(include_tag_co_occurrences: bool = True) -> tuple[ToolDefinition, ...]:
@@ -88,6 +94,213 @@ def get_anthology_tools(include_tag_co_occurrences: bool = True) -> tuple[ToolDe
     return tuple(tools)
 
 
+def _tokenize(text: str) -> list[str]:
+    return [token for token in re.split(r"[^a-z0-9]+", text.lower()) if token]
+
+
+def _tokens_are_inflectional_variants(term: str, token: str) -> bool:
+    if term == token:
+        return True
+    shorter, longer = (term, token) if len(term) <= len(token) else (token, term)
+    if len(shorter) < 3 or not longer.startswith(shorter):
+        return False
+    suffix = longer[len(shorter):]
+    return suffix in _INFLECTION_SUFFIXES
+
+
+def _term_variants(term: str) -> set[str]:
+    """Every token `_tokens_are_inflectional_variants` accepts for `term`."""
+    variants = {term}
+    if len(term) >= 3:
+        variants.update(term + suffix for suffix in _INFLECTION_SUFFIXES)
+    for suffix in _INFLECTION_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            variants.add(term[: -len(suffix)])
+    return variants
+
+
+class GroupingIndex:
+    """Topic entries of the groupings in a scope with the lookups of the tools.
+
+    Entries are what the tools return for a topic of a grouping doc; their
+    source refs carry no tag, the executor adds its seed tag. Topic path and
+    preview tokens are inverted to entry positions, so a search only scores
+    the entries sharing a token variant with the query.
+    """
+
+    def __init__(
+        self,
+        entries: list[dict[str, Any]],
+        grouping_ids_by_post_id: dict[str, str],
+        latest_update: Optional[float],
+    ) -> None:
+        self.entries: list[dict[str, Any]] = entries
+        self.grouping_ids_by_post_id: dict[str, str] = grouping_ids_by_post_id
+        self.latest_update: Optional[float] = latest_update
+        self.by_topic: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self.by_canonical_id: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self.topic_post_counts: Counter[str] = Counter()
+        self.grouped_post_ids: set[str] = set()
+        self.topic_paths: set[str] = set()
+        self._topic_post_ids: dict[str, dict[str, None]] = defaultdict(dict)
+        self._topic_tokens: dict[str, set[int]] = defaultdict(set)
+        self._preview_tokens: dict[str, set[int]] = defaultdict(set)
+        for position, entry in enumerate(entries):
+            topic_path = entry["topic_path"]
+            self.by_topic[topic_path].append(entry)
+            self.by_canonical_id[entry["canonical_id"]].append(entry)
+            self.topic_post_counts[topic_path] += len(entry["post_ids"])
+            self.grouped_post_ids.update(entry["post_ids"])
+            self._topic_post_ids[topic_path].update(dict.fromkeys(entry["post_ids"]))
+            if topic_path.strip():
+                self.topic_paths.add(topic_path.strip())
+            for token in _tokenize(topic_path):
+                self._topic_tokens[token].add(position)
+            for token in _tokenize(entry["preview"]):
+                self._preview_tokens[token].add(position)
+
+    def topic_post_ids(self, topic_path: str) -> list[str]:
+        """Post ids of a topic path in entry order, without repeats."""
+        return list(self._topic_post_ids.get(topic_path, ()))
+
+    def topic_matches(self, term: str) -> set[int]:
+        """Positions of the entries with a topic path token matching `term`."""
+        return self._matches(self._topic_tokens, term)
+
+    def preview_matches(self, term: str) -> set[int]:
+        """Positions of the entries with a preview token matching `term`."""
+        return self._matches(self._preview_tokens, term)
+
+    @staticmethod
+    def _matches(postings: dict[str, set[int]], term: str) -> set[int]:
+        positions: set[int] = set()
+        for variant in _term_variants(term):
+            positions.update(postings.get(variant, ()))
+        return positions
+
+
+class _GroupingIndexCache:
+    """Grouping indexes of the process keyed by owner and scope.
+
+    An index is served while the owner's ``topics_index_versions`` stamp,
+    renewed by every grouping, read state and alias change, is the one it
+    was built at.
+    """
+
+    def __init__(self, capacity: int = GROUPING_INDEX_CACHE_SIZE) -> None:
+        self.capacity: int = capacity
+        self._indexes: OrderedDict[tuple, tuple[Any, GroupingIndex]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: Any) -> Optional[GroupingIndex]:
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is None or cached[0] != version:
+                return None
+            self._indexes.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: tuple, version: Any, index: GroupingIndex) -> None:
+        with self._lock:
+            self._indexes[key] = (version, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.capacity:
+                self._indexes.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+grouping_index_cache = _GroupingIndexCache()
+
+
+def build_grouping_index(db: Any, owner: str, allowed_post_ids: set[str]) -> GroupingIndex:
+    """Read the groupings of the allowed posts into a `GroupingIndex`."""
+    entries: list[dict[str, Any]] = []
+    grouping_ids_by_post_id: dict[str, str] = {}
+    latest_update: Optional[float] = None
+    if not allowed_post_ids:
+        return GroupingIndex(entries, grouping_ids_by_post_id, latest_update)
+
+    query: dict[str, Any] = {"owner": owner, "post_ids": {"$in": sorted(allowed_post_ids)}}
+    topic_aliases = RssTagTopicAliases(db)
+    alias_map = topic_aliases.load_owner_map(owner)
+    projection = {
+        "post_ids": True,
+        "groups": True,
+        "sentences": True,
+        "updated_at": True,
+    }
+    for doc in db.post_grouping.find(query, projection=projection):
+        doc_id = str(doc.get("_id", ""))
+        updated_at: Any = doc.get("updated_at")
+        if isinstance(updated_at, (int, float)):
+            if latest_update is None:
+                latest_update = float(updated_at)
+            else:
+                latest_update = max(latest_update, float(updated_at))
+        post_ids = [str(value) for value in doc.get("post_ids", []) if value is not None]
+        usable_post_ids = [post_id for post_id in post_ids if post_id in allowed_post_ids]
+        if not usable_post_ids:
+            continue
+
+        for post_id in usable_post_ids:
+            grouping_ids_by_post_id[post_id] = doc_id
+        sentence_map = {
+            int(sentence["number"]): sentence
+            for sentence in doc.get("sentences", [])
+            if isinstance(sentence, dict) and "number" in sentence
+        }
+        groups = doc.get("groups", {})
+        if not isinstance(groups, dict):
+            continue
+        for topic_path, raw_indices in groups.items():
+            if not isinstance(topic_path, str) or not isinstance(raw_indices, list):
+                continue
+            sentence_indices = sorted(
+                {
+                    int(index)
+                    for index in raw_indices
+                    if isinstance(index, int) or (isinstance(index, str) and index.isdigit())
+                }
+            )
+            sentences = [
+                {
+                    "number": index,
+                    "text": str(sentence_map.get(index, {}).get("text", "")).strip(),
+                    "read": bool(sentence_map.get(index, {}).get("read", False)),
+                }
+                for index in sentence_indices
+            ]
+            preview = " ".join(sentence["text"] for sentence in sentences if sentence["text"])[:280]
+            resolved = topic_aliases.resolve_path(topic_path, alias_map=alias_map)
+            canonical_id = resolved["canonical_id"]
+            canonical_topic_path = resolved["canonical_path"]
+            source_refs = [
+                {
+                    "post_id": post_id,
+                    "sentence_indices": sentence_indices,
+                    "topic_path": topic_path,
+                    "canonical_id": canonical_id,
+                }
+                for post_id in usable_post_ids
+            ]
+            entries.append(
+                {
+                    "topic_path": topic_path,
+                    "canonical_id": canonical_id,
+                    "canonical_topic_path": canonical_topic_path,
+                    "post_ids": usable_post_ids,
+                    "sentence_indices": sentence_indices,
+                    "sentences": sentences,
+                    "preview": preview,
+                    "source_refs": source_refs,
+                }
+            )
+    return GroupingIndex(entries, grouping_ids_by_post_id, latest_update)
+
+
 class AnthologyToolExecutor:
     """Execute read-only anthology tools inside a scoped corpus."""
 
@@ -100,10 +313,9 @@ class AnthologyToolExecutor:
         self._post_grouping = RssTagPostGrouping(db)
         self._log = logging.getLogger("anthology_tools")
         self._allowed_post_ids: Optional[set[str]] = None
-        self._grouping_entries: Optional[list[dict[str, Any]]] = None
-        self._grouping_ids_by_post_id: dict[str, str] = {}
+        self._grouping_index: Optional[GroupingIndex] = None
+        self._seed_positions: Optional[set[int]] = None
         self._post_metadata_by_id: dict[str, dict[str, Any]] = {}
-        self._latest_grouping_update: Optional[float] = None
 
     def execute(self, tool_name: str, args: dict[str, Any]) -> str:
         """Execute a named tool and return a JSON string payload."""
@@ -126,18 +338,45 @@ class AnthologyToolExecutor:
 
     def search_related_topics(self, query: str, limit: int) -> dict[str, Any]:
         terms = self._tokenize(query)
-        results: list[dict[str, Any]] = []
-        for item in self._load_grouping_entries():
-            if not terms:
-                score = 1
+        index = self._load_grouping_index()
+        scored: list[tuple[int, str, int, list[str]]] = []
+        if not terms:
+            scored = [
+                (1, entry["topic_path"], position, [])
+                for position, entry in enumerate(index.entries)
+            ]
+        else:
+            # Only entries sharing a token with the query or the seed tag can score
+            topic_hits = [index.topic_matches(term) for term in terms]
+            preview_hits = [index.preview_matches(term) for term in terms]
+            seed_positions = self._get_seed_positions()
+            candidates: set[int] = set(seed_positions)
+            for hits in topic_hits + preview_hits:
+                candidates.update(hits)
+            for position in candidates:
+                score = 0
                 matched_terms: list[str] = []
-            else:
-                score, matched_terms = self._score_topic_match(item, terms)
-            if score <= 0:
-                continue
+                for term, topic_positions, preview_positions in zip(
+                    terms, topic_hits, preview_hits
+                ):
+                    if position in topic_positions:
+                        score += 2
+                        matched_terms.append(term)
+                    elif position in preview_positions:
+                        score += 1
+                        matched_terms.append(term)
+                if position in seed_positions:
+                    score += 1
+                if score > 0:
+                    topic_path = index.entries[position]["topic_path"]
+                    scored.append((score, topic_path, position, matched_terms))
+        scored.sort(key=lambda row: (-row[0], row[1], row[2]))
+        results: list[dict[str, Any]] = []
+        for score, topic_path, position, matched_terms in scored[:limit]:
+            item = index.entries[position]
             results.append(
                 {
-                    "topic_path": item["topic_path"],
+                    "topic_path": topic_path,
                     "post_ids": item["post_ids"],
                     "sentence_indices": item["sentence_indices"],
                     "sentence_count": len(item["sentence_indices"]),
@@ -146,37 +385,30 @@ class AnthologyToolExecutor:
                     "matched_terms": matched_terms,
                 }
             )
-        results.sort(key=lambda row: (-int(row["score"]), row["topic_path"]))
-        return {"query": query, "topics": results[:limit]}
+        return {"query": query, "topics": results}
 
     def get_topic_details(self, topic_path: str, limit: int) -> dict[str, Any]:
         topic_path = topic_path.strip()
         if not topic_path:
             return {"topic_path": "", "matches": []}
         matches: list[dict[str, Any]] = []
-        for item in self._load_grouping_entries():
-            if item["topic_path"] != topic_path:
-                continue
+        for item in self._load_grouping_index().by_topic.get(topic_path, [])[:limit]:
             matches.append(
                 {
                     "topic_path": topic_path,
                     "post_ids": item["post_ids"],
                     "sentences": item["sentences"],
-                    "source_refs": item["source_refs"],
+                    "source_refs": self._with_seed_tag(item["source_refs"]),
                 }
             )
-        return {"topic_path": topic_path, "matches": matches[:limit]}
+        return {"topic_path": topic_path, "matches": matches}
 
     def get_posts_for_topic(self, topic_path: str, limit: int) -> dict[str, Any]:
         topic_path = topic_path.strip()
         if not topic_path:
             return {"topic_path": "", "posts": []}
 
-        post_ids: list[str] = []
-        for item in self._load_grouping_entries():
-            if item["topic_path"] == topic_path:
-                post_ids.extend(item["post_ids"])
-        unique_post_ids = list(dict.fromkeys(post_ids))[:limit]
+        unique_post_ids = self._load_grouping_index().topic_post_ids(topic_path)[:limit]
         if not unique_post_ids:
             return {"topic_path": topic_path, "posts": []}
 
@@ -222,10 +454,7 @@ class AnthologyToolExecutor:
         """Return a compact inventory so the agent can reason about coverage."""
 
         allowed_post_ids: set[str] = self._get_allowed_post_ids() or set()
-        entries: list[dict[str, Any]] = self._load_grouping_entries()
-        topic_counts: Counter[str] = Counter()
-        for entry in entries:
-            topic_counts[str(entry.get("topic_path", ""))] += len(entry["post_ids"])
+        topic_counts: Counter[str] = self._load_grouping_index().topic_post_counts
 
         documents: list[dict[str, Any]] = []
         for post_id in sorted(allowed_post_ids)[:limit]:
@@ -248,13 +477,14 @@ class AnthologyToolExecutor:
             if post_id:
                 post_ids.add(post_id)
 
+        index = self._load_grouping_index()
         doc_ids = [
-            self._grouping_ids_by_post_id[post_id]
+            index.grouping_ids_by_post_id[post_id]
             for post_id in sorted(post_ids)
-            if post_id in self._grouping_ids_by_post_id
+            if post_id in index.grouping_ids_by_post_id
         ]
         return {
-            "post_grouping_updated_at": self._latest_grouping_update,
+            "post_grouping_updated_at": index.latest_update,
             "post_grouping_doc_ids": doc_ids,
         }
 
@@ -279,9 +509,7 @@ class AnthologyToolExecutor:
             return None
 
         valid_indices: set[int] = set()
-        for entry in self._load_grouping_entries():
-            if entry["topic_path"] != normalized_topic_path:
-                continue
+        for entry in self._load_grouping_index().by_topic.get(normalized_topic_path, []):
             if normalized_post_id not in entry["post_ids"]:
                 continue
             valid_indices.update(int(index) for index in entry["sentence_indices"])
@@ -304,26 +532,18 @@ class AnthologyToolExecutor:
     def build_coverage(self, result: dict[str, Any]) -> dict[str, Any]:
         """Build deterministic corpus and citation coverage counters."""
 
-        entries: list[dict[str, Any]] = self._load_grouping_entries()
+        index = self._load_grouping_index()
         documents_in_scope: set[str] = self._get_allowed_post_ids() or set()
-        grouped_documents: set[str] = {
-            post_id for entry in entries for post_id in entry["post_ids"]
-        }
         cited_documents: set[str] = {
             str(source_ref.get("post_id", "")).strip()
             for source_ref in self.iter_source_refs(result)
             if str(source_ref.get("post_id", "")).strip()
         }
-        topics_available: set[str] = {
-            str(entry.get("topic_path", "")).strip()
-            for entry in entries
-            if str(entry.get("topic_path", "")).strip()
-        }
         return {
             "documents_in_scope": len(documents_in_scope),
-            "documents_with_grouped_text": len(grouped_documents),
+            "documents_with_grouped_text": len(index.grouped_post_ids),
             "documents_cited": len(cited_documents),
-            "topics_available": len(topics_available),
+            "topics_available": len(index.topic_paths),
             "uncited_documents": max(len(documents_in_scope - cited_documents), 0),
         }
 
@@ -345,97 +565,40 @@ class AnthologyToolExecutor:
                     yield from self.iter_source_refs(child)
 
     def _load_grouping_entries(self) -> list[dict[str, Any]]:
-        if self._grouping_entries is not None:
-            return self._grouping_entries
-
-        allowed_post_ids = self._get_allowed_post_ids()
-        query: dict[str, Any] = {"owner": self._owner}
-        if allowed_post_ids is not None:
-            if not allowed_post_ids:
-                self._grouping_entries = []
-                return self._grouping_entries
-            query["post_ids"] = {"$in": sorted(allowed_post_ids)}
-
-        entries: list[dict[str, Any]] = []
-        topic_aliases = RssTagTopicAliases(self._db)
-        alias_map = topic_aliases.load_owner_map(self._owner)
-        projection = {
-            "post_ids": True,
-            "groups": True,
-            "sentences": True,
-            "updated_at": True,
-        }
-        for doc in self._db.post_grouping.find(query, projection=projection):
-            doc_id = str(doc.get("_id", ""))
-            updated_at: Any = doc.get("updated_at")
-            if isinstance(updated_at, (int, float)):
-                if self._latest_grouping_update is None:
-                    self._latest_grouping_update = float(updated_at)
-                else:
-                    self._latest_grouping_update = max(
-                        self._latest_grouping_update, float(updated_at)
-                    )
-            post_ids = [str(value) for value in doc.get("post_ids", []) if value is not None]
-            usable_post_ids = [post_id for post_id in post_ids if self._is_allowed_post_id(post_id)]
-            if not usable_post_ids:
-                continue
+        return self._load_grouping_index().entries
+
+    def _load_grouping_index(self) -> GroupingIndex:
+        """Index of the groupings in scope, built once and shared between runs."""
+        if self._grouping_index is not None:
+            return self._grouping_index
+
+        allowed_post_ids = self._get_allowed_post_ids() or set()
+        key = (self._owner, frozenset(allowed_post_ids))
+        # Read before building, a change made meanwhile leaves a stale version
+        version = RssTagTopicsIndex(self._db).version(self._owner)
+        index = grouping_index_cache.get(key, version)
+        if index is None:
+            index = build_grouping_index(self._db, self._owner, allowed_post_ids)
+            grouping_index_cache.put(key, version, index)
+        self._grouping_index = index
+        return self._grouping_index
+
+    def _get_seed_positions(self) -> set[int]:
+        """Positions of the entries whose topic path matches every seed tag token."""
+        if self._seed_positions is not None:
+            return self._seed_positions
+
+        index = self._load_grouping_index()
+        seed_tokens = set(self._tokenize(self._seed_tag))
+        positions: Optional[set[int]] = None
+        for token in seed_tokens:
+            matches = index.topic_matches(token)
+            positions = matches if positions is None else positions & matches
+        self._seed_positions = positions or set()
+        return self._seed_positions
 
-            for post_id in usable_post_ids:
-                self._grouping_ids_by_post_id[post_id] = doc_id
-            sentence_map = {
-                int(sentence["number"]): sentence
-                for sentence in doc.get("sentences", [])
-                if isinstance(sentence, dict) and "number" in sentence
-            }
-            groups = doc.get("groups", {})
-            if not isinstance(groups, dict):
-                continue
-            for topic_path, raw_indices in groups.items():
-                if not isinstance(topic_path, str) or not isinstance(raw_indices, list):
-                    continue
-                sentence_indices = sorted(
-                    {
-                        int(index)
-                        for index in raw_indices
-                        if isinstance(index, int) or (isinstance(index, str) and index.isdigit())
-                    }
-                )
-                sentences = [
-                    {
-                        "number": index,
-                        "text": str(sentence_map.get(index, {}).get("text", "")).strip(),
-                        "read": bool(sentence_map.get(index, {}).get("read", False)),
-                    }
-                    for index in sentence_indices
-                ]
-                preview = " ".join(sentence["text"] for sentence in sentences if sentence["text"])[:280]
-                resolved = topic_aliases.resolve_path(topic_path, alias_map=alias_map)
-                canonical_id = resolved["canonical_id"]
-                canonical_topic_path = resolved["canonical_path"]
-                source_refs = [
-                    {
-                        "post_id": post_id,
-                        "sentence_indices": sentence_indices,
-                        "topic_path": topic_path,
-                        "canonical_id": canonical_id,
-                        "tag": self._seed_tag,
-                    }
-                    for post_id in usable_post_ids
-                ]
-                entries.append(
-                    {
-                        "topic_path": topic_path,
-                        "canonical_id": canonical_id,
-                        "canonical_topic_path": canonical_topic_path,
-                        "post_ids": usable_post_ids,
-                        "sentence_indices": sentence_indices,
-                        "sentences": sentences,
-                        "preview": preview,
-                        "source_refs": source_refs,
-                    }
-                )
-        self._grouping_entries = entries
-        return self._grouping_entries
+    def _with_seed_tag(self, source_refs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [{**source_ref, "tag": self._seed_tag} for source_ref in source_refs]
 
     def _get_post_metadata(self, post_id: str) -> dict[str, Any]:
         if post_id in self._post_metadata_by_id:
@@ -491,42 +654,4 @@ class AnthologyToolExecutor:
 
     @staticmethod
     def _tokenize(text: str) -> list[str]:
-        return [token for token in re.split(r"[^a-z0-9]+", text.lower()) if token]
-
-    def _score_topic_match(self, item: dict[str, Any], terms: list[str]) -> tuple[int, list[str]]:
-        topic_tokens = set(self._tokenize(item["topic_path"]))
-        preview_tokens = set(self._tokenize(item["preview"]))
-        seed_tokens = set(self._tokenize(self._seed_tag))
-        score = 0
-        matched: list[str] = []
-        for term in terms:
-            if self._token_set_matches(term, topic_tokens):
-                score += 2
-                matched.append(term)
-            elif self._token_set_matches(term, preview_tokens):
-                score += 1
-                matched.append(term)
-        if seed_tokens and all(
-            self._token_set_matches(token, topic_tokens) for token in seed_tokens
-        ):
-            score += 1
-        return score, matched
-
-    @staticmethod
-    def _token_set_matches(term: str, tokens: set[str]) -> bool:
-        if term in tokens:
-            return True
-        for token in tokens:
-            if AnthologyToolExecutor._tokens_are_inflectional_variants(term, token):
-                return True
-        return False
-
-    @staticmethod
-    def _tokens_are_inflectional_variants(term: str, token: str) -> bool:
-        if term == token:
-            return True
-        shorter, longer = (term, token) if len(term) <= len(token) else (token, term)
-        if len(shorter) < 3 or not longer.startswith(shorter):
-            return False
-        suffix = longer[len(shorter):]
-        return suffix in {"s", "es", "ed", "d", "ing", "er", "ers", "ly"}
+        return _tokenize(text)
@@ -1,8 +1,8 @@
-import io
 import json
 import logging
+import tempfile
 from enum import Enum
-from typing import Optional, Sequence
+from typing import Iterable, Iterator, Optional, Sequence
 
 from openai import OpenAI
 
@@ -18,6 +18,57 @@ class BatchTaskStatus(Enum):
     FAILED = "failed"
 
 
+class _SpooledJsonl(tempfile.SpooledTemporaryFile):
+    # Uploads take the file name from the object; a rolled over spool would
+    # report its descriptor number instead.
+    name = "batch.jsonl"
+
+
+class BatchInput:
+    """JSONL batch input file, written request by request.
+
+    Lines are spooled to memory and past ``SPOOL_MAX_BYTES`` to a temporary
+    file, so a batch of any size holds no more than that in memory. Requests
+    are added per item: ``add`` writes all requests of one item, or none of
+    them if they would exceed the provider's request or size limit.
+    """
+
+    SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, max_requests: int, max_bytes: int) -> None:
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.size = 0
+        self.file = _SpooledJsonl(max_size=self.SPOOL_MAX_BYTES, mode="w+b")
+
+    def add(self, requests: Sequence[dict]) -> bool:
+        lines = [
+            json.dumps(req, ensure_ascii=False).encode("utf-8") for req in requests
+        ]
+        size = self.size + sum(len(line) + 1 for line in lines)
+        if not self.count:
+            size -= 1
+        if self.count + len(lines) > self.max_requests or size > self.max_bytes:
+            return False
+        for line in lines:
+            if self.count:
+                self.file.write(b"\n")
+            self.file.write(line)
+            self.count += 1
+        self.size = self.file.tell()
+        return True
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "BatchInput":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
 class LlmBatchProvider:
     name = "base"
     # Endpoint used when submitting a batch (e.g. "/v1/chat/completions")
@@ -72,30 +123,52 @@ class LlmBatchProvider:
 
     def create_batch(
         self,
-        requests: Sequence[dict],
+        requests: Iterable[dict],
         endpoint: str,
         completion_window: str = "24h",
         metadata: Optional[dict] = None,
     ) -> dict:
-        if len(requests) > self.MAX_BATCH_REQUESTS:
-            raise ValueError(
-                f"Batch exceeds maximum request limit of {self.MAX_BATCH_REQUESTS} "
-                f"(got {len(requests)} requests)"
+        with self.new_batch_input() as batch_input:
+            for req in requests:
+                if batch_input.add([req]):
+                    continue
+                if batch_input.count >= self.MAX_BATCH_REQUESTS:
+                    raise ValueError(
+                        f"Batch exceeds maximum request limit of {self.MAX_BATCH_REQUESTS} "
+                        f"(got more than {batch_input.count} requests)"
+                    )
+                raise ValueError(
+                    f"Batch file exceeds maximum size limit of {self.MAX_BATCH_SIZE_BYTES} bytes "
+                    f"(got more than {batch_input.size} bytes)"
+                )
+            return self.upload_batch(
+                batch_input,
+                endpoint,
+                completion_window=completion_window,
+                metadata=metadata,
             )
 
-        jsonl = "\n".join(json.dumps(req, ensure_ascii=False) for req in requests)
-        jsonl_bytes = jsonl.encode("utf-8")
-
-        if len(jsonl_bytes) > self.MAX_BATCH_SIZE_BYTES:
-            raise ValueError(
-                f"Batch file exceeds maximum size limit of {self.MAX_BATCH_SIZE_BYTES} bytes "
-                f"(got {len(jsonl_bytes)} bytes)"
-            )
+    def new_batch_input(self) -> BatchInput:
+        """Empty batch input bounded by this provider's batch limits."""
+        return BatchInput(self.MAX_BATCH_REQUESTS, self.MAX_BATCH_SIZE_BYTES)
 
-        file_obj = io.BytesIO(jsonl_bytes)
-        file_obj.name = "batch.jsonl"
-        file_resp = self._client.files.create(file=file_obj, purpose="batch")
-        logging.info("%s: uploaded batch file: %s", self.name, file_resp.id)
+    def upload_batch(
+        self,
+        batch_input: BatchInput,
+        endpoint: str,
+        completion_window: str = "24h",
+        metadata: Optional[dict] = None,
+    ) -> dict:
+        """Upload a filled batch input as a stream and create its batch."""
+        batch_input.file.seek(0)
+        file_resp = self._client.files.create(file=batch_input.file, purpose="batch")
+        logging.info(
+            "%s: uploaded batch file: %s (%d requests, %d bytes)",
+            self.name,
+            file_resp.id,
+            batch_input.count,
+            batch_input.size,
+        )
         batch = self._client.batches.create(
             input_file_id=file_resp.id,
             endpoint=endpoint,
@@ -117,6 +190,15 @@ class LlmBatchProvider:
         file_response = self._client.files.content(file_id)
         return file_response.text
 
+    def iter_file_lines(self, file_id: str) -> Iterator[str]:
+        """Stream a result file, yielding its non-empty JSONL lines."""
+        if not file_id:
+            return
+        with self._client.files.with_streaming_response.content(file_id) as response:
+            for line in response.iter_lines():
+                if line.strip():
+                    yield line
+
 
 class OpenAIBatchProvider(LlmBatchProvider):
     name = "openai"
@@ -1,12 +1,11 @@
 import json
 import os
 from collections.abc import Sequence
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional
 import logging
-from urllib.parse import urlparse
-from http.client import HTTPConnection, HTTPSConnection
 
 from rsstag.llm.base import LLMResponse, ToolCall, ToolDefinition, parse_arguments
+from rsstag.llm.http_pool import HTTPConnectionPool, PooledResponse, shared_pool
 
 
 class GroqCom:
@@ -25,10 +24,9 @@ class GroqCom:
         token: Optional[str] = None,
         model: str = "llama-3.1-70b-versatile",
         timeout: float = DEFAULT_TIMEOUT,
+        pool: Optional[HTTPConnectionPool] = None,
     ) -> None:
-        u = urlparse(host)
-        self.__host = u.netloc
-        self.__is_https = u.scheme.lower() == "https"
+        self.__host = host
         self.__max_context_tokens = max_context_tokens
         self.__token = token or os.getenv("TOKEN")
         if model not in self.ALLOWED_MODELS:
@@ -36,6 +34,7 @@ class GroqCom:
         else:
             self.__model = model
         self.__timeout = timeout
+        self.__pool = pool or shared_pool()
 
     def estimate_tokens(self, text: str) -> int:
         """Rough estimation: ~4 characters per token on average"""
@@ -46,7 +45,6 @@ class GroqCom:
         user_msgs: List[str],
         temperature: float = 0.0,
     ) -> str:
-        conn = self.get_connection()
         payload = {
             "model": self.__model,
             "messages": [{"role": "user", "content": user_msgs[0]}],
@@ -56,9 +54,8 @@ class GroqCom:
         headers = {"Content-type": "application/json"}
         if self.__token:
             headers["Authorization"] = f"Bearer {self.__token}"
-        conn.request("POST", "/openai/v1/chat/completions", body, headers)
-        res = conn.getresponse()
-        resp_body = res.read()
+        res = self._post("/openai/v1/chat/completions", body, headers)
+        resp_body = res.body
         if res.status != 200:
             err_msg = f"{res.status} - {res.reason} - {resp_body}"
             logging.error(err_msg)
@@ -94,15 +91,13 @@ class GroqCom:
         if provider_tools and parallel_tool_calls is not None:
             payload["parallel_tool_calls"] = parallel_tool_calls
 
-        conn = self.get_connection()
         try:
             body = json.dumps(payload)
             headers: dict[str, str] = {"Content-type": "application/json"}
             if self.__token:
                 headers["Authorization"] = f"Bearer {self.__token}"
-            conn.request("POST", "/openai/v1/chat/completions", body, headers)
-            res = conn.getresponse()
-            resp_body = res.read()
+            res = self._post("/openai/v1/chat/completions", body, headers)
+            resp_body = res.body
             if res.status != 200:
                 err_msg = f"{res.status} - {res.reason} - {resp_body}"
                 logging.error("GroqCom error: %s", err_msg)
@@ -111,8 +106,6 @@ class GroqCom:
         except Exception as e:
             logging.error("GroqCom error: %s", e)
             return LLMResponse(content=f"GroqCom error {e}")
-        finally:
-            conn.close()
 
         return self._from_provider_response(resp)
 
@@ -166,8 +159,7 @@ class GroqCom:
             )
         return LLMResponse(content=content, tool_calls=tuple(tool_calls), raw=response)
 
-    def get_connection(self) -> Union[HTTPConnection, HTTPSConnection]:
-        if self.__is_https:
-            return HTTPSConnection(self.__host, timeout=self.__timeout)
-        else:
-            return HTTPConnection(self.__host, timeout=self.__timeout)
+    def _post(self, path: str, body: str, headers: Dict[str, str]) -> PooledResponse:
+        return self.__pool.request(
+            self.__host, "POST", path, body, headers, timeout=self.__timeout
+        )
@@ -0,0 +1,191 @@
+import http.client
+import logging
+import select
+import threading
+import time
+from contextlib import contextmanager
+from http.client import HTTPConnection, HTTPSConnection
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+Connection = Union[HTTPConnection, HTTPSConnection]
+
+# Errors of a kept-alive connection the server closed while it was idle
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+class PooledResponse(NamedTuple):
+    status: int
+    reason: str
+    body: bytes
+
+
+class _HostSlots:
+    def __init__(self, max_connections: int) -> None:
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle: List[Tuple[Connection, float]] = []
+
+
+class HTTPConnectionPool:
+    """Thread-safe keep-alive pool of http.client connections.
+
+    Every ``(scheme, host)`` has at most ``max_per_host`` connections open;
+    callers over the limit wait for a free one. Idle connections are reused
+    newest first and dropped once idle longer than ``idle_seconds`` or when
+    the server closed them, so a request never starts on a dead socket.
+    """
+
+    DEFAULT_MAX_PER_HOST = 4
+    DEFAULT_IDLE_SECONDS = 30.0
+
+    def __init__(
+        self,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+    ) -> None:
+        self._max_per_host = max(1, max_per_host)
+        self._idle_seconds = idle_seconds
+        self._hosts: Dict[Tuple[bool, str], _HostSlots] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def configure(self, max_per_host: int, idle_seconds: float) -> None:
+        """Change the limits; hosts already connected keep their old bound."""
+        with self._lock:
+            self._max_per_host = max(1, max_per_host)
+            self._idle_seconds = idle_seconds
+
+    def _host_slots(self, key: Tuple[bool, str]) -> _HostSlots:
+        with self._lock:
+            host = self._hosts.get(key)
+            if host is None:
+                host = _HostSlots(self._max_per_host)
+                self._hosts[key] = host
+            return host
+
+    @staticmethod
+    def _is_alive(conn: Connection) -> bool:
+        sock = conn.sock
+        if sock is None:
+            return False
+        try:
+            # An idle keep-alive socket has nothing to read; readable means
+            # the server closed it (EOF) or sent something unexpected.
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def _checkout(self, host: _HostSlots) -> Optional[Connection]:
+        now = time.monotonic()
+        with self._lock:
+            while host.idle:
+                conn, idle_since = host.idle.pop()
+                if now - idle_since <= self._idle_seconds and self._is_alive(conn):
+                    return conn
+                conn.close()
+        return None
+
+    def _connect(self, is_https: bool, netloc: str, timeout: float) -> Connection:
+        with self._lock:
+            self.created += 1
+        if is_https:
+            return HTTPSConnection(netloc, timeout=timeout)
+        return HTTPConnection(netloc, timeout=timeout)
+
+    @contextmanager
+    def connection(
+        self, is_https: bool, netloc: str, timeout: float
+    ) -> Iterator[Tuple[Connection, bool]]:
+        """Borrow a connection; yields it and whether it was reused.
+
+        The connection goes back to the pool only if the block ends without
+        an error and the last response was read to its end.
+        """
+        host = self._host_slots((is_https, netloc))
+        if not host.slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No free connection to {netloc} in {timeout}s")
+        conn: Optional[Connection] = None
+        keep = False
+        try:
+            conn = self._checkout(host)
+            reused = conn is not None
+            if conn is None:
+                conn = self._connect(is_https, netloc, timeout)
+            else:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+            yield conn, reused
+            keep = conn.sock is not None
+        finally:
+            if conn is not None:
+                if keep:
+                    with self._lock:
+                        host.idle.append((conn, time.monotonic()))
+                else:
+                    conn.close()
+            host.slots.release()
+
+    def request(
+        self,
+        url: str,
+        method: str,
+        path: str,
+        body: Optional[Union[str, bytes]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: float = 300.0,
+    ) -> PooledResponse:
+        """Send one request to ``url``'s host and read the whole response.
+
+        A reused connection that turns out closed by the server before any
+        response arrived is dropped and the request resent on another one;
+        errors on a new connection are raised as is.
+        """
+        u = urlparse(url)
+        is_https = u.scheme.lower() == "https"
+        netloc = u.netloc or u.path
+        while True:
+            with self.connection(is_https, netloc, timeout) as (conn, reused):
+                try:
+                    conn.request(method, path, body, dict(headers or {}))
+                    res = conn.getresponse()
+                except _STALE_ERRORS as e:
+                    conn.close()
+                    if not reused:
+                        raise
+                    logging.info("Stale connection to %s, reconnecting: %s", netloc, e)
+                    continue
+                except Exception:
+                    conn.close()
+                    raise
+                resp_body = res.read()
+                if res.will_close:
+                    conn.close()
+                return PooledResponse(res.status, res.reason, resp_body)
+
+    def close(self) -> None:
+        with self._lock:
+            for host in self._hosts.values():
+                for conn, _ in host.idle:
+                    conn.close()
+                host.idle.clear()
+
+
+_shared_pool: Optional[HTTPConnectionPool] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> HTTPConnectionPool:
+    """Process-wide pool for callers that are not given one."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = HTTPConnectionPool()
+        return _shared_pool
@@ -1,12 +1,11 @@
 import json
 from collections.abc import Sequence
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional
 import logging
 import re
-from urllib.parse import urlparse
-from http.client import HTTPConnection, HTTPSConnection
 
 from rsstag.llm.base import LLMResponse, ToolCall, ToolDefinition, parse_arguments
+from rsstag.llm.http_pool import HTTPConnectionPool, PooledResponse, shared_pool
 
 
 class LLamaCPP:
@@ -18,19 +17,18 @@ class LLamaCPP:
         host: str,
         model: str = "default",
         timeout: float = DEFAULT_TIMEOUT,
+        pool: Optional[HTTPConnectionPool] = None,
     ) -> None:
-        u = urlparse(host)
-        self.__host = u.netloc
-        self.__is_https = u.scheme.lower() == "https"
+        self.__host = host
         self.__model = model
         self.__timeout = timeout
+        self.__pool = pool or shared_pool()
 
     def call(
         self,
         user_msgs: List[str],
         temperature: float = 0.0,
     ) -> str:
-        conn = self.get_connection()
         payload = {
             "model": "gpt-3.5-turbo",
             "messages": [{"role": "user", "content": user_msgs[0]}],
@@ -39,9 +37,8 @@ class LLamaCPP:
         }
         body = json.dumps(payload)
         headers = {"Content-type": "application/json"}
-        conn.request("POST", "/v1/chat/completions", body, headers)
-        res = conn.getresponse()
-        resp_body = res.read()
+        res = self._post("/v1/chat/completions", body, headers)
+        resp_body = res.body
         if res.status != 200:
             err_msg = f"{res.status} - {res.reason} - {resp_body}"
             logging.error(err_msg)
@@ -79,13 +76,11 @@ class LLamaCPP:
         if provider_tools and tool_choice is not None:
             payload["tool_choice"] = tool_choice
 
-        conn = self.get_connection()
         try:
             body = json.dumps(payload)
             headers = {"Content-type": "application/json"}
-            conn.request("POST", "/v1/chat/completions", body, headers)
-            res = conn.getresponse()
-            resp_body = res.read()
+            res = self._post("/v1/chat/completions", body, headers)
+            resp_body = res.body
             if res.status != 200:
                 err_msg = f"{res.status} - {res.reason} - {resp_body}"
                 logging.error("LLamaCPP error: %s", err_msg)
@@ -94,8 +89,6 @@ class LLamaCPP:
         except Exception as e:
             logging.error("LLamaCPP error: %s", e)
             return LLMResponse(content=f"LLamaCPP error {e}")
-        finally:
-            conn.close()
 
         return self._from_provider_response(resp)
 
@@ -150,14 +143,12 @@ class LLamaCPP:
             )
         return LLMResponse(content=content, tool_calls=tuple(tool_calls), raw=response)
 
-    def get_connection(self) -> Union[HTTPConnection, HTTPSConnection]:
-        if self.__is_https:
-            return HTTPSConnection(self.__host, timeout=self.__timeout)
-        else:
-            return HTTPConnection(self.__host, timeout=self.__timeout)
+    def _post(self, path: str, body: str, headers: Dict[str, str]) -> PooledResponse:
+        return self.__pool.request(
+            self.__host, "POST", path, body, headers, timeout=self.__timeout
+        )
 
     def embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
-        conn = self.get_connection()
         body = json.dumps(
             {
                 # "model":"GPT-4",
@@ -167,9 +158,8 @@ class LLamaCPP:
             }
         )
         headers = {"Content-type": "application/json", "Authorization": "Bearer "}
-        conn.request("POST", "/v1/embeddings", body, headers)
-        res = conn.getresponse()
-        resp_body = res.read()
+        res = self._post("/v1/embeddings", body, headers)
+        resp_body = res.body
         # logging.info("server response: %s", resp_body)
         if res.status != 200:
             err_msg = f"{res.status} - {res.reason} - {resp_body}"
@@ -200,7 +190,6 @@ class LLamaCPP:
                 - relevance_score: A float indicating relevance (higher is more relevant)
             Sorted by relevance_score in descending order, or None if the API call fails.
         """
-        conn = self.get_connection()
         request_body = {"query": query, "documents": documents}
 
         if top_n is not None:
@@ -209,9 +198,8 @@ class LLamaCPP:
         body = json.dumps(request_body)
         headers = {"Content-type": "application/json", "Authorization": "Bearer "}
 
-        conn.request("POST", "/v1/rerank", body, headers)
-        res = conn.getresponse()
-        resp_body = res.read()
+        res = self._post("/v1/rerank", body, headers)
+        resp_body = res.body
 
         if res.status != 200:
             err_msg = f"{res.status} - {res.reason} - {resp_body}"
@@ -6,6 +6,7 @@ from typing import Any, Optional, Tuple, Dict
 
 from rsstag.llm.base import LLMResponse, ToolDefinition
 from rsstag.llm.batch import LlmBatchProvider, NebiusBatchProvider, OpenAIBatchProvider
+from rsstag.llm.http_pool import HTTPConnectionPool, shared_pool
 
 
 class LLMRouter:
@@ -17,6 +18,9 @@ class LLMRouter:
         self._config = config
         self._request_timeout_seconds: float = self._get_request_timeout_seconds()
         self._request_max_retries: int = self._get_request_max_retries()
+        shared_pool().configure(
+            self._get_http_pool_max_per_host(), self._get_http_pool_idle_seconds()
+        )
         self._handlers: Dict[str, Optional[Any]] = {}
         self._model_handlers: Dict[Tuple[str, str], Optional[Any]] = {}
         self._batch_providers: Dict[str, LlmBatchProvider] = {}
@@ -74,6 +78,42 @@ class LLMRouter:
             return self.MAX_REQUEST_MAX_RETRIES
         return retries
 
+    def _get_http_pool_max_per_host(self) -> int:
+        raw_limit: Any = self._config.get("settings", {}).get(
+            "llm_http_pool_max_per_host",
+            HTTPConnectionPool.DEFAULT_MAX_PER_HOST,
+        )
+        try:
+            limit: int = int(raw_limit)
+        except (TypeError, ValueError):
+            limit = 0
+        if limit <= 0:
+            logging.warning(
+                "Invalid llm_http_pool_max_per_host=%r; using %d",
+                raw_limit,
+                HTTPConnectionPool.DEFAULT_MAX_PER_HOST,
+            )
+            return HTTPConnectionPool.DEFAULT_MAX_PER_HOST
+        return limit
+
+    def _get_http_pool_idle_seconds(self) -> float:
+        raw_idle: Any = self._config.get("settings", {}).get(
+            "llm_http_pool_idle_seconds",
+            HTTPConnectionPool.DEFAULT_IDLE_SECONDS,
+        )
+        try:
+            idle: float = float(raw_idle)
+        except (TypeError, ValueError):
+            idle = -1.0
+        if not math.isfinite(idle) or idle < 0:
+            logging.warning(
+                "Invalid llm_http_pool_idle_seconds=%r; using %.1f seconds",
+                raw_idle,
+                HTTPConnectionPool.DEFAULT_IDLE_SECONDS,
+            )
+            return HTTPConnectionPool.DEFAULT_IDLE_SECONDS
+        return idle
+
     def _init_handlers(self) -> None:
         for name in ("llamacpp", "openai", "anthropic", "groqcom", "cerebras"):
             self._handlers[name] = self._safe_build(name, None)
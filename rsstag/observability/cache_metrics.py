@@ -0,0 +1,50 @@
+"""Observable metrics for in-process caches."""
+
+import logging
+
+from rsstag.stem_cache import stem_cache
+
+
+def register_stem_cache_metrics() -> None:
+    """Export hit/miss counters and size of the process stem cache.
+
+    Values are read from ``stem_cache.stats()`` on every export cycle and
+    labelled with the stem table (``tags``, ``snowball_ru``, ``porter_en``).
+    """
+    try:
+        from opentelemetry import metrics
+        from opentelemetry.metrics import Observation
+
+        meter = metrics.get_meter("rsstag.cache")
+
+        def _observer(field: str):
+            def _observe(options):
+                try:
+                    return [
+                        Observation(table[field], {"table": name})
+                        for name, table in stem_cache.stats().items()
+                    ]
+                except Exception as exc:
+                    logging.debug("OTel stem_cache.%s observation failed: %s", field, exc)
+                    return []
+
+            return _observe
+
+        meter.create_observable_counter(
+            "rsstag.stem_cache.hits",
+            callbacks=[_observer("hits")],
+            description="Stem lookups answered from the cache",
+        )
+        meter.create_observable_counter(
+            "rsstag.stem_cache.misses",
+            callbacks=[_observer("misses")],
+            description="Stem lookups that ran the stemmer",
+        )
+        meter.create_observable_gauge(
+            "rsstag.stem_cache.size",
+            callbacks=[_observer("size")],
+            description="Words held in the stem cache",
+        )
+
+    except Exception as exc:
+        logging.warning("OTel stem cache metrics registration failed: %s", exc)
@@ -32,6 +32,9 @@ from rsstag.tasks import (
     TASK_TAG_CLASSIFICATION_BATCH,
     TASK_DELETE_FEEDS,
     TASK_SNIPPET_CLUSTERING,
+    TASK_RECODE_POSTS,
+    TASK_PREFIX_INDEX,
+    TASK_TAG_COOCCURRENCE,
 )
 
 TASK_TYPE_NAMES = {
@@ -62,6 +65,9 @@ TASK_TYPE_NAMES = {
     TASK_TAG_CLASSIFICATION_BATCH: "tag_classification_batch",
     TASK_DELETE_FEEDS: "delete_feeds",
     TASK_SNIPPET_CLUSTERING: "snippet_clustering",
+    TASK_RECODE_POSTS: "recode_posts",
+    TASK_PREFIX_INDEX: "prefix_index",
+    TASK_TAG_COOCCURRENCE: "tag_cooccurrence",
 }
 
 
@@ -0,0 +1,246 @@
+"""Per-owner Bloom filter over the pids of stored posts.
+
+Every download chunk used to be checked against Mongo with a ``$in`` query
+over all of its pids. The filter answers "definitely not stored" for most
+new posts in memory, so only its possible hits are sent to Mongo. It never
+answers "stored" on its own: a hit is always confirmed by the query, so a
+false positive costs one lookup and never drops a post.
+
+A false negative would store a duplicate (the ``(owner, pid)`` index is not
+unique), so the filter must know every stored pid. It is persisted in
+``pid_filters`` together with ``synced_at``: every post inserted before that
+time is in the bits. Loading re-reads the pids of posts whose ObjectId is
+newer (minus a margin for clock skew), which covers inserts of concurrent
+workers, of a crashed task that never saved its filter and of code paths
+that don't maintain the filter at all. Saving ORs the bits into the stored
+ones under a version check, so concurrent savers don't lose each other's
+pids. Pids can't be removed from a Bloom filter: deleting posts drops the
+filter and the next download rebuilds it from the posts collection.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from bson import Binary, ObjectId
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import DuplicateKeyError
+
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 100000
+# Owners that would need a bigger filter are checked against Mongo directly.
+MAX_FILTER_BYTES = 8 * 1024 * 1024
+# Posts whose ObjectId is this much older than ``synced_at`` are still
+# re-read on load: ObjectIds are stamped by the client before the insert.
+CATCH_UP_MARGIN = 600
+SAVE_ATTEMPTS = 3
+PIDS_CHUNK = 10000
+
+
+def _hashes(pids: List[str]) -> np.ndarray:
+    """Two 64-bit hashes per pid, for double hashing."""
+    digests = b"".join(
+        hashlib.blake2b(pid.encode("utf-8"), digest_size=16).digest() for pid in pids
+    )
+    return np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+
+
+class PidFilter:
+    """Bloom filter sized for ``capacity`` pids at ``FALSE_POSITIVE_RATE``."""
+
+    __slots__ = ("capacity", "size", "hashes_count", "bits", "synced_at")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = max(MIN_CAPACITY, capacity)
+        self.size: int = math.ceil(
+            -self.capacity * math.log(FALSE_POSITIVE_RATE) / math.log(2) ** 2
+        )
+        self.hashes_count: int = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits: np.ndarray = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.synced_at: float = 0.0
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "PidFilter":
+        if not isinstance(doc, dict):
+            raise ValueError("Pid filter document expected")
+        pid_filter = cls.__new__(cls)
+        pid_filter.capacity = int(doc["capacity"])
+        pid_filter.size = int(doc["size"])
+        pid_filter.hashes_count = int(doc["hashes_count"])
+        pid_filter.bits = np.frombuffer(bytes(doc["bits"]), dtype=np.uint8).copy()
+        pid_filter.synced_at = float(doc["synced_at"])
+        if len(pid_filter.bits) != (pid_filter.size + 7) // 8:
+            raise ValueError("Pid filter bits don't match its size")
+        return pid_filter
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    def count(self) -> int:
+        """Estimated number of pids in the filter, from the set bits."""
+        set_bits = int(np.unpackbits(self.bits).sum())
+        if set_bits >= self.size:
+            return self.capacity * 2
+        return round(
+            -self.size / self.hashes_count * math.log(1 - set_bits / self.size)
+        )
+
+    def full(self) -> bool:
+        return self.count() > self.capacity
+
+    def _positions(self, pids: List[str]) -> np.ndarray:
+        hashes = _hashes(pids)
+        steps = np.arange(self.hashes_count, dtype=np.uint64)
+        # uint64 arithmetic wraps around, which is fine for hashing
+        return (hashes[:, :1] + steps * hashes[:, 1:]) % np.uint64(self.size)
+
+    def add(self, pids: Iterable[str]) -> None:
+        pids = list(pids)
+        if not pids:
+            return
+        positions = self._positions(pids).ravel()
+        np.bitwise_or.at(
+            self.bits,
+            (positions >> np.uint64(3)).astype(np.intp),
+            (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)),
+        )
+
+    def might_contain(self, pids: List[str]) -> List[bool]:
+        if not pids:
+            return []
+        positions = self._positions(pids)
+        bytes_at = self.bits[(positions >> np.uint64(3)).astype(np.intp)]
+        masks = np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)
+        return np.all(bytes_at & masks, axis=1).tolist()
+
+    def merge(self, other: "PidFilter") -> bool:
+        """OR ``other`` into this filter; False if their shapes differ."""
+        if (other.size, other.hashes_count) != (self.size, self.hashes_count):
+            return False
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
+        self.synced_at = max(self.synced_at, other.synced_at)
+        return True
+
+
+def _object_id_at(timestamp: float) -> ObjectId:
+    return ObjectId.from_datetime(
+        datetime.fromtimestamp(max(0.0, timestamp), tz=timezone.utc)
+    )
+
+
+class RssTagPidFilters:
+    indexes = [([("owner", ASCENDING)], {"unique": True})]
+
+    def __init__(self, db: MongoClient) -> None:
+        self._db = db
+        self._log = logging.getLogger("pid_filter")
+
+    def prepare(self) -> None:
+        for index, options in self.indexes:
+            try:
+                self._db.pid_filters.create_index(index, **options)
+            except Exception as e:
+                self._log.warning(
+                    "Can`t create index %s. May be already exists. Info: %s", index, e
+                )
+
+    def _add_posts(self, pid_filter: PidFilter, query: Dict[str, Any]) -> int:
+        cursor = self._db.posts.find(query, projection={"pid": True, "_id": False})
+        pids: List[str] = []
+        added = 0
+        for post in cursor:
+            pid = post.get("pid")
+            if pid:
+                pids.append(str(pid))
+            if len(pids) >= PIDS_CHUNK:
+                pid_filter.add(pids)
+                added += len(pids)
+                pids = []
+        pid_filter.add(pids)
+        return added + len(pids)
+
+    def _rebuild(self, owner: str, synced_at: float) -> Optional[PidFilter]:
+        posts_count = self._db.posts.count_documents({"owner": owner})
+        pid_filter = PidFilter(posts_count * 2)
+        if pid_filter.nbytes > MAX_FILTER_BYTES:
+            self._log.info(
+                "Owner %s has %d posts, too many for a pid filter", owner, posts_count
+            )
+            return None
+        pid_filter.synced_at = synced_at
+        added = self._add_posts(pid_filter, {"owner": owner})
+        self._log.info("Rebuilt pid filter of %s with %d pids", owner, added)
+        return pid_filter
+
+    def load(self, owner: str) -> Optional[PidFilter]:
+        """Filter of ``owner`` knowing every stored pid; None if unusable.
+
+        The filter is rebuilt from the posts when it is missing, unreadable or
+        over capacity.
+        """
+        started = time.time()
+        doc = self._db.pid_filters.find_one({"owner": owner})
+        pid_filter: Optional[PidFilter] = None
+        if doc:
+            try:
+                pid_filter = PidFilter.from_doc(doc)
+            except Exception as e:
+                self._log.warning("Can`t read pid filter of %s. Info: %s", owner, e)
+        if pid_filter is None or pid_filter.full():
+            return self._rebuild(owner, started)
+        self._add_posts(
+            pid_filter,
+            {
+                "owner": owner,
+                "_id": {"$gte": _object_id_at(pid_filter.synced_at - CATCH_UP_MARGIN)},
+            },
+        )
+        pid_filter.synced_at = started
+        return pid_filter
+
+    def save(self, owner: str, pid_filter: PidFilter) -> bool:
+        """Merge ``pid_filter`` into the stored filter of ``owner``."""
+        for _ in range(SAVE_ATTEMPTS):
+            doc = self._db.pid_filters.find_one(
+                {"owner": owner}, projection={"_id": False}
+            )
+            version = 0
+            if doc:
+                version = int(doc.get("version", 0))
+                try:
+                    pid_filter.merge(PidFilter.from_doc(doc))
+                except Exception as e:
+                    self._log.warning(
+                        "Replacing unreadable pid filter of %s. Info: %s", owner, e
+                    )
+            fields = {
+                "capacity": pid_filter.capacity,
+                "size": pid_filter.size,
+                "hashes_count": pid_filter.hashes_count,
+                "bits": Binary(pid_filter.bits.tobytes()),
+                "synced_at": pid_filter.synced_at,
+                "version": version + 1,
+            }
+            try:
+                if doc:
+                    result = self._db.pid_filters.update_one(
+                        {"owner": owner, "version": doc.get("version", 0)},
+                        {"$set": fields},
+                    )
+                    if result.matched_count:
+                        return True
+                else:
+                    self._db.pid_filters.insert_one({"owner": owner, **fields})
+                    return True
+            except DuplicateKeyError:
+                pass
+        self._log.warning("Can`t save pid filter of %s: concurrent updates", owner)
+        return False
+
+    def remove_owner(self, owner: str) -> None:
+        self._db.pid_filters.delete_many({"owner": owner})
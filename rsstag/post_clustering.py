@@ -0,0 +1,346 @@
+"""Streaming clustering of posts, for owners too big for DBSCAN.
+
+DBSCAN over the TF-IDF matrix of every post keeps the whole matrix and its
+neighbourhoods in memory and gets roughly quadratic in time. This engine
+never holds more than one batch of posts: lemmas are hashed into a fixed
+feature space, weighted by an IDF counted in a first pass and reduced with a
+sparse random projection, which needs no fitting and so no storage. Mini-batch
+k-means is fitted on a bounded random sample of the reduced vectors and every
+post is then assigned to its nearest centroid in a second pass. Posts not
+similar enough to any centroid stay unclustered, like DBSCAN noise.
+
+The IDF and the centroids are kept per owner in ``post_cluster_models``, so
+posts tagged later are assigned to the existing clusters without a refit.
+The model is refitted once the posts assigned since the fit outgrow
+``refit_growth`` of the posts it was fitted on.
+"""
+
+import logging
+import random
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import Binary
+from pymongo import ASCENDING, MongoClient
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from rsstag.embedding_training import TAGGED_AT_OVERLAP
+from rsstag.posts import TAGGED_AT_FIELD, RssTagPosts
+from rsstag.text_codec import decode_text
+
+ENGINE_DBSCAN = "dbscan"
+ENGINE_MINIBATCH = "minibatch"
+ENGINES = (ENGINE_DBSCAN, ENGINE_MINIBATCH)
+DEFAULT_REFIT_GROWTH = 0.5
+
+# Bumped when the features change: older models are refitted.
+MODEL_VERSION = 1
+HASH_FEATURES = 2**18
+COMPONENTS = 128
+# Non-zero projection entries per feature. Posts of a few lemmas need every
+# feature to land somewhere: sklearn's SparseRandomProjection default density
+# leaves most of 2**18 features without any, and builds its matrix slowly
+# through a peak of hundreds of megabytes.
+PROJECTION_NONZEROS = 8
+PROJECTION_SEED = 0
+BATCH_SIZE = 4096
+SAMPLE_SIZE = 20000
+POSTS_PER_CLUSTER = 20
+MAX_CLUSTERS = 2000
+MIN_SIMILARITY = 0.4
+
+Batch = Tuple[List[str], List[str]]
+
+
+@lru_cache(maxsize=1)
+def _projection() -> sparse.csr_matrix:
+    """Sparse random projection of the hashed features to ``COMPONENTS``.
+
+    Every feature adds ``±1 / sqrt(PROJECTION_NONZEROS)`` to that many
+    random components. It depends only on the seed, so it is never stored.
+    """
+    rng = np.random.default_rng(PROJECTION_SEED)
+    columns = rng.integers(0, COMPONENTS, size=HASH_FEATURES * PROJECTION_NONZEROS)
+    signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=len(columns))
+    indptr = np.arange(0, len(columns) + 1, PROJECTION_NONZEROS)
+    return sparse.csr_matrix(
+        (signs / np.sqrt(PROJECTION_NONZEROS), columns.astype(np.int32), indptr),
+        shape=(HASH_FEATURES, COMPONENTS),
+    )
+
+
+class PostVectorizer:
+    """Hashed TF-IDF of lemmas, projected to ``COMPONENTS`` dimensions."""
+
+    def __init__(self, stopwords: Iterable[str], idf: Optional[np.ndarray] = None) -> None:
+        self._hasher = HashingVectorizer(
+            n_features=HASH_FEATURES,
+            alternate_sign=False,
+            norm=None,
+            stop_words=sorted(stopwords) or None,
+        )
+        self._projection = _projection()
+        self.idf = idf
+
+    def hash(self, texts: List[str]) -> sparse.csr_matrix:
+        return self._hasher.transform(texts).astype(np.float32)
+
+    def fit_idf(self, doc_freq: np.ndarray, docs_count: int) -> None:
+        """Smoothed IDF, the same formula as ``TfidfTransformer``."""
+        self.idf = (np.log((1.0 + docs_count) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+
+    def reduce(self, hashed: sparse.csr_matrix) -> np.ndarray:
+        """Unit rows of the reduced TF-IDF; zero rows for posts without words."""
+        weighted = normalize(hashed.multiply(self.idf).tocsr())
+        return normalize((weighted @ self._projection).toarray()).astype(np.float32)
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        return self.reduce(self.hash(texts))
+
+
+class ClusteringModel:
+    """IDF and unit centroids of the clusters of one owner."""
+
+    __slots__ = ("idf", "centers", "fitted_posts", "assigned_posts", "clustered_until")
+
+    def __init__(
+        self,
+        idf: np.ndarray,
+        centers: np.ndarray,
+        fitted_posts: int,
+        clustered_until: float,
+        assigned_posts: int = 0,
+    ) -> None:
+        self.idf = idf
+        self.centers = centers
+        self.fitted_posts = fitted_posts
+        # Posts assigned by updates since the fit
+        self.assigned_posts = assigned_posts
+        # Posts tagged before this time are clustered
+        self.clustered_until = clustered_until
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid of each vector, -1 when none is similar enough."""
+        if not len(vectors):
+            return np.empty(0, dtype=np.int64)
+        similarity = vectors @ self.centers.T
+        labels = similarity.argmax(axis=1)
+        labels[similarity[np.arange(len(labels)), labels] < MIN_SIMILARITY] = -1
+        return labels
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "version": MODEL_VERSION,
+            "idf": Binary(self.idf.astype("<f4").tobytes()),
+            "centers": Binary(self.centers.astype("<f4").tobytes()),
+            "clusters_count": len(self.centers),
+            "fitted_posts": self.fitted_posts,
+            "assigned_posts": self.assigned_posts,
+            "clustered_until": self.clustered_until,
+        }
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "ClusteringModel":
+        if doc.get("version") != MODEL_VERSION:
+            raise ValueError("Clustering model of another version")
+        idf = np.frombuffer(bytes(doc["idf"]), dtype="<f4").copy()
+        centers = np.frombuffer(bytes(doc["centers"]), dtype="<f4").copy()
+        if len(idf) != HASH_FEATURES:
+            raise ValueError("Clustering model IDF doesn't match the features")
+        return cls(
+            idf,
+            centers.reshape(int(doc["clusters_count"]), COMPONENTS),
+            int(doc["fitted_posts"]),
+            float(doc["clustered_until"]),
+            int(doc.get("assigned_posts", 0)),
+        )
+
+
+def fit_model(
+    batches: Iterable[Batch],
+    posts_count: int,
+    vectorizer: PostVectorizer,
+    clustered_until: float,
+    seed: int = 0,
+) -> Optional[ClusteringModel]:
+    """Fit the clusters of the ``(pids, texts)`` chunks of ``batches``.
+
+    Hashed rows of a random sample of about ``SAMPLE_SIZE`` of the
+    ``posts_count`` posts are kept to fit on once the IDF is known. Returns
+    None when there are too few posts to cluster.
+    """
+    rnd = random.Random(seed)
+    sample_share = min(1.0, SAMPLE_SIZE / max(posts_count, 1))
+    doc_freq = np.zeros(HASH_FEATURES, dtype=np.int64)
+    docs_count = 0
+    sample: List[sparse.csr_matrix] = []
+    for _, texts in batches:
+        hashed = vectorizer.hash(texts)
+        doc_freq += np.bincount(hashed.indices, minlength=HASH_FEATURES)
+        docs_count += hashed.shape[0]
+        rows = [i for i in range(hashed.shape[0]) if rnd.random() < sample_share]
+        if rows:
+            sample.append(hashed[rows])
+    if not sample:
+        return None
+
+    vectorizer.fit_idf(doc_freq, docs_count)
+    vectors = vectorizer.reduce(sparse.vstack(sample, format="csr"))
+    vectors = vectors[np.abs(vectors).sum(axis=1) > 0]
+    clusters_count = min(
+        MAX_CLUSTERS, docs_count // POSTS_PER_CLUSTER, len(vectors) // 2
+    )
+    if clusters_count < 2:
+        return None
+    kmeans = MiniBatchKMeans(
+        n_clusters=clusters_count,
+        batch_size=1024,
+        init_size=min(len(vectors), max(3 * clusters_count, 3 * 1024)),
+        n_init=3,
+        random_state=seed,
+    )
+    kmeans.fit(vectors)
+    return ClusteringModel(
+        vectorizer.idf,
+        normalize(kmeans.cluster_centers_).astype(np.float32),
+        docs_count,
+        clustered_until,
+    )
+
+
+def assign_posts(
+    model: ClusteringModel, batches: Iterable[Batch], vectorizer: PostVectorizer
+) -> Dict[int, Set[str]]:
+    """Pids of the posts in ``batches`` by cluster, without the unclustered."""
+    vectorizer.idf = model.idf
+    clusters: Dict[int, Set[str]] = defaultdict(set)
+    for pids, texts in batches:
+        for pid, label in zip(pids, model.assign(vectorizer.transform(texts))):
+            if label >= 0:
+                clusters[int(label)].add(pid)
+    return clusters
+
+
+class RssTagPostClusterModels:
+    indexes = [([("owner", ASCENDING)], {"unique": True})]
+
+    def __init__(self, db: MongoClient) -> None:
+        self._db = db
+        self._log = logging.getLogger("post_clustering")
+
+    def prepare(self) -> None:
+        for index, options in self.indexes:
+            try:
+                self._db.post_cluster_models.create_index(index, **options)
+            except Exception as e:
+                self._log.warning(
+                    "Can`t create index %s. May be already exists. Info: %s", index, e
+                )
+
+    def load(self, owner: str) -> Optional[ClusteringModel]:
+        doc = self._db.post_cluster_models.find_one({"owner": owner})
+        if not doc:
+            return None
+        try:
+            return ClusteringModel.from_doc(doc)
+        except Exception as e:
+            self._log.warning("Can`t read clustering model of %s. Info: %s", owner, e)
+            return None
+
+    def save(self, owner: str, model: ClusteringModel) -> None:
+        self._db.post_cluster_models.update_one(
+            {"owner": owner}, {"$set": model.to_doc()}, upsert=True
+        )
+
+    def remove_owner(self, owner: str) -> None:
+        self._db.post_cluster_models.delete_many({"owner": owner})
+
+
+class StreamingPostClustering:
+    """Clusters the posts of an owner in batches and keeps the model."""
+
+    def __init__(
+        self,
+        db: MongoClient,
+        stopwords: Iterable[str],
+        refit_growth: float = DEFAULT_REFIT_GROWTH,
+    ) -> None:
+        self._db = db
+        self._stopwords = set(stopwords)
+        self._refit_growth = refit_growth
+        self._models = RssTagPostClusterModels(db)
+        self._log = logging.getLogger("post_clustering")
+
+    def _batches(self, query: Dict[str, Any]) -> Iterator[Batch]:
+        cursor = self._db.posts.find(
+            query, projection={"lemmas": True, "pid": True, "_id": False}
+        ).batch_size(BATCH_SIZE)
+        pids: List[str] = []
+        texts: List[str] = []
+        for post in cursor:
+            if not post.get("lemmas"):
+                continue
+            pids.append(post["pid"])
+            texts.append(decode_text(post["lemmas"], "ignore"))
+            if len(pids) >= BATCH_SIZE:
+                yield pids, texts
+                pids, texts = [], []
+        if pids:
+            yield pids, texts
+
+    def run(self, owner: str) -> bool:
+        """Assign the posts tagged since the last run, refitting when due."""
+        started = time.time()
+        posts = RssTagPosts(self._db)
+        model = self._models.load(owner)
+        if model is not None:
+            new_query = {
+                "owner": owner,
+                TAGGED_AT_FIELD: {"$gt": model.clustered_until - TAGGED_AT_OVERLAP},
+            }
+            new_count = self._db.posts.count_documents(new_query)
+            assigned = model.assigned_posts + new_count
+            if assigned <= self._refit_growth * model.fitted_posts:
+                clusters = assign_posts(
+                    model, self._batches(new_query), PostVectorizer(self._stopwords)
+                )
+                model.assigned_posts = assigned
+                model.clustered_until = started
+                self._models.save(owner, model)
+                self._log.info(
+                    "Assigned %s new posts to %s clusters. User: %s",
+                    new_count,
+                    len(clusters),
+                    owner,
+                )
+                # Re-tagged posts and the overlap window come again
+                return posts.replace_clusters(owner, clusters)
+
+        query = {"owner": owner}
+        vectorizer = PostVectorizer(self._stopwords)
+        model = fit_model(
+            self._batches(query),
+            self._db.posts.count_documents(query),
+            vectorizer,
+            started,
+        )
+        if model is None:
+            return True
+        clusters = {
+            label: pids
+            for label, pids in assign_posts(model, self._batches(query), vectorizer).items()
+            if len(pids) > 1
+        }
+        # Labels of the previous fit mean nothing to the new centroids
+        posts.clear_clusters(owner)
+        self._models.save(owner, model)
+        self._log.info(
+            "Posts: %s. Clusters: %s. User: %s", model.fitted_posts, len(clusters), owner
+        )
+        return posts.set_clusters(owner, clusters)
@@ -2,13 +2,16 @@
 
 import logging
 import time
-from typing import Optional, List, Dict, Any, Union, Iterator, Set
-from pymongo import MongoClient
+from typing import Optional, List, Dict, Any, Union, Iterator, Set, Tuple
+from pymongo import MongoClient, UpdateOne
 import hashlib
 
 from rsstag.anthologies import RssTagAnthologies
+from rsstag.topics_index import RssTagTopicsIndex
 
 PostId = Union[int, str]
+# Groupings read per query when marking many posts
+READ_STATE_CHUNK = 1000
 
 
 class RssTagPostGrouping:
@@ -18,6 +21,7 @@ class RssTagPostGrouping:
         self._db: MongoClient = db
         self._log = logging.getLogger("post_grouping")
         self._anthologies = RssTagAnthologies(db)
+        self._topics_index = RssTagTopicsIndex(db)
 
     def prepare(self) -> None:
         """Create indexes for post_grouping collection"""
@@ -158,6 +162,7 @@ class RssTagPostGrouping:
                 upsert=True,
             )
             self._anthologies.mark_stale_for_source_change(owner, [str(pid) for pid in post_ids])
+            self._topics_index.mark_grouping(owner, post_ids_hash, post_ids)
             return True
         except Exception as e:
             self._log.error("Can't save grouped posts data. Info: %s", e)
@@ -179,6 +184,7 @@ class RssTagPostGrouping:
             )
             deleted_total += int(result.deleted_count)
             self._anthologies.mark_stale_for_source_change(owner, batch)
+            self._topics_index.mark_posts(owner, batch)
 
         return deleted_total
 
@@ -201,51 +207,94 @@ class RssTagPostGrouping:
         none of `sentence_indices` matched a sentence of this post. Callers use
         None to skip the post entirely instead of rolling its read state up.
         """
-        post_ids = [post_id]
-        post_ids_hash = self._generate_post_ids_hash(post_ids)
-
-        doc = self.get_grouped_posts(owner, post_ids)
-        if not doc:
-            return None
+        all_read = self.update_snippets_read_statuses(
+            owner, {post_id: sentence_indices}, read_status
+        )
+        return all_read.get(post_id)
 
-        sentences = doc.get("sentences", [])
-        indices_set = set(sentence_indices)
-        all_read = True
-        found_any = False
-        for s in sentences:
-            if s.get("number") in indices_set:
-                s["read"] = read_status
-                found_any = True
-            if not s.get("read", False):
-                all_read = False
+    def update_snippets_read_statuses(
+        self, owner: str, selections: Dict[PostId, List[int]], read_status: bool
+    ) -> Dict[PostId, bool]:
+        """`update_snippets_read_status` of many posts in one read and one write.
 
-        if not found_any:
-            return None
+        Maps every updated post to whether all its sentences are now read;
+        posts update_snippets_read_status returns None for are left out.
+        """
+        updated: Dict[PostId, bool] = {}
+        updates: List[UpdateOne] = []
+        for post_id, doc in self._single_post_groupings(owner, list(selections)):
+            indices_set = set(selections[post_id])
+            sentences = doc.get("sentences", [])
+            all_read = True
+            found_any = False
+            for s in sentences:
+                if s.get("number") in indices_set:
+                    s["read"] = read_status
+                    found_any = True
+                if not s.get("read", False):
+                    all_read = False
+            if not found_any:
+                continue
+            updated[post_id] = all_read
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"sentences": sentences}}))
 
-        self._db.post_grouping.update_one(
-            {"owner": owner, "post_ids_hash": post_ids_hash},
-            {"$set": {"sentences": sentences}},
-        )
-        return all_read
+        if updates:
+            self._db.post_grouping.bulk_write(updates, ordered=False)
+            self._topics_index.mark_posts(owner, list(updated))
+        return updated
 
     def mark_sequences_read(self, owner: str, post_id: PostId, read_status: bool) -> bool:
         """Mark ALL sentences in a post's grouping as read/unread"""
-        post_ids = [post_id]
-        post_ids_hash = self._generate_post_ids_hash(post_ids)
+        return self.mark_posts_sequences_read(owner, [post_id], read_status) > 0
 
-        doc = self.get_grouped_posts(owner, post_ids)
-        if not doc:
-            return False
+    def mark_posts_sequences_read(
+        self, owner: str, post_ids: List[PostId], read_status: bool
+    ) -> int:
+        """`mark_sequences_read` of many posts in one read and one write.
 
-        sentences = doc.get("sentences", [])
-        for s in sentences:
-            s["read"] = read_status
+        Returns the number of groupings found.
+        """
+        updates: List[UpdateOne] = []
+        marked: List[PostId] = []
+        for post_id, doc in self._single_post_groupings(owner, post_ids):
+            sentences = doc.get("sentences", [])
+            for s in sentences:
+                s["read"] = read_status
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"sentences": sentences}}))
+            marked.append(post_id)
 
-        self._db.post_grouping.update_one(
-            {"owner": owner, "post_ids_hash": post_ids_hash},
-            {"$set": {"sentences": sentences}},
-        )
-        return True
+        if updates:
+            self._db.post_grouping.bulk_write(updates, ordered=False)
+            self._topics_index.mark_posts(owner, marked)
+        return len(updates)
+
+    def _single_post_groupings(
+        self, owner: str, post_ids: List[PostId]
+    ) -> Iterator[Tuple[PostId, dict]]:
+        """(post id, grouping doc) of the posts grouped on their own."""
+        by_hash = {self._generate_post_ids_hash([post_id]): post_id for post_id in post_ids}
+        hashes = list(by_hash)
+        for start in range(0, len(hashes), READ_STATE_CHUNK):
+            chunk = hashes[start : start + READ_STATE_CHUNK]
+            cursor = self._db.post_grouping.find(
+                {"owner": owner, "post_ids_hash": {"$in": chunk}},
+                projection={"post_ids_hash": True, "sentences": True},
+            )
+            for doc in cursor:
+                yield by_hash[doc["post_ids_hash"]], doc
+
+    def refresh_topics_index(self, owner: str, aliases_changed: bool = False) -> None:
+        """Recount the topics of the groupings changed since the last refresh.
+
+        Errors are only logged: the changed groupings stay marked and the next
+        refresh, at the latest the next topics page, counts them.
+        """
+        try:
+            if aliases_changed:
+                self._topics_index.mark_owner(owner)
+            self._topics_index.refresh(owner)
+        except Exception as e:
+            self._log.error("Can't refresh topics index of %s. Info: %s", owner, e)
 
     def _generate_post_ids_hash(self, post_ids: List[PostId]) -> str:
         """Generate a hash from post IDs for unique identification"""
@@ -1,6 +1,7 @@
 """Post splitting and LLM interaction logic"""
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 
 # Import txt_splitt components
@@ -37,6 +38,12 @@ class LLMGenerationError(PostSplitterError):
     pass
 
 
+class LLMRequestError(LLMGenerationError):
+    """Raised when a pipeline session LLM request fails all its retries"""
+
+    pass
+
+
 class ParsingError(PostSplitterError):
     """Raised when LLM response cannot be parsed correctly"""
 
@@ -66,10 +73,18 @@ class PostSplitter:
 
     MAX_TOPIC_LENGTH = 500
     MAX_PIPELINE_RETRIES = 3
+    MAX_REQUEST_RETRIES = 3
+    DEFAULT_MAX_IN_FLIGHT = 4
 
-    def __init__(self, llm_handler: Optional[Any] = None) -> None:
+    def __init__(
+        self,
+        llm_handler: Optional[Any] = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> None:
         self._log = logging.getLogger("post_splitter")
         self._llm_handler = llm_handler
+        # Pending requests of a session sent to the LLM at the same time
+        self._max_in_flight = max(1, max_in_flight)
 
     def generate_grouped_data(
         self,
@@ -151,6 +166,16 @@ class PostSplitter:
                 )
                 return transformed
 
+            except LLMRequestError as e:
+                # Requests were already retried one by one; running the whole
+                # pipeline again would repeat the requests that succeeded.
+                self._log.warning("Pipeline attempt %s failed: %s", attempt, e)
+                self._log.info(
+                    "Pipeline trace before failure (attempt %s):\n%s",
+                    attempt,
+                    attempt_tracer.format(),
+                )
+                raise
             except Exception as e:
                 last_error = e
                 if isinstance(e, ParsingError):
@@ -180,28 +205,56 @@ class PostSplitter:
     def _run_pipeline_session(
         self, pipeline: Any, text: str, llm_callable: TracingLLMCallable
     ) -> Any:
-        """Drive txt_splitt pipelines that emit deferred LLM request batches."""
+        """Drive txt_splitt pipelines that emit deferred LLM request batches.
+
+        The pending requests of a round (chunks of a long post, topics) don't
+        depend on each other, so up to ``max_in_flight`` of them are sent at
+        once; responses are submitted in request order.
+        """
         if not hasattr(pipeline, "start"):
             return pipeline.run(text)
 
         session: Any = pipeline.start(text)
-        while not session.is_complete():
-            requests: tuple[Any, ...] = session.pending_requests()
-            if not requests:
-                raise PostSplitterError(
-                    "Pipeline session is incomplete but has no pending requests"
+        with ThreadPoolExecutor(max_workers=self._max_in_flight) as executor:
+            while not session.is_complete():
+                requests: tuple[Any, ...] = session.pending_requests()
+                if not requests:
+                    raise PostSplitterError(
+                        "Pipeline session is incomplete but has no pending requests"
+                    )
+
+                contents: List[str] = list(
+                    executor.map(
+                        lambda request: self._call_llm(llm_callable, request),
+                        requests,
+                    )
                 )
+                session.submit_responses(
+                    [LLMResponse(content=content) for content in contents]
+                )
+
+        return session.result()
 
-            responses: List[LLMResponse] = []
-            for request in requests:
-                response: str = llm_callable.call(
+    def _call_llm(self, llm_callable: TracingLLMCallable, request: Any) -> str:
+        """Send one session request, retrying it on its own on failure."""
+        last_error: Optional[Exception] = None
+        for attempt in range(1, self.MAX_REQUEST_RETRIES + 1):
+            try:
+                return llm_callable.call(
                     request.prompt,
                     temperature=request.temperature,
                 )
-                responses.append(LLMResponse(content=response))
-            session.submit_responses(responses)
-
-        return session.result()
+            except Exception as e:
+                last_error = e
+                self._log.warning(
+                    "LLM request attempt %s/%s failed: %s",
+                    attempt,
+                    self.MAX_REQUEST_RETRIES,
+                    e,
+                )
+        raise LLMRequestError(
+            f"LLM request failed after {self.MAX_REQUEST_RETRIES} attempts: {last_error}"
+        ) from last_error
 
     def _create_batch_pipeline(self) -> BatchPipeline:
         """Create a BatchPipeline configured the same as the regular pipeline."""
@@ -1,9 +1,15 @@
 import logging
 from typing import Optional, List, Iterator
-import gzip
 
 from pymongo import MongoClient, DESCENDING, ASCENDING, UpdateMany
 
+from rsstag.indexes import create_compound_indexes
+from rsstag.text_codec import decode_text, decode_words
+from rsstag.topics_index import RssTagTopicsIndex
+
+# When TASK_TAGS last wrote the lemmas of a post
+TAGGED_AT_FIELD = "tagged_at"
+
 
 class RssTagPosts:
     indexes = ["owner", "category_id", "feed_id", "read", "tags", "pid", "processing"]
@@ -20,6 +26,7 @@ class RssTagPosts:
                 self._log.warning(
                     "Can`t create index %s. May be already exists. Info: %s", index, e
                 )
+        create_compound_indexes(self._db.posts, "posts", self._log)
 
     def get_by_category(
         self,
@@ -200,6 +207,7 @@ class RssTagPosts:
     def change_status(self, owner: str, pids: List[str], readed: bool) -> bool:
         query = {"owner": owner, "pid": {"$in": pids}}
         self._db.posts.update_many(query, {"$set": {"read": readed}})
+        RssTagTopicsIndex(self._db).mark_posts(owner, pids)
 
         return True
 
@@ -234,6 +242,26 @@ class RssTagPosts:
 
         return True
 
+    def replace_clusters(self, owner: str, similars: dict) -> bool:
+        """Same as set_clusters, but drops the cluster a post had before"""
+        updates = [
+            UpdateMany(
+                {"owner": owner, "pid": {"$in": list(ids)}},
+                {"$set": {"clusters": [cluster]}},
+            )
+            for cluster, ids in similars.items()
+        ]
+
+        if updates:
+            self._db.posts.bulk_write(updates)
+
+        return True
+
+    def clear_clusters(self, owner: str) -> None:
+        self._db.posts.update_many(
+            {"owner": owner, "clusters": {"$exists": True}}, {"$unset": {"clusters": ""}}
+        )
+
     def get_neighbors_by_unix_date(
         self,
         owner: str,
@@ -297,21 +325,28 @@ class RssTagPosts:
 
 
 class PostLemmaSentence:
-    def __init__(self, db: MongoClient, owner: str, split: bool = False):
+    def __init__(
+        self,
+        db: MongoClient,
+        owner: str,
+        split: bool = False,
+        tagged_since: Optional[float] = None,
+    ):
         self.__db = db
         self.__owner = owner
         self.__split = split
+        self.__query = {"owner": owner}
+        if tagged_since is not None:
+            self.__query[TAGGED_AT_FIELD] = {"$gt": tagged_since}
 
     def __iter__(self):
-        cursor = self.__db.posts.find(
-            {"owner": self.__owner}, projection={"lemmas": True}
-        )
+        cursor = self.__db.posts.find(self.__query, projection={"lemmas": True})
         if self.__split:
             for p in cursor:
-                yield gzip.decompress(p["lemmas"]).decode("utf-8", "replace").split()
+                yield decode_words(p["lemmas"])
         else:
             for p in cursor:
-                yield gzip.decompress(p["lemmas"]).decode("utf-8", "replace")
+                yield decode_text(p["lemmas"])
 
     def count(self) -> int:
-        return self.__db.posts.count_documents({"owner": self.__owner})
+        return self.__db.posts.count_documents(self.__query)
@@ -0,0 +1,483 @@
+"""Persisted per-owner prefix index of post words for the prefixes pages.
+
+The prefixes pages used to build a ``PrefixTreeBuilder`` (a dict per trie
+node) from every post of the user on the first hit and keep it in a module
+global forever, in every web process, never seeing new posts.
+
+``PrefixIndex`` keeps the same information, how often every word occurs,
+as the sorted distinct words concatenated into one string with an offsets
+array and an array of cumulative counts: the words of a prefix are one
+contiguous run found by bisection, and its count is the difference of two
+cumulative counts. ``RssTagPrefixIndex`` stores it compressed in one doc per
+owner. TASK_PREFIX_INDEX builds it from the tagged posts. TASK_TAGS pushes
+the word counts of the posts it tags to the doc as a small delta, which
+loading adds to the index; every ``MAX_DELTAS`` deltas they are folded into
+the stored index. Web processes keep the indexes they loaded in
+``prefix_cache``, bounded in bytes and reloaded when the stored version
+changes.
+"""
+
+import logging
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import MongoClient, ReturnDocument
+
+from rsstag.html_cleaner import HTMLCleaner
+from rsstag.posts import TAGGED_AT_FIELD
+from rsstag.prefix_tree import text2words
+from rsstag.text_codec import decode_text
+
+DEFAULT_PREFIX_CACHE_MB = 64
+# Deltas of tagged posts kept on the index doc before they are folded in
+MAX_DELTAS = 32
+# Set by a rebuild on the posts it counted that have no TAGGED_AT_FIELD
+PREFIX_COUNTED_FIELD = "prefix_counted"
+# Sorts after any char of a word, so [prefix, prefix + _LAST_CHAR) holds
+# exactly the words starting with prefix.
+_LAST_CHAR = chr(0x10FFFF)
+_WORDS_SEP = "\n"
+
+
+def post_words(post: Dict[str, Any], cleaner: HTMLCleaner) -> List[str]:
+    """Words of a post's title and content, as the prefix tree splits them."""
+    content: Dict[str, Any] = post.get("content") or {}
+    text = decode_text(content["content"]) if content.get("content") else ""
+    cleaner.purge()
+    cleaner.feed(f"{content.get('title', '')} {text}")
+    return text2words(" ".join(cleaner.get_content()))
+
+
+class _Words:
+    """Read-only sequence view of the words of a ``PrefixIndex`` for bisect."""
+
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, blob: str, offsets: array) -> None:
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[self._offsets[i] : self._offsets[i + 1]]
+
+
+class PrefixIndex:
+    """Word counts with the queries of ``PrefixTreeBuilder``.
+
+    Counts follow the trie: the count of a prefix is the number of word
+    occurrences starting with it. Results are ordered alphabetically where
+    the trie used insertion order.
+    """
+
+    __slots__ = ("_blob", "_offsets", "_cumulative", "_top_n", "words")
+
+    def __init__(self, words: List[str], counts: Iterable[int]) -> None:
+        """``words`` must be sorted and distinct, ``counts`` parallel to them."""
+        self._blob: str = "".join(words)
+        self._offsets = array("I", [0])
+        position = 0
+        for word in words:
+            position += len(word)
+            self._offsets.append(position)
+        self._cumulative = array("Q", [0])
+        total = 0
+        for count in counts:
+            total += count
+            self._cumulative.append(total)
+        self.words = _Words(self._blob, self._offsets)
+        self._top_n: Dict[int, List[Tuple[str, int]]] = {}
+
+    @classmethod
+    def from_counts(cls, counts: Dict[str, int]) -> "PrefixIndex":
+        words = sorted(word for word, count in counts.items() if word and count > 0)
+        return cls(words, (counts[word] for word in words))
+
+    @staticmethod
+    def _decode(doc: Dict[str, Any]) -> Tuple[List[str], array]:
+        text = zlib.decompress(doc["words"]).decode("utf-8")
+        counts = array("I")
+        counts.frombytes(zlib.decompress(doc["counts"]))
+        return text.split(_WORDS_SEP) if text else [], counts
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "PrefixIndex":
+        """Stored index with the counts of its deltas added."""
+        index = cls(*cls._decode(doc))
+        deltas: Counter = Counter()
+        for delta in doc.get("deltas", []):
+            words, counts = cls._decode(delta)
+            deltas.update(dict(zip(words, counts)))
+        return index.merge(deltas) if deltas else index
+
+    def to_doc(self) -> Dict[str, Any]:
+        counts = array("I", self.counts())
+        return {
+            "words": zlib.compress(_WORDS_SEP.join(self.words).encode("utf-8")),
+            "counts": zlib.compress(counts.tobytes()),
+            "words_count": len(self.words),
+        }
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory taken by the index."""
+        return (
+            len(self._blob.encode("utf-8"))
+            + self._offsets.itemsize * len(self._offsets)
+            + self._cumulative.itemsize * len(self._cumulative)
+        )
+
+    def counts(self) -> Iterator[int]:
+        cumulative = self._cumulative
+        return (cumulative[i + 1] - cumulative[i] for i in range(len(self.words)))
+
+    def merge(self, counts: Dict[str, int]) -> "PrefixIndex":
+        """New index with ``counts`` added to the counts of this one.
+
+        One pass over both sorted word lists, without a dict of every word.
+        """
+        added = sorted((word, count) for word, count in counts.items() if word and count > 0)
+        words: List[str] = []
+        merged: List[int] = []
+        i = 0
+        for word, count in zip(self.words, self.counts()):
+            while i < len(added) and added[i][0] < word:
+                words.append(added[i][0])
+                merged.append(added[i][1])
+                i += 1
+            if i < len(added) and added[i][0] == word:
+                count += added[i][1]
+                i += 1
+            words.append(word)
+            merged.append(count)
+        for word, count in added[i:]:
+            words.append(word)
+            merged.append(count)
+        return PrefixIndex(words, merged)
+
+    def _range(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        if hi is None:
+            hi = len(self.words)
+        start = bisect_left(self.words, prefix, lo, hi)
+        return start, bisect_left(self.words, prefix + _LAST_CHAR, start, hi)
+
+    def _count(self, lo: int, hi: int) -> int:
+        return self._cumulative[hi] - self._cumulative[lo]
+
+    def count(self, prefix: str) -> int:
+        return self._count(*self._range(prefix))
+
+    def get_top_n(self, n: int) -> List[Tuple[str, int]]:
+        """Prefixes of length ``n`` with their counts, most frequent first.
+
+        Kept per ``n``, the index never changes once built.
+        """
+        if n <= 0:
+            return [("", 0)] if n == 0 else []
+        if n in self._top_n:
+            return self._top_n[n]
+        prefixes: List[Tuple[str, int]] = []
+        words = self.words
+        i = 0
+        while i < len(words):
+            word = words[i]
+            if len(word) < n:
+                i += 1
+                continue
+            prefix = word[:n]
+            _, end = self._range(prefix, i)
+            prefixes.append((prefix, self._count(i, end)))
+            i = end
+        prefixes.sort(key=lambda item: (-item[1], item[0]))
+        self._top_n[n] = prefixes
+        return prefixes
+
+    def _is_leaf(self, i: int, hi: int) -> bool:
+        """Word ``i`` is no prefix of another word, a leaf of the trie."""
+        return i + 1 >= hi or not self.words[i + 1].startswith(self.words[i])
+
+    def get_tails(self, prefix: str) -> List[str]:
+        """Words starting with ``prefix`` that are no prefix of another word."""
+        lo, hi = self._range(prefix)
+        return [self.words[i] for i in range(lo, hi) if self._is_leaf(i, hi)]
+
+    def _children(self, depth: int, lo: int, hi: int) -> Iterator[Tuple[str, int, int]]:
+        """Next chars after the common ``depth`` chars of words ``lo:hi``."""
+        i = lo
+        if i < hi and len(self.words[i]) == depth:
+            i += 1
+        while i < hi:
+            path = self.words[i][: depth + 1]
+            _, end = self._range(path, i, hi)
+            yield path[depth], i, end
+            i = end
+
+    def _is_chain(self, lo: int, hi: int) -> bool:
+        """Every word of ``lo:hi`` is a prefix of the next, a single trie path."""
+        return all(not self._is_leaf(i, hi) for i in range(lo, hi - 1))
+
+    def _compact_subtree(self, depth: int, lo: int, hi: int, name: str) -> Dict[str, Any]:
+        value = self._count(lo, hi) if depth else 0
+        children: List[Dict[str, Any]] = []
+        has_children = False
+        for char, start, end in self._children(depth, lo, hi):
+            has_children = True
+            last = self.words[end - 1]
+            if len(last) > depth + 1 and self._is_chain(start, end):
+                child = {"name": char + last[depth + 1 :], "value": self._count(end - 1, end)}
+            else:
+                child = self._compact_subtree(depth + 1, start, end, char)
+            if child.get("value", 0) > 0:
+                children.append(child)
+        if not has_children:
+            return {"name": name, "value": value}
+        if len(children) == 1:
+            child = children[0]
+            return {
+                "name": name + child["name"],
+                "value": child["value"],
+                "children": child.get("children", []) if "children" in child else None,
+            }
+        result: Dict[str, Any] = {"name": name, "value": value}
+        if children:
+            children.sort(key=lambda x: x["value"], reverse=True)
+            result["children"] = children
+        return result
+
+    def get_compact_tree(self, prefix: str) -> Optional[Dict[str, Any]]:
+        """Sunburst subtree of ``prefix`` with single-path segments joined.
+
+        Same format as ``PrefixTreeBuilder.get_compact_tree``; None if no
+        word starts with ``prefix``.
+        """
+        lo, hi = self._range(prefix)
+        if lo == hi:
+            return None
+        return self._compact_subtree(len(prefix), lo, hi, prefix)
+
+
+class PrefixIndexCache:
+    """Loaded indexes of the process, least recently used evicted first.
+
+    Bounded by the total ``nbytes`` of the indexes; one larger than the
+    whole capacity is served but not kept.
+    """
+
+    def __init__(self, capacity_bytes: int = DEFAULT_PREFIX_CACHE_MB * 1024 * 1024) -> None:
+        self.capacity_bytes: int = capacity_bytes
+        self._indexes: "OrderedDict[str, Tuple[Any, PrefixIndex]]" = OrderedDict()
+        self._size: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, owner: str, version: Any) -> Optional[PrefixIndex]:
+        with self._lock:
+            cached = self._indexes.get(owner)
+            if cached is None or cached[0] != version:
+                return None
+            self._indexes.move_to_end(owner)
+            return cached[1]
+
+    def put(self, owner: str, version: Any, index: PrefixIndex) -> None:
+        with self._lock:
+            self._pop(owner)
+            if index.nbytes > self.capacity_bytes:
+                return
+            self._indexes[owner] = (version, index)
+            self._size += index.nbytes
+            while self._size > self.capacity_bytes:
+                self._pop(next(iter(self._indexes)))
+
+    def _pop(self, owner: str) -> None:
+        cached = self._indexes.pop(owner, None)
+        if cached is not None:
+            self._size -= cached[1].nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._size = 0
+
+
+class RssTagPrefixIndex:
+    indexes = ["owner"]
+
+    def __init__(self, db: MongoClient) -> None:
+        self._db = db
+        self._log = logging.getLogger("prefix_index")
+
+    def prepare(self) -> None:
+        for index in self.indexes:
+            try:
+                self._db.prefix_index.create_index(index, unique=True)
+            except Exception as e:
+                self._log.warning(
+                    "Can`t create index %s. May be already exists. Info: %s", index, e
+                )
+
+    def remove_owner(self, owner: str) -> None:
+        self._db.prefix_index.delete_many({"owner": owner})
+
+    def load(self, owner: str) -> Optional[PrefixIndex]:
+        """Index of ``owner``, from ``prefix_cache`` while its version is current."""
+        head = self._db.prefix_index.find_one({"owner": owner}, projection={"version": True})
+        if head is None:
+            return None
+        index = prefix_cache.get(owner, head["version"])
+        if index is not None:
+            return index
+        doc = self._db.prefix_index.find_one({"owner": owner})
+        if doc is None:
+            return None
+        index = PrefixIndex.from_doc(doc)
+        prefix_cache.put(owner, doc["version"], index)
+        return index
+
+    def rebuild(self, owner: str) -> bool:
+        """Count the words of every post of ``owner`` tagged so far into a new index.
+
+        Posts tagged once the rebuild started are left to ``add_posts``: their
+        deltas are carried over to the new index.
+        """
+        built_at = time.time()
+        cleaner = HTMLCleaner()
+        counts: Counter = Counter()
+        legacy_ids: List[Any] = []
+        cursor = self._db.posts.find(
+            {
+                "owner": owner,
+                "$or": [
+                    {"tags": {"$ne": []}},
+                    {TAGGED_AT_FIELD: {"$exists": True}},
+                    {PREFIX_COUNTED_FIELD: True},
+                ],
+                TAGGED_AT_FIELD: {"$not": {"$gte": built_at}},
+            },
+            projection={
+                "content.title": True,
+                "content.content": True,
+                TAGGED_AT_FIELD: True,
+                PREFIX_COUNTED_FIELD: True,
+            },
+        )
+        for post in cursor:
+            counts.update(post_words(post, cleaner))
+            if TAGGED_AT_FIELD not in post and PREFIX_COUNTED_FIELD not in post:
+                legacy_ids.append(post["_id"])
+        index = PrefixIndex.from_counts(counts)
+        self._replace(owner, built_at, index)
+        # Posts tagged before TAGGED_AT_FIELD existed must not be added again
+        # by add_posts if they get tagged once more.
+        for start in range(0, len(legacy_ids), 10000):
+            self._db.posts.update_many(
+                {"_id": {"$in": legacy_ids[start : start + 10000]}},
+                {"$set": {PREFIX_COUNTED_FIELD: True}},
+            )
+        self._log.info("Built prefix index of %s: %s words", owner, len(index))
+        return True
+
+    def _replace(self, owner: str, built_at: float, index: PrefixIndex) -> None:
+        """Store a rebuilt index, keeping the deltas of posts tagged since ``built_at``."""
+        while True:
+            current = self._db.prefix_index.find_one(
+                {"owner": owner}, projection={"version": True, "deltas": True}
+            )
+            doc = {"owner": owner, "version": ObjectId(), "built_at": built_at, **index.to_doc()}
+            if current is None:
+                self._db.prefix_index.replace_one({"owner": owner}, doc, upsert=True)
+                return
+            deltas = [
+                delta
+                for delta in current.get("deltas", [])
+                if delta.get(TAGGED_AT_FIELD, 0) >= built_at
+            ]
+            if deltas:
+                doc["deltas"] = deltas
+                doc["deltas_count"] = len(deltas)
+            # A delta pushed meanwhile changes the version: read it again
+            result = self._db.prefix_index.replace_one(
+                {"owner": owner, "version": current["version"]}, doc
+            )
+            if result.matched_count:
+                return
+
+    def add_posts(self, owner: str, posts: List[Dict[str, Any]], tagged_at: float) -> bool:
+        """Add the words of posts tagged at ``tagged_at`` to the index.
+
+        Posts tagged or counted before are skipped, and owners without an
+        index get theirs built with these posts by TASK_PREFIX_INDEX. The
+        counts are pushed as a delta, so a batch costs its own words only.
+        """
+        cleaner = HTMLCleaner()
+        counts: Counter = Counter()
+        for post in posts:
+            if TAGGED_AT_FIELD not in post and PREFIX_COUNTED_FIELD not in post:
+                counts.update(post_words(post, cleaner))
+        if not counts:
+            return True
+        delta = PrefixIndex.from_counts(counts).to_doc()
+        del delta["words_count"]
+        delta[TAGGED_AT_FIELD] = tagged_at
+        doc = self._db.prefix_index.find_one_and_update(
+            # Posts tagged before a rebuild started are counted by it
+            {"owner": owner, "built_at": {"$lte": tagged_at}},
+            {
+                "$push": {"deltas": delta},
+                "$inc": {"deltas_count": 1},
+                "$set": {"version": ObjectId()},
+            },
+            projection={"deltas_count": True},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None and doc["deltas_count"] >= MAX_DELTAS:
+            self._fold_deltas(owner)
+        return True
+
+    def _fold_deltas(self, owner: str) -> None:
+        """Store the index with its deltas added, unless it changed meanwhile."""
+        doc = self._db.prefix_index.find_one({"owner": owner})
+        if doc is None:
+            return
+        index = PrefixIndex.from_doc(doc)
+        result = self._db.prefix_index.update_one(
+            {"owner": owner, "version": doc["version"]},
+            {
+                "$set": {"version": ObjectId(), **index.to_doc()},
+                "$unset": {"deltas": "", "deltas_count": ""},
+            },
+        )
+        if not result.modified_count:
+            # A concurrent delta, the next batch folds it with the others
+            self._log.info("Prefix index of %s changed while folding deltas", owner)
+
+
+def init_prefix_cache(config: dict) -> None:
+    """Size ``prefix_cache`` from ``prefix_index_cache_mb`` in the settings."""
+    raw_size = config.get("settings", {}).get("prefix_index_cache_mb", DEFAULT_PREFIX_CACHE_MB)
+    try:
+        size = int(raw_size)
+    except (TypeError, ValueError):
+        logging.warning(
+            "Invalid prefix_index_cache_mb=%r, using %d", raw_size, DEFAULT_PREFIX_CACHE_MB
+        )
+        size = DEFAULT_PREFIX_CACHE_MB
+    if size <= 0:
+        size = DEFAULT_PREFIX_CACHE_MB
+    prefix_cache.capacity_bytes = size * 1024 * 1024
+
+
+prefix_cache = PrefixIndexCache()
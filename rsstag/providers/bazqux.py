@@ -1,7 +1,6 @@
 from random import randint
 import time
 from datetime import date, datetime, timezone
-import gzip
 import asyncio
 from hashlib import md5
 import json
@@ -15,6 +14,8 @@ from rsstag.web.routes import RSSTagRoutes
 from rsstag.providers.providers import BAZQUX
 from rsstag.providers.feed_docs import build_feed_doc
 from rsstag.providers.pid import generate_post_pid
+from rsstag.providers.streaming import download_chunk_size, iter_async_items, iter_chunks
+from rsstag.text_codec import encode_content
 
 import aiohttp
 
@@ -37,16 +38,16 @@ class BazquxProvider:
             "Content-type": "application/x-www-form-urlencoded",
         }
 
-    async def fetch(
-        self, data: dict
-    ) -> Tuple[dict, str]:
-        posts = []
+    async def fetch(self, data: dict, pages: asyncio.Queue) -> int:
+        """Put every page of a stream into ``pages`` as (items, category)."""
+        loaded = 0
         max_repetitions = 5
         repetitions = 0
         again = True
         url = data["url"]
         async with aiohttp.ClientSession() as session:
             while again:
+                items = []
                 try:
                     async with session.get(url, headers=data["headers"]) as resp:
                         if resp.status == 200:
@@ -67,7 +68,7 @@ class BazquxProvider:
                             else:
                                 again = False
                             if "items" in downloaded:
-                                posts = posts + downloaded["items"]
+                                items = downloaded["items"]
                         else:
                             repetitions += 1
                             again = repetitions < max_repetitions
@@ -77,10 +78,13 @@ class BazquxProvider:
                     )
                     repetitions += 1
                     again = repetitions < max_repetitions
+                if items:
+                    loaded += len(items)
+                    await pages.put((items, data["category"]))
             logging.info(
-                'Loaded posts %s for category "%s"', len(posts), data["category"]
+                'Loaded posts %s for category "%s"', loaded, data["category"]
             )
-            return (posts, data["category"])
+            return loaded
 
     def _fetch_subscriptions(self, user: dict) -> Optional[dict]:
         """Ask bazqux for the raw subscriptions list. None means "can`t know"."""
@@ -170,11 +174,98 @@ class BazquxProvider:
 
         return feeds
 
+    def _stream_request(self, headers: dict, stream: str, limit: int, category: str) -> dict:
+        return {
+            "headers": headers,
+            "url": "https://{}/reader/api/0/stream/contents?s={}&xt=user/-/state/com.google/read&n={}&output=json".format(
+                self._config[BAZQUX]["api_host"], stream, limit
+            ),
+            "category": category,
+        }
+
+    def _label_request(self, headers: dict, category: str) -> dict:
+        return self._stream_request(
+            headers, "user/-/label/{}".format(quote_plus(category)), 1000, category
+        )
+
+    def _feed_request(self, headers: dict, feed_id: str, category: str) -> dict:
+        return self._stream_request(headers, quote_plus(feed_id), 5000, category)
+
+    def _page_posts(
+        self,
+        user: dict,
+        routes: RSSTagRoutes,
+        items: List[dict],
+        category: str,
+        feeds: dict,
+    ) -> Tuple[List[dict], List[dict]]:
+        """Convert one downloaded page, return its posts and unseen feeds."""
+        posts = []
+        new_feeds = []
+        for post in items:
+            stream_id = md5(post["origin"]["streamId"].encode("utf-8")).hexdigest()
+            if stream_id not in feeds:
+                feeds[stream_id] = {
+                    "createdAt": datetime.now(timezone.utc),
+                    "title": post["origin"]["title"],
+                    "owner": user["sid"],
+                    "category_id": category,
+                    "feed_id": stream_id,
+                    "origin_feed_id": post["origin"]["streamId"],
+                    "category_title": category,
+                    "category_local_url": routes.get_url_by_endpoint(
+                        endpoint="on_category_get",
+                        params={"quoted_category": category},
+                    ),
+                    "local_url": routes.get_url_by_endpoint(
+                        endpoint="on_feed_get",
+                        params={"quoted_feed": stream_id},
+                    ),
+                    "favicon": "",
+                }
+                new_feeds.append(feeds[stream_id])
+            if "published" in post:
+                p_date = date.fromtimestamp(int(post["published"])).strftime("%x")
+                pu_date = float(post["published"])
+            else:
+                p_date = -1
+                pu_date = -1.0
+            attachments_list = []
+            if "enclosure" in post:
+                for attachments in post["enclosure"]:
+                    if ("href" in attachments) and attachments["href"]:
+                        attachments_list.append(attachments["href"])
+            posts.append(
+                {
+                    "content": {
+                        "title": post["title"],
+                        "content": encode_content(post["summary"]["content"]),
+                    },
+                    "feed_id": stream_id,
+                    "category_id": category,
+                    "id": post["id"],
+                    "url": post["canonical"][0]["href"]
+                    if post["canonical"]
+                    else "http://google.com",
+                    "date": p_date,
+                    "unix_date": pu_date,
+                    "read": False,
+                    "favorite": False,
+                    "attachments": attachments_list,
+                    "tags": [],
+                    "bi_grams": [],
+                    "pid": generate_post_pid(BAZQUX, stream_id, post["id"]),
+                    "owner": user["sid"],
+                    "processing": POST_NOT_IN_PROCESSING,
+                }
+            )
+
+        return posts, new_feeds
+
     def download(
         self, user: dict, selection: Optional[dict] = None
     ) -> Iterator[Tuple[List, List]]:
-        posts = []
-        feeds = {}
+        """Yield (posts, new feeds) chunks while the streams are downloaded."""
         selected_categories = set()
         selected_feeds = set()
         selection_active = False
@@ -184,158 +275,57 @@ class BazquxProvider:
             selection_active = bool(selected_categories or selected_feeds)
         headers = self.get_headers(user)
         subscriptions = self._require_subscriptions(user)
-        if subscriptions:
-            routes = RSSTagRoutes(self._config["settings"]["host_name"])
-            by_category = {}
-            by_feed = set()
-            loop = asyncio.get_event_loop()
-            futures = []
-            for feed in subscriptions["subscriptions"]:
-                category_name = self._feed_category(feed)
-                feed_id = feed["id"]
-                is_uncategorized = category_name == self.no_category_name
-                category_selected = category_name in selected_categories
-                feed_selected = feed_id in selected_feeds
-                if selection_active:
-                    if category_selected and not is_uncategorized:
-                        if category_name not in by_category:
-                            by_category[category_name] = True
-                            futures.append(
-                                self.fetch(
-                                    {
-                                        "headers": headers,
-                                        "url": "https://{}/reader/api/0/stream/contents?s=user/-/label/{}&xt=user/-/state/com.google/read&n=1000&output=json".format(
-                                            self._config[BAZQUX]["api_host"],
-                                            quote_plus(category_name),
-                                        ),
-                                        "category": category_name,
-                                    },
-                                )
-                            )
-                    if (feed_selected and not category_selected) or (
-                        category_selected and is_uncategorized
-                    ):
-                        if feed_id not in by_feed:
-                            by_feed.add(feed_id)
-                            futures.append(
-                                self.fetch(
-                                    {
-                                        "headers": headers,
-                                        "url": "https://{}/reader/api/0/stream/contents?s={}&xt=user/-/state/com.google/read&n=5000&output=json".format(
-                                            self._config[BAZQUX]["api_host"],
-                                            quote_plus(feed_id),
-                                        ),
-                                        "category": category_name,
-                                    },
-                                )
-                            )
-                else:
-                    if is_uncategorized:
-                        if feed_id not in by_feed:
-                            by_feed.add(feed_id)
-                            futures.append(
-                                self.fetch(
-                                    {
-                                        "headers": headers,
-                                        "url": "https://{}/reader/api/0/stream/contents?s={}&xt=user/-/state/com.google/read&n=5000&output=json".format(
-                                            self._config[BAZQUX]["api_host"],
-                                            quote_plus(feed_id),
-                                        ),
-                                        "category": category_name,
-                                    },
-                                )
-                            )
+        if not subscriptions:
+            return
+        by_category = {}
+        by_feed = set()
+        requests = []
+        for feed in subscriptions["subscriptions"]:
+            category_name = self._feed_category(feed)
+            feed_id = feed["id"]
+            is_uncategorized = category_name == self.no_category_name
+            category_selected = category_name in selected_categories
+            feed_selected = feed_id in selected_feeds
+            if selection_active:
+                if category_selected and not is_uncategorized:
                     if category_name not in by_category:
                         by_category[category_name] = True
-                        if category_name != self.no_category_name:
-                            futures.append(
-                                self.fetch(
-                                    {
-                                        "headers": headers,
-                                        "url": "https://{}/reader/api/0/stream/contents?s=user/-/label/{}&xt=user/-/state/com.google/read&n=1000&output=json".format(
-                                            self._config[BAZQUX]["api_host"],
-                                            quote_plus(category_name),
-                                        ),
-                                        "category": category_name,
-                                    },
-                                )
-                            )
-            future = asyncio.gather(*futures)
-            loop.run_until_complete(future)
-            cats_data = future.result()
-            loop.close()
-            logging.info("Was loaded %s categories", len(cats_data))
-            for cat_data in cats_data:
-                cat_posts, category = cat_data
-                logging.info(
-                    'Fetched %s posts for category "%s"', len(cat_posts), category
-                )
-                for post in cat_posts:
-                    stream_id = md5(
-                        post["origin"]["streamId"].encode("utf-8")
-                    ).hexdigest()
-                    if stream_id not in feeds:
-                        feeds[stream_id] = {
-                            "createdAt": datetime.now(timezone.utc),
-                            "title": post["origin"]["title"],
-                            "owner": user["sid"],
-                            "category_id": category,
-                            "feed_id": stream_id,
-                            "origin_feed_id": post["origin"]["streamId"],
-                            "category_title": category,
-                            "category_local_url": routes.get_url_by_endpoint(
-                                endpoint="on_category_get",
-                                params={"quoted_category": category},
-                            ),
-                            "local_url": routes.get_url_by_endpoint(
-                                endpoint="on_feed_get",
-                                params={"quoted_feed": stream_id},
-                            ),
-                            "favicon": "",
-                        }
-                    if "published" in post:
-                        p_date = date.fromtimestamp(int(post["published"])).strftime(
-                            "%x"
+                        requests.append(self._label_request(headers, category_name))
+                if (feed_selected and not category_selected) or (
+                    category_selected and is_uncategorized
+                ):
+                    if feed_id not in by_feed:
+                        by_feed.add(feed_id)
+                        requests.append(
+                            self._feed_request(headers, feed_id, category_name)
                         )
-                        pu_date = float(post["published"])
-                    else:
-                        p_date = -1
-                        pu_date = -1.0
-                    attachments_list = []
-                    if "enclosure" in post:
-                        for attachments in post["enclosure"]:
-                            if ("href" in attachments) and attachments["href"]:
-                                attachments_list.append(attachments["href"])
-                    posts.append(
-                        {
-                            "content": {
-                                "title": post["title"],
-                                "content": gzip.compress(
-                                    post["summary"]["content"].encode(
-                                        "utf-8", "replace"
-                                    )
-                                ),
-                            },
-                            "feed_id": stream_id,
-                            "category_id": category,
-                            "id": post["id"],
-                            "url": post["canonical"][0]["href"]
-                            if post["canonical"]
-                            else "http://google.com",
-                            "date": p_date,
-                            "unix_date": pu_date,
-                            "read": False,
-                            "favorite": False,
-                            "attachments": attachments_list,
-                            "tags": [],
-                            "bi_grams": [],
-                            "pid": generate_post_pid(BAZQUX, stream_id, post["id"]),
-                            "owner": user["sid"],
-                            "processing": POST_NOT_IN_PROCESSING,
-                        }
-                    )
+            else:
+                if is_uncategorized:
+                    if feed_id not in by_feed:
+                        by_feed.add(feed_id)
+                        requests.append(
+                            self._feed_request(headers, feed_id, category_name)
+                        )
+                if category_name not in by_category:
+                    by_category[category_name] = True
+                    if category_name != self.no_category_name:
+                        requests.append(self._label_request(headers, category_name))
 
-        yield (posts, list(feeds.values()))
+        async def produce(pages: asyncio.Queue) -> None:
+            loaded = await asyncio.gather(
+                *(self.fetch(request, pages) for request in requests)
+            )
+            logging.info(
+                "Was loaded %s categories, %s posts", len(loaded), sum(loaded)
+            )
+
+        routes = RSSTagRoutes(self._config["settings"]["host_name"])
+        feeds = {}
+        pages = (
+            self._page_posts(user, routes, items, category, feeds)
+            for items, category in iter_async_items(produce)
+        )
+        yield from iter_chunks(pages, download_chunk_size(self._config))
 
     def mark(self, data: dict, user: dict) -> Optional[bool]:
         status = data["status"]
@@ -5,7 +5,6 @@ import re
 from typing import Tuple, List, Optional, Iterator
 from datetime import datetime, timezone
 from hashlib import md5
-import gzip
 
 import aiohttp
 
@@ -13,6 +12,8 @@ from rsstag.tasks import POST_NOT_IN_PROCESSING
 from rsstag.web.routes import RSSTagRoutes
 from rsstag.providers.providers import GMAIL
 from rsstag.providers.pid import generate_post_pid
+from rsstag.providers.streaming import download_chunk_size, iter_async_items, iter_chunks
+from rsstag.text_codec import encode_content
 
 
 class GmailProvider:
@@ -196,15 +197,77 @@ class GmailProvider:
 
         return response
 
+    def _mail_post(
+        self, user: dict, routes: RSSTagRoutes, mail_data: dict, feeds: dict
+    ) -> Tuple[dict, Optional[dict]]:
+        """Build the post of one email and its feed when it is new."""
+        headers_map = {
+            h["name"].lower(): h["value"]
+            for h in mail_data["payload"]["headers"]
+        }
+        subject = headers_map.get("subject", "")
+        from_ = headers_map.get("from", "")
+
+        body, body_format = self.get_email_body(mail_data["payload"])
+
+        stream_id = md5(from_.encode("utf-8")).hexdigest()
+        new_feed = None
+        if stream_id not in feeds:
+            feeds[stream_id] = {
+                "createdAt": datetime.now(timezone.utc),
+                "title": from_,
+                "owner": user["sid"],
+                "category_id": self.no_category_name,
+                "feed_id": stream_id,
+                "origin_feed_id": from_,
+                "category_title": self.no_category_name,
+                "category_local_url": routes.get_url_by_endpoint(
+                    endpoint="on_category_get",
+                    params={"quoted_category": self.no_category_name},
+                ),
+                "local_url": routes.get_url_by_endpoint(
+                    endpoint="on_feed_get",
+                    params={"quoted_feed": stream_id},
+                ),
+                "favicon": "",
+            }
+            new_feed = feeds[stream_id]
+
+        post = {
+            "content": {
+                "title": subject,
+                "content": encode_content(body),
+                "format": body_format,
+            },
+            "feed_id": stream_id,
+            "category_id": self.no_category_name,
+            "id": mail_data["id"],
+            "url": f"https://mail.google.com/mail/u/0/#inbox/{mail_data['id']}",
+            "date": datetime.fromtimestamp(
+                int(mail_data["internalDate"]) / 1000
+            ).strftime("%x"),
+            "unix_date": float(mail_data["internalDate"]) / 1000,
+            "read": False,
+            "favorite": False,
+            "attachments": [],
+            "tags": [],
+            "bi_grams": [],
+            "pid": generate_post_pid(GMAIL, stream_id, mail_data["id"]),
+            "owner": user["sid"],
+            "processing": POST_NOT_IN_PROCESSING,
+        }
+
+        return post, new_feed
+
     def download(
         self, user: dict, selection: Optional[dict] = None
     ) -> Iterator[Tuple[List, List]]:
-        """Fetch all unread emails"""
-        posts = []
+        """Fetch all unread emails, yielding chunks as batches arrive"""
         feeds = {}
         user["token_refreshed"] = False  # Track if token was refreshed
+        routes = RSSTagRoutes(self._config["settings"]["host_name"])
 
-        async def main():
+        async def main(pages: asyncio.Queue):
             async with aiohttp.ClientSession() as session:
                 # 1. Get list of unread message IDs
                 list_url = (
@@ -240,7 +303,6 @@ class GmailProvider:
                 # Process in batches of 10 with a delay between batches
                 batch_size = 10
                 batch_delay = 0.5  # 0.5 second delay between batches
-                emails = []
 
                 logging.info(
                     f"Fetching {len(message_ids)} emails in batches of {batch_size}"
@@ -257,7 +319,7 @@ class GmailProvider:
                         )
 
                     batch_emails = await asyncio.gather(*email_tasks)
-                    emails.extend(batch_emails)
+                    await pages.put(batch_emails)
 
                     # Add delay between batches (except for the last batch)
                     if i + batch_size < len(message_ids):
@@ -266,73 +328,20 @@ class GmailProvider:
                         )
                         await asyncio.sleep(batch_delay)
 
-                routes = RSSTagRoutes(self._config["settings"]["host_name"])
+        def batches() -> Iterator[Tuple[List, List]]:
+            for emails in iter_async_items(main):
+                posts = []
+                new_feeds = []
                 for mail_data in emails:
                     if not mail_data:
                         continue
+                    post, new_feed = self._mail_post(user, routes, mail_data, feeds)
+                    posts.append(post)
+                    if new_feed:
+                        new_feeds.append(new_feed)
+                yield posts, new_feeds
 
-                    headers_map = {
-                        h["name"].lower(): h["value"]
-                        for h in mail_data["payload"]["headers"]
-                    }
-                    subject = headers_map.get("subject", "")
-                    from_ = headers_map.get("from", "")
-
-                    body, body_format = self.get_email_body(mail_data["payload"])
-
-                    stream_id = md5(from_.encode("utf-8")).hexdigest()
-                    if stream_id not in feeds:
-                        feeds[stream_id] = {
-                            "createdAt": datetime.now(timezone.utc),
-                            "title": from_,
-                            "owner": user["sid"],
-                            "category_id": self.no_category_name,
-                            "feed_id": stream_id,
-                            "origin_feed_id": from_,
-                            "category_title": self.no_category_name,
-                            "category_local_url": routes.get_url_by_endpoint(
-                                endpoint="on_category_get",
-                                params={"quoted_category": self.no_category_name},
-                            ),
-                            "local_url": routes.get_url_by_endpoint(
-                                endpoint="on_feed_get",
-                                params={"quoted_feed": stream_id},
-                            ),
-                            "favicon": "",
-                        }
-
-                    posts.append(
-                        {
-                            "content": {
-                                "title": subject,
-                                "content": gzip.compress(
-                                    body.encode("utf-8", "replace")
-                                ),
-                                "format": body_format,
-                            },
-                            "feed_id": stream_id,
-                            "category_id": self.no_category_name,
-                            "id": mail_data["id"],
-                            "url": f"https://mail.google.com/mail/u/0/#inbox/{mail_data['id']}",
-                            "date": datetime.fromtimestamp(
-                                int(mail_data["internalDate"]) / 1000
-                            ).strftime("%x"),
-                            "unix_date": float(mail_data["internalDate"]) / 1000,
-                            "read": False,
-                            "favorite": False,
-                            "attachments": [],
-                            "tags": [],
-                            "bi_grams": [],
-                            "pid": generate_post_pid(GMAIL, stream_id, mail_data["id"]),
-                            "owner": user["sid"],
-                            "processing": POST_NOT_IN_PROCESSING,
-                        }
-                    )
-
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(main())
-
-        yield (posts, list(feeds.values()))
+        yield from iter_chunks(batches(), download_chunk_size(self._config))
 
     async def fetch_email_content_authenticated(self, session, url, user):
         """Fetch email content with authentication and token refresh"""
@@ -1,7 +1,6 @@
 from typing import Tuple, List, Optional
 from datetime import date, datetime, timezone
 import time
-import gzip
 import logging
 import json
 
@@ -9,6 +8,7 @@ from rsstag.tasks import POST_NOT_IN_PROCESSING
 from rsstag.web.routes import RSSTagRoutes
 from rsstag.providers.providers import JSONS_FILE
 from rsstag.providers.pid import generate_post_pid
+from rsstag.text_codec import encode_content
 
 NOT_CATEGORIZED = "NotCategorized"
 
@@ -64,9 +64,7 @@ class JSONSFileProvider:
                     {
                         "content": {
                             "title": title,
-                            "content": gzip.compress(
-                                content.encode("utf-8", "replace")
-                            ),
+                            "content": encode_content(content),
                         },
                         "feed_id": stream_id,
                         "category_id": self.no_category_name,
@@ -0,0 +1,100 @@
+"""Hand provider downloads to the worker in bounded chunks.
+
+Providers fetch pages with aiohttp. Instead of gathering every page and
+yielding one list with the whole download, they put each page into a small
+bounded queue as soon as it arrives. ``iter_async_items`` runs the fetching
+coroutines on a private event loop and yields the pages one by one.
+``iter_chunks`` regroups the converted posts into chunks of
+``download_chunk_size``. While the worker stores a chunk the event loop is
+paused and producers wait on the full queue, so memory holds at most a few
+pages plus one chunk, whatever the size of the download.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Tuple
+
+DEFAULT_CHUNK_SIZE = 1000
+# Pages fetched ahead of the consumer
+QUEUE_PAGES = 4
+
+_DONE = object()
+
+
+def download_chunk_size(config: dict) -> int:
+    """``download_chunk_size`` from the settings section."""
+    raw_size: Any = config.get("settings", {}).get(
+        "download_chunk_size", DEFAULT_CHUNK_SIZE
+    )
+    try:
+        size = int(raw_size)
+    except (TypeError, ValueError):
+        logging.warning(
+            "Invalid download_chunk_size=%r, using %d", raw_size, DEFAULT_CHUNK_SIZE
+        )
+        size = DEFAULT_CHUNK_SIZE
+    if size <= 0:
+        size = DEFAULT_CHUNK_SIZE
+    return size
+
+
+async def _next_item(queue: asyncio.Queue, producer: asyncio.Task) -> Any:
+    if queue.empty() and producer.done():
+        return _DONE
+    getter = asyncio.ensure_future(queue.get())
+    await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+    if getter.done():
+        return getter.result()
+    getter.cancel()
+    if queue.empty():
+        return _DONE
+    return queue.get_nowait()
+
+
+def iter_async_items(
+    produce: Callable[[asyncio.Queue], Awaitable[Any]],
+    max_items: int = QUEUE_PAGES,
+) -> Iterator[Any]:
+    """Yield what ``produce(queue)`` puts into the queue, as it is produced.
+
+    Exceptions of ``produce`` are raised after the items put before them.
+    Closing the generator early cancels the producer.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_items)
+        producer = loop.create_task(produce(queue))
+        try:
+            while True:
+                item = loop.run_until_complete(_next_item(queue, producer))
+                if item is _DONE:
+                    break
+                yield item
+            producer.result()
+        finally:
+            if not producer.done():
+                producer.cancel()
+                loop.run_until_complete(asyncio.gather(producer, return_exceptions=True))
+    finally:
+        loop.close()
+
+
+def iter_chunks(
+    batches: Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+    chunk_size: int,
+) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Regroup (posts, feeds) batches into chunks of ``chunk_size`` posts.
+
+    Feeds travel with the chunk holding the first posts seen after them.
+    """
+    posts: List[Dict[str, Any]] = []
+    feeds: List[Dict[str, Any]] = []
+    for batch_posts, batch_feeds in batches:
+        feeds.extend(batch_feeds)
+        for post in batch_posts:
+            posts.append(post)
+            if len(posts) >= chunk_size:
+                yield posts, feeds
+                posts, feeds = [], []
+    if posts or feeds:
+        yield posts, feeds
@@ -1,7 +1,6 @@
 """RSSTag downloaders"""
 
 import time
-import gzip
 import logging
 from datetime import date
 from random import randint, uniform
@@ -22,6 +21,8 @@ from rsstag.posts import RssTagPosts
 from rsstag.providers.providers import TELEGRAM
 from rsstag.providers.pid import generate_post_pid
 from rsstag.providers.feed_docs import build_feed_doc
+from rsstag.providers.streaming import download_chunk_size
+from rsstag.text_codec import encode_content
 
 from pymongo import MongoClient
 
@@ -299,7 +300,7 @@ def tlg_raw_message_to_post(
     return {
         "content": {
             "title": "",
-            "content": gzip.compress(post_text.encode("utf-8", "replace")),
+            "content": encode_content(post_text),
         },
         "feed_id": stream_id,
         "category_id": no_category_name,
@@ -327,6 +328,14 @@ class TelegramProvider:
         else:
             self.no_category_name = NOT_CATEGORIZED
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # raw->posts pool processes get the provider without the Mongo
+        # client and TDLib session, which can't be pickled.
+        state = self.__dict__.copy()
+        state.pop("_db", None)
+        state.pop("_tlg", None)
+        return state
+
     @staticmethod
     def _is_channel(chat: Dict[str, Any]) -> bool:
         """Return whether a TDLib chat is a broadcast Telegram channel."""
@@ -746,6 +755,7 @@ class TelegramProvider:
                     )
             feeds = {}
             routes = RSSTagRoutes(self._config["settings"]["host_name"])
+            chunk_size = download_chunk_size(self._config)
             for channel in channels:
                 tasks_q.put_nowait((all_channels, max_limit, channel))
                 stream_id = str(channel["id"])
@@ -819,9 +829,7 @@ class TelegramProvider:
                         {
                             "content": {
                                 "title": "",
-                                "content": gzip.compress(
-                                    post_text.encode("utf-8", "replace")
-                                ),
+                                "content": encode_content(post_text),
                             },
                             "feed_id": str(stream_id),
                             "category_id": self.no_category_name,
@@ -841,7 +849,7 @@ class TelegramProvider:
                             "processing": POST_NOT_IN_PROCESSING,
                         }
                     )
-                if len(posts) > 5000:
+                if len(posts) >= chunk_size:
                     yield (posts, list(feeds.values()))
                     posts = []
                 time.sleep(randint(1, 3))
@@ -1,13 +1,13 @@
 from typing import Tuple, List, Optional
 from datetime import date, datetime, timezone
 import time
-import gzip
 import logging
 
 from rsstag.tasks import POST_NOT_IN_PROCESSING
 from rsstag.web.routes import RSSTagRoutes
 from rsstag.providers.providers import TEXT_FILE
 from rsstag.providers.pid import generate_post_pid
+from rsstag.text_codec import encode_content
 
 NOT_CATEGORIZED = "NotCategorized"
 
@@ -56,7 +56,7 @@ class TextFileProvider:
                     {
                         "content": {
                             "title": "",
-                            "content": gzip.compress(line.encode("utf-8", "replace")),
+                            "content": encode_content(line),
                         },
                         "feed_id": stream_id,
                         "category_id": self.no_category_name,
@@ -1,6 +1,5 @@
 import asyncio
 import base64
-import gzip
 import html
 import logging
 import time
@@ -12,8 +11,10 @@ import aiohttp
 
 from rsstag.providers.pid import generate_post_pid
 from rsstag.providers.providers import X
+from rsstag.providers.streaming import download_chunk_size, iter_async_items, iter_chunks
 from rsstag.tasks import POST_NOT_IN_PROCESSING
 from rsstag.web.routes import RSSTagRoutes
+from rsstag.text_codec import encode_content
 
 
 class XProviderError(Exception):
@@ -356,7 +357,7 @@ class XProvider:
         return {
             "content": {
                 "title": "",
-                "content": gzip.compress("".join(text_parts).encode("utf-8", "replace")),
+                "content": encode_content("".join(text_parts)),
                 "format": "html",
             },
             "feed_id": feed_id,
@@ -416,7 +417,7 @@ class XProvider:
         user: dict,
         routes: RSSTagRoutes,
         feeds: Dict[str, dict],
-        posts: List[dict],
+        pages: asyncio.Queue,
     ) -> None:
         owner_id = user.get("x_user_id")
         if not owner_id:
@@ -464,11 +465,13 @@ class XProvider:
             if item.get("id")
         }
         newest_id = user.get("x_home_since_id", "")
+        posts = []
         for post in data.get("data", []) or []:
             posts.append(self._make_post(user, feed_id, post, users_by_id))
             post_id = str(post.get("id", ""))
             if post_id and (not newest_id or int(post_id) > int(newest_id)):
                 newest_id = post_id
+        await pages.put((posts, [feeds[feed_id]]))
         if self._normalize_fetch_mode(user) == "unread" and newest_id:
             user["provider_updates"] = {
                 **user.get("provider_updates", {}),
@@ -482,7 +485,7 @@ class XProvider:
         selected_feed_ids: List[str],
         routes: RSSTagRoutes,
         feeds: Dict[str, dict],
-        posts: List[dict],
+        pages: asyncio.Queue,
     ) -> None:
         if not selected_feed_ids:
             return
@@ -522,6 +525,7 @@ class XProvider:
                 params,
             )
             if not data:
+                await pages.put(([], [feeds[feed_id]]))
                 continue
             includes = data.get("includes", {})
             author_by_id = {
@@ -533,11 +537,13 @@ class XProvider:
                 author_by_id[followed_id] = account
 
             newest_id = follow_since_ids.get(followed_id, "")
+            posts = []
             for post in data.get("data", []) or []:
                 posts.append(self._make_post(user, feed_id, post, author_by_id))
                 post_id = str(post.get("id", ""))
                 if post_id and (not newest_id or int(post_id) > int(newest_id)):
                     newest_id = post_id
+            await pages.put((posts, [feeds[feed_id]]))
             if unread_mode and newest_id:
                 follow_since_ids[followed_id] = newest_id
 
@@ -550,25 +556,24 @@ class XProvider:
     def download(
         self, user: dict, selection: Optional[dict] = None
     ) -> Iterator[Tuple[List, List]]:
-        posts: List[dict] = []
+        """Yield (posts, feeds) chunks as timeline pages arrive."""
         feeds: Dict[str, dict] = {}
         user["token_refreshed"] = False
 
-        async def main() -> None:
+        async def main(pages: asyncio.Queue) -> None:
             routes = RSSTagRoutes(self._config["settings"]["host_name"])
             selected_feed_ids = self._selected_following_ids(user, selection)
             home_enabled = self._home_enabled(user, selection)
             async with aiohttp.ClientSession(timeout=self._timeout) as session:
                 if home_enabled:
-                    await self._download_home(session, user, routes, feeds, posts)
+                    await self._download_home(session, user, routes, feeds, pages)
                 await self._download_following(
                     session,
                     user,
                     selected_feed_ids,
                     routes,
                     feeds,
-                    posts,
+                    pages,
                 )
 
-        asyncio.run(main())
-        yield posts, list(feeds.values())
+        yield from iter_chunks(iter_async_items(main), download_chunk_size(self._config))
@@ -3,11 +3,22 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
-from typing import Any, Iterable, Mapping
+from collections import Counter, defaultdict
+from typing import Any, Iterable, Mapping, Optional
 
+from rsstag.cooccurrence import keyword_pairs
 from rsstag.tasks import TASK_MARK, TASK_NOT_IN_PROCESSING
 
+POST_PROJECTION = {
+    "pid": True,
+    "read": True,
+    "id": True,
+    "tags": True,
+    "bi_grams": True,
+    "keywords": True,
+    "provider": True,
+}
+
 
 class ReadStateService:
     """Apply read/unread updates across grouped sentences and derived counters."""
@@ -20,6 +31,7 @@ class ReadStateService:
         letters: Any,
         tasks: Any,
         post_grouping: Any,
+        cooccurrence: Any = None,
     ) -> None:
         self._posts: Any = posts
         self._tags: Any = tags
@@ -27,6 +39,7 @@ class ReadStateService:
         self._letters: Any = letters
         self._tasks: Any = tasks
         self._post_grouping: Any = post_grouping
+        self._cooccurrence: Any = cooccurrence
         self._log = logging.getLogger("read_state")
 
     def mark_sentences(
@@ -42,7 +55,8 @@ class ReadStateService:
         left: marking a subset read updates the grouping doc alone, so no
         TASK_MARK is queued and the provider API is never called for a
         partially read post. `provider` is the session default, used only when
-        a post does not carry its own provider.
+        a post does not carry its own provider. Groupings, posts, tasks and
+        counters are each read and written once for all selected posts.
         """
 
         by_post: dict[str, list[int]] = defaultdict(list)
@@ -54,80 +68,123 @@ class ReadStateService:
             if sentence_indices:
                 by_post[post_id].extend(sentence_indices)
 
-        changed_posts: list[str] = []
+        all_read_by_post = self._post_grouping.update_snippets_read_statuses(
+            owner,
+            {post_id: sorted(set(indices)) for post_id, indices in by_post.items()},
+            readed,
+        )
+        posts = {}
+        if all_read_by_post:
+            for post in self._posts.get_by_pids(owner, list(all_read_by_post), POST_PROJECTION):
+                posts[post["pid"]] = post
+
+        to_change: list[Mapping[str, Any]] = []
         skipped_posts: list[str] = []
-        for post_id, sentence_indices in by_post.items():
-            all_read = self._post_grouping.update_snippets_read_status(
-                owner,
-                post_id,
-                sorted(set(sentence_indices)),
-                readed,
-            )
-            if all_read is None:
-                skipped_posts.append(post_id)
-                continue
-
-            post = self._posts.get_by_pid(
-                owner,
-                post_id,
-                {
-                    "pid": True,
-                    "read": True,
-                    "id": True,
-                    "tags": True,
-                    "bi_grams": True,
-                    "provider": True,
-                },
-            )
-            if not post:
+        for post_id in by_post:
+            post = posts.get(post_id)
+            if post_id not in all_read_by_post or not post:
                 skipped_posts.append(post_id)
                 continue
 
-            should_change_post = False
             if not readed:
                 should_change_post = bool(post.get("read"))
-            elif all_read and not post.get("read"):
-                should_change_post = True
+            else:
+                should_change_post = all_read_by_post[post_id] and not post.get("read")
+            if should_change_post:
+                to_change.append(post)
+
+        error = self._change_posts(owner, provider, to_change, readed)
+        if error:
+            return {"ok": False, "error": error}
+
+        return {
+            "ok": True,
+            "changed_posts": [post["pid"] for post in to_change],
+            "skipped_posts": skipped_posts,
+        }
+
+    def mark_posts(
+        self,
+        owner: str,
+        provider: str,
+        post_ids: list[Any],
+        readed: bool,
+    ) -> dict[str, Any]:
+        """Mark whole posts and all their grouped sentences read/unread.
 
-            if not should_change_post:
-                continue
+        Only posts whose read state changes are handed to their provider and
+        move the counters; the grouped sentences of every post are marked.
+        """
+        post_ids = list(dict.fromkeys(post_ids))
+        to_change = [
+            post
+            for post in self._posts.get_by_pids(owner, post_ids, POST_PROJECTION)
+            if post.get("read") != readed
+        ]
+        error = self._change_posts(owner, provider, to_change, readed)
+        if error:
+            return {"ok": False, "error": error}
+        self._post_grouping.mark_posts_sequences_read(owner, post_ids, readed)
+
+        return {"ok": True, "changed_posts": [post["pid"] for post in to_change]}
+
+    def _change_posts(
+        self,
+        owner: str,
+        provider: str,
+        posts: list[Mapping[str, Any]],
+        readed: bool,
+    ) -> Optional[str]:
+        """Queue one TASK_MARK for all posts and apply their counter deltas at once.
 
-            task_payload = [
-                {
-                    "user": owner,
-                    "id": post["id"],
-                    "status": readed,
-                    "processing": TASK_NOT_IN_PROCESSING,
-                    "type": TASK_MARK,
-                    # A user can hold posts from several providers, so the
-                    # post's own provider wins over the session default.
-                    "provider": post.get("provider") or provider,
-                }
-            ]
-            if not self._tasks.add_task(
-                {"type": TASK_MARK, "user": owner, "data": task_payload}
-            ):
-                self._log.warning(
-                    "Failed to enqueue mark task for owner=%s post_id=%s",
-                    owner,
-                    post_id,
-                )
-                return {"ok": False, "error": "Failed to queue mark task"}
-
-            changed = self._posts.change_status(owner, [post_id], readed)
-            tags, bi_grams, letters = self._collect_counters(post)
-            if changed and tags:
-                changed = self._tags.change_unread(owner, tags, readed)
-            if changed and bi_grams:
-                changed = self._bi_grams.change_unread(owner, bi_grams, readed)
-            if changed and letters:
-                self._letters.change_unread(owner, letters, readed)
-
-            if not changed:
-                return {"ok": False, "error": "Database error"}
-            changed_posts.append(post_id)
-
-        return {"ok": True, "changed_posts": changed_posts, "skipped_posts": skipped_posts}
+        Returns an error message, None on success.
+        """
+        if not posts:
+            return None
+
+        task_payload = [
+            {
+                "user": owner,
+                "id": post["id"],
+                "status": readed,
+                "processing": TASK_NOT_IN_PROCESSING,
+                "type": TASK_MARK,
+                # A user can hold posts from several providers, so the
+                # post's own provider wins over the session default.
+                "provider": post.get("provider") or provider,
+            }
+            for post in posts
+        ]
+        if not self._tasks.add_task({"type": TASK_MARK, "user": owner, "data": task_payload}):
+            self._log.warning(
+                "Failed to enqueue mark task for owner=%s posts=%s", owner, len(posts)
+            )
+            return "Failed to queue mark task"
+
+        tags: Counter = Counter()
+        bi_grams: Counter = Counter()
+        letters: Counter = Counter()
+        pairs: Counter = Counter()
+        for post in posts:
+            post_tags, post_bi_grams, post_letters = self._collect_counters(post)
+            tags.update(post_tags)
+            bi_grams.update(post_bi_grams)
+            letters.update(post_letters)
+            pairs.update(keyword_pairs(post.get("keywords", [])))
+
+        changed = self._posts.change_status(owner, [post["pid"] for post in posts], readed)
+        if changed and tags:
+            changed = self._tags.change_unread(owner, dict(tags), readed)
+        if changed and bi_grams:
+            changed = self._bi_grams.change_unread(owner, dict(bi_grams), readed)
+        if changed and letters:
+            self._letters.change_unread(owner, dict(letters), readed)
+        if changed and pairs and self._cooccurrence is not None:
+            self._cooccurrence.change_unread(owner, dict(pairs), readed)
+
+        if not changed:
+            return "Database error"
+        return None
 
     @staticmethod
     def _normalize_indices(values: Any) -> list[int]:
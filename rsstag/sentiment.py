@@ -19,6 +19,8 @@ SENTIMENT = SentimentsList(
     positive_negative="positive/negative",
 )
 
+AFFECTS = ("anger", "disgust", "fear", "joy", "sadness", "surprise")
+
 
 class SentimentConverter:
     """
@@ -80,6 +82,9 @@ class RuSentiLex:
     def get_sentiment(self, word: str) -> List[str]:
         return list(self._sentiments[word])
 
+    def words(self) -> List[str]:
+        return [word for word, sentiments in self._sentiments.items() if sentiments]
+
     def sentiment_validation(
         self, strings: List[str], splitter: str, comment_symbol: str
     ) -> List[str]:
@@ -120,7 +125,7 @@ class WordNetAffectRuRom:
         self._all_by_id = {}
         self._search_index = {}
         self.log = logging.getLogger("WordNetAffectRuRomVer2")
-        self._affects_list = ["anger", "disgust", "fear", "joy", "sadness", "surprise"]
+        self._affects_list = list(AFFECTS)
         self._ids_key = "_"
 
     def load_dicts_from_dir(self, dir: str) -> None:
@@ -195,6 +200,9 @@ class WordNetAffectRuRom:
 
         return list(affects)
 
+    def words(self) -> List[str]:
+        return list(self._by_word)
+
     def get_info_by_word(self, word: str) -> List[dict]:
         """Return all info about given word"""
         info = []
@@ -0,0 +1,269 @@
+"""Compiled word -> sentiment lookup for the tags sentiment task.
+
+``make_tags_sentiment`` parsed the RuSentiLex file and the six WordNet-Affect
+files on every run, then looked every tag up in the three dictionaries and
+converted affects to sentiments. ``compile_sentiment_lexicon`` does that once
+for every word of the sources, and ``SentimentLexicon`` keeps the result as
+one file: the distinct words sorted by their utf-8 bytes and concatenated,
+an offsets array, a sentiment bit mask per word and an open addressing
+table of word numbers by crc32, so a lookup probes a memory mapped buffer
+without decoding it. Worker processes map the same file, sharing its pages,
+and ``load_sentiment_lexicon`` compiles it again when the size or mtime of
+a source changed.
+
+Layout: ``MAGIC``, uint32 header length, JSON header (version, sources,
+words count, slots) padded to 4 bytes, uint32 offsets (count + 1), uint32
+slots (word number + 1, 0 is empty), uint8 masks (count), words. Integers
+are little endian.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from rsstag.sentiment import (
+    AFFECTS,
+    SENTIMENT,
+    RuSentiLex,
+    SentimentConverter,
+    WordNetAffectRuRom,
+)
+
+MAGIC = b"RSTSENT1"
+SENTIMENT_LEXICON_FILE_VERSION = 1
+_LENGTH = struct.Struct("<I")
+# Sorted labels of every mask, bit i is SENTIMENT[i]
+_LABELS = tuple(
+    sorted(label for i, label in enumerate(SENTIMENT) if mask & (1 << i))
+    for mask in range(1 << len(SENTIMENT))
+)
+_MASKS = {label: 1 << i for i, label in enumerate(SENTIMENT)}
+
+
+def _uint32_view(buffer: memoryview) -> Sequence[int]:
+    if sys.byteorder == "little":
+        return buffer.cast("I")
+    values = array("I")
+    values.frombytes(buffer)
+    values.byteswap()
+    return values
+
+
+def _uint32_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array("I", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class SentimentLexicon:
+    """Sentiment labels of words, read from a compiled lexicon buffer."""
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        view = memoryview(buffer)
+        if bytes(view[: len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a sentiment lexicon")
+        start = len(MAGIC) + _LENGTH.size
+        (header_length,) = _LENGTH.unpack_from(view, len(MAGIC))
+        self.header: Dict[str, Any] = json.loads(bytes(view[start : start + header_length]))
+        if self.header.get("version") != SENTIMENT_LEXICON_FILE_VERSION:
+            raise ValueError(f"Unsupported sentiment lexicon version: {self.header.get('version')}")
+        count = int(self.header["count"])
+        slots = int(self.header["slots"])
+        start += header_length
+        self._offsets = _uint32_view(view[start : start + (count + 1) * 4])
+        start += (count + 1) * 4
+        self._slots = _uint32_view(view[start : start + slots * 4])
+        start += slots * 4
+        self._masks = view[start : start + count]
+        start += count
+        self._words = view[start : start + self._offsets[count]]
+        self._count = count
+        self._slots_mask = slots - 1
+        self._buffer = buffer
+
+    @staticmethod
+    def build(sentiments: Dict[str, Iterable[str]], sources: Optional[list] = None) -> bytes:
+        """Serialize words and their sentiment labels, unknown labels are dropped."""
+        encoded = sorted(
+            (word.encode("utf-8"), sum({_MASKS[label] for label in labels if label in _MASKS}))
+            for word, labels in sentiments.items()
+        )
+        encoded = [(word, mask) for word, mask in encoded if mask]
+        # At most half full, so probes stay short
+        slots_count = 1
+        while slots_count < len(encoded) * 2:
+            slots_count *= 2
+        header = json.dumps(
+            {
+                "version": SENTIMENT_LEXICON_FILE_VERSION,
+                "sources": sources or [],
+                "count": len(encoded),
+                "slots": slots_count,
+            }
+        ).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + _LENGTH.size + len(header)) % 4)
+        offsets = array("I", [0])
+        slots = array("I", bytes(slots_count * 4))
+        for number, (word, _) in enumerate(encoded):
+            offsets.append(offsets[-1] + len(word))
+            slot = zlib.crc32(word) & (slots_count - 1)
+            while slots[slot]:
+                slot = (slot + 1) & (slots_count - 1)
+            slots[slot] = number + 1
+        return b"".join(
+            [
+                MAGIC,
+                _LENGTH.pack(len(header)),
+                header,
+                _uint32_bytes(offsets),
+                _uint32_bytes(slots),
+                bytes(mask for _, mask in encoded),
+                b"".join(word for word, _ in encoded),
+            ]
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, word: str) -> List[str]:
+        """Sorted sentiment labels of ``word``, empty if it has none."""
+        key = word.encode("utf-8")
+        offsets = self._offsets
+        slot = zlib.crc32(key) & self._slots_mask
+        while True:
+            number = self._slots[slot]
+            if not number:
+                return []
+            number -= 1
+            if self._words[offsets[number] : offsets[number + 1]] == key:
+                return list(_LABELS[self._masks[number]])
+            slot = (slot + 1) & self._slots_mask
+
+
+def lexicon_sources(sentilex_path: str, wordnet_dir: str) -> List[str]:
+    """Files a lexicon is compiled from, the WordNet-Affect ones if present."""
+    paths = [os.path.abspath(sentilex_path)]
+    for affect in AFFECTS:
+        path = os.path.abspath(os.path.join(wordnet_dir, f"{affect}.txt"))
+        if os.path.exists(path):
+            paths.append(path)
+    return paths
+
+
+def sources_signature(paths: Iterable[str]) -> list:
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append([path, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def compile_sentiment_lexicon(
+    sentilex_path: str, wordnet_dir: str
+) -> Optional[Dict[str, List[str]]]:
+    """Sentiments of every word of the sources, None if RuSentiLex is invalid.
+
+    A word takes its RuSentiLex sentiments, else the converted affects of
+    the english WordNet-Affect words, else of the russian ones.
+    """
+    with open(sentilex_path, "r", encoding="utf-8") as f:
+        strings = f.read().splitlines()
+    ru_sent = RuSentiLex()
+    wrong = ru_sent.sentiment_validation(strings, ",", "!")
+    if wrong:
+        logging.warning("Wrong sentiments in %s: %s", sentilex_path, wrong[:5])
+        return None
+    ru_sent.load(strings, ",", "!")
+    wn_en = WordNetAffectRuRom("en", 4)
+    wn_en.load_dicts_from_dir(wordnet_dir)
+    wn_ru = WordNetAffectRuRom("ru", 4)
+    wn_ru.load_dicts_from_dir(wordnet_dir)
+    conv = SentimentConverter()
+
+    sentiments: Dict[str, List[str]] = {}
+    for word in set(ru_sent.words()) | set(wn_en.words()) | set(wn_ru.words()):
+        sentiment = ru_sent.get_sentiment(word)
+        if not sentiment:
+            affects = wn_en.get_affects_by_word(word)
+            if not affects:
+                affects = wn_ru.get_affects_by_word(word)
+            if affects:
+                sentiment = conv.convert_sentiment(affects)
+        if sentiment:
+            sentiments[word] = sorted(set(sentiment))
+    return sentiments
+
+
+def _open(path: str, signature: list) -> Optional[SentimentLexicon]:
+    """Map a compiled lexicon file, None if missing, unreadable or stale."""
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        lexicon = SentimentLexicon(buffer)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning("Can`t read sentiment lexicon %s. Info: %s", path, e)
+        return None
+    if lexicon.header.get("sources") != signature:
+        return None
+    return lexicon
+
+
+def _write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+_lexicon: Optional[SentimentLexicon] = None
+_lexicon_lock = threading.Lock()
+
+
+def load_sentiment_lexicon(config: dict) -> Optional[SentimentLexicon]:
+    """The process lexicon, compiled from ``sentilex`` and ``lilu_wordnet``.
+
+    It is mapped from ``sentiment_lexicon_path`` and compiled there again
+    when the sources changed; with an empty path it's compiled in memory.
+    None if the sources are invalid.
+    """
+    global _lexicon
+    settings: dict = config.get("settings", {})
+    sentilex_path = str(settings["sentilex"])
+    wordnet_dir = str(settings["lilu_wordnet"])
+    path = str(settings.get("sentiment_lexicon_path", "") or "").strip()
+    signature = sources_signature(lexicon_sources(sentilex_path, wordnet_dir))
+    with _lexicon_lock:
+        if _lexicon is not None and _lexicon.header.get("sources") == signature:
+            return _lexicon
+        lexicon = _open(path, signature) if path else None
+        if lexicon is None:
+            sentiments = compile_sentiment_lexicon(sentilex_path, wordnet_dir)
+            if sentiments is None:
+                return None
+            data = SentimentLexicon.build(sentiments, signature)
+            if path:
+                try:
+                    _write(path, data)
+                    logging.info("Compiled %d sentiment words to %s", len(sentiments), path)
+                except Exception as e:
+                    logging.warning("Can`t save sentiment lexicon %s. Info: %s", path, e)
+            lexicon = SentimentLexicon(data)
+        _lexicon = lexicon
+        return _lexicon
@@ -0,0 +1,212 @@
+"""Process-wide word -> stem cache shared by the stemming call sites.
+
+``TagsBuilder`` used an ``lru_cache(maxsize=5128)`` on a bound method: one
+small cache per builder instance, so web handlers that build a fresh
+``TagsBuilder`` per request never hit it and workers lost it on restart.
+``stem_cache`` replaces it with one large bounded table per stemming scheme
+that every builder/extractor in the process reads through, and that can be
+saved to and preloaded from a file.
+
+Tables are keyed by scheme because the call sites do not stem the same way:
+``TagsBuilder.process_word_`` applies its own rules on top of Snowball, while
+``RssTagEntityExtractor`` uses Snowball for Russian and Porter for English.
+"""
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+STEMS_TAGS = "tags"
+STEMS_RU = "snowball_ru"
+STEMS_EN = "porter_en"
+
+DEFAULT_STEM_CACHE_SIZE = 500000
+STEM_CACHE_FILE_VERSION = 1
+
+
+class StemTable:
+    """Bounded word -> stem map for one stemming scheme.
+
+    Eviction is FIFO by insertion rather than LRU: a hit then costs a single
+    dict lookup, and with a capacity sized to the whole vocabulary eviction is
+    rare anyway. Individual dict operations are atomic under the GIL, so
+    concurrent web threads only risk an occasional redundant stem.
+    """
+
+    __slots__ = ("capacity", "hits", "misses", "_stems")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+        self._stems: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._stems)
+
+    def get(self, word: str, stem: Callable[[str], str]) -> str:
+        """Return the cached stem of ``word``, computing it with ``stem``."""
+        cached: Optional[str] = self._stems.get(word)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        value = stem(word)
+        self.put(word, value)
+        return value
+
+    def put(self, word: str, value: str) -> None:
+        stems = self._stems
+        if len(stems) >= self.capacity:
+            try:
+                del stems[next(iter(stems))]
+            except (KeyError, RuntimeError, StopIteration):
+                pass
+        stems[word] = value
+
+    def items(self) -> Dict[str, str]:
+        return dict(self._stems)
+
+    def clear(self) -> None:
+        self._stems.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class StemCache:
+    """All stem tables of the process, plus their persistence."""
+
+    def __init__(self, capacity: int = DEFAULT_STEM_CACHE_SIZE) -> None:
+        self._capacity: int = capacity
+        self._tables: Dict[str, StemTable] = {}
+        self._lock = threading.Lock()
+        self._log = logging.getLogger("stem_cache")
+
+    def table(self, name: str) -> StemTable:
+        table = self._tables.get(name)
+        if table is None:
+            with self._lock:
+                table = self._tables.setdefault(name, StemTable(self._capacity))
+        return table
+
+    def configure(self, capacity: int) -> None:
+        """Resize every table; shrinking drops the oldest entries."""
+        self._capacity = max(1, capacity)
+        for table in list(self._tables.values()):
+            table.capacity = self._capacity
+            items = table.items()
+            if len(items) > self._capacity:
+                table.clear()
+                for word, value in list(items.items())[-self._capacity :]:
+                    table.put(word, value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"hits": table.hits, "misses": table.misses, "size": len(table)}
+            for name, table in list(self._tables.items())
+        }
+
+    def _read(self, path: str) -> Dict[str, Dict[str, str]]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != STEM_CACHE_FILE_VERSION:
+            self._log.warning("Ignoring stem cache %s with unknown version", path)
+            return {}
+        return data.get("tables", {})
+
+    def load(self, path: str) -> int:
+        """Preload tables from ``path``. Returns the number of stems loaded."""
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            tables = self._read(path)
+        except Exception as e:
+            self._log.warning("Can`t load stem cache %s. Info: %s", path, e)
+            return 0
+        loaded = 0
+        for name, stems in tables.items():
+            table = self.table(name)
+            for word, value in stems.items():
+                table.put(word, value)
+                loaded += 1
+        return loaded
+
+    def save(self, path: str) -> bool:
+        """Write the tables to ``path``, keeping stems other processes saved.
+
+        Several worker processes share one file, so entries already on disk are
+        merged in (bounded by capacity) and the file is replaced atomically.
+        """
+        if not path:
+            return False
+        try:
+            on_disk: Dict[str, Dict[str, str]] = {}
+            if os.path.exists(path):
+                try:
+                    on_disk = self._read(path)
+                except Exception as e:
+                    self._log.warning("Overwriting unreadable stem cache %s: %s", path, e)
+            tables: Dict[str, Dict[str, str]] = {}
+            for name in set(on_disk) | set(self._tables):
+                merged = dict(on_disk.get(name, {}))
+                if name in self._tables:
+                    merged.update(self._tables[name].items())
+                if len(merged) > self._capacity:
+                    merged = dict(list(merged.items())[-self._capacity :])
+                tables[name] = merged
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf-8") as f:
+                    json.dump(
+                        {"version": STEM_CACHE_FILE_VERSION, "tables": tables},
+                        f,
+                        ensure_ascii=False,
+                    )
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            return True
+        except Exception as e:
+            self._log.warning("Can`t save stem cache %s. Info: %s", path, e)
+            return False
+
+
+def stem_cache_settings(config: dict) -> Dict[str, object]:
+    """``stem_cache_size`` / ``stem_cache_path`` from the settings section."""
+    settings: dict = config.get("settings", {})
+    raw_size = settings.get("stem_cache_size", DEFAULT_STEM_CACHE_SIZE)
+    try:
+        size = int(raw_size)
+    except (TypeError, ValueError):
+        logging.warning(
+            "Invalid stem_cache_size=%r, using %d", raw_size, DEFAULT_STEM_CACHE_SIZE
+        )
+        size = DEFAULT_STEM_CACHE_SIZE
+    if size <= 0:
+        size = DEFAULT_STEM_CACHE_SIZE
+    return {"size": size, "path": str(settings.get("stem_cache_path", "") or "").strip()}
+
+
+def init_stem_cache(config: dict) -> None:
+    """Size the process cache from config and preload its saved stems."""
+    settings = stem_cache_settings(config)
+    stem_cache.configure(int(settings["size"]))
+    loaded = stem_cache.load(str(settings["path"]))
+    if loaded:
+        logging.info("Preloaded %d stems from %s", loaded, settings["path"])
+
+
+def save_stem_cache(config: dict) -> None:
+    path = str(stem_cache_settings(config)["path"])
+    if path:
+        stem_cache.save(path)
+
+
+stem_cache = StemCache()
@@ -1,7 +1,9 @@
 import logging
 from collections import defaultdict
 from typing import Optional, List, Iterator
-from pymongo import MongoClient, DESCENDING, UpdateOne
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+
+from rsstag.indexes import create_compound_indexes
 
 
 class RssTagTags:
@@ -26,6 +28,7 @@ class RssTagTags:
                 self._log.warning(
                     "Can`t create index %s. May be already exists. Info: %s", index, e
                 )
+        create_compound_indexes(self._db.tags, "tags", self._log)
 
     def get_by_tag(self, owner: str, tag: str) -> Optional[dict]:
         query = {"owner": owner, "tag": tag}
@@ -83,6 +86,27 @@ class RssTagTags:
 
         return self._db.tags.find(query, **params).allow_disk_use(True).sort(sort_data)
 
+    def get_by_df(
+        self,
+        owner: str,
+        only_unread: Optional[bool] = None,
+        min_unread: int = 0,
+        projection: Optional[dict] = None,
+    ) -> Iterator[dict]:
+        """Tags from the rarest up, by posts (or unread posts) count.
+
+        That is descending IDF: ``posts_count``/``unread_count`` is the
+        document frequency of the tag over all (or unread) posts.
+        """
+        df_field = "unread_count" if only_unread else "posts_count"
+        query = {"owner": owner, df_field: {"$gt": 0}}
+        if min_unread > 0:
+            query["unread_count"] = {"$gte": min_unread}
+
+        return self._db.tags.find(query, projection=projection).sort(
+            df_field, ASCENDING
+        )
+
     def count(
         self,
         owner: str,
@@ -146,6 +170,16 @@ class RssTagTags:
 
         return True
 
+    def add_sentiments(self, owner: str, sentiments: dict) -> bool:
+        updates = [
+            UpdateOne({"owner": owner, "tag": tag}, {"$set": {"sentiment": sentiment}})
+            for tag, sentiment in sentiments.items()
+        ]
+        if updates:
+            self._db.tags.bulk_write(updates, ordered=False)
+
+        return True
+
     def get_sentiments(self, owner: str, only_unread: bool) -> tuple:
         query = {"owner": owner, "sentiment": {"$exists": True}}
         if only_unread:
@@ -2,17 +2,26 @@
 
 import re
 import logging
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import List, Dict
+
+import numpy as np
 from nltk.stem import SnowballStemmer
 from rsstag.stopwords import stopwords
-from functools import lru_cache
+from rsstag.stem_cache import STEMS_TAGS, stem_cache
+
+
+ENGINE_PYTHON = "python"
+ENGINE_NUMPY = "numpy"
+ENGINES = (ENGINE_PYTHON, ENGINE_NUMPY)
 
 
 class TagsBuilder:
     """Build tags from text. Support languages: english, russian"""
 
-    def __init__(self, text_clean_re: str = r"[^\w\d ]") -> None:
+    def __init__(
+        self, text_clean_re: str = r"[^\w\d ]", engine: str = ENGINE_PYTHON
+    ) -> None:
         self.purge()
         """self._text = ''
         self._prepared_text = ''
@@ -28,6 +37,11 @@ class TagsBuilder:
         self._stopwords = None
         self._log = logging.getLogger("TagsBuilder")
         self._window = 2
+        if engine not in ENGINES:
+            self._log.warning("Unknown tags engine %r, using %s", engine, ENGINE_PYTHON)
+            engine = ENGINE_PYTHON
+        self._engine = engine
+        self._stems = stem_cache.table(STEMS_TAGS)
 
     def purge(self) -> None:
         """Clear state"""
@@ -48,11 +62,10 @@ class TagsBuilder:
         return words
 
     def process_word(self, current_word: str) -> str:
-        return self.process_word_(current_word.strip().casefold())
+        return self._stems.get(current_word.strip().casefold(), self.process_word_)
 
-    @lru_cache(maxsize=5128)
     def process_word_(self, current_word: str) -> str:
-        """Make tag/token from gven word"""
+        """Make tag/token from gven word. Uncached, use process_word"""
         tag = ""
         try:
             word_length = len(current_word)
@@ -120,6 +133,9 @@ class TagsBuilder:
 
     def build_tags_and_bi_grams(self, text: str) -> None:
         """Build tags and words from text"""
+        if self._engine == ENGINE_NUMPY:
+            self._build_tags_and_bi_grams_np(text)
+            return
         self._text = text
         words = self.text2words(text)
         if not words:
@@ -159,6 +175,73 @@ class TagsBuilder:
                     self._bi_grams_words[bi_gram].add(bi_word)
         self._prepared_text = " ".join(lemmas)
 
+    def _build_tags_and_bi_grams_np(self, text: str) -> None:
+        """Same result as the python engine, pairs built with array operations.
+
+        Every distinct word is stemmed once and stems get integer ids in sorted
+        order, so ``min``/``max`` of two ids gives the sorted bi-gram key. The
+        window neighbours of all words form a ``(words, 2 * window)`` matrix
+        laid out in the python engine's visiting order, which keeps "first
+        occurrence in the post" - and so dict order and bi-gram words - the same.
+        """
+        self._text = text
+        words = self.text2words(text)
+        if not words:
+            return
+        word_tags = {word: self.process_word(word) for word in dict.fromkeys(words)}
+        tags = [word_tags[word] for word in words]
+        lemmas = [tag for tag in tags if tag]
+        for tag, freq in Counter(lemmas).items():
+            self._tags[tag] += freq
+        for word, tag in word_tags.items():
+            if tag:
+                self._words[tag].add(word)
+        self._prepared_text = " ".join(lemmas)
+        if len(words) < 2:
+            return
+
+        uniq_tags, tag_ids = np.unique(np.array(tags, dtype=object), return_inverse=True)
+        tag_ids = tag_ids.astype(np.int64)
+        count = len(words)
+        positions = np.arange(count)
+        # Column order per word: -1, +1, -2, +2, ... like the python loop.
+        offsets = np.array(
+            [sign * i for i in range(1, self._window + 1) for sign in (-1, 1)]
+        )
+        neighbours = positions[:, None] + offsets[None, :]
+        valid = (neighbours >= 0) & (neighbours < count)
+        if len(lemmas) < count:
+            # process_word failed on some words: they are not centers, and as
+            # neighbours they are logged and skipped.
+            has_tag = np.fromiter((bool(tag) for tag in tags), dtype=bool, count=count)
+            valid &= has_tag[:, None]
+            empty_neighbours = valid & ~has_tag[np.clip(neighbours, 0, count - 1)]
+            for pos in np.nonzero(empty_neighbours.any(axis=1))[0]:
+                for bi_pos in neighbours[pos][empty_neighbours[pos]]:
+                    logging.error("Bigram bug: %s - %s", words[bi_pos], tags[bi_pos])
+            valid &= ~empty_neighbours
+        centers = np.broadcast_to(positions[:, None], neighbours.shape)[valid]
+        neighbours = neighbours[valid]
+        first_ids = tag_ids[centers]
+        second_ids = tag_ids[neighbours]
+        pair_codes = np.minimum(first_ids, second_ids) * len(uniq_tags) + np.maximum(
+            first_ids, second_ids
+        )
+        _, first_seen = np.unique(pair_codes, return_index=True)
+        first_seen.sort()
+        for pos, bi_pos in zip(
+            centers[first_seen].tolist(), neighbours[first_seen].tolist()
+        ):
+            word = words[pos]
+            bi_word = words[bi_pos]
+            tag = tags[pos]
+            bi_tag = tags[bi_pos]
+            bi_gram = tag + " " + bi_tag if tag <= bi_tag else bi_tag + " " + tag
+            if bi_gram not in self._bi_grams:
+                self._bi_grams[bi_gram] = {tag, bi_tag}
+            self._bi_grams_words[bi_gram].add(word)
+            self._bi_grams_words[bi_gram].add(bi_word)
+
     def get_prepared_text(self) -> str:
         """Get text prepared for Doc2Vec"""
         return self._prepared_text
@@ -29,6 +29,8 @@ from typing import Any, Dict, Optional
 from pymongo import ReturnDocument
 from pymongo.database import Database
 
+from rsstag.task_wakeup import ENQUEUED_AT_FIELD, notify_new_task
+
 TASK_STATUS_PENDING = "pending"
 TASK_STATUS_RUNNING = "running"
 TASK_STATUS_PAUSED = "paused"
@@ -177,10 +179,14 @@ class TaskStateMachine:
                         "status": TASK_STATUS_PENDING,
                         "processing": LEGACY_PROCESSING_IDLE,
                         "updated_at": now,
+                        ENQUEUED_AT_FIELD: now,
                     },
                     "$unset": {"worker_id": "", "lease_until": ""},
                 },
             )
+            if result.modified_count:
+                # The rest of the batch is work for any idle worker
+                notify_new_task()
             return result.matched_count > 0
         except Exception as e:
             self._log.error("Can`t release task %s. Info: %s", task_id, e)
@@ -294,6 +300,7 @@ class TaskStateMachine:
                         "attempts": 0,
                         "backoff_until": 0.0,
                         "updated_at": now,
+                        ENQUEUED_AT_FIELD: now,
                     },
                     "$unset": {
                         "worker_id": "",
@@ -306,6 +313,7 @@ class TaskStateMachine:
                 },
                 upsert=True,
             )
+            notify_new_task()
             return True
         except Exception as e:
             self._log.error("Can`t enqueue task %s. Info: %s", key, e)
@@ -356,6 +364,7 @@ class TaskStateMachine:
                         "attempts": 0,
                         "backoff_until": 0.0,
                         "updated_at": now,
+                        ENQUEUED_AT_FIELD: now,
                     },
                     "$unset": {
                         "failed": "",
@@ -367,6 +376,8 @@ class TaskStateMachine:
                     },
                 },
             )
+            if result.modified_count:
+                notify_new_task()
             return int(result.modified_count)
         except Exception as e:
             self._log.error("Can`t resume tasks for user %s. Info: %s", user, e)
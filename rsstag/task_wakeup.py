@@ -0,0 +1,255 @@
+"""Wakeup channel between task producers and idle workers.
+
+Idle workers used to sleep a random 3-8 seconds between ``get_task`` polls, so
+a freshly queued task waited that long before anyone looked at it and every
+idle worker kept querying ``tasks``. A worker now blocks on a listener that
+returns as soon as new work is enqueued, and only re-polls on its own after
+``task_wakeup_max_wait_seconds`` so backoff/lease expiry is still noticed.
+
+Listeners, picked by the ``task_wakeup`` setting:
+    - ``change_stream``: a Mongo change stream on ``tasks`` matching inserts
+      and enqueue writes (the ``enqueued_at`` field). Needs a replica set.
+    - ``socket``: a per-worker unix datagram socket in ``task_wakeup_dir``.
+      Producers (web process, other workers) call ``notify_new_task`` which
+      pings every socket in the directory.
+    - ``auto`` (default): ``change_stream`` when the server supports it,
+      ``socket`` otherwise. A worker can't tell whether producers share its
+      socket directory (e.g. web and worker in separate containers), so the
+      ``auto`` socket fallback still re-polls every few seconds.
+    - ``off``: the old sleep-polling.
+
+Listeners keep the stream/socket open between waits, so a signal sent while a
+worker is busy is not lost: the next ``wait`` returns immediately.
+"""
+
+import logging
+import os
+import socket
+import tempfile
+import time
+from random import randint
+from typing import Any, Dict, Optional
+
+from pymongo.errors import PyMongoError
+
+WAKEUP_MODE_AUTO = "auto"
+WAKEUP_MODE_CHANGE_STREAM = "change_stream"
+WAKEUP_MODE_SOCKET = "socket"
+WAKEUP_MODE_OFF = "off"
+WAKEUP_MODES = {
+    WAKEUP_MODE_AUTO,
+    WAKEUP_MODE_CHANGE_STREAM,
+    WAKEUP_MODE_SOCKET,
+    WAKEUP_MODE_OFF,
+}
+
+DEFAULT_WAKEUP_DIR = os.path.join(tempfile.gettempdir(), "rsstag-wakeup")
+DEFAULT_WAKEUP_MAX_WAIT_SECONDS = 30.0
+# Longest wait of the ``auto`` socket fallback, as the old sleep-polling
+AUTO_SOCKET_MAX_WAIT_SECONDS = 8.0
+# How long a single change stream getMore blocks; bounds how late a wait
+# notices its own deadline.
+CHANGE_STREAM_AWAIT_MS = 1000
+SOCKET_SUFFIX = ".sock"
+# Stamped by ``TaskStateMachine.enqueue`` and ``release`` so change streams
+# can tell work waiting for a worker apart from claim/lease churn on the doc.
+ENQUEUED_AT_FIELD = "enqueued_at"
+
+_log = logging.getLogger("task_wakeup")
+# Directory producers ping in ``notify_new_task``. None until the process
+# calls ``configure_task_wakeup``, so library use without a config stays a
+# no-op.
+_notify_dir: Optional[str] = None
+
+
+def _wakeup_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    settings: Dict[str, Any] = config.get("settings", {})
+    mode: str = str(settings.get("task_wakeup", WAKEUP_MODE_AUTO)).strip().lower()
+    if mode not in WAKEUP_MODES:
+        _log.warning("Unknown task_wakeup=%r, using %s", mode, WAKEUP_MODE_AUTO)
+        mode = WAKEUP_MODE_AUTO
+    raw_wait: Any = settings.get(
+        "task_wakeup_max_wait_seconds", DEFAULT_WAKEUP_MAX_WAIT_SECONDS
+    )
+    try:
+        max_wait = float(raw_wait)
+    except (TypeError, ValueError):
+        _log.warning(
+            "Invalid task_wakeup_max_wait_seconds=%r, using %.1f",
+            raw_wait,
+            DEFAULT_WAKEUP_MAX_WAIT_SECONDS,
+        )
+        max_wait = DEFAULT_WAKEUP_MAX_WAIT_SECONDS
+    if max_wait <= 0:
+        max_wait = DEFAULT_WAKEUP_MAX_WAIT_SECONDS
+
+    return {
+        "mode": mode,
+        "dir": settings.get("task_wakeup_dir") or DEFAULT_WAKEUP_DIR,
+        "max_wait": max_wait,
+    }
+
+
+def configure_task_wakeup(config: Dict[str, Any]) -> None:
+    """Let this process signal idle workers whenever it enqueues a task."""
+    global _notify_dir
+    wakeup = _wakeup_settings(config)
+    if wakeup["mode"] == WAKEUP_MODE_OFF or not hasattr(socket, "AF_UNIX"):
+        _notify_dir = None
+    else:
+        _notify_dir = wakeup["dir"]
+
+
+def notify_new_task() -> None:
+    """Wake every worker listening on the local socket directory.
+
+    Best effort: a missing directory means no socket listeners, and a socket
+    whose worker is gone is removed so the directory does not grow forever.
+    """
+    if not _notify_dir:
+        return
+    try:
+        names = os.listdir(_notify_dir)
+    except OSError:
+        return
+
+    sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sender.setblocking(False)
+    try:
+        for name in names:
+            if not name.endswith(SOCKET_SUFFIX):
+                continue
+            path = os.path.join(_notify_dir, name)
+            try:
+                sender.sendto(b"1", path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                # Full receive buffer: that worker already has a wakeup pending.
+                pass
+    finally:
+        sender.close()
+
+
+class SleepWakeup:
+    """Legacy behaviour: sleep a random interval, never woken early."""
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        time.sleep(timeout if timeout is not None else randint(3, 8))
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+class SocketWakeup:
+    """Blocks on a per-process unix datagram socket pinged by producers."""
+
+    def __init__(self, wakeup_dir: str, max_wait: float) -> None:
+        os.makedirs(wakeup_dir, exist_ok=True)
+        self._path: str = os.path.join(wakeup_dir, f"{os.getpid()}{SOCKET_SUFFIX}")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self._path)
+        self._max_wait: float = max_wait
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._sock.settimeout(self._max_wait if timeout is None else timeout)
+        try:
+            self._sock.recv(16)
+        except socket.timeout:
+            return False
+        # Collapse a burst of enqueues into a single wakeup.
+        self._sock.setblocking(False)
+        try:
+            while True:
+                self._sock.recv(16)
+        except (BlockingIOError, InterruptedError):
+            pass
+        return True
+
+    def close(self) -> None:
+        self._sock.close()
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+
+class ChangeStreamWakeup:
+    """Blocks on a change stream over ``tasks`` for newly enqueued work."""
+
+    def __init__(self, collection: Any, max_wait: float) -> None:
+        self._collection = collection
+        self._max_wait: float = max_wait
+        self._stream = self._open()
+
+    def _open(self) -> Any:
+        pipeline = [
+            {
+                "$match": {
+                    "$or": [
+                        {"operationType": "insert"},
+                        {
+                            f"updateDescription.updatedFields.{ENQUEUED_AT_FIELD}": {
+                                "$exists": True
+                            }
+                        },
+                    ]
+                }
+            }
+        ]
+        return self._collection.watch(
+            pipeline, max_await_time_ms=CHANGE_STREAM_AWAIT_MS
+        )
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + (self._max_wait if timeout is None else timeout)
+        try:
+            if self._stream is None:
+                self._stream = self._open()
+            while True:
+                if self._stream.try_next() is not None:
+                    return True
+                if time.monotonic() >= deadline:
+                    return False
+        except PyMongoError as e:
+            _log.warning("Task change stream failed, will reopen. Info: %s", e)
+            self._stream = None
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            return False
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+def open_task_wakeup(db: Any, config: Dict[str, Any]) -> Any:
+    """Build the listener an idle worker blocks on between polls."""
+    wakeup = _wakeup_settings(config)
+    mode: str = wakeup["mode"]
+    if mode in (WAKEUP_MODE_AUTO, WAKEUP_MODE_CHANGE_STREAM):
+        try:
+            return ChangeStreamWakeup(db.tasks, wakeup["max_wait"])
+        except PyMongoError as e:
+            # Standalone servers reject $changeStream.
+            _log.info("Task change streams unavailable. Info: %s", e)
+            if mode == WAKEUP_MODE_CHANGE_STREAM:
+                _log.warning("task_wakeup=change_stream unavailable, falling back")
+    if mode != WAKEUP_MODE_OFF and hasattr(socket, "AF_UNIX"):
+        max_wait: float = wakeup["max_wait"]
+        if mode == WAKEUP_MODE_AUTO:
+            max_wait = min(max_wait, AUTO_SOCKET_MAX_WAIT_SECONDS)
+        try:
+            return SocketWakeup(wakeup["dir"], max_wait)
+        except OSError as e:
+            _log.warning(
+                "Can`t open task wakeup socket in %s. Info: %s", wakeup["dir"], e
+            )
+
+    return SleepWakeup()
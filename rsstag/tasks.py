@@ -1,6 +1,6 @@
 import logging
 import time
-import gzip
+import uuid
 from typing import Optional, List, Dict, Any, Set, Tuple, Callable
 from rsstag.users import RssTagUsers
 from pymongo import MongoClient, UpdateOne, ReturnDocument
@@ -17,6 +17,8 @@ from rsstag.task_state import (
     TASK_STATUS_DEAD,
     DEFAULT_LEASE_SECONDS,
 )
+from rsstag.task_wakeup import notify_new_task
+from rsstag.text_codec import decode_text, pending_recode_query
 
 TASK_ALL = -1
 TASK_NOOP = 0
@@ -52,6 +54,9 @@ TASK_TAGS_TOPICS = 30
 TASK_POST_QUALITY = 31
 TASK_SOURCE_QUALITY = 32
 TASK_FEEDS_LIST = 33
+TASK_RECODE_POSTS = 34
+TASK_PREFIX_INDEX = 35
+TASK_TAG_COOCCURRENCE = 36
 
 SCOPE_MODE_ALL = "all"
 SCOPE_MODE_POSTS = "posts"
@@ -149,6 +154,9 @@ POST_GROUPING_NOT_IN_PROCESSING = 0
 # An item-level ``processing`` lock (posts/tags/bi_grams) older than this is
 # considered leaked by a crashed worker and becomes claimable again.
 ITEM_LOCK_MAX_AGE_SECONDS = 3600.0
+# Per-batch token written next to ``processing`` by ``claim_items`` so a
+# worker can read back exactly the items its own claim locked.
+ITEM_CLAIM_FIELD = "claim_token"
 MAX_EXTERNAL_ERROR_LENGTH = 1000
 MAX_TOPIC_MERGE_FAILED_ATTEMPTS = 3
 EXTERNAL_WORKER_ALLOWED_TASK_TYPES: Set[int] = {
@@ -187,6 +195,8 @@ TASK_LEASE_SECONDS: Dict[int, float] = {
     TASK_ANTHOLOGY: 3600.0,
     TASK_TAGS_TOPICS: 7200.0,
     TASK_POST_QUALITY: 3600.0,
+    TASK_PREFIX_INDEX: 3600.0,
+    TASK_TAG_COOCCURRENCE: 3600.0,
 }
 
 
@@ -200,6 +210,43 @@ def claimable_item_processing() -> Dict[str, Any]:
     return {"$lt": time.time() - ITEM_LOCK_MAX_AGE_SECONDS}
 
 
+def claim_items(
+    collection: Any,
+    query: Dict[str, Any],
+    limit: int,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[dict]:
+    """Atomically lock up to ``limit`` idle items matching ``query``.
+
+    Candidates are only a hint: the lock itself is written by an
+    ``update_many`` that re-checks ``processing`` per document and stamps a
+    claim token unique to this call. Mongo applies each document update
+    atomically, so when several workers race for the same candidates every
+    item is won by exactly one of them. Reading back by token returns only the
+    items this call actually locked, which keeps concurrent batches disjoint.
+    """
+    claim_query: Dict[str, Any] = {
+        **query,
+        "processing": claimable_item_processing(),
+    }
+    candidates = collection.find(claim_query, projection={"_id": True}).limit(limit)
+    ids: List[Any] = [candidate["_id"] for candidate in candidates]
+    if not ids:
+        return []
+
+    token: str = uuid.uuid4().hex
+    collection.update_many(
+        {**claim_query, "_id": {"$in": ids}},
+        {"$set": {"processing": time.time(), ITEM_CLAIM_FIELD: token}},
+    )
+
+    return list(
+        collection.find(
+            {"_id": {"$in": ids}, ITEM_CLAIM_FIELD: token}, projection=projection
+        )
+    )
+
+
 class RssTagTasks:
     indexes = ["user", "processing"]
 
@@ -543,6 +590,7 @@ class RssTagTasks:
                             doc.setdefault("attempts", 0)
                             self._normalize_mark_status(doc)
                         self._db.tasks.insert_many(data["data"])
+                        notify_new_task()
                     else:
                         result = False
                 else:
@@ -658,25 +706,13 @@ class RssTagTasks:
             if user_task["type"] in (TASK_MARK, TASK_MARK_TELEGRAM):
                 data = self._mark_task_data(user_task)
             elif user_task["type"] == TASK_TAGS:
-                data = []
-                ps = self._db.posts.find(
-                    {
-                        "owner": task["user"]["sid"],
-                        "tags": [],
-                        "processing": claimable_item_processing(),
-                    }
-                ).limit(self._posts_bath_size)
-                ids = []
-                for p in ps:
-                    data.append(p)
-                    ids.append(p["_id"])
+                data = claim_items(
+                    self._db.posts,
+                    {"owner": task["user"]["sid"], "tags": []},
+                    self._posts_bath_size,
+                )
                 unlock_task = True
-                if ids:
-                    self._db.posts.update_many(
-                        {"_id": {"$in": ids}},
-                        {"$set": {"processing": time.time()}},
-                    )
-                else:
+                if not data:
                     task["type"] = TASK_NOOP
                     psc = self._db.posts.count_documents(
                         {
@@ -690,24 +726,13 @@ class RssTagTasks:
                 if unlock_task:
                     self._state.release(user_task["_id"])
             elif user_task["type"] == TASK_BIGRAMS_RANK:
-                data = []
-                bis_dt = self._db.bi_grams.find(
-                    {
-                        "owner": task["user"]["sid"],
-                        "temperature": 0,
-                        "processing": claimable_item_processing(),
-                    },
+                data = claim_items(
+                    self._db.bi_grams,
+                    {"owner": task["user"]["sid"], "temperature": 0},
+                    self._bigrams_bath_size,
                     projection={"tag": True, "posts_count": True},
-                ).limit(self._bigrams_bath_size)
-                ids = []
-                for bi_dt in bis_dt:
-                    data.append(bi_dt)
-                    ids.append(bi_dt["_id"])
-                if ids:
-                    self._db.bi_grams.update_many(
-                        {"_id": {"$in": ids}},
-                        {"$set": {"processing": time.time()}},
-                    )
+                )
+                if data:
                     self._state.release(user_task["_id"])
                 else:
                     task["type"] = TASK_NOOP
@@ -753,25 +778,17 @@ class RssTagTasks:
                     for p in ps:
                         data.append(p)
                 else:
-                    ps = self._db.posts.find(
-                        {
-                            **scope_query,
-                            "grouping": {"$exists": False},
-                            "processing": claimable_item_processing(),
-                        }
-                    ).limit(10000)
-                    for p in ps:
-                        data.append(p)
+                    data = claim_items(
+                        self._db.posts,
+                        {**scope_query, "grouping": {"$exists": False}},
+                        10000,
+                    )
+                    # Already-grouped posts are unlocked and marked here, so
+                    # only genuinely pending posts stay claimed.
                     data = self._exclude_posts_with_existing_groupings(
                         task["user"]["sid"], data
                     )
-                    ids = [post["_id"] for post in data]
-                    if ids:
-                        self._db.posts.update_many(
-                            {"_id": {"$in": ids}},
-                            {"$set": {"processing": time.time()}},
-                        )
-                    else:
+                    if not data:
                         task["type"] = TASK_NOOP
                         psc = self._db.posts.count_documents(
                             {
@@ -810,48 +827,41 @@ class RssTagTasks:
                 if unlock_task:
                     self._state.release(user_task["_id"])
             elif user_task["type"] == TASK_TAGS_RANK:
-                data = []
-                tags_dt = self._db.tags.find(
-                    {
-                        "owner": task["user"]["sid"],
-                        "temperature": 0,
-                        "processing": claimable_item_processing(),
-                    },
+                data = claim_items(
+                    self._db.tags,
+                    {"owner": task["user"]["sid"], "temperature": 0},
+                    self._tags_bath_size,
                     projection={"tag": True, "posts_count": True, "freq": True},
-                ).limit(self._tags_bath_size)
-                ids = []
-                for tag_dt in tags_dt:
-                    data.append(tag_dt)
-                    ids.append(tag_dt["_id"])
-                if ids:
-                    self._db.tags.update_many(
-                        {"_id": {"$in": ids}},
-                        {"$set": {"processing": time.time()}},
-                    )
+                )
+                if data:
                     self._state.release(user_task["_id"])
                 else:
                     task["type"] = TASK_NOOP
                     self._state.complete(user_task["_id"])
+            elif user_task["type"] == TASK_RECODE_POSTS:
+                recode_query = {"owner": task["user"]["sid"], **pending_recode_query()}
+                data = claim_items(
+                    self._db.posts,
+                    recode_query,
+                    self._posts_bath_size,
+                    projection={"content.content": True, "lemmas": True},
+                )
+                unlock_task = True
+                if not data:
+                    task["type"] = TASK_NOOP
+                    if self._db.posts.count_documents(recode_query) == 0:
+                        self._state.complete(user_task["_id"])
+                        unlock_task = False
+                if unlock_task:
+                    self._state.release(user_task["_id"])
             elif user_task["type"] == TASK_NER:
-                data = []
-                ps = self._db.posts.find(
-                    {
-                        "owner": task["user"]["sid"],
-                        "ner": {"$exists": False},
-                        "processing": claimable_item_processing(),
-                    }
-                ).limit(self._posts_bath_size)
-                ids = []
-                for p in ps:
-                    data.append(p)
-                    ids.append(p["_id"])
+                data = claim_items(
+                    self._db.posts,
+                    {"owner": task["user"]["sid"], "ner": {"$exists": False}},
+                    self._posts_bath_size,
+                )
                 unlock_task = True
-                if ids:
-                    self._db.posts.update_many(
-                        {"_id": {"$in": ids}},
-                        {"$set": {"processing": time.time()}},
-                    )
-                else:
+                if not data:
                     task["type"] = TASK_NOOP
                     psc = self._db.posts.count_documents(
                         {"owner": task["user"]["sid"], "ner": {"$exists": False}}
@@ -862,27 +872,15 @@ class RssTagTasks:
                 if unlock_task:
                     self._state.release(user_task["_id"])
             elif user_task["type"] == TASK_POST_QUALITY:
-                data = []
                 owner = task["user"]["sid"]
                 scope_query = self._build_post_scope_predicate(owner, user_task)
-                ps = self._db.posts.find(
-                    {
-                        **scope_query,
-                        "quality": {"$exists": False},
-                        "processing": claimable_item_processing(),
-                    }
-                ).limit(self._quality_batch_size)
-                ids = []
-                for p in ps:
-                    data.append(p)
-                    ids.append(p["_id"])
+                data = claim_items(
+                    self._db.posts,
+                    {**scope_query, "quality": {"$exists": False}},
+                    self._quality_batch_size,
+                )
                 unlock_task = True
-                if ids:
-                    self._db.posts.update_many(
-                        {"_id": {"$in": ids}},
-                        {"$set": {"processing": time.time()}},
-                    )
-                else:
+                if not data:
                     task["type"] = TASK_NOOP
                     if self._count_pending_quality_posts(owner, user_task) == 0:
                         self._state.complete(user_task["_id"])
@@ -904,22 +902,15 @@ class RssTagTasks:
                     for tag_dt in tags_dt:
                         data.append(tag_dt)
                 else:
-                    tags_dt = self._db.tags.find(
+                    data = claim_items(
+                        self._db.tags,
                         {
                             "owner": task["user"]["sid"],
                             "classifications": {"$exists": False},
-                            "processing": claimable_item_processing(),
-                        }
-                    ).limit(10000)
-                    for tag_dt in tags_dt:
-                        data.append(tag_dt)
-                        ids.append(tag_dt["_id"])
-                    if ids:
-                        self._db.tags.update_many(
-                            {"_id": {"$in": ids}},
-                            {"$set": {"processing": time.time()}},
-                        )
-                    else:
+                        },
+                        10000,
+                    )
+                    if not data:
                         task["type"] = TASK_NOOP
                         psc = self._db.tags.count_documents(
                             {
@@ -933,25 +924,16 @@ class RssTagTasks:
                 if unlock_task:
                     self._state.release(user_task["_id"])
             elif user_task["type"] == TASK_TAG_CLASSIFICATION:
-                data = []
                 unlock_task = True
-                tags_dt = self._db.tags.find(
+                data = claim_items(
+                    self._db.tags,
                     {
                         "owner": task["user"]["sid"],
                         "classifications": {"$exists": False},
-                        "processing": claimable_item_processing(),
-                    }
-                ).limit(self._tags_bath_size)
-                ids = []
-                for tag_dt in tags_dt:
-                    data.append(tag_dt)
-                    ids.append(tag_dt["_id"])
-                if ids:
-                    self._db.tags.update_many(
-                        {"_id": {"$in": ids}},
-                        {"$set": {"processing": time.time()}},
-                    )
-                else:
+                    },
+                    self._tags_bath_size,
+                )
+                if not data:
                     task["type"] = TASK_NOOP
                     psc = self._db.tags.count_documents(
                         {
@@ -1126,10 +1108,10 @@ class RssTagTasks:
                         )
                     )
                 self._db.posts.bulk_write(updates, ordered=False)
-            elif task["type"] == TASK_POST_QUALITY:
-                # The handler writes each post's own ``quality`` marker, so all
-                # this has to do is drop the item locks and keep the task in the
-                # queue for the next batch.
+            elif task["type"] in (TASK_POST_QUALITY, TASK_RECODE_POSTS):
+                # The handler writes each post's own ``quality``/``codecs``
+                # marker, so all this has to do is drop the item locks and keep
+                # the task in the queue for the next batch.
                 remove_task = False
                 updates = []
                 for post in task["data"]:
@@ -1187,7 +1169,21 @@ class RssTagTasks:
                 batch_state = task.get("batch", {}) or {}
                 batch_status = batch_state.get("status", "")
                 if batch_status == BatchTaskStatus.COMPLETED.value:
-                    remove_task = True
+                    # Tags that didn't fit in the provider limits are left
+                    # unclassified, the next claim submits them in a new batch
+                    remove_task = (
+                        self._db.tags.count_documents(
+                            {
+                                "owner": task["user"]["sid"],
+                                "classifications": {"$exists": False},
+                            }
+                        )
+                        == 0
+                    )
+                    if not remove_task:
+                        self._db.tasks.update_one(
+                            {"_id": task["_id"]}, {"$unset": {"batch": ""}}
+                        )
                 else:
                     remove_task = False
                 updates = []
@@ -1331,6 +1327,10 @@ class RssTagTasks:
                     info["count"] = self._db.posts.count_documents(
                         {"owner": user_id, "ner": {"$exists": False}}
                     )
+                elif task["type"] == TASK_RECODE_POSTS:
+                    info["count"] = self._db.posts.count_documents(
+                        {"owner": user_id, **pending_recode_query()}
+                    )
                 elif task["type"] == TASK_POST_GROUPING:
                     info["count"] = self._count_pending_grouping_posts(user_id, task)
                 elif task["type"] == TASK_TAG_CLASSIFICATION:
@@ -1394,6 +1394,9 @@ class RssTagTasks:
             TASK_POST_QUALITY: "Post quality scoring (incremental, supports scope)",
             TASK_SOURCE_QUALITY: "Feed/category quality rollup (supports scope)",
             TASK_FEEDS_LIST: "Refresh sources list from provider (no posts)",
+            TASK_RECODE_POSTS: "Re-encode posts content and lemmas",
+            TASK_PREFIX_INDEX: "Build words prefix index",
+            TASK_TAG_COOCCURRENCE: "Count tags co-occurrence",
         }
 
         if task_type in task_titles:
@@ -1463,7 +1466,7 @@ class RssTagTasks:
                 continue
 
             try:
-                lemmas_text = gzip.decompress(lemmas_data).decode("utf-8", "replace")
+                lemmas_text = decode_text(lemmas_data)
             except Exception:
                 continue
 
@@ -1534,7 +1537,7 @@ class RssTagTasks:
                 title = post.get("content", {}).get("title", "")
                 raw_content = post.get("content", {}).get("content", b"")
                 if isinstance(raw_content, (bytes, bytearray)):
-                    content = gzip.decompress(raw_content).decode("utf-8", "replace")
+                    content = decode_text(raw_content)
                 elif isinstance(raw_content, str):
                     content = raw_content
             except Exception:
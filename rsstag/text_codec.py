@@ -0,0 +1,252 @@
+"""Encoding of the text blobs stored on posts (``content.content``, ``lemmas``).
+
+Posts used to store both fields as ``gzip.compress`` output, and gunzipping
+them dominated CPU in every handler that scans lemmas. Blobs can now be
+written with one of several codecs, and every reader goes through
+``decode_text``/``decode_words``, which accept any of them:
+
+* ``gzip`` - the legacy format, written without a header so old code and old
+  documents keep working;
+* ``zlib`` - zlib at level 1, several times faster to decode than gzip at a
+  somewhat larger size;
+* ``raw`` - plain UTF-8, no decompression at all;
+* ``tokens`` - lemmas only: the distinct words of the post plus an
+  ``array('I')`` of indexes into them, so ``decode_words`` returns the word
+  list without decoding and splitting a string.
+
+Blobs other than gzip start with ``_MAGIC``, the format version and the codec
+id. Gzip blobs start with ``\\x1f\\x8b`` and text never starts with a NUL, so
+the formats cannot be confused. Documents also carry a ``codecs`` field
+(``{"version", "content", "lemmas"}``) recording what their blobs use; the
+TASK_RECODE_POSTS migration selects posts by it.
+"""
+
+import gzip
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+CODEC_GZIP = "gzip"
+CODEC_ZLIB = "zlib"
+CODEC_RAW = "raw"
+CODEC_TOKENS = "tokens"
+CODECS = (CODEC_GZIP, CODEC_ZLIB, CODEC_RAW, CODEC_TOKENS)
+# tokens keeps a post's words in order, it is meaningless for HTML content
+CONTENT_CODECS = (CODEC_GZIP, CODEC_ZLIB, CODEC_RAW)
+
+CODEC_VERSION = 1
+CODECS_FIELD = "codecs"
+ZLIB_LEVEL = 1
+
+_MAGIC = b"\x00rt"
+_CODEC_IDS = {CODEC_ZLIB: 1, CODEC_RAW: 2, CODEC_TOKENS: 3}
+_CODEC_NAMES = {codec_id: name for name, codec_id in _CODEC_IDS.items()}
+_HEADER_SIZE = len(_MAGIC) + 2
+# distinct words count, size of the NUL-joined words
+_TOKENS_HEAD = struct.Struct("<II")
+_TOKEN_SEP = "\x00"
+
+_content_codec: str = CODEC_GZIP
+_lemmas_codec: str = CODEC_GZIP
+
+
+def _header(codec: str) -> bytes:
+    return _MAGIC + bytes((CODEC_VERSION, _CODEC_IDS[codec]))
+
+
+def _encode_tokens(text: str, errors: str) -> bytes:
+    words = text.split(" ")
+    ids: Dict[str, int] = {}
+    indexes = array("I", [ids.setdefault(word, len(ids)) for word in words])
+    if sys.byteorder != "little":
+        indexes.byteswap()
+    table = _TOKEN_SEP.join(ids).encode("utf-8", errors)
+    return (
+        _header(CODEC_TOKENS)
+        + _TOKENS_HEAD.pack(len(ids), len(table))
+        + table
+        + indexes.tobytes()
+    )
+
+
+def _decode_tokens(payload: bytes, errors: str) -> List[str]:
+    try:
+        return _read_tokens(payload, errors)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"Corrupt tokens blob: {e}") from e
+
+
+def _read_tokens(payload: bytes, errors: str) -> List[str]:
+    count, table_size = _TOKENS_HEAD.unpack_from(payload)
+    start = _TOKENS_HEAD.size
+    table = str(payload[start : start + table_size], "utf-8", errors)
+    words = table.split(_TOKEN_SEP) if count else []
+    indexes = array("I")
+    indexes.frombytes(payload[start + table_size :])
+    if sys.byteorder != "little":
+        indexes.byteswap()
+    if len(indexes) < 2:
+        return [words[i] for i in indexes]
+    return list(itemgetter(*indexes)(words))
+
+
+def encode_text(text: str, codec: str = CODEC_GZIP, errors: str = "replace") -> bytes:
+    """Encode ``text`` with ``codec``."""
+    if codec == CODEC_GZIP:
+        return gzip.compress(text.encode("utf-8", errors))
+    if codec == CODEC_ZLIB:
+        return _header(codec) + zlib.compress(text.encode("utf-8", errors), ZLIB_LEVEL)
+    if codec == CODEC_RAW:
+        return _header(codec) + text.encode("utf-8", errors)
+    if codec == CODEC_TOKENS:
+        if _TOKEN_SEP in text:
+            return encode_text(text, CODEC_ZLIB, errors)
+        return _encode_tokens(text, errors)
+    raise ValueError(f"Unknown text codec: {codec}")
+
+
+def detect_codec(blob: bytes) -> str:
+    """Codec ``blob`` was written with; anything without a header is gzip."""
+    if blob[: len(_MAGIC)] != _MAGIC:
+        return CODEC_GZIP
+    version = blob[len(_MAGIC)]
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported text codec version: {version}")
+    codec = _CODEC_NAMES.get(blob[len(_MAGIC) + 1])
+    if codec is None:
+        raise ValueError(f"Unknown text codec id: {blob[len(_MAGIC) + 1]}")
+    return codec
+
+
+def decode_text(blob: bytes, errors: str = "replace") -> str:
+    """Decode a blob written by ``encode_text`` with any codec.
+
+    Corrupt blobs raise ``OSError``/``EOFError`` (gzip) or ``ValueError``.
+    """
+    codec = detect_codec(blob)
+    if codec == CODEC_GZIP:
+        return gzip.decompress(blob).decode("utf-8", errors)
+    payload = memoryview(blob)[_HEADER_SIZE:]
+    if codec == CODEC_ZLIB:
+        try:
+            return zlib.decompress(payload).decode("utf-8", errors)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt zlib blob: {e}") from e
+    if codec == CODEC_RAW:
+        return str(payload, "utf-8", errors)
+    return " ".join(_decode_tokens(payload, errors))
+
+
+def decode_words(blob: bytes, errors: str = "replace") -> List[str]:
+    """Words of a lemmas blob, same as ``decode_text(blob).split()``."""
+    if detect_codec(blob) != CODEC_TOKENS:
+        return decode_text(blob, errors).split()
+    words = _decode_tokens(memoryview(blob)[_HEADER_SIZE:], errors)
+    if "" in words:
+        return [word for word in words if word]
+    return words
+
+
+def _codec_setting(settings: Dict[str, Any], key: str, allowed: tuple) -> str:
+    raw = str(settings.get(key, CODEC_GZIP) or CODEC_GZIP).strip().lower()
+    if raw not in allowed:
+        logging.warning("Invalid %s=%r, using %s", key, raw, CODEC_GZIP)
+        return CODEC_GZIP
+    return raw
+
+
+def configure_codecs(config: dict) -> None:
+    """Pick the codecs new blobs are written with from the settings section.
+
+    The choice is module state of the calling process, the others keep
+    writing gzip. The web app and each worker call it on start, and process
+    pools pass the codec settings to their initializer to call it there
+    (``TagsPool``, ``RawPostsPipeline``); a new pool must do the same.
+    """
+    global _content_codec, _lemmas_codec
+    settings: dict = config.get("settings", {})
+    _content_codec = _codec_setting(settings, "content_codec", CONTENT_CODECS)
+    _lemmas_codec = _codec_setting(settings, "lemmas_codec", CODECS)
+
+
+def content_codec() -> str:
+    return _content_codec
+
+
+def lemmas_codec() -> str:
+    return _lemmas_codec
+
+
+def encode_content(text: str, errors: str = "replace") -> bytes:
+    """Encode post content with the configured ``content_codec``."""
+    return encode_text(text, _content_codec, errors)
+
+
+def encode_lemmas(text: str, errors: str = "replace") -> bytes:
+    """Encode post lemmas with the configured ``lemmas_codec``."""
+    return encode_text(text, _lemmas_codec, errors)
+
+
+def _post_blobs(post: Dict[str, Any]) -> Tuple[Optional[bytes], Optional[bytes]]:
+    content = post.get("content")
+    blob = content.get("content") if isinstance(content, dict) else None
+    lemmas = post.get("lemmas")
+    return (
+        blob if isinstance(blob, bytes) and blob else None,
+        lemmas if isinstance(lemmas, bytes) and lemmas else None,
+    )
+
+
+def codecs_marker(post: Dict[str, Any]) -> Dict[str, Any]:
+    """``codecs`` field value describing the blobs of ``post``."""
+    marker: Dict[str, Any] = {"version": CODEC_VERSION}
+    content, lemmas = _post_blobs(post)
+    if content is not None:
+        marker["content"] = detect_codec(content)
+    if lemmas is not None:
+        marker["lemmas"] = detect_codec(lemmas)
+    return marker
+
+
+def pending_recode_query() -> Dict[str, Any]:
+    """Posts whose blobs are not in the configured codecs yet."""
+    return {
+        CODECS_FIELD + ".corrupt": {"$ne": True},
+        "$or": [
+            {CODECS_FIELD + ".version": {"$ne": CODEC_VERSION}},
+            {CODECS_FIELD + ".content": {"$ne": _content_codec}},
+            {
+                "lemmas": {"$exists": True},
+                CODECS_FIELD + ".lemmas": {"$ne": _lemmas_codec},
+            },
+        ]
+    }
+
+
+def recode_post(post: Dict[str, Any]) -> Dict[str, Any]:
+    """``$set`` payload moving the blobs of ``post`` to the configured codecs."""
+    update: Dict[str, Any] = {}
+    content, lemmas = _post_blobs(post)
+    if content is not None and detect_codec(content) != _content_codec:
+        update["content.content"] = encode_content(decode_text(content, "strict"))
+    if lemmas is not None and detect_codec(lemmas) != _lemmas_codec:
+        update["lemmas"] = encode_lemmas(decode_text(lemmas, "strict"))
+    marker: Dict[str, Any] = {"version": CODEC_VERSION, "content": _content_codec}
+    if lemmas is not None:
+        marker["lemmas"] = _lemmas_codec
+    update[CODECS_FIELD] = marker
+
+    return update
+
+
+def corrupt_marker() -> Dict[str, Any]:
+    """``$set`` payload for a post whose blobs can't be decoded.
+
+    Keeps the post out of ``pending_recode_query`` so the migration does not
+    claim it again and again.
+    """
+    return {CODECS_FIELD + ".corrupt": True}
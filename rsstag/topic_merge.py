@@ -314,6 +314,22 @@ class TopicMergeAgent:
         # most recent _merge_with_llm call; consumed by _apply_anchor_redirects
         # so the in-memory bucket state follows the DB-side redirect.
         self._last_redirects: List[Tuple[str, str, str]] = []
+        # Set by any alias write, even of a run that fails afterwards: the
+        # topics index must then be recounted with the new canonical paths.
+        self.aliases_changed: bool = False
+
+    def _upsert_alias(
+        self,
+        level: int,
+        parent_id: str,
+        label: str,
+        canonical_id: str,
+        canonical_label: str,
+    ) -> None:
+        self.aliases_changed = True
+        self._aliases.upsert_alias(
+            self._owner, level, parent_id, label, canonical_id, canonical_label
+        )
 
     def _heartbeat(self) -> None:
         if self._on_progress is None:
@@ -591,8 +607,7 @@ class TopicMergeAgent:
                         canonical_by_id[canonical_id] = canonical_label
                         label_to_id[key] = canonical_id
 
-                    self._aliases.upsert_alias(
-                        self._owner,
+                    self._upsert_alias(
                         level,
                         parent_id,
                         label,
@@ -661,9 +676,7 @@ class TopicMergeAgent:
                     "canonical_id": canonical_id,
                     "canonical_label": canonical_label,
                 }
-                self._aliases.upsert_alias(
-                    self._owner, level, parent_id, label, canonical_id, canonical_label
-                )
+                self._upsert_alias(level, parent_id, label, canonical_id, canonical_label)
                 leader_by_normal_form[normal] = label
                 continue
 
@@ -683,9 +696,7 @@ class TopicMergeAgent:
                     "canonical_id": canonical_id,
                     "canonical_label": canonical_label,
                 }
-                self._aliases.upsert_alias(
-                    self._owner, level, parent_id, label, canonical_id, canonical_label
-                )
+                self._upsert_alias(level, parent_id, label, canonical_id, canonical_label)
                 leader_by_normal_form[normal] = label
                 continue
 
@@ -714,8 +725,7 @@ class TopicMergeAgent:
             if not leader_info:
                 continue
             resolved[follower_label] = dict(leader_info)
-            self._aliases.upsert_alias(
-                self._owner,
+            self._upsert_alias(
                 level,
                 parent_id,
                 follower_label,
@@ -773,6 +783,7 @@ class TopicMergeAgent:
             loser_id = anchor_ids.get(num_to_label[num])
             if not loser_id or loser_id == winner_id:
                 continue
+            self.aliases_changed = True
             moved = self._aliases.redirect_canonical(
                 self._owner, loser_id, winner_id, winner_label
             )
@@ -0,0 +1,375 @@
+"""Materialized per-owner topics index of the post groupings.
+
+The topics pages used to read every ``post_grouping`` doc and every grouped
+post of the owner on each request to count the topics. This index keeps
+that result in two collections:
+
+* ``topics_index_groupings`` holds what one grouping doc adds to its
+  canonical topics: text length and sentences, in total and unread only,
+  and whether any of its posts is still unread.
+* ``topics_index`` holds one doc per canonical topic with the sums over its
+  groupings, both for all and for unread posts, so a page reads only the
+  topics.
+
+Writers never compute anything: saving or deleting a grouping, changing
+sentence or post read state and re-merging topic aliases only stamp the
+affected grouping entries ``dirty`` with a fresh ObjectId. ``refresh``
+recomputes the dirty entries from their sources, clears the stamp only if
+no writer re-stamped it meanwhile, and recounts the topics they touched
+from the entries. Both steps are idempotent, so concurrent refreshes can't
+skew the counts. Workers refresh at the end of their tasks and pages
+refresh whatever web requests left dirty before reading.
+
+Every stamp also renews the owner's doc in ``topics_index_versions``, so
+other caches of grouping derived data can tell whether anything changed.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteOne, MongoClient, ReplaceOne, UpdateOne
+
+from rsstag.topic_aliases import RssTagTopicAliases
+
+REFRESH_CHUNK = 500
+
+
+def _post_id_values(post_ids: Iterable[Any]) -> List[Any]:
+    """Post ids as stored by any writer: both str and int variants."""
+    values: List[Any] = []
+    for post_id in post_ids:
+        if post_id is None:
+            continue
+        variants: List[Any] = [post_id, str(post_id)]
+        try:
+            variants.append(int(post_id))
+        except (TypeError, ValueError):
+            pass
+        for value in variants:
+            if value not in values:
+                values.append(value)
+    return values
+
+
+def grouping_topics(
+    grouping: Dict[str, Any], canonical_topic: Any
+) -> List[Dict[str, Any]]:
+    """Per canonical topic text length and sentences of a grouping doc.
+
+    ``canonical_topic`` maps a raw topic path to its canonical path. Counts
+    follow the topics pages: all sentences of a topic, and separately the
+    ones not marked read.
+    """
+    sentences_map: Dict[int, dict] = {
+        s["number"]: s for s in grouping.get("sentences", []) if "number" in s
+    }
+    topics: Dict[str, Dict[str, Any]] = {}
+    for topic, indices in (grouping.get("groups") or {}).items():
+        if not indices:
+            continue
+        unread_indices = [
+            idx
+            for idx in indices
+            if idx in sentences_map and not sentences_map[idx].get("read", False)
+        ]
+        name: str = canonical_topic(topic)
+        stats = topics.setdefault(
+            name,
+            {
+                "name": name,
+                "text_length": 0,
+                "sentences_count": 0,
+                "unread_text_length": 0,
+                "unread_sentences_count": 0,
+            },
+        )
+        for idx in indices:
+            text = sentences_map.get(idx, {}).get("text")
+            if text:
+                stats["text_length"] += len(str(text))
+        stats["sentences_count"] += len(indices)
+        for idx in unread_indices:
+            text = sentences_map[idx].get("text")
+            if text:
+                stats["unread_text_length"] += len(str(text))
+        stats["unread_sentences_count"] += len(unread_indices)
+    return list(topics.values())
+
+
+class RssTagTopicsIndex:
+    indexes = [([("owner", ASCENDING), ("topic", ASCENDING)], {"unique": True})]
+    groupings_indexes = [
+        ([("owner", ASCENDING), ("post_ids_hash", ASCENDING)], {"unique": True}),
+        ([("owner", ASCENDING), ("post_ids", ASCENDING)], {}),
+        ([("owner", ASCENDING), ("topics.name", ASCENDING)], {}),
+        ([("owner", ASCENDING), ("dirty", ASCENDING)], {"sparse": True}),
+    ]
+    versions_indexes = [([("owner", ASCENDING)], {"unique": True})]
+
+    def __init__(self, db: MongoClient) -> None:
+        self._db = db
+        self._log = logging.getLogger("topics_index")
+
+    def prepare(self) -> None:
+        for collection, indexes in (
+            (self._db.topics_index, self.indexes),
+            (self._db.topics_index_groupings, self.groupings_indexes),
+            (self._db.topics_index_versions, self.versions_indexes),
+        ):
+            for index, options in indexes:
+                try:
+                    collection.create_index(index, **options)
+                except Exception as e:
+                    self._log.warning(
+                        "Can`t create index %s. May be already exists. Info: %s", index, e
+                    )
+
+    def mark_grouping(self, owner: str, post_ids_hash: str, post_ids: List[Any]) -> None:
+        """Stamp the entry of a saved grouping, creating it if new."""
+        self._db.topics_index_groupings.update_one(
+            {"owner": owner, "post_ids_hash": post_ids_hash},
+            {"$set": {"post_ids": post_ids, "dirty": ObjectId()}},
+            upsert=True,
+        )
+        self._renew_version(owner)
+
+    def mark_posts(self, owner: str, post_ids: Iterable[Any]) -> None:
+        """Stamp the entries of every grouping containing one of the posts."""
+        values = _post_id_values(post_ids)
+        for start in range(0, len(values), REFRESH_CHUNK):
+            self._db.topics_index_groupings.update_many(
+                {"owner": owner, "post_ids": {"$in": values[start : start + REFRESH_CHUNK]}},
+                {"$set": {"dirty": ObjectId()}},
+            )
+        if values:
+            self._renew_version(owner)
+
+    def mark_owner(self, owner: str) -> None:
+        """Stamp every entry of the owner, e.g. after its aliases changed."""
+        self._db.topics_index_groupings.update_many(
+            {"owner": owner}, {"$set": {"dirty": ObjectId()}}
+        )
+        self._renew_version(owner)
+
+    def version(self, owner: str) -> Optional[ObjectId]:
+        """Stamp of the last grouping or alias change of the owner, None if unknown."""
+        doc = self._db.topics_index_versions.find_one({"owner": owner}, projection=["version"])
+        return doc["version"] if doc else None
+
+    def _renew_version(self, owner: str) -> None:
+        self._db.topics_index_versions.update_one(
+            {"owner": owner}, {"$set": {"version": ObjectId()}}, upsert=True
+        )
+
+    def remove_owner(self, owner: str) -> None:
+        """Drop the owner's index, renewing rather than dropping its version.
+
+        A missing version reads as None, which a cache filled before the
+        groupings were ever marked holds too.
+        """
+        self._db.topics_index.delete_many({"owner": owner})
+        self._db.topics_index_groupings.delete_many({"owner": owner})
+        self._renew_version(owner)
+
+    def _build_missing(self, owner: str) -> None:
+        """Create dirty entries for owners with groupings but no index yet."""
+        if self._db.topics_index_groupings.find_one({"owner": owner}, projection=["_id"]):
+            return
+        token = ObjectId()
+        updates: List[UpdateOne] = []
+        for grouping in self._db.post_grouping.find(
+            {"owner": owner}, projection={"post_ids_hash": True, "post_ids": True}
+        ):
+            if not grouping.get("post_ids_hash"):
+                continue
+            updates.append(
+                UpdateOne(
+                    {"owner": owner, "post_ids_hash": grouping["post_ids_hash"]},
+                    {"$set": {"post_ids": grouping.get("post_ids", []), "dirty": token}},
+                    upsert=True,
+                )
+            )
+            if len(updates) >= REFRESH_CHUNK:
+                self._db.topics_index_groupings.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            self._db.topics_index_groupings.bulk_write(updates, ordered=False)
+
+    def _refresh_entries(
+        self, owner: str, entries: List[Dict[str, Any]], canonical_topic: Any
+    ) -> Set[str]:
+        """Recompute ``entries`` from their groupings; returns touched topics."""
+        groupings: Dict[str, dict] = {
+            doc["post_ids_hash"]: doc
+            for doc in self._db.post_grouping.find(
+                {
+                    "owner": owner,
+                    "post_ids_hash": {"$in": [e["post_ids_hash"] for e in entries]},
+                },
+                projection={
+                    "_id": False,
+                    "post_ids_hash": True,
+                    "post_ids": True,
+                    "groups": True,
+                    "sentences": True,
+                },
+            )
+        }
+        pids: List[Any] = _post_id_values(
+            pid for doc in groupings.values() for pid in doc.get("post_ids", [])
+        )
+        read_pids: Set[str] = {
+            str(post["pid"])
+            for post in self._db.posts.find(
+                {"owner": owner, "pid": {"$in": pids}, "read": True},
+                projection={"_id": False, "pid": True},
+            )
+        }
+
+        touched: Set[str] = set()
+        updates: List[Any] = []
+        for entry in entries:
+            touched.update(topic["name"] for topic in entry.get("topics", []))
+            condition = {"_id": entry["_id"], "dirty": entry["dirty"]}
+            grouping = groupings.get(entry["post_ids_hash"])
+            if grouping is None:
+                updates.append(DeleteOne(condition))
+                continue
+            post_ids: List[Any] = grouping.get("post_ids", [])
+            topics = grouping_topics(grouping, canonical_topic)
+            touched.update(topic["name"] for topic in topics)
+            updates.append(
+                UpdateOne(
+                    condition,
+                    {
+                        "$set": {
+                            "post_ids": post_ids,
+                            "post_id_str": "_".join(str(pid) for pid in post_ids),
+                            # Unknown posts count as unread, see _all_posts_read
+                            "unread": not post_ids
+                            or any(str(pid) not in read_pids for pid in post_ids),
+                            "topics": topics,
+                        },
+                        "$unset": {"dirty": ""},
+                    },
+                )
+            )
+        if updates:
+            self._db.topics_index_groupings.bulk_write(updates, ordered=False)
+        return touched
+
+    def _recount_topics(self, owner: str, names: List[str]) -> None:
+        wanted: Set[str] = set(names)
+        counts: Dict[str, Dict[str, Any]] = {}
+        cursor = self._db.topics_index_groupings.find(
+            {"owner": owner, "topics.name": {"$in": names}},
+            projection={"_id": False, "post_id_str": True, "unread": True, "topics": True},
+        ).sort("_id", ASCENDING)
+        for entry in cursor:
+            post_id_str: str = entry.get("post_id_str", "")
+            for topic in entry.get("topics", []):
+                if topic["name"] not in wanted:
+                    continue
+                doc = counts.setdefault(
+                    topic["name"],
+                    {
+                        "owner": owner,
+                        "topic": topic["name"],
+                        "count": 0,
+                        "posts": [],
+                        "text_length": 0,
+                        "sentences_count": 0,
+                        "unread_count": 0,
+                        "unread_posts": [],
+                        "unread_text_length": 0,
+                        "unread_sentences_count": 0,
+                    },
+                )
+                doc["count"] += 1
+                doc["posts"].append(post_id_str)
+                doc["text_length"] += topic["text_length"]
+                doc["sentences_count"] += topic["sentences_count"]
+                if entry.get("unread") and topic["unread_sentences_count"]:
+                    doc["unread_count"] += 1
+                    doc["unread_posts"].append(post_id_str)
+                    doc["unread_text_length"] += topic["unread_text_length"]
+                    doc["unread_sentences_count"] += topic["unread_sentences_count"]
+
+        updates: List[Any] = []
+        for name in names:
+            key = {"owner": owner, "topic": name}
+            if name in counts:
+                updates.append(ReplaceOne(key, counts[name], upsert=True))
+            else:
+                updates.append(DeleteOne(key))
+        if updates:
+            self._db.topics_index.bulk_write(updates, ordered=False)
+
+    def refresh(self, owner: str) -> int:
+        """Bring the index of ``owner`` up to date; returns refreshed entries."""
+        self._build_missing(owner)
+        aliases = RssTagTopicAliases(self._db)
+        alias_map: Optional[Dict[Any, Dict[str, str]]] = None
+        canonical_cache: Dict[str, str] = {}
+
+        def canonical_topic(raw_topic: str) -> str:
+            cached = canonical_cache.get(raw_topic)
+            if cached is None:
+                cached = aliases.resolve_path(raw_topic, alias_map=alias_map)[
+                    "canonical_path"
+                ]
+                canonical_cache[raw_topic] = cached
+            return cached
+
+        refreshed = 0
+        touched: Set[str] = set()
+        # Entries a writer re-stamped while they were recomputed stay dirty;
+        # they are left to the next refresh instead of looping on them here.
+        skipped: List[Any] = []
+        while True:
+            entries: List[Dict[str, Any]] = list(
+                self._db.topics_index_groupings.find(
+                    {"owner": owner, "dirty": {"$exists": True}, "_id": {"$nin": skipped}},
+                    projection={"post_ids_hash": True, "dirty": True, "topics.name": True},
+                ).limit(REFRESH_CHUNK)
+            )
+            if not entries:
+                break
+            if alias_map is None:
+                alias_map = aliases.load_owner_map(owner)
+            touched |= self._refresh_entries(owner, entries, canonical_topic)
+            refreshed += len(entries)
+            skipped.extend(
+                entry["_id"]
+                for entry in self._db.topics_index_groupings.find(
+                    {"_id": {"$in": [e["_id"] for e in entries]}, "dirty": {"$exists": True}},
+                    projection=["_id"],
+                )
+            )
+
+        names = sorted(touched)
+        for start in range(0, len(names), REFRESH_CHUNK):
+            self._recount_topics(owner, names[start : start + REFRESH_CHUNK])
+        if refreshed:
+            self._log.info(
+                "Refreshed %s groupings, %s topics of %s", refreshed, len(names), owner
+            )
+        return refreshed
+
+    def get_topics(self, owner: str, only_unread: bool = False) -> Dict[str, dict]:
+        """Topics of ``owner`` as ``{topic: {count, posts, text_length, sentences_count}}``."""
+        self.refresh(owner)
+        prefix = "unread_" if only_unread else ""
+        query: Dict[str, Any] = {"owner": owner}
+        if only_unread:
+            query["unread_count"] = {"$gt": 0}
+        topics: Dict[str, dict] = {}
+        for doc in self._db.topics_index.find(query):
+            topics[doc["topic"]] = {
+                "count": doc[prefix + "count"],
+                "posts": doc[prefix + "posts"],
+                "text_length": doc[prefix + "text_length"],
+                "sentences_count": doc[prefix + "sentences_count"],
+            }
+        return topics
@@ -1,46 +1,27 @@
 import os
 import logging
 from collections import defaultdict
-from typing import List, Tuple, Union
+from typing import Iterable, List
 
 from gensim.models.word2vec import Word2Vec
-from .posts import PostLemmaSentence
+from .embedding_training import EmbeddingLearn
 
 
-class W2VLearn:
+class W2VLearn(EmbeddingLearn):
     def __init__(self, path: str) -> None:
         self._log = logging.getLogger("W2VLearn")
-        self._path = path
-        if os.path.exists(self._path):
-            self._model = Word2Vec.load(self._path)
-        else:
-            self._model = None
-
-        self.__n_epochs = 30
+        super().__init__(path, Word2Vec)
         self.__window = 5
 
-    def learn(self, texts: Union[List[Tuple[str, int]], PostLemmaSentence]):
-        if isinstance(texts, PostLemmaSentence):
-            words = texts
-            total = texts.count()
-        else:
-            words = []
-            for i, tagged_text in enumerate(texts):
-                words.append(tagged_text[0].split())
-            total = len(words)
-
-        if self._model:
-            self._model.train(words, total_examples=total, epochs=self.__n_epochs)
-        else:
-            self._model = Word2Vec(
-                words,
-                window=self.__window,
-                epochs=self.__n_epochs,
-                sample=1e-5,
-                min_count=0,
-                workers=os.cpu_count(),
-            )
-        self._model.save(self._path)
+    def _new_model(self, words: Iterable[List[str]]) -> Word2Vec:
+        return Word2Vec(
+            words,
+            window=self.__window,
+            epochs=self._n_epochs,
+            sample=1e-5,
+            min_count=0,
+            workers=os.cpu_count(),
+        )
 
     def make_groups(self, tags: List[str], top_n: int = 10, koef: float = 0.3):
         groups = defaultdict(set)
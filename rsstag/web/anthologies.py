@@ -507,6 +507,7 @@ def on_anthologies_api_read_post(
         app.letters,
         app.tasks,
         app.post_grouping,
+        app.cooccurrence,
     )
     service_result = service.mark_sentences(
         user["sid"],
@@ -8,6 +8,9 @@ from typing import Any, Dict, List, Optional
 import traceback
 
 from rsstag.tasks import RssTagTasks
+from rsstag.stem_cache import init_stem_cache
+from rsstag.text_codec import configure_codecs
+from rsstag.task_wakeup import configure_task_wakeup
 from rsstag.web.routes import RSSTagRoutes
 from rsstag.utils import load_config
 from rsstag.posts import RssTagPosts
@@ -19,6 +22,11 @@ from rsstag.feeds import RssTagFeeds
 from rsstag.tags import RssTagTags
 from rsstag.letters import RssTagLetters
 from rsstag.bi_grams import RssTagBiGrams
+from rsstag.cooccurrence import RssTagCooccurrence
+from rsstag.lemma_vocab import RssTagLemmaVocab
+from rsstag.pid_filter import RssTagPidFilters
+from rsstag.post_clustering import RssTagPostClusterModels
+from rsstag.prefix_index import RssTagPrefixIndex, init_prefix_cache
 from rsstag.users import RssTagUsers
 from rsstag.tokens import RssTagTokens
 from rsstag.workers_db import RssTagWorkers
@@ -153,6 +161,16 @@ class RSSTagApplication(object):
         self.letters.prepare()
         self.bi_grams = RssTagBiGrams(self.db)
         self.bi_grams.prepare()
+        self.cooccurrence = RssTagCooccurrence(self.db)
+        self.cooccurrence.prepare()
+        self.lemma_vocab = RssTagLemmaVocab(self.db)
+        self.lemma_vocab.prepare()
+        self.pid_filters = RssTagPidFilters(self.db)
+        self.pid_filters.prepare()
+        self.post_cluster_models = RssTagPostClusterModels(self.db)
+        self.post_cluster_models.prepare()
+        self.prefix_index = RssTagPrefixIndex(self.db)
+        self.prefix_index.prepare()
         self.users = RssTagUsers(self.db)
         self.users.prepare()
         self.tokens = RssTagTokens(self.db)
@@ -175,6 +193,11 @@ class RSSTagApplication(object):
         self.update_endpoints()
         self.tasks = RssTagTasks(self.db)
         self.tasks.prepare()
+        configure_task_wakeup(self.config)
+        # Request handlers build a TagsBuilder per call; they share this cache.
+        init_stem_cache(self.config)
+        configure_codecs(self.config)
+        init_prefix_cache(self.config)
 
         self.count_showed_numbers = 4
         self.models = {"d2v": "d2v", "w2v": "w2v", "fasttext": "fasttext"}
@@ -200,7 +223,9 @@ class RSSTagApplication(object):
             from rsstag.observability.business_metrics import register_business_metrics
             from rsstag.observability.worker_instrumentation import instrument_tasks
             from rsstag.observability.llm_instrumentation import instrument_llm_router
+            from rsstag.observability.cache_metrics import register_stem_cache_metrics
             register_business_metrics(self.db)
+            register_stem_cache_metrics()
             instrument_tasks(self.tasks)
             instrument_llm_router(self.llm)
         except ImportError:
@@ -218,6 +243,11 @@ class RSSTagApplication(object):
         self.topic_aliases = RssTagTopicAliases(self.db)
         self.topic_aliases.prepare()
 
+        from rsstag.topics_index import RssTagTopicsIndex
+
+        self.topics_index = RssTagTopicsIndex(self.db)
+        self.topics_index.prepare()
+
     def _find_group_for_sentence(self, sentence_num, groups):
         """Custom filter to find which group a sentence belongs to"""
         for group_id, group_sentences in groups.items():
@@ -471,8 +501,8 @@ class RSSTagApplication(object):
     def on_get_tag_bi_grams(self, user: dict, _: Request, tag: str) -> Response:
         return bigrams_handlers.on_get_tag_bi_grams(self, user, tag)
 
-    def on_get_tag_bi_grams_graph(self, user: dict, _: Request, tag: str) -> Response:
-        return bigrams_handlers.on_get_tag_bi_grams_graph(self, user, tag)
+    def on_get_tag_bi_grams_graph(self, user: dict, request: Request, tag: str) -> Response:
+        return bigrams_handlers.on_get_tag_bi_grams_graph(self, user, tag, request)
 
     def on_get_tag_bi_grams_graph_debug(
         self, user: dict, _: Request, tag: str
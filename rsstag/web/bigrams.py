@@ -1,19 +1,19 @@
 import json
-import gzip
 import logging
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from collections import Counter
 from urllib.parse import quote
 
 if TYPE_CHECKING:
     from rsstag.web.app import RSSTagApplication
 
-from werkzeug.wrappers import Response
+from werkzeug.wrappers import Request, Response
 
 from sklearn.feature_extraction.text import TfidfVectorizer
 from rsstag.stopwords import stopwords
 from rsstag.context_filter import ContextFilterManager, TagContextFilter
 from rsstag.web.context_filter_handlers import get_context_filter_manager
+from rsstag.text_codec import decode_text
 
 
 def on_group_by_bigrams_get(
@@ -136,12 +136,190 @@ def on_get_tag_bi_grams_graph_debug(
         )
 
 
+GRAPH_DEPTH = 1
+GRAPH_MAX_DEPTH = 2
+GRAPH_MAX_NODES = 100
+GRAPH_MAX_EDGES = 200
+# Upper bounds of the max_nodes/max_edges request params
+GRAPH_NODES_LIMIT = 500
+GRAPH_EDGES_LIMIT = 1000
+# Bi-grams read per graph level, most frequent first
+GRAPH_BI_GRAMS_LIMIT = 20000
+
+
+def _graph_budget(request: Optional[Request]) -> Tuple[int, int, int]:
+    """Depth, max nodes and max edges of the graph from the request args."""
+    budget = []
+    for name, default, limit in (
+        ("depth", GRAPH_DEPTH, GRAPH_MAX_DEPTH),
+        ("max_nodes", GRAPH_MAX_NODES, GRAPH_NODES_LIMIT),
+        ("max_edges", GRAPH_MAX_EDGES, GRAPH_EDGES_LIMIT),
+    ):
+        value = default
+        if request is not None:
+            try:
+                value = int(request.args.get(name, default))
+            except (TypeError, ValueError):
+                value = default
+        budget.append(min(max(value, 1), limit))
+    return budget[0], budget[1], budget[2]
+
+
+def _bi_gram_pair(bi_gram: dict) -> Optional[Tuple[str, str, int]]:
+    """Both tags and frequency of a bi-gram, None if it can't be an edge."""
+    bi_gram_freq = bi_gram.get("posts_count", 1)
+    if bi_gram_freq is None:
+        bi_gram_freq = 1
+    if bi_gram_freq < 1:
+        return None
+    tags_in_bi_gram = bi_gram["tag"].split()
+    if len(tags_in_bi_gram) != 2 or tags_in_bi_gram[0] == tags_in_bi_gram[1]:
+        return None
+    return tags_in_bi_gram[0], tags_in_bi_gram[1], bi_gram_freq
+
+
+def _top_related_nodes(
+    app: "RSSTagApplication", owner: str, candidates: Dict[str, dict], count: int
+) -> List[dict]:
+    """``count`` most frequent candidate nodes, frequencies of all fetched at once."""
+    if count <= 0 or not candidates:
+        return []
+    tags_cursor = app.tags.get_by_tags(
+        owner, list(candidates), projection={"_id": False, "tag": True, "posts_count": True}
+    )
+    for tag_data in tags_cursor:
+        tag_posts_count = tag_data.get("posts_count")
+        if tag_posts_count is not None and tag_posts_count > 0:
+            candidates[tag_data["tag"]]["frequency"] = tag_posts_count
+    nodes = list(candidates.values())
+    if len(nodes) > count:
+        nodes.sort(key=lambda x: x["frequency"], reverse=True)
+        nodes = nodes[:count]
+    return nodes
+
+
+def build_bi_grams_graph(
+    app: "RSSTagApplication",
+    owner: str,
+    tag: str,
+    depth: int = GRAPH_DEPTH,
+    max_nodes: int = GRAPH_MAX_NODES,
+    max_edges: int = GRAPH_MAX_EDGES,
+) -> Optional[dict]:
+    """Nodes (tags) and edges (bi-grams) around ``tag``, None if no such tag.
+
+    Every level is one bi-grams query and one tags query for the frequencies
+    of its new nodes. Edges are keyed by their unordered pair of tags, so
+    "a b" and "b a" add up into one edge. Depth 2 adds the bi-grams between
+    the neighbours of ``tag`` and their own neighbours while ``max_nodes``
+    allows; edges of ``tag`` are kept before them within ``max_edges``.
+    """
+    main_tag_data = app.tags.get_by_tag(owner, tag)
+    if not main_tag_data:
+        return None
+
+    main_tag_freq = main_tag_data.get("posts_count", 1)
+    if main_tag_freq is None:
+        main_tag_freq = 1
+    nodes: Dict[str, dict] = {tag: {"id": tag, "frequency": main_tag_freq, "type": "main"}}
+    edges: Dict[Tuple[str, str], dict] = {}
+    edge_levels: Dict[Tuple[str, str], int] = {}
+    candidates_count = 0
+    projection = {"_id": False, "tag": True, "posts_count": True}
+    frontier = [tag]
+    for level in range(1, depth + 1):
+        if not frontier or len(nodes) >= max_nodes:
+            break
+        frontier_set = set(frontier)
+        try:
+            if level == 1:
+                # Always fetch all bi-grams regardless of read status for the graph
+                # to ensure the visualization shows the full context
+                bi_grams = app.bi_grams.get_by_tags(
+                    owner, [tag], False, projection=projection, limit=GRAPH_BI_GRAMS_LIMIT
+                )
+            else:
+                bi_grams = app.bi_grams.get_by_any_tags(
+                    owner, frontier, projection=projection, limit=GRAPH_BI_GRAMS_LIMIT
+                )
+        except Exception as e:
+            logging.warning("Failed to get bi-grams for tag %s: %s", tag, e)
+            break
+
+        candidates: Dict[str, dict] = {}
+        level_edges: Dict[Tuple[str, str], dict] = {}
+        for bi_gram in bi_grams:
+            pair = _bi_gram_pair(bi_gram)
+            if pair is None:
+                continue
+            first, second, bi_gram_freq = pair
+            if first in frontier_set:
+                source, other = first, second
+            elif second in frontier_set:
+                source, other = second, first
+            else:
+                continue
+            key = (source, other) if source < other else (other, source)
+            if key in edges:
+                continue
+            if other not in nodes and other not in candidates:
+                candidates[other] = {
+                    "id": other,
+                    "frequency": bi_gram_freq,  # Use bi-gram frequency as default
+                    "bigram_frequency": bi_gram_freq,
+                    "type": "related",
+                }
+            if key in level_edges:
+                # Combine weights for duplicate edges
+                level_edges[key]["weight"] += bi_gram_freq
+            else:
+                level_edges[key] = {"source": source, "target": other, "weight": bi_gram_freq}
+
+        candidates_count += len(candidates)
+        new_nodes = _top_related_nodes(app, owner, candidates, max_nodes - len(nodes))
+        for node in new_nodes:
+            if level > 1:
+                node["depth"] = level
+            nodes[node["id"]] = node
+        for key, edge in level_edges.items():
+            if key[0] in nodes and key[1] in nodes:
+                edges[key] = edge
+                edge_levels[key] = level
+        frontier = [node["id"] for node in new_nodes]
+
+    edges_list = [
+        edges[key] for key in sorted(edges, key=lambda k: (edge_levels[k], -edges[k]["weight"]))
+    ]
+    original_edges_count = len(edges_list)
+    edges_list = edges_list[:max_edges]
+    nodes_list = list(nodes.values())
+
+    return {
+        "data": {"nodes": nodes_list, "links": edges_list},
+        "meta": {
+            "main_tag": tag,
+            "main_tag_frequency": max(0, main_tag_freq),
+            "related_tags_count": len(nodes_list) - 1,
+            "bi_grams_count": len(edges_list),
+            "has_bigrams": bool(edges_list),
+            "truncated": bool(
+                candidates_count + 1 > len(nodes_list)
+                or original_edges_count > len(edges_list)
+            ),
+            "original_nodes_count": candidates_count + 1,
+            "original_edges_count": original_edges_count,
+            "depth": depth,
+        },
+    }
+
+
 def on_get_tag_bi_grams_graph(
-    app: "RSSTagApplication", user: dict, tag: str
+    app: "RSSTagApplication", user: dict, tag: str, request: Optional[Request] = None
 ) -> Response:
     """
     Get bi-grams graph data for visualization.
-    Returns nodes (tags) and edges (bi-grams) for force-directed graph.
+    Returns nodes (tags) and edges (bi-grams) for force-directed graph,
+    bounded by the depth, max_nodes and max_edges request args.
     """
     try:
         if not tag:
@@ -151,184 +329,20 @@ def on_get_tag_bi_grams_graph(
                 status=400,
             )
 
-        # Get the main tag data
-        main_tag_data = app.tags.get_by_tag(user["sid"], tag)
-        if not main_tag_data:
+        depth, max_nodes, max_edges = _graph_budget(request)
+        result = build_bi_grams_graph(app, user["sid"], tag, depth, max_nodes, max_edges)
+        if result is None:
             return Response(
                 json.dumps({"error": "Tag not found"}),
                 mimetype="application/json",
                 status=404,
             )
 
-        # Get bi-grams containing the main tag
-        try:
-            # Always fetch all bi-grams regardless of read status for the graph
-            # to ensure the visualization shows the full context
-            bi_grams = app.bi_grams.get_by_tags(user["sid"], [tag], False)
-            if bi_grams is None:
-                bi_grams = []
-        except Exception as e:
-            logging.warning(f"Failed to get bi-grams for tag {tag}: {e}")
-            bi_grams = []
-
-        # Build nodes and edges
-        nodes = {}
-        edges = []
-
-        # Add main tag as primary node
-        main_tag_freq = main_tag_data.get("posts_count", 1)
-        if main_tag_freq is None:
-            main_tag_freq = 1
-
-        nodes[tag] = {"id": tag, "frequency": main_tag_freq, "type": "main"}
-
-        # Process bi-grams to build the graph
-        for bi_gram in bi_grams:
-            try:
-                bi_gram_tag = bi_gram["tag"]
-                bi_gram_freq = bi_gram.get("posts_count", 1)
-                if bi_gram_freq is None:
-                    bi_gram_freq = 1
-
-                # Skip if frequency is too low
-                if bi_gram_freq < 1:
-                    continue
-
-                # Split bi-gram into individual tags
-                tags_in_bi_gram = bi_gram_tag.split()
-
-                # Skip if not a valid bi-gram (should have exactly 2 tags)
-                if len(tags_in_bi_gram) != 2:
-                    continue
-
-                # Find the other tag in the bi-gram (not the main tag)
-                other_tags = [t for t in tags_in_bi_gram if t != tag]
-
-                for other_tag in other_tags:
-                    # Skip if the other tag is the same as the main tag
-                    if other_tag == tag:
-                        continue
-
-                    # Add other tag as node if not already present
-                    if other_tag not in nodes:
-                        other_tag_freq = (
-                            bi_gram_freq  # Use bi-gram frequency as default
-                        )
-                        try:
-                            other_tag_data = app.tags.get_by_tag(user["sid"], other_tag)
-                            if other_tag_data:
-                                tag_posts_count = other_tag_data.get(
-                                    "posts_count", None
-                                )
-                                if tag_posts_count is not None and tag_posts_count > 0:
-                                    other_tag_freq = tag_posts_count
-                        except Exception as e:
-                            import logging
-
-                            logging.warning(
-                                f"Failed to get tag data for {other_tag}: {e}"
-                            )
-                            # Use bi-gram frequency as fallback
-
-                        nodes[other_tag] = {
-                            "id": other_tag,
-                            "frequency": other_tag_freq,
-                            "bigram_frequency": bi_gram_freq,  # Also include bi-gram frequency
-                            "type": "related",
-                        }
-
-                    # Add edge between main tag and other tag
-                    # Check for existing edge and combine weights if duplicate
-                    existing_edge_index = None
-                    for i, edge in enumerate(edges):
-                        if (edge["source"] == tag and edge["target"] == other_tag) or (
-                            edge["source"] == other_tag and edge["target"] == tag
-                        ):
-                            existing_edge_index = i
-                            break
-
-                    if existing_edge_index is not None:
-                        # Combine weights for duplicate edges
-                        edges[existing_edge_index]["weight"] += bi_gram_freq
-                    else:
-                        # Add new edge
-                        edges.append(
-                            {"source": tag, "target": other_tag, "weight": bi_gram_freq}
-                        )
-            except Exception:
-                # Skip problematic bi-grams but continue processing
-                continue
-
-        # Convert nodes dict to list
-        try:
-            nodes_list = list(nodes.values())
-            if nodes_list is None:
-                nodes_list = []
-        except Exception:
-            nodes_list = []
-
-        # Ensure we have at least the main node even if no bi-grams found
-        if not nodes_list:
-            nodes_list = [{"id": tag, "frequency": main_tag_freq, "type": "main"}]
-
-        # Limit the graph size for performance (max 100 nodes, 200 edges)
-        max_nodes = 100
-        max_edges = 200
-
-        # Sort nodes by frequency and keep top nodes
-        if len(nodes_list) > max_nodes:
-            # Separate main tag to ensure it's preserved
-            main_node = next((n for n in nodes_list if n["id"] == tag), None)
-            other_nodes = [n for n in nodes_list if n["id"] != tag]
-
-            other_nodes.sort(key=lambda x: x["frequency"], reverse=True)
-            # Keep top (max_nodes - 1) other nodes
-            other_nodes = other_nodes[: max_nodes - 1]
-
-            nodes_list = [main_node] + other_nodes if main_node else other_nodes
-
-        # Filter edges to only include those between remaining nodes
-        remaining_node_ids = {node["id"] for node in nodes_list}
-        edges = [
-            edge
-            for edge in edges
-            if edge["source"] in remaining_node_ids
-            and edge["target"] in remaining_node_ids
-        ]
-
-        # Sort edges by weight and keep top edges
-        if len(edges) > max_edges:
-            edges.sort(key=lambda x: x["weight"], reverse=True)
-            edges = edges[:max_edges]
-
-        # Add some metadata about the graph
-        original_nodes_count = len(nodes)
-        original_edges_count = len(edges)
-
-        result = {
-            "data": {"nodes": nodes_list, "links": edges},
-            "meta": {
-                "main_tag": tag if tag else "unknown",
-                "main_tag_frequency": max(0, main_tag_freq),
-                "related_tags_count": max(0, len(nodes_list) - 1),
-                "bi_grams_count": max(0, len(edges)),
-                "has_bigrams": bool(len(edges) > 0),
-                "truncated": bool(
-                    len(nodes.values()) > max_nodes or len(edges) > max_edges
-                ),
-                "original_nodes_count": max(0, original_nodes_count),
-                "original_edges_count": max(
-                    0, original_edges_count if original_edges_count is not None else 0
-                ),
-            },
-        }
-
         return Response(json.dumps(result), mimetype="application/json")
 
     except Exception as e:
         # Log the error for debugging
         import traceback
-        import logging
 
         logging.error(f"Error in on_get_tag_bi_grams_graph: {e}")
         logging.error(traceback.format_exc())
@@ -385,7 +399,7 @@ def on_group_by_bigrams_dyn_get(
     posts = app.posts.get_all(user["sid"], only_unread, projection={"lemmas": True})
     texts = []
     for post in posts:
-        texts.append(gzip.decompress(post["lemmas"]).decode("utf-8", "replace"))
+        texts.append(decode_text(post["lemmas"]))
 
     stopw = set(stopwords.words("english") + stopwords.words("russian"))
     vectorizer = TfidfVectorizer(stop_words=list(stopw))
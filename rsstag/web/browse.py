@@ -1,4 +1,3 @@
-import gzip
 import json
 import re
 from collections import OrderedDict, defaultdict
@@ -10,6 +9,7 @@ from rsstag.lda import LDA
 from rsstag.quality import summarize_category_quality
 from rsstag.utils import get_sorted_dict_by_alphabet
 from rsstag.web.providers import feeds_list_capable_providers
+from rsstag.text_codec import decode_text, decode_words
 
 from werkzeug.wrappers import Request, Response
 from werkzeug.exceptions import NotFound
@@ -247,8 +247,7 @@ def on_wordtree_texts_get(app: "RSSTagApplication", user: dict, request: Request
         data = []
         window = 10
         for post in cursor:
-            text = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            words = text.split()
+            words = decode_words(post["lemmas"])
             for i, word in enumerate(words):
                 if word == tag:
                     start_pos = i - window
@@ -271,7 +270,7 @@ def on_topics_texts_get(app: "RSSTagApplication", user: dict, request: Request,
             user["sid"], [tag], user["settings"]["only_unread"], {"lemmas": True}
         )
         texts = [
-            gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+            decode_text(post["lemmas"])
             for post in cursor
         ]
         lda = LDA()
@@ -295,7 +294,7 @@ def on_topics_get(
         user["sid"], user["settings"]["only_unread"], {"lemmas": True}
     )
     texts = [
-        gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+        decode_text(post["lemmas"])
         for post in cursor
     ]
     lda = LDA()
@@ -383,7 +382,7 @@ def on_get_sentences_with_tags(
     w_cond = "|".join(re.escape(word) for word in words)
     re_words = re.compile(r"(\b({})\b)".format(w_cond), re.IGNORECASE | re.UNICODE)
     for post in db_posts:
-        txt = gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
+        txt = decode_text(post["content"]["content"])
         if post["content"]["title"]:
             txt = post["content"]["title"] + ". " + txt
         html_c.purge()
@@ -476,7 +475,7 @@ def on_download_post_get(app: "RSSTagApplication", user: dict, request: Request,
     if not post or "content" not in post:
         return Response("Post not found", status=404)
 
-    content = gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
+    content = decode_text(post["content"]["content"])
     title = post["content"].get("title", f"post_{post_id}")
     safe_title = title[:50].encode("ascii", "ignore").decode("ascii")
 
@@ -4,9 +4,8 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from rsstag.web.app import RSSTagApplication
 
-import gzip
-
 from rsstag.html_cleaner import HTMLCleaner
+from rsstag.text_codec import decode_text
 
 from werkzeug.wrappers import Response, Request
 
@@ -47,7 +46,7 @@ def on_chat_post(app: "RSSTagApplication", user: dict, rqst: Request):
         txt = (
             post["content"]["title"]
             + ". "
-            + gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
+            + decode_text(post["content"]["content"])
         )
 
         cleaner.purge()
@@ -1,4 +1,3 @@
-import gzip
 import json
 import logging
 from collections import defaultdict
@@ -12,6 +11,7 @@ from sklearn.metrics.pairwise import cosine_distances
 from sklearn.neighbors import NearestNeighbors
 
 from rsstag.stopwords import stopwords
+from rsstag.text_codec import decode_text
 from werkzeug.wrappers import Request, Response
 
 if TYPE_CHECKING:
@@ -31,7 +31,7 @@ def on_clusters_get(app: "RSSTagApplication", user: dict, request: Request) -> R
         if "clusters" not in post:
             continue
 
-        text = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+        text = decode_text(post["lemmas"])
         if not text.strip():
             continue
         for cl in post["clusters"]:
@@ -101,7 +101,7 @@ def on_clusters_dyn_get(app: "RSSTagApplication", user: dict, request: Request)
     pids = []
     post_tags = []
     for post in db_posts:
-        text = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+        text = decode_text(post["lemmas"])
         if not text.strip():
             continue
         texts.append(text)
@@ -227,15 +227,13 @@ def on_clusters_topics_dyn_get(app: "RSSTagApplication", user: dict, request: Re
         if not post_obj or not post_obj.get("content"):
             plain_text_cache[post_id] = ""
             return ""
-        raw_content: str = gzip.decompress(post_obj["content"]["content"]).decode(
-            "utf-8", "replace"
-        )
+        raw_content: str = decode_text(post_obj["content"]["content"])
         title: str = post_obj["content"].get("title", "")
         if title:
             raw_content = f"{title}. {raw_content}"
-        from rsstag.html_utils import build_html_mapping
+        from rsstag.html_utils import html_to_text
 
-        plain_text, _ = build_html_mapping(raw_content)
+        plain_text = html_to_text(raw_content)
         plain_text_cache[post_id] = plain_text
         return plain_text
 
@@ -536,15 +534,13 @@ def on_clusters_topics_dyn_sentences_post(
         if not post_obj or not post_obj.get("content"):
             plain_text_cache[post_id] = ""
             return ""
-        raw_content: str = gzip.decompress(post_obj["content"]["content"]).decode(
-            "utf-8", "replace"
-        )
+        raw_content: str = decode_text(post_obj["content"]["content"])
         title: str = post_obj["content"].get("title", "")
         if title:
             raw_content = f"{title}. {raw_content}"
-        from rsstag.html_utils import build_html_mapping
+        from rsstag.html_utils import html_to_text
 
-        plain_text, _ = build_html_mapping(raw_content)
+        plain_text = html_to_text(raw_content)
         plain_text_cache[post_id] = plain_text
         return plain_text
 
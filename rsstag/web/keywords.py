@@ -1,12 +1,14 @@
-import gzip
 import math
+from array import array
 from collections import Counter, defaultdict
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
 from urllib.parse import quote
 
+import numpy as np
 from werkzeug.wrappers import Response
 
+from rsstag.lemma_vocab import LemmaVocabulary, ids_view
 from rsstag.stopwords import stopwords
 
 if TYPE_CHECKING:
@@ -20,156 +22,184 @@ class KeywordItem:
     frequency: int
 
 
-def _load_lemmas_texts(app: "RSSTagApplication", user: dict) -> List[str]:
+@dataclass
+class LemmaDocs:
+    """Posts lemmas as arrays of normalized word ids.
+
+    Tokens dropped by normalization are removed from ``docs``, stop words
+    are kept (they break phrases) and flagged in ``stop`` by id.
+    """
+
+    docs: List[np.ndarray]
+    words: List[str]
+    stop: np.ndarray
+
+
+def _normalize_token(token: str) -> str:
+    normalized: str = token.strip().casefold()
+    if not normalized or len(normalized) < 2 or normalized.isdigit():
+        return ""
+    return normalized
+
+
+def _make_lemma_docs(
+    vocab: LemmaVocabulary, arrays: Iterable[array], stop_words: Set[str]
+) -> LemmaDocs:
+    # Normalize each vocabulary word once instead of every token occurrence.
+    local_ids: Dict[str, int] = {}
+    words: List[str] = []
+    mapping: np.ndarray = np.full(vocab.next_id, -1, dtype=np.int64)
+    for word_id, word in enumerate(vocab.words):
+        normalized: str = _normalize_token(word) if word else ""
+        if not normalized:
+            continue
+        local_id: Optional[int] = local_ids.get(normalized)
+        if local_id is None:
+            local_id = len(words)
+            local_ids[normalized] = local_id
+            words.append(normalized)
+        mapping[word_id] = local_id
+    stop: np.ndarray = np.fromiter(
+        (word in stop_words for word in words), dtype=bool, count=len(words)
+    )
+
+    docs: List[np.ndarray] = []
+    for word_ids in arrays:
+        doc: np.ndarray = mapping[ids_view(word_ids)]
+        doc = doc[doc >= 0]
+        if len(doc):
+            docs.append(doc)
+    return LemmaDocs(docs=docs, words=words, stop=stop)
+
+
+def _load_lemma_docs(
+    app: "RSSTagApplication", user: dict, stop_words: Set[str]
+) -> LemmaDocs:
     only_unread: Optional[bool] = user["settings"]["only_unread"] or None
     posts: Iterable[dict] = app.posts.get_all(
-        user["sid"], only_unread, projection={"lemmas": True}
+        user["sid"], only_unread, projection={"pid": True}
     )
-    texts: List[str] = []
-    for post in posts:
-        lemmas_data: Optional[bytes] = post.get("lemmas")
-        if not isinstance(lemmas_data, (bytes, bytearray)):
-            continue
-        text: str = gzip.decompress(lemmas_data).decode("utf-8", "replace").strip()
-        if text:
-            texts.append(text)
-    return texts
-
-
-def _tokenize_lemmas_text(text: str) -> List[str]:
-    tokens: List[str] = []
-    raw_tokens: List[str] = text.split()
-    for token in raw_tokens:
-        normalized: str = token.strip().casefold()
-        if not normalized or len(normalized) < 2 or normalized.isdigit():
-            continue
-        tokens.append(normalized)
-    return tokens
+    pids: List[str] = [post["pid"] for post in posts]
+    vocab, arrays = app.lemma_vocab.load_arrays(user["sid"], pids)
+    return _make_lemma_docs(vocab, arrays.values(), stop_words)
 
 
 def _get_stopwords() -> Set[str]:
     return set(stopwords.words("english") + stopwords.words("russian"))
 
 
-def _extract_rake_keywords(
-    texts: List[str], stop_words: Set[str], max_keywords: int
+def _rank_keywords(
+    scored: List[KeywordItem], max_keywords: int
 ) -> List[KeywordItem]:
-    phrase_freq: Counter[str] = Counter()
-    word_freq: Counter[str] = Counter()
-    word_degree: Counter[str] = Counter()
-
-    for text in texts:
-        tokens: List[str] = _tokenize_lemmas_text(text)
-        current_phrase: List[str] = []
-        for token in tokens:
-            if token in stop_words:
-                if current_phrase:
-                    phrase: str = " ".join(current_phrase)
-                    phrase_freq[phrase] += 1
-                    phrase_len: int = len(current_phrase)
-                    for phrase_word in current_phrase:
-                        word_freq[phrase_word] += 1
-                        word_degree[phrase_word] += max(0, phrase_len - 1)
-                    current_phrase = []
-                continue
-            current_phrase.append(token)
-        if current_phrase:
-            phrase = " ".join(current_phrase)
-            phrase_freq[phrase] += 1
-            phrase_len = len(current_phrase)
-            for phrase_word in current_phrase:
-                word_freq[phrase_word] += 1
-                word_degree[phrase_word] += max(0, phrase_len - 1)
-
-    word_score: Dict[str, float] = {}
+    scored.sort(key=lambda item: (item.score, item.frequency, item.phrase), reverse=True)
+    return scored[:max_keywords]
+
+
+def _extract_rake_keywords(lemma_docs: LemmaDocs, max_keywords: int) -> List[KeywordItem]:
+    phrase_freq: Counter[Tuple[int, ...]] = Counter()
+    for doc in lemma_docs.docs:
+        # Phrases are the runs between stop words.
+        stops: np.ndarray = np.flatnonzero(lemma_docs.stop[doc])
+        bounds: List[int] = [-1] + stops.tolist() + [len(doc)]
+        tokens: List[int] = doc.tolist()
+        for start, end in zip(bounds, bounds[1:]):
+            if end - start > 1:
+                phrase_freq[tuple(tokens[start + 1 : end])] += 1
+
+    word_freq: Counter[int] = Counter()
+    word_degree: Counter[int] = Counter()
+    for phrase, freq in phrase_freq.items():
+        phrase_len: int = len(phrase)
+        for phrase_word in phrase:
+            word_freq[phrase_word] += freq
+            word_degree[phrase_word] += freq * (phrase_len - 1)
+
+    word_score: Dict[int, float] = {}
     for word, freq in word_freq.items():
         if freq <= 0:
             continue
         degree: int = word_degree[word] + freq
         word_score[word] = degree / float(freq)
 
+    words: List[str] = lemma_docs.words
     ranked: List[KeywordItem] = []
     for phrase, freq in phrase_freq.items():
-        words: List[str] = phrase.split()
         score: float = 0.0
-        for word in words:
+        for word in phrase:
             score += word_score.get(word, 0.0)
         if score <= 0.0:
             continue
-        ranked.append(KeywordItem(phrase=phrase, score=score, frequency=freq))
+        ranked.append(
+            KeywordItem(
+                phrase=" ".join(words[word] for word in phrase),
+                score=score,
+                frequency=freq,
+            )
+        )
 
-    ranked.sort(key=lambda item: (item.score, item.frequency, item.phrase), reverse=True)
-    return ranked[:max_keywords]
+    return _rank_keywords(ranked, max_keywords)
 
 
-def _extract_yake_keywords(
-    texts: List[str], stop_words: Set[str], max_keywords: int
-) -> List[KeywordItem]:
-    docs_tokens: List[List[str]] = [_tokenize_lemmas_text(text) for text in texts]
-    docs_tokens = [tokens for tokens in docs_tokens if tokens]
-    if not docs_tokens:
+def _extract_yake_keywords(lemma_docs: LemmaDocs, max_keywords: int) -> List[KeywordItem]:
+    docs: List[np.ndarray] = lemma_docs.docs
+    if not docs:
         return []
 
-    total_docs: int = len(docs_tokens)
-    total_tokens: int = sum(len(tokens) for tokens in docs_tokens)
+    total_docs: int = len(docs)
+    total_tokens: int = sum(len(doc) for doc in docs)
     if total_tokens <= 0:
         return []
 
-    word_tf: Counter[str] = Counter()
-    word_df: Counter[str] = Counter()
-    word_positions: defaultdict[str, List[float]] = defaultdict(list)
-    for tokens in docs_tokens:
-        seen_in_doc: Set[str] = set()
-        doc_len: int = len(tokens)
-        for idx, token in enumerate(tokens):
-            if token in stop_words:
-                continue
-            word_tf[token] += 1
-            if token not in seen_in_doc:
-                seen_in_doc.add(token)
-                word_df[token] += 1
-                word_positions[token].append((idx + 1) / float(doc_len + 1))
-
-    word_weight: Dict[str, float] = {}
-    for token, tf in word_tf.items():
-        df: int = word_df.get(token, 1)
-        avg_pos: float = sum(word_positions[token]) / float(len(word_positions[token]))
-        tf_norm: float = tf / float(total_tokens)
+    words_count: int = len(lemma_docs.words)
+    word_tf: np.ndarray = np.zeros(words_count, dtype=np.int64)
+    word_df: np.ndarray = np.zeros(words_count, dtype=np.int64)
+    word_pos_sum: np.ndarray = np.zeros(words_count, dtype=np.float64)
+    not_stop: List[np.ndarray] = []
+    for doc in docs:
+        doc_ok: np.ndarray = ~lemma_docs.stop[doc]
+        not_stop.append(doc_ok)
+        positions: np.ndarray = np.flatnonzero(doc_ok)
+        doc_words: np.ndarray = doc[positions]
+        word_tf += np.bincount(doc_words, minlength=words_count)
+        unique_words, first_idx = np.unique(doc_words, return_index=True)
+        word_df[unique_words] += 1
+        word_pos_sum[unique_words] += (positions[first_idx] + 1) / float(len(doc) + 1)
+
+    word_weight: Dict[int, float] = {}
+    for token in np.flatnonzero(word_tf).tolist():
+        df: int = int(word_df[token])
+        avg_pos: float = float(word_pos_sum[token]) / float(df)
+        tf_norm: float = int(word_tf[token]) / float(total_tokens)
         idf: float = math.log((1.0 + total_docs) / (1.0 + df)) + 1.0
         position_boost: float = 1.0 / (0.3 + avg_pos)
         word_weight[token] = tf_norm * idf * position_boost
 
-    candidate_freq: Counter[str] = Counter()
-    candidate_df: Counter[str] = Counter()
-    candidate_first_pos: defaultdict[str, List[float]] = defaultdict(list)
-
-    for tokens in docs_tokens:
-        doc_len = len(tokens)
-        seen_candidates: Set[str] = set()
-        for start_idx in range(doc_len):
-            if tokens[start_idx] in stop_words:
-                continue
-            for n_size in (1, 2, 3):
-                end_idx: int = start_idx + n_size
-                if end_idx > doc_len:
-                    break
-                phrase_words: List[str] = tokens[start_idx:end_idx]
-                if any(word in stop_words for word in phrase_words):
-                    continue
-                phrase: str = " ".join(phrase_words)
+    candidate_freq: Counter[Tuple[int, ...]] = Counter()
+    candidate_df: Counter[Tuple[int, ...]] = Counter()
+    candidate_first_pos: defaultdict[Tuple[int, ...], List[float]] = defaultdict(list)
+
+    for doc, doc_ok in zip(docs, not_stop):
+        doc_len: int = len(doc)
+        tokens: List[int] = doc.tolist()
+        seen_candidates: Set[Tuple[int, ...]] = set()
+        valid: np.ndarray = doc_ok
+        for n_size in (1, 2, 3):
+            if n_size > 1:
+                # Windows of n_size words without a stop word.
+                valid = valid[:-1] & doc_ok[n_size - 1 :]
+            for start_idx in np.flatnonzero(valid).tolist():
+                phrase: Tuple[int, ...] = tuple(tokens[start_idx : start_idx + n_size])
                 candidate_freq[phrase] += 1
                 if phrase not in seen_candidates:
                     seen_candidates.add(phrase)
                     candidate_df[phrase] += 1
                     candidate_first_pos[phrase].append((start_idx + 1) / float(doc_len + 1))
 
+    words: List[str] = lemma_docs.words
     ranked: List[KeywordItem] = []
     for phrase, freq in candidate_freq.items():
-        phrase_words = phrase.split()
-        if not phrase_words:
-            continue
-        word_scores_sum: float = sum(word_weight.get(word, 0.0) for word in phrase_words)
-        avg_word_score: float = word_scores_sum / float(len(phrase_words))
+        word_scores_sum: float = sum(word_weight.get(word, 0.0) for word in phrase)
+        avg_word_score: float = word_scores_sum / float(len(phrase))
         df_boost: float = 1.0 + (candidate_df.get(phrase, 1) / float(total_docs))
         first_pos_values: List[float] = candidate_first_pos.get(phrase, [1.0])
         avg_first_pos: float = sum(first_pos_values) / float(len(first_pos_values))
@@ -178,10 +208,15 @@ def _extract_yake_keywords(
         score: float = avg_word_score * df_boost * early_boost * freq_boost
         if score <= 0.0:
             continue
-        ranked.append(KeywordItem(phrase=phrase, score=score, frequency=freq))
+        ranked.append(
+            KeywordItem(
+                phrase=" ".join(words[word] for word in phrase),
+                score=score,
+                frequency=freq,
+            )
+        )
 
-    ranked.sort(key=lambda item: (item.score, item.frequency, item.phrase), reverse=True)
-    return ranked[:max_keywords]
+    return _rank_keywords(ranked, max_keywords)
 
 
 def _render_keywords_page(
@@ -252,11 +287,9 @@ def _render_keywords_page(
 def on_group_by_rake_dyn_get(
     app: "RSSTagApplication", user: dict, page_number: int = 1
 ) -> Response:
-    texts: List[str] = _load_lemmas_texts(app, user)
-    stop_words: Set[str] = _get_stopwords()
+    lemma_docs: LemmaDocs = _load_lemma_docs(app, user, _get_stopwords())
     keywords: List[KeywordItem] = _extract_rake_keywords(
-        texts=texts,
-        stop_words=stop_words,
+        lemma_docs=lemma_docs,
         max_keywords=max(50, user["settings"]["tags_on_page"] * 12),
     )
     return _render_keywords_page(
@@ -272,11 +305,9 @@ def on_group_by_rake_dyn_get(
 def on_group_by_yake_dyn_get(
     app: "RSSTagApplication", user: dict, page_number: int = 1
 ) -> Response:
-    texts: List[str] = _load_lemmas_texts(app, user)
-    stop_words: Set[str] = _get_stopwords()
+    lemma_docs: LemmaDocs = _load_lemma_docs(app, user, _get_stopwords())
     keywords: List[KeywordItem] = _extract_yake_keywords(
-        texts=texts,
-        stop_words=stop_words,
+        lemma_docs=lemma_docs,
         max_keywords=max(50, user["settings"]["tags_on_page"] * 12),
     )
     return _render_keywords_page(
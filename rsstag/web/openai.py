@@ -5,9 +5,9 @@ from typing import Any, TYPE_CHECKING
 if TYPE_CHECKING:
     from rsstag.web.app import RSSTagApplication
 
-import gzip
 
 from rsstag.html_cleaner import HTMLCleaner
+from rsstag.text_codec import decode_text
 
 from werkzeug.wrappers import Response, Request
 
@@ -137,7 +137,7 @@ def on_openai_post(app: "RSSTagApplication", user: dict, rqst: Request):
         txt = (
             post["content"]["title"]
             + ". "
-            + gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
+            + decode_text(post["content"]["content"])
         )
 
         cleaner.purge()
@@ -210,7 +210,7 @@ def on_openai_post_(app: "RSSTagApplication", user: dict, rqst: Request):
         txt = (
             post["content"]["title"]
             + ". "
-            + gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
+            + decode_text(post["content"]["content"])
         )
         txt = txt.strip()
         cleaner.purge()
@@ -1,14 +1,15 @@
 import json
 import html
 import re
-import gzip
 import logging
+from array import array
 from collections import defaultdict
 from urllib.parse import unquote_plus, unquote, quote_plus
 import requests  # Add requests import
 
 from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
 from jinja2 import Template
+import numpy as np
 
 if TYPE_CHECKING:
     from rsstag.web.app import RSSTagApplication
@@ -19,7 +20,6 @@ from rsstag.snippets import (
     strip_html_markup,
 )
 from rsstag.tasks import (
-    TASK_MARK,
     TASK_MARK_TELEGRAM,
     TASK_GMAIL_SORT,
     TASK_NOT_IN_PROCESSING,
@@ -31,6 +31,8 @@ from rsstag.tags_builder import TagsBuilder
 from rsstag.utils import text_to_speech
 from rsstag.web.context_filter_handlers import get_context_filter_manager
 from rsstag.topic_aliases import RssTagTopicAliases
+from rsstag.text_codec import decode_text
+from rsstag.lemma_vocab import ids_view
 
 from werkzeug.wrappers import Request, Response
 from werkzeug.exceptions import BadRequest, InternalServerError, NotFound
@@ -60,8 +62,8 @@ def _decode_post_lemmas(post: dict[str, Any]) -> str:
     if not isinstance(payload, (bytes, bytearray)):
         return ""
     try:
-        return gzip.decompress(payload).decode("utf-8", "replace")
-    except (EOFError, OSError) as error:
+        return decode_text(payload)
+    except (EOFError, OSError, ValueError) as error:
         logging.warning(
             "Can`t decode lemmas for post %s: %s",
             post.get("pid", "unknown"),
@@ -269,16 +271,16 @@ def _build_topics_index(
                 if plain_text is None:
                     post_obj: Optional[dict] = posts_data.get(first_post_id)
                     if post_obj and post_obj.get("content"):
-                        raw_content: str = gzip.decompress(
+                        raw_content: str = decode_text(
                             post_obj["content"]["content"]
-                        ).decode("utf-8", "replace")
+                        )
                         if post_obj["content"].get("title"):
                             raw_content = (
                                 f"{post_obj['content']['title']}. {raw_content}"
                             )
-                        from rsstag.html_utils import build_html_mapping
+                        from rsstag.html_utils import html_to_text
 
-                        plain_text, _ = build_html_mapping(raw_content)
+                        plain_text = html_to_text(raw_content)
                         plain_text_cache[first_post_id] = plain_text
 
                 if plain_text:
@@ -340,6 +342,26 @@ def _build_topics_index(
     return topic_counts, post_topic_mapping
 
 
+def _get_topic_counts(
+    app: "RSSTagApplication",
+    user: dict,
+    normalized_context_tags: Optional[list[str]],
+    only_unread: bool = False,
+) -> dict[str, dict]:
+    """Topics of the topics pages, from the persisted topics index.
+
+    Context filters select by post content, feed and category, which the
+    index doesn't keep: with any of them active the topics are still built
+    per request by `_build_topics_index`.
+    """
+    if get_context_filter_manager(user).has_active_filters():
+        topic_counts, _ = _build_topics_index(
+            app, user, normalized_context_tags, only_unread=only_unread
+        )
+        return topic_counts
+    return app.topics_index.get_topics(user["sid"], only_unread=only_unread)
+
+
 def _split_topic_parts(topic_name: str) -> list[str]:
     """Split hierarchical topic path by '>' and remove empty parts."""
     return [part.strip() for part in topic_name.split(">") if part.strip()]
@@ -616,9 +638,7 @@ def _load_posts_for_snippets(
         feed_title: str = feed["title"] if feed else "Unknown feed"
         feed_titles.add(feed_title)
 
-        raw_content: str = gzip.decompress(post["content"]["content"]).decode(
-            "utf-8", "replace"
-        )
+        raw_content: str = decode_text(post["content"]["content"])
         title: str = str(post.get("content", {}).get("title", ""))
         if title:
             raw_content = f"{title}. {raw_content}"
@@ -1620,54 +1640,22 @@ def on_read_posts_post(
         code = 400
 
     if post_ids:
-        tags = defaultdict(int)
-        bi_grams = defaultdict(int)
-        letters = defaultdict(int)
-        for_insert = []
-        db_posts = app.posts.get_by_pids(
-            user["sid"],
-            post_ids,
-            {"id": True, "tags": True, "bi_grams": True, "read": True, "provider": True},
+        service = ReadStateService(
+            app.posts,
+            app.tags,
+            app.bi_grams,
+            app.letters,
+            app.tasks,
+            app.post_grouping,
+            app.cooccurrence,
         )
-        for d in db_posts:
-            if d["read"] != readed:
-                for_insert.append(
-                    {
-                        "user": user["sid"],
-                        "id": d["id"],
-                        "status": readed,
-                        "processing": TASK_NOT_IN_PROCESSING,
-                        "type": TASK_MARK,
-                        "provider": d.get("provider") or user.get("provider", ""),
-                    }
-                )
-                for t in d["tags"]:
-                    tags[t] += 1
-                    if not t:
-                        continue
-                    letters[t[0]] += 1
-                for bi_g in d["bi_grams"]:
-                    bi_grams[bi_g] += 1
-
-        if app.tasks.add_task(
-            {"type": TASK_MARK, "user": user["sid"], "data": for_insert}
-        ):
-            changed = app.posts.change_status(user["sid"], post_ids, readed)
-            if changed and tags:
-                changed = app.tags.change_unread(user["sid"], tags, readed)
-            if changed and bi_grams:
-                changed = app.bi_grams.change_unread(user["sid"], bi_grams, readed)
-            if changed and letters:
-                app.letters.change_unread(user["sid"], letters, readed)
-                changed = True
-            if changed:
-                for pid in post_ids:
-                    app.post_grouping.mark_sequences_read(user["sid"], pid, readed)
-                code = 200
-                result = {"data": "ok"}
-            else:
-                code = 500
-                result = {"error": "Database error"}
+        marked = service.mark_posts(user["sid"], user.get("provider", ""), post_ids, readed)
+        if marked["ok"]:
+            code = 200
+            result = {"data": "ok"}
+        else:
+            code = 500
+            result = {"error": marked["error"]}
 
     return Response(json.dumps(result), mimetype="application/json", status=code)
 
@@ -1724,9 +1712,7 @@ def on_posts_content_post(
             if post["attachments"]:
                 for href in post["attachments"]:
                     attachments += '<a href="{0}">{0}</a><br />'.format(href)
-            content = gzip.decompress(post["content"]["content"]).decode(
-                "utf-8", "replace"
-            )
+            content = decode_text(post["content"]["content"])
             if attachments:
                 content += "<p>Attachments:<br />{0}<p>".format(attachments)
             posts_content.append({"pos": post["pid"], "content": content})
@@ -2234,7 +2220,7 @@ def on_entity_get(
     by_feed = {}
     pids = set()
     multi_word_tag = len(tag_words) > 1
-    tag_words_set = set(tag_words)
+    tag_ids, lemma_arrays = _entity_lemma_arrays(app, user, tag_words, db_posts)
 
     # Maximum length for reranking API
     MAX_CHUNK_LENGTH = 1024
@@ -2249,54 +2235,10 @@ def on_entity_get(
         post["lemmas"] = _decode_post_lemmas(post)
 
         # If tag has multiple words, check if they are within the window distance
-        if multi_word_tag:
-            lemmas_list = post["lemmas"].split()
-            words_positions = {}
-
-            # Find positions of all tag words in lemmas
-
-            for i, lemma in enumerate(lemmas_list):
-                if lemma in tag_words_set:
-                    if lemma not in words_positions:
-                        words_positions[lemma] = []
-                    words_positions[lemma].append(i)
-
-            # Check if all words are present
-            if len(words_positions) != len(tag_words):
-                continue
-
-            # Check if any combination of positions is within window distance
-            within_window = False
-
-            # Get all possible combinations of positions
-            positions_lists = []
-            for word in tag_words:
-                if word in words_positions and words_positions[word]:
-                    positions_lists.append(words_positions[word])
-
-            # If we have positions for all words
-            if len(positions_lists) == len(tag_words):
-                # Try each position of the first word with all combinations of other words
-                for pos1 in positions_lists[0]:
-                    # Create a test set starting with the first word's position
-                    test_positions = [pos1]
-
-                    # Try to find positions of other words that are within window distance
-                    for positions in positions_lists[1:]:
-                        # Find the nearest position to pos1
-                        nearest_pos = min(positions, key=lambda x: abs(x - pos1))
-                        test_positions.append(nearest_pos)
-
-                    # Check if the max distance is within window
-                    max_pos = max(test_positions)
-                    min_pos = min(test_positions)
-                    if max_pos - min_pos <= window:
-                        within_window = True
-                        break
-
-            # Skip post if words aren't within window
-            if not within_window:
-                continue
+        if multi_word_tag and not _entity_post_matches_window(
+            lemma_arrays.get(post["pid"]), tag_ids, window
+        ):
+            continue
 
         if post["pid"] not in pids:
             pids.add(post["pid"])
@@ -2317,9 +2259,7 @@ def on_entity_get(
                 if rerank and rerank_url:
                     try:
                         # Get content
-                        content = gzip.decompress(post["content"]["content"]).decode(
-                            "utf-8", "replace"
-                        )
+                        content = decode_text(post["content"]["content"])
 
                         # Split content into chunks with 50% overlap
                         chunks = []
@@ -2418,20 +2358,17 @@ def on_entity_get(
 
 
 def get_embeddings(texts: list[str]) -> list[list[float]]:
-    from http.client import HTTPConnection
+    from rsstag.llm.http_pool import shared_pool
 
-    conn = HTTPConnection("192.168.178.26:8256")
-    conn.request(
+    resp = shared_pool().request(
+        "http://192.168.178.26:8256",
         "POST",
         "/v1/embeddings",
         json.dumps(texts),
         {"Content-Type": "application/json"},
     )
-    resp = conn.getresponse()
-    data = resp.read()
-    conn.close()
 
-    return json.loads(data)
+    return json.loads(resp.body)
 
 
 def cosine_similarity(v1: list[float], v2: list[float]) -> float:
@@ -2474,7 +2411,7 @@ def on_entity_get_(
     by_feed = {}
     pids = set()
     multi_word_tag = len(tag_words) > 1
-    tag_words_set = set(tag_words)
+    tag_ids, lemma_arrays = _entity_lemma_arrays(app, user, tag_words, db_posts)
 
     # Maximum length for chunking
     MAX_CHUNK_LENGTH = 1024
@@ -2496,54 +2433,10 @@ def on_entity_get_(
         post["lemmas"] = _decode_post_lemmas(post)
 
         # If tag has multiple words, check if they are within the window distance
-        if multi_word_tag:
-            lemmas_list = post["lemmas"].split()
-            words_positions = {}
-
-            # Find positions of all tag words in lemmas
-
-            for i, lemma in enumerate(lemmas_list):
-                if lemma in tag_words_set:
-                    if lemma not in words_positions:
-                        words_positions[lemma] = []
-                    words_positions[lemma].append(i)
-
-            # Check if all words are present
-            if len(words_positions) != len(tag_words):
-                continue
-
-            # Check if any combination of positions is within window distance
-            within_window = False
-
-            # Get all possible combinations of positions
-            positions_lists = []
-            for word in tag_words:
-                if word in words_positions and words_positions[word]:
-                    positions_lists.append(words_positions[word])
-
-            # If we have positions for all words
-            if len(positions_lists) == len(tag_words):
-                # Try each position of the first word with all combinations of other words
-                for pos1 in positions_lists[0]:
-                    # Create a test set starting with the first word's position
-                    test_positions = [pos1]
-
-                    # Try to find positions of other words that are within window distance
-                    for positions in positions_lists[1:]:
-                        # Find the nearest position to pos1
-                        nearest_pos = min(positions, key=lambda x: abs(x - pos1))
-                        test_positions.append(nearest_pos)
-
-                    # Check if the max distance is within window
-                    max_pos = max(test_positions)
-                    min_pos = min(test_positions)
-                    if max_pos - min_pos <= window:
-                        within_window = True
-                        break
-
-            # Skip post if words aren't within window
-            if not within_window:
-                continue
+        if multi_word_tag and not _entity_post_matches_window(
+            lemma_arrays.get(post["pid"]), tag_ids, window
+        ):
+            continue
 
         if post["pid"] not in pids:
             pids.add(post["pid"])
@@ -2564,9 +2457,7 @@ def on_entity_get_(
                 if rerank and query_embedding:
                     try:
                         # Get content
-                        content = gzip.decompress(post["content"]["content"]).decode(
-                            "utf-8", "replace"
-                        )
+                        content = decode_text(post["content"]["content"])
 
                         # Split content into chunks with 50% overlap
                         chunks = []
@@ -2828,9 +2719,7 @@ def _build_grouped_posts_page_context(
             if feed_title not in feed_titles:
                 feed_titles.append(feed_title)
 
-            raw_content = gzip.decompress(post["content"]["content"]).decode(
-                "utf-8", "replace"
-            )
+            raw_content = decode_text(post["content"]["content"])
 
             if post["content"]["title"]:
                 title = post["content"]["title"]
@@ -2868,11 +2757,9 @@ def _build_grouped_posts_page_context(
                     (p for p in posts_info if p["post_id"] == post_id), None
                 )
                 if p_info_ctx and post_id not in plain_text_cache:
-                    from rsstag.html_utils import build_html_mapping
+                    from rsstag.html_utils import html_to_text
 
-                    plain_text_cache[post_id], _ = build_html_mapping(
-                        p_info_ctx["raw_content"]
-                    )
+                    plain_text_cache[post_id] = html_to_text(p_info_ctx["raw_content"])
 
             for sentence in post_grouped_data["sentences"]:
                 all_sentences_data.append(
@@ -3135,9 +3022,9 @@ def _collect_topic_snippets(
             sentences_map = {s["number"]: s for s in post_grouped_data["sentences"]}
 
             if normalized_context_tags and post_id not in plain_text_cache:
-                from rsstag.html_utils import build_html_mapping
+                from rsstag.html_utils import html_to_text
 
-                plain_text_cache[post_id], _ = build_html_mapping(raw_content)
+                plain_text_cache[post_id] = html_to_text(raw_content)
 
             post_topics_data = merge_grouped_snippets(
                 raw_content,
@@ -3523,7 +3410,7 @@ def on_topic_grouped_snippets_get(
     context_tags = _get_context_tags(user)
     normalized_context_tags = _normalize_context_tags(context_tags)
     only_unread: bool = bool(user.get("settings", {}).get("only_unread", False))
-    topic_counts, _ = _build_topics_index(
+    topic_counts = _get_topic_counts(
         app, user, normalized_context_tags, only_unread=only_unread
     )
     matching_topic_data: list[dict[str, Any]] = [
@@ -3642,55 +3529,66 @@ def on_tag_grouped_snippets_get(
 
 
 def _entity_post_matches_window(
-    post: dict[str, Any], tag_words: list[str], window: int
+    word_ids: Optional[array], tag_ids: list[int], window: int
 ) -> bool:
-    """Return whether a post contains all entity words close enough in lemmas."""
-    if len(tag_words) <= 1:
+    """Return whether a post contains all entity words close enough in lemmas.
+
+    ``word_ids`` is the post lemma id array, ``tag_ids`` the ids of the
+    entity words.
+    """
+    if len(tag_ids) <= 1:
         return True
 
-    lemmas_payload = post.get("lemmas")
-    if not lemmas_payload:
+    if word_ids is None or len(set(tag_ids)) != len(tag_ids):
         return False
 
-    try:
-        lemmas_text: str = gzip.decompress(lemmas_payload).decode("utf-8", "replace")
-    except (OSError, EOFError, TypeError) as exc:
-        logging.error(
-            "Can't decode lemmas for entity snippets post %s. Info: %s",
-            post.get("pid"),
-            exc,
-        )
+    lemmas = ids_view(word_ids)
+    positions_lists: list[np.ndarray] = [
+        np.flatnonzero(lemmas == tag_id) for tag_id in tag_ids
+    ]
+    if any(not len(positions) for positions in positions_lists):
         return False
 
-    lemmas_list: list[str] = lemmas_text.split()
-    word_positions: dict[str, list[int]] = {}
-    tag_words_set: set[str] = set(tag_words)
-
-    for index, lemma in enumerate(lemmas_list):
-        if lemma in tag_words_set:
-            word_positions.setdefault(lemma, []).append(index)
+    first_positions = positions_lists[0]
+    lowest = first_positions.copy()
+    highest = first_positions.copy()
+    for positions in positions_lists[1:]:
+        # Nearest occurrence to every first word position, earlier on ties.
+        after = np.searchsorted(positions, first_positions)
+        before = positions[np.maximum(after - 1, 0)]
+        after = positions[np.minimum(after, len(positions) - 1)]
+        nearest = np.where(
+            np.abs(before - first_positions) <= np.abs(after - first_positions),
+            before,
+            after,
+        )
+        lowest = np.minimum(lowest, nearest)
+        highest = np.maximum(highest, nearest)
 
-    if len(word_positions) != len(tag_words):
-        return False
+    return bool(np.any(highest - lowest <= window))
 
-    positions_lists: list[list[int]] = [
-        word_positions[word] for word in tag_words if word_positions.get(word)
-    ]
-    if len(positions_lists) != len(tag_words):
-        return False
 
-    for first_position in positions_lists[0]:
-        test_positions: list[int] = [first_position]
-        for positions in positions_lists[1:]:
-            nearest_position: int = min(
-                positions, key=lambda position: abs(position - first_position)
-            )
-            test_positions.append(nearest_position)
-
-        if max(test_positions) - min(test_positions) <= window:
-            return True
+def _entity_lemma_arrays(
+    app: "RSSTagApplication",
+    user: dict,
+    tag_words: list[str],
+    db_posts: list[dict[str, Any]],
+) -> tuple[list[int], dict[str, array]]:
+    """Load entity word ids and lemma arrays for the window check.
 
-    return False
+    Only multi-word entities need the window check. Unknown words get the
+    id ``-1``, which no post contains.
+    """
+    if len(tag_words) <= 1:
+        return [], {}
+    vocab, lemma_arrays = app.lemma_vocab.load_arrays(
+        user["sid"], [post["pid"] for post in db_posts if post.get("pid")]
+    )
+    tag_ids: list[int] = []
+    for word in tag_words:
+        tag_id = vocab.get_id(word)
+        tag_ids.append(-1 if tag_id is None else tag_id)
+    return tag_ids, lemma_arrays
 
 
 def _find_entity_post_ids(
@@ -3704,7 +3602,6 @@ def _find_entity_post_ids(
         "_id": False,
         "pid": True,
         "feed_id": True,
-        "lemmas": True,
         "clusters": True,
     }
 
@@ -3729,13 +3626,17 @@ def _find_entity_post_ids(
         )
         db_posts.extend(similar_posts)
 
+    tag_ids, lemma_arrays = _entity_lemma_arrays(app, user, tag_words, db_posts)
+
     post_ids: list[str] = []
     seen_post_ids: set[str] = set()
     for post in db_posts:
         post_id = str(post.get("pid", ""))
         if not post_id or post_id in seen_post_ids:
             continue
-        if not _entity_post_matches_window(post, tag_words, window):
+        if not _entity_post_matches_window(
+            lemma_arrays.get(post_id), tag_ids, window
+        ):
             continue
         post_ids.append(post_id)
         seen_post_ids.add(post_id)
@@ -4277,10 +4178,8 @@ def on_topics_list_get(
     topics_per_page: int = 50
     context_tags: Optional[list[str]] = _get_context_tags(user)
     normalized_context_tags: Optional[list[str]] = _normalize_context_tags(context_tags)
-    topic_counts: dict[str, dict]
-    post_topic_mapping: dict[str, dict]
     only_unread: bool = user.get("settings", {}).get("only_unread", False)
-    topic_counts, post_topic_mapping = _build_topics_index(
+    topic_counts: dict[str, dict] = _get_topic_counts(
         app, user, normalized_context_tags, only_unread=only_unread
     )
 
@@ -4321,7 +4220,6 @@ def on_topics_list_get(
         page.render(
             topics_tree=paginated_topics,
             sunburst_data=sunburst_data,
-            post_topic_mapping=post_topic_mapping,
             pages_map=pages_map,
             current_page=new_cookie_page_value,
             user_settings=user["settings"],
@@ -4339,7 +4237,7 @@ def on_topics_mindmap_get(
     normalized_context_tags: Optional[list[str]] = _normalize_context_tags(context_tags)
     only_unread: bool = user.get("settings", {}).get("only_unread", False)
     topic_counts: dict[str, dict]
-    topic_counts, _ = _build_topics_index(
+    topic_counts = _get_topic_counts(
         app, user, normalized_context_tags, only_unread=only_unread
     )
 
@@ -4369,7 +4267,7 @@ def on_topic_hierarchy_get(
     normalized_context_tags: Optional[list[str]] = _normalize_context_tags(context_tags)
     only_unread: bool = user.get("settings", {}).get("only_unread", False)
     topic_counts: dict[str, dict]
-    topic_counts, _ = _build_topics_index(
+    topic_counts = _get_topic_counts(
         app, user, normalized_context_tags, only_unread=only_unread
     )
 
@@ -4403,7 +4301,7 @@ def on_topics_search(
     normalized_context_tags: Optional[list[str]] = _normalize_context_tags(context_tags)
     topic_counts: dict[str, dict]
     only_unread: bool = user.get("settings", {}).get("only_unread", False)
-    topic_counts, _ = _build_topics_index(
+    topic_counts = _get_topic_counts(
         app, user, normalized_context_tags, only_unread=only_unread
     )
 
@@ -4667,6 +4565,7 @@ def on_read_snippets_post(
         app.letters,
         app.tasks,
         app.post_grouping,
+        app.cooccurrence,
     )
     result = service.mark_sentences(user["sid"], user.get("provider", ""), selections, readed)
     if not result.get("ok"):
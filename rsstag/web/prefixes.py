@@ -1,38 +1,28 @@
-import gzip
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from rsstag.web.app import RSSTagApplication
-from rsstag.prefix_tree import PrefixTreeBuilder
-from rsstag.html_cleaner import HTMLCleaner
+from rsstag.prefix_index import PrefixIndex
+from rsstag.tasks import TASK_PREFIX_INDEX
 
 from werkzeug.wrappers import Response
 
-prefixes_builders: dict[str:PrefixTreeBuilder] = {}
+
+def _get_prefix_index(app: "RSSTagApplication", user: dict) -> PrefixIndex:
+    """Stored prefix index of the user; queues its build if there is none yet."""
+    prefix_index = app.prefix_index.load(user["sid"])
+    if prefix_index is None:
+        app.tasks.add_task({"user": user["sid"], "type": TASK_PREFIX_INDEX})
+        prefix_index = PrefixIndex([], [])
+    return prefix_index
 
 
 def on_prefixes_all_get(
     app: "RSSTagApplication", user: dict, prefix_len: int
 ) -> Response:
-    if user["sid"] not in prefixes_builders:
-        cleaner = HTMLCleaner()
-        prefix_builder = PrefixTreeBuilder()
-        cursor = app.posts.get_all(user["sid"])
-        for post in cursor:
-            text = gzip.decompress(post["content"]["content"]).decode(
-                "utf-8", "replace"
-            )
-            text = post["content"]["title"] + " " + text
-            cleaner.purge()
-            cleaner.feed(text)
-            text = " ".join(cleaner.get_content())
-            prefix_builder.add_words_from_doc(text)
-
-        prefixes_builders[user["sid"]] = prefix_builder
-    else:
-        prefix_builder = prefixes_builders[user["sid"]]
-    prefixes = prefix_builder.get_top_n(prefix_len)
+    prefix_index = _get_prefix_index(app, user)
+    prefixes = prefix_index.get_top_n(prefix_len)
 
     sorted_prefixes = []
     for p in prefixes:
@@ -72,24 +62,8 @@ def on_prefixes_all_get(
 def on_prefixes_words_get(
     app: "RSSTagApplication", user: dict, prefix: str
 ) -> Response:
-    if user["sid"] not in prefixes_builders:
-        cleaner = HTMLCleaner()
-        prefix_builder = PrefixTreeBuilder()
-        cursor = app.posts.get_all(user["sid"])
-        for post in cursor:
-            text = gzip.decompress(post["content"]["content"]).decode(
-                "utf-8", "replace"
-            )
-            text = post["content"]["title"] + " " + text
-            cleaner.purge()
-            cleaner.feed(text)
-            text = " ".join(cleaner.get_content())
-            prefix_builder.add_words_from_doc(text)
-
-        prefixes_builders[user["sid"]] = prefix_builder
-    else:
-        prefix_builder = prefixes_builders[user["sid"]]
-    words = prefix_builder.get_tails(prefix)
+    prefix_index = _get_prefix_index(app, user)
+    words = prefix_index.get_tails(prefix)
 
     sorted_prefixes = []
     for w in words:
@@ -129,26 +103,8 @@ def on_prefixes_words_get(
 def on_prefixes_prefix_get(
     app: "RSSTagApplication", user: dict, prefix: str
 ) -> Response:
-    if user["sid"] not in prefixes_builders:
-        cleaner = HTMLCleaner()
-        prefix_builder = PrefixTreeBuilder()
-        cursor = app.posts.get_all(user["sid"])
-        for post in cursor:
-            text = gzip.decompress(post["content"]["content"]).decode(
-                "utf-8", "replace"
-            )
-            text = post["content"]["title"] + " " + text
-            cleaner.purge()
-            cleaner.feed(text)
-            text = " ".join(cleaner.get_content())
-            prefix_builder.add_words_from_doc(text)
-
-        prefixes_builders[user["sid"]] = prefix_builder
-    else:
-        prefix_builder = prefixes_builders[user["sid"]]
-
-    # root = prefix_builder.get_tree(prefix)
-    root = prefix_builder.get_compact_tree(prefix)
+    prefix_index = _get_prefix_index(app, user)
+    root = prefix_index.get_compact_tree(prefix)
     if root is None:
         root = {"name": prefix, "children": []}
 
@@ -1,10 +1,10 @@
-import gzip
 import json
 import logging
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import rsstag.web.users as users_handlers
+from rsstag.text_codec import decode_text
 
 from werkzeug.wrappers import Request, Response
 from werkzeug.utils import redirect
@@ -35,6 +35,8 @@ def _prune_owner_data(app: "RSSTagApplication", owner: str) -> Dict[str, int]:
         "raw_download_state",
         "tags",
         "bi_grams",
+        "tag_cooccurrence",
+        "tag_cooccurrence_builds",
         "letters",
         "words",
         "post_grouping",
@@ -44,12 +46,17 @@ def _prune_owner_data(app: "RSSTagApplication", owner: str) -> Dict[str, int]:
         "anthology_runs",
         "llm_batch_results",
         "llm_cache",
+        "prefix_index",
     ]
     deleted_counts: Dict[str, int] = {}
     for collection_name in collection_names:
         deleted_counts[collection_name] = _delete_owner_collection(
             app, collection_name, owner
         )
+    app.topics_index.remove_owner(owner)
+    app.lemma_vocab.remove_owner(owner)
+    app.pid_filters.remove_owner(owner)
+    app.post_cluster_models.remove_owner(owner)
     deleted_counts["tasks"] = _delete_tasks_for_owner(app, owner)
     app.users.update_by_sid(owner, {"in_queue": {}})
     return deleted_counts
@@ -222,7 +229,7 @@ def on_statistics_get(app: "RSSTagApplication", user: dict, _: Request) -> Respo
         title = post.get("content", {}).get("title", "")
         content = post.get("content", {}).get("content", b"")
         if isinstance(content, bytes):
-            content = gzip.decompress(content).decode("utf-8", "ignore")
+            content = decode_text(content, "ignore")
         text = f"{title} {content}"
         total_tokens += len(text) // 4
 
@@ -1,8 +1,6 @@
 import os
 import re
 import json
-import gzip
-import math
 import html
 import logging
 from collections import Counter, defaultdict
@@ -13,7 +11,6 @@ from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from rsstag.web.app import RSSTagApplication
-from rsstag.tags_builder import TagsBuilder
 from rsstag.html_cleaner import HTMLCleaner
 from rsstag.lda import LDA
 from rsstag.surprise import BayesianSurprise
@@ -28,7 +25,11 @@ from werkzeug.wrappers import Request, Response
 from werkzeug.exceptions import NotFound, InternalServerError
 
 from rsstag.stopwords import stopwords
-from rsstag.html_utils import build_html_mapping
+from rsstag.html_utils import html_to_text
+from rsstag.text_codec import decode_text, decode_words
+from rsstag.lemma_vocab import LemmaVocabulary, ids_view
+from rsstag.cooccurrence import ids_keywords, related_counts, top_related
+from rsstag.tasks import TASK_TAG_COOCCURRENCE
 
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.cluster import DBSCAN
@@ -239,7 +240,7 @@ def on_s_tree_get(
 
     pid_context_map = []  # Store (pid, context) for later use
     for post in cursor:
-        txt = gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
+        txt = decode_text(post["content"]["content"])
         if post["content"].get("title"):
             txt = post["content"]["title"] + ". " + txt
         html_c.purge()
@@ -737,8 +738,7 @@ def on_get_tag_siblings(app: "RSSTagApplication", user: dict, tags: str) -> Resp
     stopw = set(stopwords.words("english") + stopwords.words("russian"))
     req_tags_s = set(req_tags)
     for post in posts:
-        txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-        words = txt.split()
+        words = decode_words(post["lemmas"])
         words_ln = len(words)
         for i, w in enumerate(words):
             if w not in req_tags_s:
@@ -780,81 +780,35 @@ def on_get_tag_siblings(app: "RSSTagApplication", user: dict, tags: str) -> Resp
 
 def on_get_tag_pmi(app: "RSSTagApplication", user: dict, tag: str) -> Response:
     if tag:
-        req_tags = set(tag.split())
-        cursor = app.posts.get_by_tags(
-            user["sid"],
-            list(req_tags),
-            user["settings"]["only_unread"],
-            {"lemmas": True},
-        )
-        stopw = set(stopwords.words("english") + stopwords.words("russian"))
-        texts = [
-            gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            for post in cursor
-        ]
-        uniq_words = set()
-        bigrams = Counter()
-        bigrams_count = Counter()
-        window = 5
-        for text in texts:
-            words_l = [
-                word
-                for word in text.split()
-                if word not in stopw and word not in req_tags
-            ]
-            uniq_words.update(words_l)
-            bi_grams = []
-            for word_pos, word in enumerate(words_l):
-                for i in range(window):
-                    i += 1
-                    bi_words = []
-                    prev_pos = word_pos - i
-                    if prev_pos >= 0:
-                        bi_words.append(words_l[prev_pos])
-                    next_pos = word_pos + i
-                    if next_pos < len(words_l):
-                        bi_words.append(words_l[next_pos])
-                    for bi_word in bi_words:
-                        if word == bi_word:
-                            continue
-                        bi_grams_l = [word, bi_word]
-                        bi_grams_l.sort()
-                        bi_gram = " ".join(bi_grams_l)
-                        bi_grams.append(bi_gram)
-            bigrams.update(bi_grams)
-            bigrams_count.update(set(bi_grams))
-
+        req_tags = tag.split()
+        related = _get_related_tags(app, user, req_tags)
         tags = app.tags.get_by_tags(
-            user["sid"], list(uniq_words), user["settings"]["only_unread"]
+            user["sid"], req_tags + list(related), user["settings"]["only_unread"]
         )
         tags_d = {}
         for tg in tags:
             tags_d[tg["tag"]] = tg
-
-        pmis = []
-        for bi, bi_freq in bigrams.items():
-            if bi_freq < 2:
-                continue
-            bi_words = bi.split(" ")
-            f1 = tags_d[bi_words[0]]["freq"]
-            f2 = tags_d[bi_words[1]]["freq"]
-            pmi = bi_freq / (abs(f1 - f2) + 1)
-            pmis.append((bi, pmi))
-        pmis.sort(key=lambda x: x[1], reverse=True)
+        t_words = []
+        t_freq = 0
+        for req_tag in req_tags:
+            if req_tag in tags_d:
+                t_words += tags_d[req_tag]["words"]
+                t_freq += tags_d[req_tag]["freq"]
 
         all_pmis = []
-        for bi, temp in pmis[:4000]:
-            bi_words = bi.split(" ")
+        for rel_tag, count in related.items():
+            if count < 2 or rel_tag not in tags_d:
+                continue
+            tg = tags_d[rel_tag]
             all_pmis.append(
                 {
-                    "tag": bi,
-                    "url": "/entity/" + quote(tag + " " + bi),
-                    "words": tags_d[bi_words[0]]["words"]
-                    + tags_d[bi_words[1]]["words"],
-                    "count": bigrams_count[bi],
+                    "tag": tag + " " + rel_tag,
+                    "url": "/entity/" + quote(tag + " " + rel_tag),
+                    "words": tg["words"] + t_words,
+                    "count": count,
                     "sentiment": [],
-                    "temp": temp,
-                    "freq": bigrams[bi],
+                    "temp": count / (abs(t_freq - tg["freq"]) + 1),
+                    "freq": tg["freq"],
                 }
             )
         all_pmis.sort(key=lambda x: x["count"], reverse=True)
@@ -867,41 +821,56 @@ def on_get_tag_pmi(app: "RSSTagApplication", user: dict, tag: str) -> Response:
     return Response(json.dumps(result), mimetype="application/json", status=code)
 
 
+def _get_posts_keywords(app: "RSSTagApplication", user: dict, req_tags: list) -> list:
+    """Keywords of every post with the tags, from their lemma ids if not stored."""
+    cursor = app.posts.get_by_tags(
+        user["sid"],
+        req_tags,
+        user["settings"]["only_unread"],
+        {"pid": True, "keywords": True},
+    )
+    posts_keywords = []
+    missing = []
+    for post in cursor:
+        if "keywords" in post:
+            posts_keywords.append(post["keywords"])
+        else:
+            missing.append(post["pid"])
+    if missing:
+        vocab, arrays = app.lemma_vocab.load_arrays(user["sid"], missing)
+        for word_ids in arrays.values():
+            posts_keywords.append(ids_keywords(word_ids, vocab))
+
+    return posts_keywords
+
+
+def _get_related_tags(
+    app: "RSSTagApplication", user: dict, req_tags: list
+) -> Dict[str, int]:
+    """Posts count of the keywords co-occurring with all the tags.
+
+    A single tag is read from the co-occurrence store once it counted the
+    posts tagged before it existed; until then (the count is queued) and for
+    several tags the same statistic is counted over the tags' posts.
+    """
+    only_unread = bool(user["settings"]["only_unread"])
+    if len(req_tags) == 1:
+        if app.cooccurrence.is_built(user["sid"]):
+            return app.cooccurrence.get_related(user["sid"], req_tags[0], only_unread)
+        app.tasks.add_task({"user": user["sid"], "type": TASK_TAG_COOCCURRENCE})
+
+    return top_related(
+        related_counts(_get_posts_keywords(app, user, req_tags), req_tags)
+    )
+
+
 def on_tag_tfidf_get(app: "RSSTagApplication", user: dict, tag: str) -> Response:
     if tag:
-        req_tags_s = set(tag.split())
-        cursor = app.posts.get_by_tags(
-            user["sid"],
-            list(req_tags_s),
-            user["settings"]["only_unread"],
-            {"lemmas": True},
-        )
-        topics = set()
-        stopw = set(stopwords.words("english") + stopwords.words("russian"))
-        texts = [
-            gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            for post in cursor
-        ]
-        freq_d = Counter()
-        for text in texts:
-            words = [word for word in text.split() if word not in stopw]
-            st = set(words)
-            freq_d.update(st)
-        for text in texts:
-            words = [word for word in text.split() if word not in stopw]
-            tfidf = []
-            freq = Counter(words)
-            for word in words:
-                tf = freq[word] / len(words)
-                idf = math.log(len(texts) / freq_d[word])
-                tfidf.append((word, tf * idf))
-            tfidf.sort(key=lambda x: x[1], reverse=True)
-            topics.update([ti[0] for ti in tfidf[:5]])
-        topics.update(req_tags_s)
-        topics = list(topics)
-
+        req_tags = tag.split()
+        req_tags_s = set(req_tags)
+        related = _get_related_tags(app, user, req_tags)
         tags_c = app.tags.get_by_tags(
-            user["sid"], topics, user["settings"]["only_unread"]
+            user["sid"], req_tags + list(related), user["settings"]["only_unread"]
         )
         tags = list(tags_c)
         t_words = []
@@ -918,13 +887,13 @@ def on_tag_tfidf_get(app: "RSSTagApplication", user: dict, tag: str) -> Response
                     "tag": tag + " " + tg["tag"],
                     "url": "/entity/" + quote(tag + " " + tg["tag"]),
                     "words": tg["words"] + t_words,
-                    "count": freq_d[tg["tag"]],
+                    "count": related[tg["tag"]],
                     "sentiment": tg["sentiment"] if "sentiment" in tg else [],
                     "temp": tg["temperature"],
                     "freq": tg["freq"],
                 }
             )
-            all_tags.sort(key=lambda t: t["count"] / t["freq"], reverse=True)
+        all_tags.sort(key=lambda t: t["count"] / (t["freq"] or 1), reverse=True)
         result = {"data": all_tags}
         code = 200
     else:
@@ -934,33 +903,66 @@ def on_tag_tfidf_get(app: "RSSTagApplication", user: dict, tag: str) -> Response
     return Response(json.dumps(result), mimetype="application/json", status=code)
 
 
+def _cluster_tag_posts(app: "RSSTagApplication", user: dict, tag: str) -> dict:
+    """Cluster the posts of the tag by their lemmas TF-IDF."""
+    cursor = app.posts.get_by_tags(
+        user["sid"],
+        tag.split(),
+        user["settings"]["only_unread"],
+        {"lemmas": True, "pid": True},
+    )
+    pids = []
+    texts = []
+    for post in cursor:
+        texts.append(decode_text(post["lemmas"]))
+        pids.append(post["pid"])
+    stopw = set(stopwords.words("english") + stopwords.words("russian"))
+    vectorizer = TfidfVectorizer(stop_words=list(stopw))
+    vectorizer.fit(texts)
+    vectors = vectorizer.transform(texts)
+    dbs = DBSCAN(eps=0.7, min_samples=2, metric="cosine")
+    cl = dbs.fit_predict(vectors)
+    label_txt = {}
+    for i, label in enumerate(cl):
+        if label < 0:
+            continue
+        label = str(label)
+        if label not in label_txt:
+            label_txt[label] = []
+        label_txt[label].append({"txt": texts[i], "pid": pids[i]})
+
+    return label_txt
+
+
 def on_tag_clusters_get(app: "RSSTagApplication", user: dict, tag: str) -> Response:
     if tag:
+        # Posts clustering (TASK_CLUSTERING) keeps the clusters of every
+        # post; only owners never clustered get the tag's posts clustered
+        # on the request.
         cursor = app.posts.get_by_tags(
             user["sid"],
             tag.split(),
             user["settings"]["only_unread"],
-            {"lemmas": True, "pid": True},
+            {"pid": True, "clusters": True},
         )
-        pids = []
-        texts = []
+        label_pids = defaultdict(list)
+        clustered = False
         for post in cursor:
-            texts.append(gzip.decompress(post["lemmas"]).decode("utf-8", "replace"))
-            pids.append(post["pid"])
-        stopw = set(stopwords.words("english") + stopwords.words("russian"))
-        vectorizer = TfidfVectorizer(stop_words=list(stopw))
-        vectorizer.fit(texts)
-        vectors = vectorizer.transform(texts)
-        dbs = DBSCAN(eps=0.7, min_samples=2, metric="cosine")
-        cl = dbs.fit_predict(vectors)
-        label_txt = {}
-        for i, label in enumerate(cl):
-            if label < 0:
-                continue
-            label = str(label)
-            if label not in label_txt:
-                label_txt[label] = []
-            label_txt[label].append({"txt": texts[i], "pid": pids[i]})
+            clustered = clustered or "clusters" in post
+            for label in post.get("clusters", []):
+                label_pids[str(label)].append(post["pid"])
+        if clustered:
+            label_pids = {lb: pids for lb, pids in label_pids.items() if len(pids) > 1}
+            texts = {}
+            pids = [pid for lb_pids in label_pids.values() for pid in lb_pids]
+            for post in app.posts.get_by_pids(user["sid"], pids, {"pid": True, "lemmas": True}):
+                texts[post["pid"]] = decode_text(post["lemmas"])
+            label_txt = {
+                label: [{"txt": texts.get(pid, ""), "pid": pid} for pid in lb_pids]
+                for label, lb_pids in label_pids.items()
+            }
+        else:
+            label_txt = _cluster_tag_posts(app, user, tag)
         result = {"data": label_txt}
         code = 200
     else:
@@ -989,7 +991,7 @@ def on_tag_topics_get(app: "RSSTagApplication", user: dict, tags: str) -> Respon
             user["sid"], req_tags, user["settings"]["only_unread"], {"lemmas": True}
         )
         texts = [
-            gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+            decode_text(post["lemmas"])
             for post in cursor
         ]
         lda = LDA()
@@ -1058,14 +1060,12 @@ def on_tag_grouped_topics_get(
         first_sentence = grouping["sentences"][0]
         if "text" not in first_sentence:
             try:
-                raw_content = gzip.decompress(post["content"]["content"]).decode(
-                    "utf-8", "replace"
-                )
+                raw_content = decode_text(post["content"]["content"])
                 title = post["content"].get("title", "")
                 full_content_html = f"{title}. {raw_content}" if title else raw_content
-                from rsstag.html_utils import build_html_mapping
+                from rsstag.html_utils import html_to_text
 
-                content_plain, _ = build_html_mapping(full_content_html)
+                content_plain = html_to_text(full_content_html)
             except Exception as e:
                 logging.error("Failed to decompress content for post %s: %s", pid, e)
                 continue
@@ -1183,12 +1183,10 @@ def on_tag_llm_topics_get(app: "RSSTagApplication", user: dict, tag: str) -> Res
         plain_text = ""
         if needs_plain_text:
             try:
-                raw_content = gzip.decompress(post["content"]["content"]).decode(
-                    "utf-8", "replace"
-                )
+                raw_content = decode_text(post["content"]["content"])
                 title = post["content"].get("title", "")
                 full_content_html = f"{title}. {raw_content}" if title else raw_content
-                plain_text, _ = build_html_mapping(full_content_html)
+                plain_text = html_to_text(full_content_html)
             except Exception as e:
                 logging.warning(
                     "Failed to build plain text for pid=%s while loading LLM topics: %s",
@@ -1269,7 +1267,7 @@ def on_tag_specific_get(app: "RSSTagApplication", user: dict, tags: str) -> Resp
         tag_words = set()
         other_words = set()
         for post in cursor:
-            txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
+            txt = decode_text(post["lemmas"])
             words = set(txt.split(" "))
             diff_s = words.difference(req_tags_s)
             if len(diff_s) == len(req_tags_s):
@@ -1324,8 +1322,7 @@ def on_tag_specific1_get(app: "RSSTagApplication", user: dict, tags: str) -> Res
         )
         tag_fr = Counter()
         for post in cursor:
-            txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            tag_fr.update(txt.split())
+            tag_fr.update(decode_words(post["lemmas"]))
 
         cursor = app.tags.get_all(user["sid"], projection={"_id": False})
         tag_c = []
@@ -1481,48 +1478,21 @@ def on_get_tag_similar_tags(app: "RSSTagApplication", user: dict, tag: str) -> R
 
 
 def on_get_tfidf_tags(app: "RSSTagApplication", user: dict, rqst: Request) -> Response:
-    cursor = app.posts.get_all(
-        user["sid"], user["settings"]["only_unread"], projection={"_id": False}
-    )
-    vectorizer = TfidfVectorizer()
-    texts = []
-    cleaner = HTMLCleaner()
-    builder = TagsBuilder()
-    for post in cursor:
-        txt = gzip.decompress(post["content"]["content"]).decode("utf-8", "replace")
-        if post["content"]["title"]:
-            txt = post["content"]["title"] + ". " + txt
-
-        cleaner.purge()
-        cleaner.feed(txt)
-        strings = cleaner.get_content()
-        txt = " ".join(strings)
-        builder.purge()
-        builder.build_tags_and_bi_grams(txt)
-        builder.get_prepared_text()
-        texts.append(builder.get_prepared_text())
-
-    vectorizer.fit(texts)
-    tfidfs = []
-    for w, indx in vectorizer.vocabulary_.items():
-        tfidfs.append((w, vectorizer.idf_[indx]))
-
-    tfidfs.sort(key=lambda x: x[1], reverse=True)
-    tags = [w[0] for w in tfidfs]
-    cursor = app.tags.get_by_tags(
-        user["sid"], tags, user["settings"]["only_unread"], projection={"_id": False}
+    # idf = ln((1 + N) / (1 + df)) + 1 falls as df grows, so the tags with the
+    # highest idf are the ones with the fewest posts: read them in that order
+    # from the maintained counters instead of re-tagging every post.
+    min_tags = int(rqst.values.get("min_tags", default=5))
+    cursor = app.tags.get_by_df(
+        user["sid"],
+        user["settings"]["only_unread"],
+        min_unread=min_tags,
+        projection={"_id": False},
     )
-    db_tags = {t["tag"]: t for t in cursor}
-    # db_tags.sort(key=lambda x: x["unread_count"], reverse=True)
     all_tags = []
-    min_tags = int(rqst.values.get("min_tags", default=5))
-    for w, _ in tfidfs:
+    for tg in cursor:
         if len(all_tags) > 500:
             break
-        if w not in db_tags:
-            continue
-        tg = db_tags[w]
-        if db_tags[tg["tag"]]["unread_count"] < min_tags:
+        if len(tg["tag"]) < 2:
             continue
         all_tags.append(
             {
@@ -1581,8 +1551,7 @@ def on_get_sunburst(app: "RSSTagApplication", user: dict, tags: str) -> Response
     window = 4
     if len(tags_l) > 1:
         for post in cursor:
-            txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            words = txt.split()
+            words = decode_words(post["lemmas"])
             for i, w in enumerate(words):
                 if w != cur_tag:
                     continue
@@ -1604,8 +1573,7 @@ def on_get_sunburst(app: "RSSTagApplication", user: dict, tags: str) -> Response
                         childs[words[e]] += 1
     else:
         for post in cursor:
-            txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            words = txt.split()
+            words = decode_words(post["lemmas"])
             for i, w in enumerate(words):
                 if w != cur_tag:
                     continue
@@ -1664,8 +1632,7 @@ def on_get_sunburst_(app: "RSSTagApplication", user: dict, tags: str) -> Respons
     window = 4
     if len(tags_l) > 1:
         for post in cursor:
-            txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            words = txt.split()
+            words = decode_words(post["lemmas"])
             for i, w in enumerate(words):
                 if w != cur_tag:
                     continue
@@ -1687,8 +1654,7 @@ def on_get_sunburst_(app: "RSSTagApplication", user: dict, tags: str) -> Respons
                         childs[words[e]] += 1
     else:
         for post in cursor:
-            txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-            words = txt.split()
+            words = decode_words(post["lemmas"])
             for i, w in enumerate(words):
                 if w != cur_tag:
                     continue
@@ -1802,8 +1768,7 @@ def on_get_chain(app: "RSSTagApplication", user: dict, tags: str) -> Response:
     stopwrds.update(tags_l)
     window = 4
     for post in cursor:
-        txt = gzip.decompress(post["lemmas"]).decode("utf-8", "replace")
-        words = txt.split()
+        words = decode_words(post["lemmas"])
         counted_tags = set()
         for i, w in enumerate(words):
             if w not in tags_l:
@@ -2182,54 +2147,84 @@ def on_ba_surprise_get(app: "RSSTagApplication", user: dict, rqst: Request) -> R
     )
 
 
-def _build_tag_context_tree(post_lemmas: list, root_tag: str, max_levels: int) -> list:
-    """Build a context word tree for root_tag using pre-loaded lemma lists."""
+def _build_tag_context_tree(
+    pids: list, lemma_arrays: list, root_id: int, vocab: LemmaVocabulary, max_levels: int
+) -> list:
+    """Build a context word tree for the root_id lemma over lemma id arrays."""
     MAX_CHILDREN = 30
 
-    def _build(chain_offsets: list, level: int) -> list:
+    if not lemma_arrays:
+        return []
+    tokens = np.concatenate([ids_view(word_ids) for word_ids in lemma_arrays])
+    ends = np.cumsum([len(word_ids) for word_ids in lemma_arrays])
+    roots = np.flatnonzero(tokens == root_id)
+    if not len(roots):
+        return []
+    root_posts = np.searchsorted(ends, roots, side="right")
+    root_ends = ends[root_posts]
+    root_starts = root_ends - np.array([len(lemma_arrays[i]) for i in root_posts])
+    alpha: Dict[int, bool] = {}
+
+    def _words_at(offset: int) -> tuple:
+        positions = roots + offset
+        inside = (positions >= root_starts) & (positions < root_ends)
+        return inside, tokens[np.where(inside, positions, 0)]
+
+    def _build(active: np.ndarray, chain: list, level: int) -> list:
         if level > max_levels:
             return []
 
-        word_data: dict = {}
-        for p in post_lemmas:
-            lemmas = p["lemmas"]
-            for root_pos in p["root_positions"]:
-                match = True
-                for offset, word in chain_offsets:
-                    pos = root_pos + offset
-                    if pos < 0 or pos >= len(lemmas) or lemmas[pos] != word:
-                        match = False
-                        break
-                if not match:
-                    continue
-
-                excluded = {root_tag} | {w for _, w in chain_offsets}
-                for sign in (1, -1):
-                    pos = root_pos + sign * level
-                    if 0 <= pos < len(lemmas):
-                        w = lemmas[pos]
-                        if w not in excluded and w.isalpha():
-                            if w not in word_data:
-                                word_data[w] = {"count": 0, "pids": set(), "offset": sign * level}
-                            word_data[w]["count"] += 1
-                            word_data[w]["pids"].add(p["pid"])
+        excluded = [root_id] + [word_id for _, word_id in chain]
+        found_words, found_roots, found_signs = [], [], []
+        for sign in (1, -1):
+            inside, words = _words_at(sign * level)
+            hits = np.flatnonzero(active & inside & ~np.isin(words, excluded))
+            found_words.append(words[hits])
+            found_roots.append(hits)
+            found_signs.append(np.full(len(hits), sign))
+        words = np.concatenate(found_words)
+        if not len(words):
+            return []
+        for word_id in np.unique(words).tolist():
+            if word_id not in alpha:
+                alpha[word_id] = vocab.word(word_id).isalpha()
+        keep = np.array([alpha[word_id] for word_id in words.tolist()], dtype=bool)
+        words = words[keep]
+        if not len(words):
+            return []
+        hit_roots = np.concatenate(found_roots)[keep]
+        signs = np.concatenate(found_signs)[keep]
 
-        top_words = sorted(word_data.items(), key=lambda x: -x[1]["count"])[:MAX_CHILDREN]
+        # Ties keep the order in which words are met: by root, "after" first.
+        order = hit_roots * 2 + (signs < 0)
+        unique_words, inverse, counts = np.unique(
+            words, return_inverse=True, return_counts=True
+        )
+        first = np.full(len(unique_words), len(roots) * 2)
+        np.minimum.at(first, inverse, order)
+        top = np.lexsort((first, -counts))[:MAX_CHILDREN]
 
         children = []
-        for word, info in top_words:
-            child_offsets = chain_offsets + [(info["offset"], word)]
+        for i in top.tolist():
+            word_id = int(unique_words[i])
+            offset = (-1 if first[i] % 2 else 1) * level
+            child_chain = chain + [(offset, word_id)]
+            inside, child_words = _words_at(offset)
+            child_active = active & inside & (child_words == word_id)
+            post_indexes = np.unique(root_posts[hit_roots[inverse == i]])
             child = {
-                "name": word,
-                "value": info["count"],
-                "_topicPosts": list(info["pids"]),
-                "_topicPath": root_tag + " > " + " > ".join(w for _, w in child_offsets),
-                "children": _build(child_offsets, level + 1),
+                "name": vocab.word(word_id),
+                "value": int(counts[i]),
+                "_topicPosts": [pids[j] for j in post_indexes.tolist()],
+                "_topicPath": vocab.word(root_id)
+                + " > "
+                + " > ".join(vocab.word(w) for _, w in child_chain),
+                "children": _build(child_active, child_chain, level + 1),
             }
             children.append(child)
         return children
 
-    return _build([], 1)
+    return _build(np.ones(len(roots), dtype=bool), [], 1)
 
 
 def on_tag_context_tree_get(
@@ -2248,19 +2243,19 @@ def on_tag_context_tree_get(
         user["sid"],
         [tag],
         only_unread=only_unread,
-        projection={"lemmas": True, "pid": True},
+        projection={"pid": True},
     )
 
-    post_lemmas = []
-    for post in cursor:
-        if not post.get("lemmas"):
-            continue
-        lemmas = gzip.decompress(post["lemmas"]).decode("utf-8", "replace").split()
-        root_positions = [i for i, w in enumerate(lemmas) if w == tag]
-        if root_positions:
-            post_lemmas.append({"pid": post["pid"], "lemmas": lemmas, "root_positions": root_positions})
-
-    children = _build_tag_context_tree(post_lemmas, tag, max_levels)
+    vocab, arrays = app.lemma_vocab.load_arrays(
+        user["sid"], [post["pid"] for post in cursor]
+    )
+    root_id = vocab.get_id(tag)
+    children = []
+    if root_id is not None:
+        pids = list(arrays)
+        children = _build_tag_context_tree(
+            pids, [arrays[pid] for pid in pids], root_id, vocab, max_levels
+        )
 
     mindmap_data = {
         "name": tag,
@@ -29,6 +29,9 @@ from rsstag.tasks import (
     TASK_RAW_TO_POSTS,
     TASK_TAGS_TOPICS,
     TASK_SOURCE_QUALITY,
+    TASK_RECODE_POSTS,
+    TASK_PREFIX_INDEX,
+    TASK_TAG_COOCCURRENCE,
     build_telegram_read_state_task,
     get_task_scope_hint,
 )
@@ -67,6 +70,9 @@ def on_tasks_get(app, user: dict, request: Request) -> Response:
         # picking it here would mean one LLM call for every post the user owns.
         # Quality scans are started per feed/category from /group/category.
         TASK_SOURCE_QUALITY: "Roll up feed quality",
+        TASK_RECODE_POSTS: "Re-encode posts with the configured codecs",
+        TASK_PREFIX_INDEX: "Build words prefix index",
+        TASK_TAG_COOCCURRENCE: "Count tags co-occurrence",
     }
     available_tasks = {
         task_type: f"{title} ({get_task_scope_hint(task_type)})"
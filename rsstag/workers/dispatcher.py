@@ -39,6 +39,8 @@ from rsstag.tasks import (
     TASK_POST_QUALITY,
     TASK_RAW_DOWNLOAD,
     TASK_RAW_TO_POSTS,
+    TASK_PREFIX_INDEX,
+    TASK_RECODE_POSTS,
     TASK_SNIPPET_CLUSTERING,
     TASK_SOURCE_QUALITY,
     TASK_TAGS,
@@ -48,10 +50,14 @@ from rsstag.tasks import (
     TASK_TAGS_TOPICS,
     TASK_TAG_CLASSIFICATION,
     TASK_TAG_CLASSIFICATION_BATCH,
+    TASK_TAG_COOCCURRENCE,
     TASK_TOPIC_MERGE,
     TASK_W2V,
 )
+from rsstag.stem_cache import init_stem_cache, save_stem_cache
 from rsstag.tasks import RssTagTasks
+from rsstag.task_wakeup import configure_task_wakeup, open_task_wakeup
+from rsstag.text_codec import configure_codecs
 from rsstag.users import RssTagUsers
 from rsstag.utils import load_config
 from rsstag.workers.llm_worker import LLMWorker
@@ -196,6 +202,9 @@ def _build_registry(tag_worker: TagWorker, llm_worker: LLMWorker, provider_worke
         TASK_TAG_CLASSIFICATION_BATCH, llm_worker.make_tags_classification_batch
     )
     registry.register(TASK_DELETE_FEEDS, tag_worker.handle_delete_feeds)
+    registry.register(TASK_RECODE_POSTS, tag_worker.handle_recode_posts)
+    registry.register(TASK_PREFIX_INDEX, tag_worker.handle_prefix_index)
+    registry.register(TASK_TAG_COOCCURRENCE, tag_worker.handle_tag_cooccurrence)
     return registry
 
 
@@ -215,6 +224,7 @@ def worker(config: Dict[str, Any]) -> None:
         )
         from rsstag.observability.llm_instrumentation import instrument_llm_router
         from rsstag.observability.business_metrics import register_business_metrics
+        from rsstag.observability.cache_metrics import register_stem_cache_metrics
         reset_for_child_process()
         reset_instruments()
         init_observability("rsstag-worker-child", auto_instrument=False)
@@ -260,7 +270,13 @@ def worker(config: Dict[str, Any]) -> None:
     }
     users = RssTagUsers(db)
     tasks = RssTagTasks(db)
+    # Tasks this worker enqueues wake its idle peers; the listener lets this
+    # worker block until someone else enqueues instead of sleep-polling.
+    configure_task_wakeup(config)
+    wakeup = open_task_wakeup(db, config)
 
+    init_stem_cache(config)
+    configure_codecs(config)
     tag_worker = TagWorker(db, config)
     llm_worker = LLMWorker(db, config)
     provider_worker = ProviderWorker(db, config, providers, users, tasks, record_bulk_write)
@@ -272,6 +288,7 @@ def worker(config: Dict[str, Any]) -> None:
     if _obs_available:
         instrument_tasks(tasks)
         register_business_metrics(db)
+        register_stem_cache_metrics()
     last_heartbeat = time.time()
     # Force a reclaim on the first loop so a worker restart immediately frees
     # claims left by a previous crashed process, instead of waiting one full
@@ -295,7 +312,7 @@ def worker(config: Dict[str, Any]) -> None:
                 task = tasks.get_task(users)
                 task_done = False
                 if task["type"] == TASK_NOOP:
-                    time.sleep(randint(3, 8))
+                    wakeup.wait()
                     continue
                 is_scope_valid, scope_error = tasks.validate_task_scope(
                     task["type"], task.get("scope")
@@ -363,6 +380,9 @@ def worker(config: Dict[str, Any]) -> None:
                         )
                 time.sleep(randint(3, 8))
     finally:
+        wakeup.close()
+        tag_worker.close()
+        save_stem_cache(config)
         try:
             workers_db.delete_worker(worker_id)
             logging.info("Worker %s heartbeat deleted on shutdown", worker_id)
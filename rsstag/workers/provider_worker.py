@@ -8,8 +8,11 @@ from typing import Any, Callable, Dict, List, Optional, Tuple
 from pymongo import UpdateOne
 from pymongo.errors import BulkWriteError
 
+from rsstag.pid_filter import PidFilter, RssTagPidFilters
 from rsstag.providers import providers as data_providers
 from rsstag.providers.feed_docs import dedup_feed_docs
+from rsstag.text_codec import CODECS_FIELD, codecs_marker
+from rsstag.workers.raw_posts_pipeline import RAW_BATCH_SIZE, RawPostsPipeline
 
 
 class ProviderWorker:
@@ -22,6 +25,7 @@ class ProviderWorker:
         self._users = users
         self._tasks = tasks
         self._record_bulk_write = record_bulk_write
+        self._pid_filters = RssTagPidFilters(db)
 
     def _save_refreshed_oauth_token(self, task: Dict[str, Any], provider_user: Dict[str, Any], provider_name: str) -> None:
         if provider_name not in (data_providers.GMAIL, data_providers.X):
@@ -72,8 +76,12 @@ class ProviderWorker:
         owner: str,
         provider_name: str,
         posts: List[Dict[str, Any]],
+        pid_filter: Optional[PidFilter] = None,
     ) -> Tuple[List[Dict[str, Any]], int]:
-        """Return posts not already stored, using the provider-scoped PID."""
+        """Return posts not already stored, using the provider-scoped PID.
+
+        With a ``pid_filter`` only the pids it might contain are looked up.
+        """
         unique_posts: Dict[str, Dict[str, Any]] = {}
         skipped_count: int = 0
         for post in posts:
@@ -98,16 +106,25 @@ class ProviderWorker:
         if not unique_posts:
             return [], skipped_count
 
-        existing_posts: Any = self._db.posts.find(
-            {
-                "owner": owner,
-                "pid": {"$in": list(unique_posts)},
-            },
-            projection={"pid": True, "_id": False},
-        )
-        existing_pids: set[str] = {
-            str(post["pid"]) for post in existing_posts if post.get("pid")
-        }
+        lookup_pids: List[str] = list(unique_posts)
+        if pid_filter is not None:
+            lookup_pids = [
+                pid
+                for pid, hit in zip(lookup_pids, pid_filter.might_contain(lookup_pids))
+                if hit
+            ]
+        existing_pids: set[str] = set()
+        if lookup_pids:
+            existing_posts: Any = self._db.posts.find(
+                {
+                    "owner": owner,
+                    "pid": {"$in": lookup_pids},
+                },
+                projection={"pid": True, "_id": False},
+            )
+            existing_pids = {
+                str(post["pid"]) for post in existing_posts if post.get("pid")
+            }
         skipped_count += len(existing_pids)
         new_posts: List[Dict[str, Any]] = [
             post
@@ -125,6 +142,8 @@ class ProviderWorker:
         if not posts:
             return 0, 0
 
+        for post in posts:
+            post[CODECS_FIELD] = codecs_marker(post)
         try:
             self._db.posts.insert_many(posts, ordered=False)
         except BulkWriteError as bulk_error:
@@ -283,6 +302,23 @@ class ProviderWorker:
 
         return True
 
+    def _load_pid_filter(self, owner: str) -> Optional[PidFilter]:
+        try:
+            return self._pid_filters.load(owner)
+        except Exception as e:
+            logging.warning(
+                "Can`t load pid filter for user %s, deduplicating in Mongo. Info: %s",
+                owner,
+                e,
+            )
+            return None
+
+    def _save_pid_filter(self, owner: str, pid_filter: PidFilter) -> None:
+        try:
+            self._pid_filters.save(owner, pid_filter)
+        except Exception as e:
+            logging.warning("Can`t save pid filter for user %s. Info: %s", owner, e)
+
     def handle_download(self, task: Dict[str, Any]) -> bool:
         """Incrementally download new posts/feeds for one connected source.
 
@@ -321,16 +357,21 @@ class ProviderWorker:
         if task.get("data"):
             selection = task["data"].get("selection")
         success: bool = False
+        pid_filter: Optional[PidFilter] = None
+        pid_filter_loaded: bool = False
         try:
             posts: List[Dict[str, Any]]
             feeds: List[Dict[str, Any]]
             for posts, feeds in provider.download(provider_user, selection):
                 received_count += len(posts)
                 if posts:
+                    if not pid_filter_loaded:
+                        pid_filter = self._load_pid_filter(task["user"]["sid"])
+                        pid_filter_loaded = True
                     new_posts: List[Dict[str, Any]]
                     filtered_count: int
                     new_posts, filtered_count = self._prepare_new_posts(
-                        task["user"]["sid"], provider_name, posts
+                        task["user"]["sid"], provider_name, posts, pid_filter
                     )
                     skipped_count += filtered_count
                     batch_inserted: int
@@ -340,6 +381,8 @@ class ProviderWorker:
                     )
                     inserted_count += batch_inserted
                     skipped_count += duplicate_count
+                    if pid_filter is not None:
+                        pid_filter.add(str(post["pid"]) for post in new_posts)
                 if feeds:
                     self._store_feeds(task["user"]["sid"], provider_name, feeds)
             success = True
@@ -357,6 +400,8 @@ class ProviderWorker:
             self._handle_provider_error(task, provider_name, e)
         finally:
             self._save_refreshed_oauth_token(task, provider_user, provider_name)
+            if pid_filter is not None and inserted_count:
+                self._save_pid_filter(task["user"]["sid"], pid_filter)
 
         if success:
             logging.info(
@@ -574,6 +619,8 @@ class ProviderWorker:
         n_posts = [p for pid, p in unique.items() if pid not in skip]
         if not n_posts:
             return
+        for post in n_posts:
+            post[CODECS_FIELD] = codecs_marker(post)
         try:
             self._db.posts.insert_many(n_posts, ordered=False)
             self._record_bulk_write("posts", len(n_posts))
@@ -586,12 +633,25 @@ class ProviderWorker:
             if non_dup:
                 raise
 
+    def _get_raw_to_posts_pool_size(self) -> int:
+        settings: Dict[str, Any] = self._config.get("settings", {})
+        raw_size: Any = settings.get("raw_to_posts_pool_size", 0)
+        try:
+            size: int = int(raw_size)
+        except (TypeError, ValueError):
+            logging.warning(
+                "Invalid raw_to_posts_pool_size=%r, converting in-process", raw_size
+            )
+            return 0
+        return max(0, size)
+
     def handle_raw_to_posts(self, task: Dict[str, Any]) -> bool:
         """Incrementally convert archived raw data into the posts collection.
 
         Only raw_posts docs not yet marked ``posts_converted`` are processed,
         deduped against existing posts by pid, and the source raw docs are
-        marked converted afterwards so re-runs only handle new data. Does not
+        marked converted afterwards so re-runs only handle new data. Reading,
+        converting and storing overlap in a ``RawPostsPipeline``. Does not
         chain into the tag pipeline (run Build Tags separately).
         """
         provider_name = task["data"].get("provider")
@@ -617,39 +677,37 @@ class ProviderWorker:
         }
 
         converted_n = 0
-        batch_size = 500
+
+        def store(
+            ids: List[Any], posts: List[Dict[str, Any]], feeds: List[Dict[str, Any]]
+        ) -> None:
+            nonlocal converted_n
+            self._store_converted_posts(owner, provider_name, posts, feeds)
+            self._db.raw_posts.update_many(
+                {"_id": {"$in": ids}},
+                {"$set": {"posts_converted": 1}},
+            )
+            converted_n += len(ids)
+
         success = False
+        pipeline = RawPostsPipeline(
+            transform,
+            owner,
+            chat_by_stream,
+            pool_size=self._get_raw_to_posts_pool_size(),
+            batch_size=RAW_BATCH_SIZE,
+            config=self._config,
+        )
         try:
-            while True:
-                raw_docs = list(
-                    self._db.raw_posts.find(
-                        {
-                            "owner": owner,
-                            "provider": provider_name,
-                            "posts_converted": {"$exists": False},
-                        },
-                        projection={"raw": True},
-                    ).limit(batch_size)
-                )
-                if not raw_docs:
-                    break
-                messages = [
-                    d["raw"]
-                    for d in raw_docs
-                    if isinstance(d.get("raw"), dict)
-                ]
-                posts, feeds = transform(owner, messages, chat_by_stream)
-                self._store_converted_posts(
-                    owner, provider_name, posts, feeds
-                )
-                ids = [d["_id"] for d in raw_docs]
-                self._db.raw_posts.update_many(
-                    {"_id": {"$in": ids}},
-                    {"$set": {"posts_converted": 1}},
-                )
-                converted_n += len(ids)
-                if len(raw_docs) < batch_size:
-                    break
+            raw_docs = self._db.raw_posts.find(
+                {
+                    "owner": owner,
+                    "provider": provider_name,
+                    "posts_converted": {"$exists": False},
+                },
+                projection={"raw": True},
+            ).batch_size(RAW_BATCH_SIZE)
+            pipeline.run(raw_docs, store)
             success = True
         except Exception as e:
             logging.error(
@@ -659,6 +717,8 @@ class ProviderWorker:
                 traceback.format_exc(),
             )
             self._handle_provider_error(task, provider_name, e)
+        finally:
+            pipeline.close()
 
         logging.info(
             "Raw->posts finished for %s. Converted %d raw docs.",
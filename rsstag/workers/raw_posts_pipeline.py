@@ -0,0 +1,171 @@
+"""Pipelined conversion of archived raw provider data into posts.
+
+TASK_RAW_TO_POSTS runs three stages joined by a bounded queue: a reader
+thread walks one cursor over the unconverted ``raw_posts`` docs and cuts it
+into batches, the provider transform converts each batch in a process pool
+(or a single thread when no pool is configured), and the calling thread
+stores the posts and marks the batch converted. Batches are written in the
+order they were read and a batch is marked only after its posts are stored,
+so a crash leaves the unmarked batches to the next run, where pid dedup
+keeps the retried posts from being stored twice.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rsstag.text_codec import configure_codecs
+
+RAW_BATCH_SIZE = 500
+# Batches read and converted ahead of the writer, per transform process
+BATCHES_AHEAD = 2
+
+# transform(owner, raw messages, chat_by_stream) -> (posts, feeds)
+Transform = Callable[[str, List[dict], Dict[str, dict]], Tuple[List[dict], List[dict]]]
+# store(raw_posts _ids, posts, feeds)
+Store = Callable[[List[Any], List[dict], List[dict]], None]
+
+_DONE = object()
+
+# Transform and its arguments in a pool process, set once by the initializer.
+_process_transform: Optional[Transform] = None
+_process_owner: str = ""
+_process_chats: Dict[str, dict] = {}
+
+
+def iter_raw_batches(
+    raw_docs: Iterable[dict], batch_size: int
+) -> Iterator[Tuple[List[Any], List[dict]]]:
+    """Cut raw_posts docs into (``_id`` list, raw message list) batches."""
+    ids: List[Any] = []
+    messages: List[dict] = []
+    for doc in raw_docs:
+        ids.append(doc["_id"])
+        if isinstance(doc.get("raw"), dict):
+            messages.append(doc["raw"])
+        if len(ids) >= batch_size:
+            yield ids, messages
+            ids, messages = [], []
+    if ids:
+        yield ids, messages
+
+
+def _init_process(
+    config: Dict[str, Any], transform: Transform, owner: str, chat_by_stream: Dict[str, dict]
+) -> None:
+    global _process_transform, _process_owner, _process_chats
+    # Spawned processes start with the default codecs
+    configure_codecs(config)
+    _process_transform = transform
+    _process_owner = owner
+    _process_chats = chat_by_stream
+
+
+def _convert_batch(messages: List[dict]) -> Tuple[List[dict], List[dict]]:
+    return _process_transform(_process_owner, messages, _process_chats)
+
+
+def _put(pending: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put ``item`` unless the writer stopped; False if it did."""
+    while not stop.is_set():
+        try:
+            pending.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class RawPostsPipeline:
+    """Reader thread, transform pool and in-order writer for raw->posts.
+
+    Pool processes are spawned rather than forked, as in ``TagsPool``: the
+    worker holds a ``MongoClient`` with background threads. They receive the
+    transform once, so it must pickle without the provider's client, and the
+    codec settings of ``config``.
+    """
+
+    def __init__(
+        self,
+        transform: Transform,
+        owner: str,
+        chat_by_stream: Dict[str, dict],
+        pool_size: int = 0,
+        batch_size: int = RAW_BATCH_SIZE,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._batch_size: int = batch_size
+        self._ahead: int = max(1, pool_size) * BATCHES_AHEAD
+        self._executor: Executor
+        self._convert: Callable[[List[dict]], Tuple[List[dict], List[dict]]]
+        if pool_size > 0:
+            settings: Dict[str, Any] = (config or {}).get("settings", {})
+            process_config: Dict[str, Any] = {
+                "settings": {
+                    key: settings[key]
+                    for key in ("content_codec", "lemmas_codec")
+                    if key in settings
+                }
+            }
+            self._executor = ProcessPoolExecutor(
+                max_workers=pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(process_config, transform, owner, chat_by_stream),
+            )
+            self._convert = _convert_batch
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._convert = lambda messages: transform(owner, messages, chat_by_stream)
+
+    def _read(
+        self, raw_docs: Iterable[dict], pending: queue.Queue, stop: threading.Event
+    ) -> None:
+        try:
+            for ids, messages in iter_raw_batches(raw_docs, self._batch_size):
+                future: Future = self._executor.submit(self._convert, messages)
+                if not _put(pending, (ids, future), stop):
+                    future.cancel()
+                    return
+            last: Any = _DONE
+        except Exception as e:
+            last = e
+        _put(pending, last, stop)
+
+    def run(self, raw_docs: Iterable[dict], store: Store) -> int:
+        """Convert ``raw_docs`` batch by batch; return how many were stored.
+
+        ``store`` runs in the calling thread, one batch at a time and in read
+        order. Reader, transform and ``store`` errors are raised here.
+        """
+        pending: queue.Queue = queue.Queue(maxsize=self._ahead)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=self._read, args=(raw_docs, pending, stop), daemon=True
+        )
+        reader.start()
+        stored = 0
+        try:
+            while True:
+                item = pending.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                ids, future = item
+                posts, feeds = future.result()
+                store(ids, posts, feeds)
+                stored += len(ids)
+        finally:
+            stop.set()
+            reader.join()
+        return stored
+
+    def close(self) -> None:
+        try:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        except Exception as e:
+            logging.warning("Can`t shut down raw->posts pool. Info: %s", e)
@@ -1,6 +1,5 @@
 """Tag-related worker operations."""
 
-import gzip
 import logging
 import math
 import os.path
@@ -9,29 +8,45 @@ import time
 from collections import Counter, defaultdict
 from functools import lru_cache
 from random import randint
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from pymongo import UpdateOne
 from sklearn.cluster import DBSCAN
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 from rsstag.bi_grams import RssTagBiGrams
+from rsstag.cooccurrence import RssTagCooccurrence, keyword_pairs
 from rsstag.entity_extractor import RssTagEntityExtractor
 from rsstag.html_cleaner import HTMLCleaner
+from rsstag.lemma_vocab import LEMMA_IDS_FIELD, RssTagLemmaVocab, ids_to_bytes
+from rsstag.pid_filter import RssTagPidFilters
+from rsstag.prefix_index import RssTagPrefixIndex
 from rsstag.letters import RssTagLetters
-from rsstag.posts import PostLemmaSentence, RssTagPosts
+from rsstag.embedding_training import DEFAULT_FULL_RETRAIN_DAYS, DEFAULT_FULL_RETRAIN_DRIFT
+from rsstag.posts import TAGGED_AT_FIELD, RssTagPosts
+from rsstag.post_clustering import (
+    DEFAULT_REFIT_GROWTH,
+    ENGINE_DBSCAN,
+    ENGINE_MINIBATCH,
+    ENGINES as CLUSTERING_ENGINES,
+    RssTagPostClusterModels,
+    StreamingPostClustering,
+)
 from rsstag.post_grouping import RssTagPostGrouping
-from rsstag.sentiment import RuSentiLex, SentimentConverter, WordNetAffectRuRom
+from rsstag.sentiment_lexicon import load_sentiment_lexicon
 from rsstag.snippet_clusters import RssTagSnippetClusters
 from rsstag.snippets import merge_grouped_snippets
 from rsstag.tags import RssTagTags
-from rsstag.tags_builder import TagsBuilder
+from rsstag.tags_builder import ENGINE_PYTHON, TagsBuilder
+from rsstag.topics_index import RssTagTopicsIndex
 from rsstag.users import RssTagUsers
 from rsstag.w2v import W2VLearn
 from rsstag.fasttext import FastTextLearn
 from rsstag.web.routes import RSSTagRoutes
 from rsstag.tasks import TAG_NOT_IN_PROCESSING
 from rsstag.workers.base import BaseWorker
+from rsstag.workers.tags_pipeline import TagsPool, build_posts_tags
+from rsstag.text_codec import corrupt_marker, decode_text, decode_words, recode_post
 
 
 def _tag_occurs_in_topic(tag: str, topic: str) -> bool:
@@ -47,8 +62,36 @@ def _tag_occurs_in_topic(tag: str, topic: str) -> bool:
 class TagWorker(BaseWorker):
     def __init__(self, db, config):
         super().__init__(db, config)
-        self._builder = TagsBuilder()
+        self._builder = TagsBuilder(
+            engine=self._config.get("settings", {}).get(
+                "tags_builder_engine", ENGINE_PYTHON
+            )
+        )
         self._cleaner = HTMLCleaner()
+        self._tags_pool: Optional[TagsPool] = None
+
+    def _get_tags_pool_size(self) -> int:
+        settings: Dict[str, Any] = self._config.get("settings", {})
+        raw_size: Any = settings.get("tags_pool_size", 0)
+        try:
+            size: int = int(raw_size)
+        except (TypeError, ValueError):
+            logging.warning("Invalid tags_pool_size=%r, building tags in-process", raw_size)
+            return 0
+        return max(0, size)
+
+    def _get_tags_pool(self) -> Optional[TagsPool]:
+        """Lazily start the TASK_TAGS process pool, if one is configured."""
+        if self._tags_pool is None:
+            size: int = self._get_tags_pool_size()
+            if size > 0:
+                self._tags_pool = TagsPool(size, self._config)
+        return self._tags_pool
+
+    def close(self) -> None:
+        if self._tags_pool is not None:
+            self._tags_pool.close()
+            self._tags_pool = None
 
     def handle_tags(self, task: dict) -> bool:
         if task["data"]:
@@ -83,13 +126,29 @@ class TagWorker(BaseWorker):
     def handle_tags_topics(self, task: dict[str, Any]) -> bool:
         return self.make_tags_topics(task["user"]["sid"])
 
+    def handle_recode_posts(self, task: dict) -> bool:
+        return self.make_recode_posts(task["data"])
+
+    def handle_prefix_index(self, task: dict) -> bool:
+        return RssTagPrefixIndex(self._db).rebuild(task["user"]["sid"])
+
+    def handle_tag_cooccurrence(self, task: dict) -> bool:
+        RssTagCooccurrence(self._db).rebuild(task["user"]["sid"])
+        return True
+
     def clear_user_data(self, user: dict) -> bool:
         try:
             self._db.posts.delete_many({"owner": user["sid"]})
             self._db.feeds.delete_many({"owner": user["sid"]})
             self._db.tags.delete_many({"owner": user["sid"]})
             self._db.bi_grams.delete_many({"owner": user["sid"]})
+            RssTagCooccurrence(self._db).remove_owner(user["sid"])
             self._db.letters.delete_many({"owner": user["sid"]})
+            RssTagLemmaVocab(self._db).remove_owner(user["sid"])
+            RssTagPidFilters(self._db).remove_owner(user["sid"])
+            RssTagPostClusterModels(self._db).remove_owner(user["sid"])
+            RssTagPrefixIndex(self._db).remove_owner(user["sid"])
+            RssTagTopicsIndex(self._db).remove_owner(user["sid"])
             result = True
         except Exception as e:
             logging.error("Can`t clear user data %s. Info: %s", user["sid"], e)
@@ -101,6 +160,7 @@ class TagWorker(BaseWorker):
         try:
             self._db.tags.delete_many({"owner": user["sid"]})
             self._db.bi_grams.delete_many({"owner": user["sid"]})
+            RssTagCooccurrence(self._db).remove_owner(user["sid"])
             self._db.letters.delete_many({"owner": user["sid"]})
             result = True
         except Exception as e:
@@ -109,59 +169,66 @@ class TagWorker(BaseWorker):
 
         return result
 
+    def _set_lemma_ids(self, owner: str, posts_tags: list) -> bool:
+        """Add the lemmas as vocabulary id arrays to the posts updates."""
+        try:
+            lemmas = [decode_words(post_tags["lemmas"]) for _, post_tags in posts_tags]
+            vocab = RssTagLemmaVocab(self._db).assign(
+                owner, (word for words in lemmas for word in words)
+            )
+            lemma_ids = [ids_to_bytes(vocab.to_ids(words)) for words in lemmas]
+        except Exception as e:
+            # Readers build missing arrays themselves, tagging must go on.
+            logging.error("Can`t assign lemma ids for posts. Info: %s", e)
+            return False
+        for (_, post_tags), post_lemma_ids in zip(posts_tags, lemma_ids):
+            post_tags[LEMMA_IDS_FIELD] = post_lemma_ids
+        return True
+
     def make_tags(
         self,
         posts: List[dict],
     ) -> bool:
         if not posts:
             return False
-        posts_updates = []
         tags_updates = []
         bi_grams_updates = []
-        sum_tags = {}
-        sum_bigrams = {}
         routes = RSSTagRoutes(self._config["settings"]["host_name"])
         owner = posts[0]["owner"]
-        for post in posts:
-            content = gzip.decompress(post["content"]["content"])
-            text = post["content"]["title"] + " " + content.decode("utf-8")
-            self._cleaner.purge()
-            self._cleaner.feed(text)
-            strings = self._cleaner.get_content()
-            text = " ".join(strings)
-            self._builder.purge()
-            self._builder.build_tags_and_bi_grams(text)
-            tags = self._builder.get_tags()
-            tag_words = self._builder.get_words()
-            bi_grams = self._builder.get_bi_grams()
-            bi_words = self._builder.get_bi_grams_words()
-            post_tags = {
-                "lemmas": gzip.compress(
-                    self._builder.get_prepared_text().encode("utf-8", "replace")
-                ),
-                "tags": [""],
-                "bi_grams": [],
-            }
-            if tags:
-                post_tags["tags"] = [tag for tag in tags]
-            if bi_grams:
-                post_tags["bi_grams"] = list(bi_grams.keys())
-            posts_updates.append(UpdateOne({"_id": post["_id"]}, {"$set": post_tags}))
-            for tag, freq in tags.items():
-                if tag not in sum_tags:
-                    sum_tags[tag] = {"posts": 0, "freq": 0, "words": set()}
-                sum_tags[tag]["posts"] += 1
-                sum_tags[tag]["freq"] += freq
-                sum_tags[tag]["words"].update(tag_words[tag])
-            for bigram, bi_tags in bi_grams.items():
-                if bigram not in sum_bigrams:
-                    sum_bigrams[bigram] = {
-                        "tags": list(bi_tags),
-                        "posts": 0,
-                        "words": set(),
-                    }
-                sum_bigrams[bigram]["posts"] += 1
-                sum_bigrams[bigram]["words"].update(bi_words[bigram])
+        pool = self._get_tags_pool()
+        built = None
+        if pool is not None:
+            try:
+                built = pool.build(posts)
+            except Exception as e:
+                # A crashed pool process breaks the whole executor; drop it
+                # so the next batch starts a fresh one, and finish this batch
+                # in-process.
+                logging.error("Tags pool failed, building in-process. Info: %s", e)
+                self.close()
+        if built is None:
+            built = build_posts_tags(posts, self._builder, self._cleaner)
+        posts_tags, sum_tags, sum_bigrams = built
+        tagged_at = time.time()
+        posts_updates = []
+        has_lemma_ids = self._set_lemma_ids(owner, posts_tags)
+        for post_id, post_tags in posts_tags:
+            update: dict = {"$set": {**post_tags, TAGGED_AT_FIELD: tagged_at}}
+            if not has_lemma_ids:
+                # Arrays of the previous tagging don't match the new lemmas
+                update["$unset"] = {LEMMA_IDS_FIELD: ""}
+            posts_updates.append(UpdateOne({"_id": post_id}, update))
+        pairs: Counter = Counter()
+        unread_pairs: Counter = Counter()
+        read_posts = {post["_id"] for post in posts if post.get("read")}
+        for post_id, post_tags in posts_tags:
+            post_pairs = list(keyword_pairs(post_tags["keywords"]))
+            pairs.update(post_pairs)
+            if post_id not in read_posts:
+                unread_pairs.update(post_pairs)
+        cooccurrence_updates = RssTagCooccurrence(self._db).make_updates(
+            owner, pairs, unread_pairs
+        )
 
         for tag, tag_d in sum_tags.items():
             tags_updates.append(
@@ -227,10 +294,19 @@ class TagWorker(BaseWorker):
                 self._db.tags.bulk_write(tags_updates, ordered=False)
             if bi_grams_updates:
                 self._db.bi_grams.bulk_write(bi_grams_updates, ordered=False)
+            if cooccurrence_updates:
+                self._db.tag_cooccurrence.bulk_write(
+                    cooccurrence_updates, ordered=False
+                )
             result = True
         except Exception as e:
             result = False
             logging.error("Can`t save tags/bi-grams for posts. Info: %s", e)
+        if result:
+            try:
+                RssTagPrefixIndex(self._db).add_posts(owner, posts, tagged_at)
+            except Exception as e:
+                logging.error("Can`t update prefix index of %s. Info: %s", owner, e)
 
         return result
 
@@ -297,6 +373,21 @@ class TagWorker(BaseWorker):
 
         return True
 
+    def make_recode_posts(self, posts: List[dict]) -> bool:
+        """Re-encode content and lemmas of ``posts`` with the configured codecs."""
+        updates = []
+        for post in posts:
+            try:
+                update = recode_post(post)
+            except (EOFError, OSError, ValueError) as e:
+                logging.error("Can`t recode post %s. Info: %s", post["_id"], e)
+                update = corrupt_marker()
+            updates.append(UpdateOne({"_id": post["_id"]}, {"$set": update}))
+        if updates:
+            self._db.posts.bulk_write(updates, ordered=False)
+
+        return True
+
     def make_ner(self, all_posts: List[dict]) -> Optional[bool]:
         if not all_posts:
             return True
@@ -307,7 +398,7 @@ class TagWorker(BaseWorker):
             text = (
                 post["content"]["title"]
                 + " "
-                + gzip.decompress(post["content"]["content"]).decode("utf-8", "ignore")
+                + decode_text(post["content"]["content"], "ignore")
             )
             if not text.strip():
                 continue
@@ -329,7 +420,29 @@ class TagWorker(BaseWorker):
 
         return result
 
+    def _get_clustering_settings(self) -> Tuple[str, float]:
+        settings: Dict[str, Any] = self._config.get("settings", {})
+        engine: Any = settings.get("clustering_engine", ENGINE_DBSCAN)
+        if engine not in CLUSTERING_ENGINES:
+            logging.warning("Unknown clustering engine %r, using %s", engine, ENGINE_DBSCAN)
+            engine = ENGINE_DBSCAN
+        raw_growth: Any = settings.get("clustering_refit_growth", DEFAULT_REFIT_GROWTH)
+        try:
+            growth = max(0.0, float(raw_growth))
+        except (TypeError, ValueError):
+            logging.warning(
+                "Invalid clustering_refit_growth=%r, using %s",
+                raw_growth,
+                DEFAULT_REFIT_GROWTH,
+            )
+            growth = DEFAULT_REFIT_GROWTH
+        return engine, growth
+
     def make_clustering(self, owner: str) -> Optional[bool]:
+        engine, refit_growth = self._get_clustering_settings()
+        if engine == ENGINE_MINIBATCH:
+            return StreamingPostClustering(self._db, self._stopw, refit_growth).run(owner)
+
         posts = RssTagPosts(self._db)
         all_posts = posts.get_all(owner, projection={"lemmas": True, "pid": True})
         clusters = None
@@ -337,7 +450,7 @@ class TagWorker(BaseWorker):
         post_pids = []
         for post in all_posts:
             post_pids.append(post["pid"])
-            text = gzip.decompress(post["lemmas"]).decode("utf-8", "ignore")
+            text = decode_text(post["lemmas"], "ignore")
             texts_for_vec.append(text)
 
         if texts_for_vec:
@@ -449,9 +562,7 @@ class TagWorker(BaseWorker):
 
             raw_content_bytes: Any = post.get("content", {}).get("content", b"")
             try:
-                raw_content: str = gzip.decompress(raw_content_bytes).decode(
-                    "utf-8", "replace"
-                )
+                raw_content: str = decode_text(raw_content_bytes)
             except Exception:
                 continue
 
@@ -531,11 +642,31 @@ class TagWorker(BaseWorker):
         )
         return snippet_clusters.replace_clusters(owner, payload)
 
-    def make_w2v(self, owner: str) -> Optional[bool]:
-        l_sent = PostLemmaSentence(self._db, owner, split=True)
-        if l_sent.count() == 0:
-            return True
+    def _get_full_retrain_settings(self) -> Tuple[float, float]:
+        settings: Dict[str, Any] = self._config.get("settings", {})
+        raw_days: Any = settings.get("embeddings_full_retrain_days", DEFAULT_FULL_RETRAIN_DAYS)
+        raw_drift: Any = settings.get("embeddings_full_retrain_drift", DEFAULT_FULL_RETRAIN_DRIFT)
+        try:
+            days = max(0.0, float(raw_days))
+        except (TypeError, ValueError):
+            logging.warning(
+                "Invalid embeddings_full_retrain_days=%r, using %s",
+                raw_days,
+                DEFAULT_FULL_RETRAIN_DAYS,
+            )
+            days = DEFAULT_FULL_RETRAIN_DAYS
+        try:
+            drift = max(0.0, float(raw_drift))
+        except (TypeError, ValueError):
+            logging.warning(
+                "Invalid embeddings_full_retrain_drift=%r, using %s",
+                raw_drift,
+                DEFAULT_FULL_RETRAIN_DRIFT,
+            )
+            drift = DEFAULT_FULL_RETRAIN_DRIFT
+        return days, drift
 
+    def make_w2v(self, owner: str) -> Optional[bool]:
         users_h = RssTagUsers(self._db)
         user = users_h.get_by_sid(owner)
         if not user:
@@ -544,7 +675,7 @@ class TagWorker(BaseWorker):
         path = os.path.join(self._config["settings"]["w2v_dir"], user["w2v"])
         try:
             learn = W2VLearn(path)
-            learn.learn(l_sent)
+            learn.train_posts(self._db, owner, *self._get_full_retrain_settings())
             result = True
         except Exception as e:
             result = None
@@ -553,10 +684,6 @@ class TagWorker(BaseWorker):
         return result
 
     def make_fasttext(self, owner: str) -> Optional[bool]:
-        l_sent = PostLemmaSentence(self._db, owner, split=True)
-        if l_sent.count() == 0:
-            return True
-
         users_h = RssTagUsers(self._db)
         user = users_h.get_by_sid(owner)
         if not user:
@@ -565,7 +692,7 @@ class TagWorker(BaseWorker):
         path = os.path.join(self._config["settings"]["fasttext_dir"], user["fasttext"])
         try:
             learn = FastTextLearn(path)
-            learn.learn(l_sent)
+            learn.train_posts(self._db, owner, *self._get_full_retrain_settings())
             result = True
         except Exception as e:
             result = None
@@ -671,36 +798,17 @@ class TagWorker(BaseWorker):
         return result
 
     def make_tags_sentiment(self, owner: str) -> Optional[bool]:
-        """
-        TODO: may be will be need RuSentiLex and WordNetAffectRuRom caching
-        """
+        """Set the sentiment of every tag found in the compiled sentiment lexicon."""
         try:
-            with open(self._config["settings"]["sentilex"], "r", encoding="utf-8") as f:
-                strings = f.read().splitlines()
-            ru_sent = RuSentiLex()
-            wrong = ru_sent.sentiment_validation(strings, ",", "!")
-            if not wrong:
-                ru_sent.load(strings, ",", "!")
+            lexicon = load_sentiment_lexicon(self._config)
+            if lexicon is not None:
                 tags = RssTagTags(self._db)
-                all_tags = tags.get_all(owner, projection={"tag": True})
-                wna_dir = self._config["settings"]["lilu_wordnet"]
-                wn_en = WordNetAffectRuRom("en", 4)
-                wn_en.load_dicts_from_dir(wna_dir)
-                wn_ru = WordNetAffectRuRom("ru", 4)
-                wn_ru.load_dicts_from_dir(wna_dir)
-                conv = SentimentConverter()
-                for tag in all_tags:
-                    sentiment = ru_sent.get_sentiment(tag["tag"])
-                    if not sentiment:
-                        affects = wn_en.get_affects_by_word(tag["tag"])
-                        if not affects:
-                            affects = wn_ru.get_affects_by_word(tag["tag"])
-                        if affects:
-                            sentiment = conv.convert_sentiment(affects)
-
+                sentiments = {}
+                for tag in tags.get_all(owner, projection={"tag": True}):
+                    sentiment = lexicon.get(tag["tag"])
                     if sentiment:
-                        sentiment = sorted(sentiment)
-                        tags.add_sentiment(owner, tag["tag"], sentiment)
+                        sentiments[tag["tag"]] = sentiment
+                tags.add_sentiments(owner, sentiments)
             result = True
         except Exception as e:
             result = False
@@ -867,6 +975,7 @@ class TagWorker(BaseWorker):
                 projection={
                     "tags": True,
                     "bi_grams": True,
+                    "keywords": True,
                     "read": True,
                     "_id": True,
                     "pid": True,
@@ -875,6 +984,8 @@ class TagWorker(BaseWorker):
 
             tag_stats = defaultdict(lambda: {"posts_count": 0, "unread_count": 0})
             bi_gram_stats = defaultdict(lambda: {"posts_count": 0, "unread_count": 0})
+            pair_stats: Counter = Counter()
+            unread_pair_stats: Counter = Counter()
             post_ids = []
             pids = []
 
@@ -895,6 +1006,10 @@ class TagWorker(BaseWorker):
                     bi_gram_stats[bg]["posts_count"] += 1
                     if is_unread:
                         bi_gram_stats[bg]["unread_count"] += 1
+                post_pairs = list(keyword_pairs(post.get("keywords", [])))
+                pair_stats.update(post_pairs)
+                if is_unread:
+                    unread_pair_stats.update(post_pairs)
 
             logging.info(
                 "Collected %s posts and %s pids for deletion", len(post_ids), len(pids)
@@ -906,6 +1021,12 @@ class TagWorker(BaseWorker):
                 batch = post_ids[i : i + batch_size]
                 self._db.posts.delete_many({"_id": {"$in": batch}})
                 logging.info("Deleted batch of %s posts", len(batch))
+            if post_ids:
+                # Bloom filters can't forget pids: the next download rebuilds it
+                RssTagPidFilters(self._db).remove_owner(user_sid)
+                # Nor can the prefix index forget words: the prefixes pages
+                # queue its rebuild
+                RssTagPrefixIndex(self._db).remove_owner(user_sid)
 
             # 6. Delete post_grouping entries
             if pids:
@@ -914,6 +1035,8 @@ class TagWorker(BaseWorker):
                     {"owner": user_sid, "post_ids": {"$in": pids}}
                 )
                 logging.info("Deleted %s post_grouping entries", res.deleted_count)
+                RssTagTopicsIndex(self._db).mark_posts(user_sid, pids)
+                RssTagPostGrouping(self._db).refresh_topics_index(user_sid)
 
             # 5. Update counters
             tag_updates = []
@@ -951,6 +1074,10 @@ class TagWorker(BaseWorker):
                 self._db.bi_grams.bulk_write(bi_gram_updates, ordered=False)
                 logging.info("Updated counters for %s bi-grams", len(bi_gram_updates))
 
+            RssTagCooccurrence(self._db).remove_posts(
+                user_sid, pair_stats, unread_pair_stats
+            )
+
             # 7. Delete feed documents
             res = self._db.feeds.delete_many(
                 {"owner": user_sid, "feed_id": {"$in": feed_ids}}
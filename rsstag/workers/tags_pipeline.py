@@ -0,0 +1,181 @@
+"""Per-post tag building for TASK_TAGS, serial or fanned out to processes."""
+
+import logging
+import math
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from rsstag.cooccurrence import post_keywords
+from rsstag.html_cleaner import HTMLCleaner
+from rsstag.stem_cache import init_stem_cache, save_stem_cache
+from rsstag.tags_builder import ENGINE_PYTHON, TagsBuilder
+from rsstag.text_codec import (
+    CODECS_FIELD,
+    configure_codecs,
+    decode_text,
+    encode_lemmas,
+    lemmas_codec,
+)
+
+# (post _id, fields to $set on the post)
+PostTags = Tuple[Any, Dict[str, Any]]
+TagsSums = Dict[str, Dict[str, Any]]
+
+# Builder and cleaner of a pool process. They live as long as the process, and
+# the process-wide stem cache stays warm from one batch to the next.
+_process_builder: Optional[TagsBuilder] = None
+_process_cleaner: Optional[HTMLCleaner] = None
+
+
+def build_posts_tags(
+    posts: List[dict], builder: TagsBuilder, cleaner: HTMLCleaner
+) -> Tuple[List[PostTags], TagsSums, TagsSums]:
+    """Build tags/bi-grams for ``posts`` and sum them over the batch.
+
+    Returns the per-post ``$set`` payloads (with the ``keywords`` that feed
+    the co-occurrence store) plus the ``sum_tags`` and ``sum_bigrams``
+    partial sums that ``make_tags`` turns into ``$inc`` upserts.
+    """
+    posts_tags: List[PostTags] = []
+    sum_tags: TagsSums = {}
+    sum_bigrams: TagsSums = {}
+    for post in posts:
+        content = decode_text(post["content"]["content"], "strict")
+        text = post["content"]["title"] + " " + content
+        cleaner.purge()
+        cleaner.feed(text)
+        strings = cleaner.get_content()
+        text = " ".join(strings)
+        builder.purge()
+        builder.build_tags_and_bi_grams(text)
+        tags = builder.get_tags()
+        tag_words = builder.get_words()
+        bi_grams = builder.get_bi_grams()
+        bi_words = builder.get_bi_grams_words()
+        lemmas = builder.get_prepared_text()
+        post_tags = {
+            "lemmas": encode_lemmas(lemmas),
+            CODECS_FIELD + ".lemmas": lemmas_codec(),
+            "tags": [""],
+            "bi_grams": [],
+            "keywords": post_keywords(lemmas),
+        }
+        if tags:
+            post_tags["tags"] = [tag for tag in tags]
+        if bi_grams:
+            post_tags["bi_grams"] = list(bi_grams.keys())
+        posts_tags.append((post["_id"], post_tags))
+        for tag, freq in tags.items():
+            if tag not in sum_tags:
+                sum_tags[tag] = {"posts": 0, "freq": 0, "words": set()}
+            sum_tags[tag]["posts"] += 1
+            sum_tags[tag]["freq"] += freq
+            sum_tags[tag]["words"].update(tag_words[tag])
+        for bigram, bi_tags in bi_grams.items():
+            if bigram not in sum_bigrams:
+                sum_bigrams[bigram] = {
+                    "tags": list(bi_tags),
+                    "posts": 0,
+                    "words": set(),
+                }
+            sum_bigrams[bigram]["posts"] += 1
+            sum_bigrams[bigram]["words"].update(bi_words[bigram])
+
+    return posts_tags, sum_tags, sum_bigrams
+
+
+def merge_tags_sums(target: TagsSums, partial: TagsSums) -> None:
+    """Fold one process's partial tag or bi-gram sums into ``target``."""
+    for key, part in partial.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = part
+            continue
+        current["posts"] += part["posts"]
+        if "freq" in part:
+            current["freq"] += part["freq"]
+        current["words"].update(part["words"])
+
+
+def _init_process(config: Dict[str, Any]) -> None:
+    global _process_builder, _process_cleaner
+    # Spawned processes start cold: preload the saved stems and write back
+    # what this process learned when the pool shuts it down.
+    init_stem_cache(config)
+    configure_codecs(config)
+    multiprocessing.util.Finalize(None, save_stem_cache, args=(config,), exitpriority=10)
+    _process_builder = TagsBuilder(
+        engine=config["settings"].get("tags_builder_engine", ENGINE_PYTHON)
+    )
+    _process_cleaner = HTMLCleaner()
+
+
+def _build_chunk(posts: List[dict]) -> Tuple[List[PostTags], TagsSums, TagsSums]:
+    return build_posts_tags(posts, _process_builder, _process_cleaner)
+
+
+class TagsPool:
+    """Process pool that builds tags for post chunks in parallel.
+
+    Processes are spawned rather than forked: the worker already holds a
+    ``MongoClient`` with background threads, which must not be forked.
+    """
+
+    def __init__(self, size: int, config: Optional[Dict[str, Any]] = None) -> None:
+        self._size: int = size
+        # Processes only need the builder, stem cache and codec settings.
+        settings: Dict[str, Any] = (config or {}).get("settings", {})
+        process_config: Dict[str, Any] = {
+            "settings": {
+                key: settings[key]
+                for key in (
+                    "tags_builder_engine",
+                    "stem_cache_size",
+                    "stem_cache_path",
+                    "lemmas_codec",
+                )
+                if key in settings
+            }
+        }
+        self._executor = ProcessPoolExecutor(
+            max_workers=size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+            initargs=(process_config,),
+        )
+
+    def build(self, posts: List[dict]) -> Tuple[List[PostTags], TagsSums, TagsSums]:
+        # Ship only what the builder reads; whole post docs are much larger.
+        payload: List[dict] = [
+            {
+                "_id": post["_id"],
+                "content": {
+                    "title": post["content"]["title"],
+                    "content": post["content"]["content"],
+                },
+            }
+            for post in posts
+        ]
+        chunk_size: int = max(1, math.ceil(len(payload) / self._size))
+        chunks = [
+            payload[i : i + chunk_size] for i in range(0, len(payload), chunk_size)
+        ]
+        posts_tags: List[PostTags] = []
+        sum_tags: TagsSums = {}
+        sum_bigrams: TagsSums = {}
+        for chunk_posts, chunk_tags, chunk_bigrams in self._executor.map(
+            _build_chunk, chunks
+        ):
+            posts_tags.extend(chunk_posts)
+            merge_tags_sums(sum_tags, chunk_tags)
+            merge_tags_sums(sum_bigrams, chunk_bigrams)
+
+        return posts_tags, sum_tags, sum_bigrams
+
+    def close(self) -> None:
+        try:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        except Exception as e:
+            logging.warning("Can`t shut down tags pool. Info: %s", e)
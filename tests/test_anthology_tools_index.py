@@ -0,0 +1,203 @@
+import random
+import unittest
+from unittest.mock import patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from rsstag.llm import anthology_tools
+from rsstag.llm.anthology_tools import (
+    AnthologyToolExecutor,
+    _term_variants,
+    _tokenize,
+    _tokens_are_inflectional_variants,
+)
+from rsstag.post_grouping import RssTagPostGrouping
+from rsstag.topics_index import RssTagTopicsIndex
+
+OWNER = "alice"
+WORDS = [
+    "market", "markets", "marketing", "rate", "rates", "rated", "bank", "banks",
+    "banking", "oil", "price", "prices", "priced", "ai", "model", "models",
+]
+
+
+def _token_set_matches(term: str, tokens: set) -> bool:
+    return any(_tokens_are_inflectional_variants(term, token) for token in tokens)
+
+
+def reference_score_topic_match(item: dict, terms: list, seed_tag: str) -> tuple:
+    """How the executor scored an entry for a query before the index."""
+    topic_tokens = set(_tokenize(item["topic_path"]))
+    preview_tokens = set(_tokenize(item["preview"]))
+    seed_tokens = set(_tokenize(seed_tag))
+    score = 0
+    matched = []
+    for term in terms:
+        if _token_set_matches(term, topic_tokens):
+            score += 2
+            matched.append(term)
+        elif _token_set_matches(term, preview_tokens):
+            score += 1
+            matched.append(term)
+    if seed_tokens and all(_token_set_matches(token, topic_tokens) for token in seed_tokens):
+        score += 1
+    return score, matched
+
+
+def _brute_force_search(executor: AnthologyToolExecutor, query: str, limit: int) -> list:
+    """The linear scan the executor did before the index."""
+    terms = _tokenize(query)
+    results = []
+    for item in executor._load_grouping_entries():
+        score, matched = (
+            reference_score_topic_match(item, terms, executor._seed_tag) if terms else (1, [])
+        )
+        if score > 0:
+            results.append((item["topic_path"], score, matched, item["post_ids"]))
+    results.sort(key=lambda row: (-row[1], row[0]))
+    return results[:limit]
+
+
+class TestTermVariants(unittest.TestCase):
+    def test_variants_are_the_tokens_matching_a_term(self) -> None:
+        tokens = {word + suffix for word in WORDS for suffix in ("", "s", "es", "ly", "ing")}
+        for term in WORDS + ["ra", "raters", "mod", "x"]:
+            expected = {
+                token
+                for token in tokens
+                if _tokens_are_inflectional_variants(term, token)
+            }
+            self.assertEqual(_term_variants(term) & tokens, expected, term)
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestAnthologyToolIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        anthology_tools.grouping_index_cache.clear()
+        self.addCleanup(anthology_tools.grouping_index_cache.clear)
+        self.grouping = RssTagPostGrouping(self.db)
+        RssTagTopicsIndex(self.db).prepare()
+        rnd = random.Random(5)
+        for pid in range(40):
+            self.db.posts.insert_one(
+                {"owner": OWNER, "pid": str(pid), "feed_id": "f1", "content": {"title": f"T{pid}"}}
+            )
+            sentences = [
+                {"number": n, "text": " ".join(rnd.sample(WORDS, 3)), "read": False}
+                for n in range(3)
+            ]
+            groups = {
+                " > ".join(rnd.sample(WORDS, 2)).title(): [0, 1],
+                rnd.choice(WORDS).title(): [2],
+            }
+            self.grouping.save_grouped_posts(OWNER, [str(pid)], sentences, groups)
+        self.db.posts.insert_one({"owner": "bob", "pid": "99"})
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def _executor(self, seed_tag: str = "market", scope: dict = None) -> AnthologyToolExecutor:
+        return AnthologyToolExecutor(self.db, OWNER, seed_tag, scope)
+
+    def test_search_matches_linear_scan(self) -> None:
+        for seed_tag in ("market", "bank rate", "zzz"):
+            executor = self._executor(seed_tag)
+            for query in ("", "markets", "rate banking", "price oil models", "ai", "nothing"):
+                for limit in (3, 20):
+                    found = executor.search_related_topics(query, limit)["topics"]
+                    self.assertEqual(
+                        [
+                            (row["topic_path"], row["score"], row["matched_terms"], row["post_ids"])
+                            for row in found
+                        ],
+                        _brute_force_search(executor, query, limit),
+                        (seed_tag, query, limit),
+                    )
+
+    def test_topic_lookups_use_the_seed_tag(self) -> None:
+        executor = self._executor()
+        topic_path = executor._load_grouping_entries()[0]["topic_path"]
+        expected_posts = list(
+            dict.fromkeys(
+                post_id
+                for entry in executor._load_grouping_entries()
+                if entry["topic_path"] == topic_path
+                for post_id in entry["post_ids"]
+            )
+        )
+
+        details = executor.get_topic_details(topic_path, limit=20)
+        posts = executor.get_posts_for_topic(topic_path, limit=20)
+
+        self.assertEqual(
+            sum(len(match["post_ids"]) for match in details["matches"]), len(expected_posts)
+        )
+        refs = [ref for match in details["matches"] for ref in match["source_refs"]]
+        self.assertTrue(refs)
+        self.assertTrue(all(ref["tag"] == "market" for ref in refs))
+        self.assertEqual(sorted(post["post_id"] for post in posts["posts"]), sorted(expected_posts))
+        other_seed = self._executor("bank").get_topic_details(topic_path, 1)["matches"][0]
+        self.assertEqual(other_seed["source_refs"][0]["tag"], "bank")
+        ref = refs[0]
+        validated = executor.validate_source_ref(ref["post_id"], topic_path, [0, 1, 2, 7], "")
+        self.assertEqual(validated["sentence_indices"], ref["sentence_indices"])
+        self.assertIsNone(executor.validate_source_ref(ref["post_id"], "Missing", [0], ""))
+
+    def test_coverage_and_overview(self) -> None:
+        executor = self._executor(scope={"mode": "posts", "post_ids": ["0", "1", "2"]})
+
+        coverage = executor.build_coverage({"source_refs": [{"post_id": "1"}]})
+        overview = executor.get_corpus_overview(limit=20)
+
+        self.assertEqual(coverage["documents_in_scope"], 3)
+        self.assertEqual(coverage["documents_with_grouped_text"], 3)
+        self.assertEqual(coverage["uncited_documents"], 2)
+        self.assertEqual(sum(topic["post_count"] for topic in overview["topics"]), 6)
+
+    def test_index_is_shared_until_groupings_change(self) -> None:
+        first = self._executor()._load_grouping_index()
+        self.assertIs(self._executor("bank")._load_grouping_index(), first)
+        self.assertIsNot(
+            self._executor(scope={"mode": "posts", "post_ids": ["1"]})._load_grouping_index(),
+            first,
+        )
+
+        self.grouping.save_grouped_posts(
+            OWNER, ["0"], [{"number": 0, "text": "New text", "read": False}], {"Fresh": [0]}
+        )
+
+        executor = self._executor()
+        self.assertIsNot(executor._load_grouping_index(), first)
+        found = executor.search_related_topics("fresh", 5)["topics"]
+        self.assertEqual(found[0]["topic_path"], "Fresh")
+
+    def test_index_is_dropped_with_the_owner_data(self) -> None:
+        first = self._executor()._load_grouping_index()
+
+        self.db.post_grouping.delete_many({"owner": OWNER})
+        RssTagTopicsIndex(self.db).remove_owner(OWNER)
+
+        index = self._executor()._load_grouping_index()
+        self.assertIsNot(index, first)
+        self.assertEqual(index.entries, [])
+
+    def test_index_is_built_once_per_run(self) -> None:
+        executor = self._executor()
+        with patch.object(
+            anthology_tools, "build_grouping_index", wraps=anthology_tools.build_grouping_index
+        ) as build:
+            anthology_tools.grouping_index_cache.clear()
+            for query in ("market", "rate", "oil"):
+                executor.execute("search_related_topics", {"query": query})
+            executor.execute("get_corpus_overview", {})
+
+        build.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
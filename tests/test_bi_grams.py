@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, call
 from pymongo import DESCENDING, UpdateOne
 
 from rsstag.bi_grams import RssTagBiGrams
+from rsstag.indexes import COMPOUND_INDEXES
 
 
 class TestRssTagBiGramsStorage(unittest.TestCase):
@@ -19,7 +20,8 @@ class TestRssTagBiGramsStorage(unittest.TestCase):
         self.storage.prepare()
 
         self.assertEqual(
-            self.db.bi_grams.create_index.call_count, len(self.storage.indexes)
+            self.db.bi_grams.create_index.call_count,
+            len(self.storage.indexes) + len(COMPOUND_INDEXES["bi_grams"]),
         )
         self.db.bi_grams.create_index.assert_has_calls(
             [call(index) for index in self.storage.indexes], any_order=True
@@ -31,7 +33,8 @@ class TestRssTagBiGramsStorage(unittest.TestCase):
         self.storage.prepare()
 
         self.assertEqual(
-            self.db.bi_grams.create_index.call_count, len(self.storage.indexes)
+            self.db.bi_grams.create_index.call_count,
+            len(self.storage.indexes) + len(COMPOUND_INDEXES["bi_grams"]),
         )
 
     # ------------------------------------------------------------------
@@ -98,6 +101,31 @@ class TestRssTagBiGramsStorage(unittest.TestCase):
             projection={"tag": 1},
         )
 
+    def test_get_by_tags_with_limit(self):
+        cursor = self._mock_find_chain()
+        cursor.limit.return_value = cursor
+
+        result = self.storage.get_by_tags("alice", ["foo"], limit=10)
+
+        self.assertIs(result, cursor)
+        cursor.limit.assert_called_once_with(10)
+
+    def test_get_by_any_tags(self):
+        cursor = self._mock_find_chain()
+        cursor.limit.return_value = cursor
+
+        result = self.storage.get_by_any_tags(
+            "alice", ["foo", "bar"], projection={"tag": 1}, limit=5
+        )
+
+        self.assertIs(result, cursor)
+        self.db.bi_grams.find.assert_called_once_with(
+            {"owner": "alice", "tags": {"$in": ["foo", "bar"]}},
+            projection={"tag": 1},
+        )
+        cursor.sort.assert_called_once_with([("posts_count", DESCENDING)])
+        cursor.limit.assert_called_once_with(5)
+
     # ------------------------------------------------------------------
     # change_unread
     # ------------------------------------------------------------------
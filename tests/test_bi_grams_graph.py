@@ -0,0 +1,132 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from rsstag.bi_grams import RssTagBiGrams
+from rsstag.tags import RssTagTags
+from rsstag.web.bigrams import build_bi_grams_graph, on_get_tag_bi_grams_graph
+
+OWNER = "alice"
+
+
+def _request(**args) -> Request:
+    return Request(EnvironBuilder(query_string=args).get_environ())
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestBiGramsGraph(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        self.app = SimpleNamespace(tags=RssTagTags(self.db), bi_grams=RssTagBiGrams(self.db))
+        tags = {"news": 50, "world": 30, "sport": 20, "cup": 10, "final": 5}
+        self.db.tags.insert_many(
+            [{"owner": OWNER, "tag": tag, "posts_count": count} for tag, count in tags.items()]
+        )
+        bi_grams = {
+            "world news": 7,
+            "news world": 3,
+            "sport news": 4,
+            "news cup": 2,
+            "news unknown": 6,
+            "news news": 9,
+            "sport cup": 3,
+            "cup final": 1,
+        }
+        self.db.bi_grams.insert_many(
+            [
+                {"owner": OWNER, "tag": bi_gram, "tags": bi_gram.split(), "posts_count": count}
+                for bi_gram, count in bi_grams.items()
+            ]
+        )
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    @staticmethod
+    def _weights(graph: dict) -> dict:
+        return {
+            tuple(sorted((edge["source"], edge["target"]))): edge["weight"]
+            for edge in graph["data"]["links"]
+        }
+
+    def test_star_graph_combines_both_orders_of_a_bi_gram(self) -> None:
+        graph = build_bi_grams_graph(self.app, OWNER, "news")
+
+        nodes = {node["id"]: node for node in graph["data"]["nodes"]}
+        self.assertEqual(nodes["news"]["type"], "main")
+        self.assertEqual(nodes["world"]["frequency"], 30)
+        self.assertEqual(nodes["world"]["bigram_frequency"], 7)
+        # No tag for it, the bi-gram frequency stands in
+        self.assertEqual(nodes["unknown"]["frequency"], 6)
+        self.assertEqual(
+            self._weights(graph),
+            {
+                ("news", "world"): 10,
+                ("news", "unknown"): 6,
+                ("news", "sport"): 4,
+                ("cup", "news"): 2,
+            },
+        )
+        self.assertTrue(all(edge["source"] == "news" for edge in graph["data"]["links"]))
+        self.assertFalse(graph["meta"]["truncated"])
+
+    def test_neighbour_tags_are_fetched_in_one_query(self) -> None:
+        tags = self.app.tags
+        with (
+            patch.object(tags, "get_by_tag", wraps=tags.get_by_tag) as one,
+            patch.object(tags, "get_by_tags", wraps=tags.get_by_tags) as many,
+        ):
+            build_bi_grams_graph(self.app, OWNER, "news")
+
+        one.assert_called_once_with(OWNER, "news")
+        many.assert_called_once()
+
+    def test_budget_keeps_most_frequent_tags(self) -> None:
+        graph = build_bi_grams_graph(self.app, OWNER, "news", max_nodes=3, max_edges=1)
+
+        self.assertEqual(
+            [node["id"] for node in graph["data"]["nodes"]], ["news", "world", "sport"]
+        )
+        self.assertEqual(self._weights(graph), {("news", "world"): 10})
+        self.assertTrue(graph["meta"]["truncated"])
+        self.assertEqual(graph["meta"]["original_nodes_count"], 5)
+        self.assertEqual(graph["meta"]["original_edges_count"], 2)
+
+    def test_depth_two_adds_edges_of_neighbours(self) -> None:
+        graph = build_bi_grams_graph(self.app, OWNER, "news", depth=2)
+
+        nodes = {node["id"]: node for node in graph["data"]["nodes"]}
+        self.assertEqual(nodes["final"]["depth"], 2)
+        self.assertNotIn("depth", nodes["cup"])
+        links = graph["data"]["links"]
+        self.assertEqual(self._weights(graph)[("cup", "sport")], 3)
+        self.assertEqual(self._weights(graph)[("cup", "final")], 1)
+        # Edges of the main tag come first
+        self.assertEqual({link["source"] for link in links[:4]}, {"news"})
+
+    def test_handler_reads_budget_from_request(self) -> None:
+        user = {"sid": OWNER}
+
+        response = on_get_tag_bi_grams_graph(
+            self.app, user, "news", _request(max_nodes="2", depth="x")
+        )
+
+        graph = json.loads(response.get_data())
+        self.assertEqual(len(graph["data"]["nodes"]), 2)
+        self.assertEqual(graph["meta"]["depth"], 1)
+        missing = on_get_tag_bi_grams_graph(self.app, user, "nothing", _request())
+        self.assertEqual(missing.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+import gzip
+import random
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from rsstag.cooccurrence import (
+    RssTagCooccurrence,
+    ids_keywords,
+    keyword_pairs,
+    post_keywords,
+    related_counts,
+    top_related,
+)
+from rsstag.lemma_vocab import LemmaVocabulary
+
+
+class TestPostKeywords(unittest.TestCase):
+    def test_most_frequent_lemmas_without_stopwords(self) -> None:
+        keywords = post_keywords("the python code python test code python x", limit=2)
+
+        self.assertEqual(keywords, ["python", "code"])
+
+    def test_keywords_of_lemma_ids_match_keywords_of_lemmas(self) -> None:
+        words = "the python code a python test code python x rust go go".split()
+        vocab = LemmaVocabulary()
+        for word in words:
+            if vocab.get_id(word) is None:
+                vocab.add(word, vocab.next_id)
+
+        self.assertEqual(
+            ids_keywords(vocab.to_ids(words), vocab, limit=4),
+            post_keywords(" ".join(words), limit=4),
+        )
+
+    def test_related_counts_need_all_tags_as_keywords(self) -> None:
+        related = related_counts(
+            [["python", "code", "test"], ["python", "code"], ["code", "rust"]],
+            ["python", "code"],
+        )
+
+        self.assertEqual(related, {"test": 1})
+
+    def test_pairs_are_sorted_and_unique(self) -> None:
+        self.assertEqual(
+            list(keyword_pairs(["python", "code", "test"])),
+            ["code python", "code test", "python test"],
+        )
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo UpdateOne ops, apply them one by one
+    for request in requests:
+        collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestRssTagCooccurrence(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        self.store = RssTagCooccurrence(self.db)
+        bulk_patch = patch.object(
+            mongomock.collection.Collection, "bulk_write", _apply_updates
+        )
+        bulk_patch.start()
+        self.addCleanup(bulk_patch.stop)
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def _add_posts(self, owner: str, *keywords: list, read: bool = False) -> None:
+        pairs: Counter = Counter()
+        for post_keywords_ in keywords:
+            pairs.update(keyword_pairs(post_keywords_))
+        unread = Counter() if read else pairs
+        self.db.tag_cooccurrence.bulk_write(self.store.make_updates(owner, pairs, unread))
+
+    def test_related_tags_are_counted_per_post(self) -> None:
+        self._add_posts(
+            "alice",
+            ["python", "code", "test"],
+            ["python", "code"],
+            ["rust", "code"],
+        )
+
+        self.assertEqual(self.store.get_related("alice", "python"), {"code": 2, "test": 1})
+        self.assertEqual(
+            self.store.get_related("alice", "code"), {"python": 2, "test": 1, "rust": 1}
+        )
+        self.assertEqual(self.store.get_related("bob", "python"), {})
+
+    def test_related_tags_are_the_most_co_occurring(self) -> None:
+        self._add_posts("alice", ["python", "code"], ["python", "code"], ["python", "test"])
+
+        self.assertEqual(self.store.get_related("alice", "python", limit=1), {"code": 2})
+
+    def test_unread_related_tags_follow_read_state(self) -> None:
+        self._add_posts("alice", ["python", "code"], ["python", "test"])
+        self._add_posts("alice", ["python", "rust"], read=True)
+
+        self.store.change_unread("alice", {"code python": 1}, True)
+
+        self.assertEqual(self.store.get_related("alice", "python", True), {"test": 1})
+        self.store.change_unread("alice", {"python rust": 1}, False)
+        self.assertEqual(
+            self.store.get_related("alice", "python", True), {"test": 1, "rust": 1}
+        )
+
+    def test_removed_posts_drop_emptied_pairs(self) -> None:
+        self._add_posts("alice", ["python", "code"], ["python", "code", "test"])
+
+        self.store.remove_posts(
+            "alice",
+            Counter(keyword_pairs(["python", "test"])),
+            Counter(keyword_pairs(["python", "test"])),
+        )
+
+        self.assertEqual(self.store.get_related("alice", "python"), {"code": 2})
+        self.assertEqual(self.store.get_related("alice", "python", True), {"code": 2})
+        self.assertIsNone(
+            self.db.tag_cooccurrence.find_one({"pair": "python test"})
+        )
+
+    def test_rebuild_counts_posts_tagged_without_keywords(self) -> None:
+        self.db.posts.insert_one(
+            {
+                "owner": "alice",
+                "tags": ["python", "code"],
+                "read": True,
+                "lemmas": gzip.compress(b"python code python"),
+            }
+        )
+        # Tagged with keywords, already counted
+        self.db.posts.insert_one(
+            {
+                "owner": "alice",
+                "tags": ["python", "code"],
+                "keywords": ["python", "code"],
+                "lemmas": gzip.compress(b"python code"),
+            }
+        )
+        self._add_posts("alice", ["python", "code"])
+        self.assertFalse(self.store.is_built("alice"))
+
+        self.assertEqual(self.store.rebuild("alice"), 1)
+
+        self.assertTrue(self.store.is_built("alice"))
+        self.assertEqual(
+            self.db.posts.find_one({"read": True})["keywords"], ["python", "code"]
+        )
+        self.assertEqual(self.store.get_related("alice", "python"), {"code": 2})
+        self.assertEqual(self.store.get_related("alice", "python", True), {"code": 1})
+        self.assertEqual(self.store.rebuild("alice"), 0)
+        self.assertEqual(self.store.get_related("alice", "python"), {"code": 2})
+
+    def test_rebuild_skips_posts_read_meanwhile(self) -> None:
+        self.db.posts.insert_one(
+            {
+                "owner": "alice",
+                "tags": ["python", "code"],
+                "read": False,
+                "lemmas": gzip.compress(b"python code"),
+            }
+        )
+        post = self.db.posts.find_one({"owner": "alice"})
+        self.db.posts.update_one({"_id": post["_id"]}, {"$set": {"read": True}})
+
+        self.store._count_legacy_posts("alice", [post])
+
+        self.assertEqual(self.store.get_related("alice", "python"), {})
+        self.assertEqual(self.store.rebuild("alice"), 1)
+        self.assertEqual(self.store.get_related("alice", "python"), {"code": 1})
+        self.assertEqual(self.store.get_related("alice", "python", True), {})
+
+    def test_store_matches_counting_the_posts(self) -> None:
+        rnd = random.Random(7)
+        vocabulary = [f"word{i}" for i in range(30)]
+        pairs: Counter = Counter()
+        unread: Counter = Counter()
+        for i in range(300):
+            lemmas = " ".join(
+                rnd.choice(vocabulary[: rnd.randint(5, 30)])
+                for _ in range(rnd.randint(3, 40))
+            )
+            post = {
+                "owner": "alice",
+                "pid": str(i),
+                "tags": sorted(set(lemmas.split())),
+                "read": rnd.random() < 0.4,
+                "lemmas": gzip.compress(lemmas.encode("utf-8")),
+            }
+            if i % 2:
+                # Tagged with the store in place
+                post["keywords"] = post_keywords(lemmas)
+                post_pairs = list(keyword_pairs(post["keywords"]))
+                pairs.update(post_pairs)
+                if not post["read"]:
+                    unread.update(post_pairs)
+            self.db.posts.insert_one(post)
+        self.db.tag_cooccurrence.bulk_write(self.store.make_updates("alice", pairs, unread))
+        self.store.rebuild("alice")
+
+        for tag in vocabulary[:20]:
+            for only_unread in (False, True):
+                query = {"owner": "alice", "tags": tag}
+                if only_unread:
+                    query["read"] = False
+                counted = top_related(
+                    related_counts(
+                        (post["keywords"] for post in self.db.posts.find(query)), [tag]
+                    )
+                )
+                self.assertEqual(
+                    self.store.get_related("alice", tag, only_unread), counted
+                )
+
+    def test_remove_owner(self) -> None:
+        self._add_posts("alice", ["python", "code"])
+        self._add_posts("bob", ["python", "code"])
+        self.db.posts.insert_one(
+            {
+                "owner": "alice",
+                "tags": ["python", "code"],
+                "read": False,
+                "lemmas": gzip.compress(b"python code"),
+            }
+        )
+        self.store.rebuild("alice")
+
+        self.store.remove_owner("alice")
+
+        self.assertFalse(self.store.is_built("alice"))
+        self.assertEqual(self.store.get_related("alice", "python"), {})
+        self.assertEqual(self.store.get_related("bob", "python"), {"code": 1})
+        self.assertEqual(self.store.rebuild("alice"), 1)
+        self.assertEqual(self.store.get_related("alice", "python"), {"code": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from typing import List
+
+import mongomock
+
+from rsstag.embedding_training import TrainingState
+from rsstag.fasttext import FastTextLearn
+from rsstag.text_codec import encode_lemmas
+from rsstag.w2v import W2VLearn
+
+OWNER = "alice"
+
+
+class TestIncrementalTraining(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = mongomock.MongoClient().rsstag
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "model.w2v")
+        self._add_posts(["apple banana cherry", "banana cherry date"] * 5)
+
+    def _add_posts(self, texts: List[str], tagged_at: float = 0.0) -> None:
+        self.db.posts.insert_many(
+            [
+                {
+                    "owner": OWNER,
+                    "lemmas": encode_lemmas(text),
+                    "tagged_at": tagged_at or time.time(),
+                }
+                for text in texts
+            ]
+        )
+
+    def test_first_training_is_full(self) -> None:
+        learn = W2VLearn(self.path)
+
+        self.assertEqual(learn.train_posts(self.db, OWNER), 10)
+
+        state = TrainingState(self.path)
+        self.assertIsNotNone(state.trained_until)
+        self.assertEqual(state.vocab_at_full, 4)
+
+    def test_update_trains_only_newly_tagged_posts(self) -> None:
+        W2VLearn(self.path).train_posts(self.db, OWNER)
+
+        self._add_posts(["cherry elderberry fig"], tagged_at=time.time() + 3600)
+        learn = W2VLearn(self.path)
+        learn._state.trained_until = time.time() + 1800
+        learn._state.full_at = time.time()
+
+        self.assertEqual(learn.train_posts(self.db, OWNER, full_retrain_drift=10.0), 1)
+
+        model = W2VLearn(self.path)._model
+        self.assertIn("elderberry", model.wv)
+        self.assertIn("apple", model.wv)
+        self.assertEqual(TrainingState(self.path).vocab_at_full, 4)
+
+    def test_full_retrain_runs_on_schedule(self) -> None:
+        learn = W2VLearn(self.path)
+        learn.train_posts(self.db, OWNER)
+        self.assertFalse(learn.full_retrain_due(7.0, 0.2))
+
+        learn._state.full_at = time.time() - 8 * 86400
+
+        self.assertTrue(learn.full_retrain_due(7.0, 0.2))
+
+    def test_full_retrain_runs_when_vocabulary_drifts(self) -> None:
+        learn = W2VLearn(self.path)
+        learn.train_posts(self.db, OWNER)
+
+        learn.update([("grape kiwi lemon mango", 0)], time.time())
+
+        self.assertAlmostEqual(learn._state.drift(len(learn._model.wv)), 1.0)
+        self.assertTrue(learn.full_retrain_due(7.0, 0.5))
+        self.assertFalse(learn.full_retrain_due(7.0, 2.0))
+
+    def test_model_without_state_is_retrained_in_full(self) -> None:
+        W2VLearn(self.path).train_posts(self.db, OWNER)
+        os.remove(self.path + ".state")
+
+        self.assertTrue(W2VLearn(self.path).full_retrain_due(7.0, 0.2))
+
+    def test_fasttext_is_updated_the_same_way(self) -> None:
+        path = os.path.join(self.dir, "model.fasttext")
+        FastTextLearn(path).train_posts(self.db, OWNER)
+        learn = FastTextLearn(path)
+        learn._state.trained_until = time.time() + 1800
+        self._add_posts(["date elderberry"], tagged_at=time.time() + 3600)
+
+        self.assertEqual(learn.train_posts(self.db, OWNER, full_retrain_drift=10.0), 1)
+
+        self.assertIn("elderberry", FastTextLearn(path)._model.wv.key_to_index)
+
+
+if __name__ == "__main__":
+    unittest.main()
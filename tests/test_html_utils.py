@@ -1,5 +1,104 @@
+import random
+import re
 import unittest
-from rsstag.html_utils import build_html_mapping
+from html import unescape
+from typing import List, Tuple
+
+from rsstag.html_utils import BLOCK_TAGS, build_html_mapping, html_to_text
+
+
+def reference_build_html_mapping(html_text: str) -> Tuple[str, List[int]]:
+    """The char by char build_html_mapping the tokenized one must match."""
+    mapping: List[int] = []
+    plain_accum: List[str] = []
+
+    n = len(html_text)
+    i = 0
+    last_was_space = True
+
+    tag_pattern = re.compile(r"<(/?)([a-zA-Z0-9]+)([^>]*)>")
+
+    while i < n:
+        if html_text[i] == "<":
+            match = tag_pattern.match(html_text, i)
+            if match:
+                tag_name = match.group(2).lower()
+                is_block = tag_name in BLOCK_TAGS
+
+                if is_block:
+                    if plain_accum and plain_accum[-1] != "\n":
+                        if plain_accum[-1] == " ":
+                            plain_accum[-1] = "\n"
+                        else:
+                            plain_accum.append("\n")
+                            mapping.append(i)
+                    last_was_space = True
+
+                i = match.end()
+                continue
+            else:
+                char = html_text[i]
+                if char.isspace():
+                    if not last_was_space:
+                        plain_accum.append(" ")
+                        mapping.append(i)
+                        last_was_space = True
+                else:
+                    plain_accum.append(char)
+                    mapping.append(i)
+                    last_was_space = False
+                i += 1
+                continue
+
+        next_tag = html_text.find("<", i)
+        chunk_end = next_tag if next_tag != -1 else n
+        chunk = html_text[i:chunk_end]
+
+        j = 0
+        while j < len(chunk):
+            char = chunk[j]
+            if char == "&":
+                ent_end = chunk.find(";", j)
+                if ent_end != -1 and ent_end - j < 10:
+                    entity = chunk[j : ent_end + 1]
+                    decoded_char = unescape(entity)
+                    if decoded_char.isspace():
+                        if not last_was_space:
+                            plain_accum.append(" ")
+                            mapping.append(i + j)
+                            last_was_space = True
+                    else:
+                        for dc in decoded_char:
+                            plain_accum.append(dc)
+                            mapping.append(i + j)
+                            last_was_space = False
+                    j = ent_end + 1
+                    continue
+
+            if char.isspace():
+                if not last_was_space:
+                    plain_accum.append(" ")
+                    mapping.append(i + j)
+                    last_was_space = True
+            else:
+                plain_accum.append(char)
+                mapping.append(i + j)
+                last_was_space = False
+            j += 1
+        i = chunk_end
+
+    while plain_accum and plain_accum[-1] in (" ", "\n"):
+        plain_accum.pop()
+        mapping.pop()
+
+    final_plain = "".join(plain_accum)
+
+    if mapping:
+        mapping.append(n)
+    else:
+        mapping = [0]
+
+    return final_plain, mapping
 
 
 class TestBuildHtmlMapping(unittest.TestCase):
@@ -66,5 +165,22 @@ class TestBuildHtmlMapping(unittest.TestCase):
         self.assertEqual(plain, "a < b > c")
 
 
+    def test_matches_the_reference_on_random_html(self):
+        fragments = [
+            "<p>", "</p>", "<br>", "<br/>", "<DIV class='a'>", "<span>", "</span>",
+            "<a href=\"x\">", "<", ">", "<1>", "< p>", "<p\n>", "<!-- c -->",
+            "&amp;", "&lt;", "&nbsp;", "&#10;", "&#32;", "&#1;", "&#x2003;", "&bogus;",
+            "&amp", "&", ";", "& b;", "&\n;", "&averyverylongname;", "&ampx;",
+            " ", "  ", "\n", "\t", "\u00a0", "\u3000", "word", "Слово", "x", ".",
+        ]
+        rnd = random.Random(20)
+        for _ in range(3000):
+            html = "".join(rnd.choice(fragments) for _ in range(rnd.randint(0, 30)))
+            with self.subTest(html=html):
+                expected = reference_build_html_mapping(html)
+                self.assertEqual(build_html_mapping(html), expected)
+                self.assertEqual(html_to_text(html), expected[0])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+
+from rsstag.index_advisor import QUERY_BUILDERS, advise, plan_summary
+
+
+def _explain(winning_plan: dict) -> dict:
+    return {"queryPlanner": {"winningPlan": winning_plan}}
+
+
+class TestPlanSummary(unittest.TestCase):
+    def test_index_scan_is_not_flagged(self) -> None:
+        summary = plan_summary(
+            _explain(
+                {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "owner_date"},
+                }
+            )
+        )
+
+        self.assertEqual(summary["stages"], ["FETCH", "IXSCAN"])
+        self.assertEqual(summary["indexes"], ["owner_date"])
+        self.assertEqual(summary["problems"], [])
+
+    def test_in_memory_sort_and_collscan_are_flagged(self) -> None:
+        summary = plan_summary(
+            _explain({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}})
+        )
+
+        self.assertEqual(summary["problems"], ["SORT", "COLLSCAN"])
+
+    def test_index_intersection_and_sbe_plans_are_walked(self) -> None:
+        summary = plan_summary(
+            _explain(
+                {
+                    "queryPlan": {
+                        "stage": "AND_SORTED",
+                        "inputStages": [
+                            {"stage": "IXSCAN", "indexName": "owner_1"},
+                            {"stage": "IXSCAN", "indexName": "read_1"},
+                        ],
+                    }
+                }
+            )
+        )
+
+        self.assertEqual(summary["indexes"], ["owner_1", "read_1"])
+
+
+class TestAdvise(unittest.TestCase):
+    def test_every_query_builder_is_explained(self) -> None:
+        db = MagicMock()
+        db.posts.find_one.return_value = {
+            "category_id": "c",
+            "feed_id": "f",
+            "tags": ["python"],
+        }
+        plan = _explain({"stage": "IXSCAN", "indexName": "x"})
+        for collection in (db.posts, db.tags, db.bi_grams):
+            cursor = collection.find.return_value
+            cursor.allow_disk_use.return_value.sort.return_value.explain.return_value = plan
+            cursor.explain.return_value = plan
+        db.__getitem__.side_effect = lambda name: getattr(db, name)
+
+        report = advise(db, "alice")
+
+        self.assertEqual([row["query"] for row in report], [q for q, _ in QUERY_BUILDERS])
+        self.assertFalse(any(row["problems"] for row in report))
+        query = db.posts.find.call_args_list[-1][0][0]
+        self.assertEqual(query["tags"], [])
+        self.assertIn("$lt", query["processing"])
+
+    def test_failed_explain_is_reported_not_raised(self) -> None:
+        db = MagicMock()
+        db.posts.find_one.return_value = None
+        db.posts.find.side_effect = RuntimeError("no server")
+
+        report = advise(db, "alice")
+
+        self.assertTrue(report[0]["problems"][0].startswith("ERROR"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import unittest
+from array import array
+from unittest.mock import patch
+
+import numpy as np
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from rsstag import lemma_vocab
+from rsstag.lemma_vocab import (
+    LEMMA_IDS_FIELD,
+    LemmaVocabulary,
+    RssTagLemmaVocab,
+    _vocabularies,
+    ids_from_bytes,
+    ids_to_bytes,
+)
+from rsstag.text_codec import CODEC_RAW, encode_text
+from rsstag.web.keywords import (
+    _extract_rake_keywords,
+    _extract_yake_keywords,
+    _make_lemma_docs,
+)
+from rsstag.web.posts import _entity_post_matches_window
+from rsstag.web.tags import _build_tag_context_tree
+from rsstag.workers.llm_worker import _merge_context_windows
+from rsstag.workers.tag_worker import TagWorker
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo UpdateOne ops, apply them one by one
+    for request in requests:
+        collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+def _vocabulary(*texts: str) -> LemmaVocabulary:
+    vocab = LemmaVocabulary()
+    for text in texts:
+        for word in text.split():
+            if vocab.get_id(word) is None:
+                vocab.add(word, vocab.next_id)
+    return vocab
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestRssTagLemmaVocab(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        self.store = RssTagLemmaVocab(self.db)
+        self.store.prepare()
+        bulk_patch = patch.object(
+            mongomock.collection.Collection, "bulk_write", _apply_updates
+        )
+        bulk_patch.start()
+        self.addCleanup(bulk_patch.stop)
+        self.addCleanup(_vocabularies.clear)
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def test_ids_are_stable_and_per_owner(self) -> None:
+        vocab = self.store.assign("alice", ["python", "code"])
+        python_id = vocab.get_id("python")
+
+        vocab = self.store.assign("alice", ["rust", "python"])
+
+        self.assertEqual(vocab.get_id("python"), python_id)
+        self.assertEqual(len({vocab.get_id(w) for w in ("python", "code", "rust")}), 3)
+        self.assertEqual(self.db.lemma_vocab.count_documents({"owner": "alice"}), 3)
+        self.assertIsNone(self.store.vocabulary("bob").get_id("python"))
+
+    def test_words_added_by_another_process_are_reused(self) -> None:
+        self.store.assign("alice", ["python"])
+        _vocabularies.clear()
+        self.db.lemma_vocab.insert_one({"owner": "alice", "word": "code", "id": 7})
+
+        vocab = self.store.assign("alice", ["code", "test"])
+
+        self.assertEqual(vocab.get_id("code"), 7)
+        self.assertEqual(vocab.word(7), "code")
+        self.assertEqual(self.db.lemma_vocab.count_documents({"word": "code"}), 1)
+
+    def test_load_arrays_backfills_missing_ids(self) -> None:
+        self.db.posts.insert_many(
+            [
+                {"owner": "alice", "pid": "1", "lemmas": encode_text("a b a")},
+                {"owner": "alice", "pid": "2", "lemmas": encode_text("b c", CODEC_RAW)},
+                {"owner": "bob", "pid": "3", "lemmas": encode_text("d")},
+            ]
+        )
+
+        vocab, arrays = self.store.load_arrays("alice", ["1", "2", "3"])
+
+        self.assertEqual(set(arrays), {"1", "2"})
+        self.assertEqual(vocab.to_words(arrays["1"]), ["a", "b", "a"])
+        self.assertEqual(vocab.to_words(arrays["2"]), ["b", "c"])
+        stored = self.db.posts.find_one({"pid": "1"})
+        self.assertEqual(ids_from_bytes(stored[LEMMA_IDS_FIELD]), arrays["1"])
+
+        _vocabularies.clear()
+        self.db.posts.update_one({"pid": "1"}, {"$unset": {"lemmas": True}})
+        vocab, arrays = self.store.load_arrays("alice", ["1"])
+
+        self.assertEqual(vocab.to_words(arrays["1"]), ["a", "b", "a"])
+
+    def test_tag_worker_stores_lemma_ids(self) -> None:
+        worker = TagWorker(self.db, {"settings": {"host_name": "localhost"}})
+        posts_tags = [(1, {"lemmas": encode_text("python code python")})]
+
+        self.assertTrue(worker._set_lemma_ids("alice", posts_tags))
+
+        vocab = self.store.vocabulary("alice")
+        self.assertEqual(
+            vocab.to_words(ids_from_bytes(posts_tags[0][1][LEMMA_IDS_FIELD])),
+            ["python", "code", "python"],
+        )
+
+    def test_tag_worker_reports_failed_lemma_ids(self) -> None:
+        worker = TagWorker(self.db, {"settings": {"host_name": "localhost"}})
+        posts_tags = [(1, {"lemmas": b"not encoded"})]
+
+        with self.assertLogs(level="ERROR"):
+            self.assertFalse(worker._set_lemma_ids("alice", posts_tags))
+
+        self.assertNotIn(LEMMA_IDS_FIELD, posts_tags[0][1])
+
+    def test_least_recently_used_vocabularies_are_evicted(self) -> None:
+        with patch.object(lemma_vocab, "VOCABULARIES_CACHE_SIZE", 2):
+            first = self.store.vocabulary("alice")
+            self.store.vocabulary("bob")
+            self.assertIs(self.store.vocabulary("alice"), first)
+            self.store.vocabulary("carol")
+
+            self.assertEqual(
+                list(_vocabularies), [("rsstag_test", "alice"), ("rsstag_test", "carol")]
+            )
+
+    def test_remove_owner(self) -> None:
+        self.store.assign("alice", ["python"])
+
+        self.store.remove_owner("alice")
+
+        self.assertEqual(self.db.lemma_vocab.count_documents({}), 0)
+        self.assertEqual(self.db.lemma_vocab_state.count_documents({}), 0)
+        self.assertEqual(self.store.assign("alice", ["code"]).get_id("code"), 0)
+
+
+class TestLemmaArrays(unittest.TestCase):
+    def test_bytes_round_trip(self) -> None:
+        ids = array("I", [0, 1, 2**32 - 1])
+
+        self.assertEqual(ids_from_bytes(ids_to_bytes(ids)), ids)
+        self.assertEqual(len(ids_to_bytes(ids)), 12)
+
+    def test_keywords_over_arrays(self) -> None:
+        texts = ["python code and rust code", "the python code", "12 x python"]
+        vocab = _vocabulary(*texts)
+        docs = _make_lemma_docs(
+            vocab, [vocab.to_ids(text.split()) for text in texts], {"and", "the"}
+        )
+
+        rake = _extract_rake_keywords(docs, 10)
+        yake = _extract_yake_keywords(docs, 10)
+
+        frequencies = {item.phrase: item.frequency for item in rake}
+        self.assertEqual(frequencies["python code"], 2)
+        self.assertEqual(frequencies["rust code"], 1)
+        self.assertNotIn("12", {item.phrase for item in rake + yake})
+        self.assertIn("rust code", {item.phrase for item in yake})
+
+    def test_context_tree(self) -> None:
+        posts = ["big python code", "python code fast", "python 42"]
+        vocab = _vocabulary(*posts)
+
+        tree = _build_tag_context_tree(
+            ["p1", "p2", "p3"],
+            [vocab.to_ids(post.split()) for post in posts],
+            vocab.get_id("python"),
+            vocab,
+            2,
+        )
+
+        self.assertEqual(tree[0]["name"], "code")
+        self.assertEqual(tree[0]["value"], 2)
+        self.assertEqual(tree[0]["_topicPosts"], ["p1", "p2"])
+        self.assertEqual(
+            [child["_topicPath"] for child in tree[0]["children"]],
+            ["python > code > fast"],
+        )
+        self.assertEqual(tree[1]["name"], "big")
+
+    def test_entity_window(self) -> None:
+        vocab = _vocabulary("new x x x york new")
+        word_ids = vocab.to_ids("new x x x york new".split())
+        tag_ids = [vocab.get_id("new"), vocab.get_id("york")]
+
+        self.assertTrue(_entity_post_matches_window(word_ids, tag_ids, 1))
+        self.assertFalse(_entity_post_matches_window(word_ids, tag_ids[::-1] + [99], 5))
+        self.assertFalse(_entity_post_matches_window(None, tag_ids, 5))
+
+    def test_context_windows_are_merged(self) -> None:
+        self.assertEqual(
+            _merge_context_windows(np.array([5, 30, 100]), 110),
+            [(0, 51), (80, 110)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
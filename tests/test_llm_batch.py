@@ -3,6 +3,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 
 from rsstag.llm.batch import (
+    BatchInput,
     BatchTaskStatus,
     LlmBatchProvider,
     OpenAIBatchProvider,
@@ -20,6 +21,47 @@ class TestBatchTaskStatus(unittest.TestCase):
         self.assertEqual(BatchTaskStatus.FAILED.value, "failed")
 
 
+class TestBatchInput(unittest.TestCase):
+    def test_add_writes_jsonl_lines(self) -> None:
+        requests = [{"custom_id": "1", "text": "é"}, {"custom_id": "2"}]
+        with BatchInput(10, 1000) as batch_input:
+            self.assertTrue(batch_input.add(requests[:1]))
+            self.assertTrue(batch_input.add(requests[1:]))
+            batch_input.file.seek(0)
+            content = batch_input.file.read()
+
+        expected = "\n".join(json.dumps(req, ensure_ascii=False) for req in requests)
+        self.assertEqual(content, expected.encode("utf-8"))
+        self.assertEqual(batch_input.count, 2)
+        self.assertEqual(batch_input.size, len(content))
+
+    def test_add_keeps_requests_of_an_item_together(self) -> None:
+        with BatchInput(3, 1000) as batch_input:
+            self.assertTrue(batch_input.add([{"custom_id": "1"}, {"custom_id": "2"}]))
+
+            self.assertFalse(batch_input.add([{"custom_id": "3"}, {"custom_id": "4"}]))
+
+            self.assertEqual(batch_input.count, 2)
+            self.assertTrue(batch_input.add([{"custom_id": "3"}]))
+
+    def test_add_refuses_requests_over_the_size_limit(self) -> None:
+        line_size = len(json.dumps({"custom_id": "1"}))
+        with BatchInput(10, 2 * line_size + 1) as batch_input:
+            self.assertTrue(batch_input.add([{"custom_id": "1"}]))
+            self.assertTrue(batch_input.add([{"custom_id": "2"}]))
+            self.assertFalse(batch_input.add([{"custom_id": "3"}]))
+            self.assertEqual(batch_input.size, 2 * line_size + 1)
+
+    def test_large_input_is_spooled_to_disk(self) -> None:
+        with patch.object(BatchInput, "SPOOL_MAX_BYTES", 1024):
+            with BatchInput(1000, 10**6) as batch_input:
+                for i in range(100):
+                    batch_input.add([{"custom_id": str(i), "text": "x" * 100}])
+
+                self.assertTrue(batch_input.file._rolled)
+                self.assertEqual(batch_input.file.name, "batch.jsonl")
+
+
 class TestLlmBatchProvider(unittest.TestCase):
     def setUp(self) -> None:
         self.provider: LlmBatchProvider = LlmBatchProvider("gpt-4")
@@ -108,7 +150,14 @@ class TestLlmBatchProvider(unittest.TestCase):
         batch_resp = MagicMock()
         batch_resp.id = "batch-456"
         batch_resp.status = "submitted"
-        mock_client.files.create.return_value = file_resp
+        uploads = []
+
+        def upload(file, purpose):
+            # The spooled input is closed once the batch is created
+            uploads.append((file.name, file.read()))
+            return file_resp
+
+        mock_client.files.create.side_effect = upload
         mock_client.batches.create.return_value = batch_resp
         self.provider._client = mock_client
 
@@ -126,13 +175,11 @@ class TestLlmBatchProvider(unittest.TestCase):
         # Verify file upload
         mock_client.files.create.assert_called_once()
         call_kwargs = mock_client.files.create.call_args.kwargs
-        uploaded_file = call_kwargs["file"]
-        self.assertEqual(uploaded_file.name, "batch.jsonl")
+        uploaded_name, uploaded_bytes = uploads[0]
+        self.assertEqual(uploaded_name, "batch.jsonl")
         self.assertEqual(call_kwargs["purpose"], "batch")
 
         # Verify JSONL content
-        uploaded_file.seek(0)
-        uploaded_bytes = uploaded_file.read()
         expected_jsonl = "\n".join(
             json.dumps(req, ensure_ascii=False) for req in requests
         )
@@ -171,6 +218,20 @@ class TestLlmBatchProvider(unittest.TestCase):
         self.assertEqual(result, "file contents")
         mock_client.files.content.assert_called_once_with("file-1")
 
+    def test_iter_file_lines_streams_non_empty_lines(self) -> None:
+        mock_client = MagicMock()
+        response = mock_client.files.with_streaming_response.content.return_value
+        response.__enter__.return_value.iter_lines.return_value = iter(
+            ['{"custom_id": "1"}', "", '{"custom_id": "2"}']
+        )
+        self.provider._client = mock_client
+
+        lines = list(self.provider.iter_file_lines("file-1"))
+
+        self.assertEqual(lines, ['{"custom_id": "1"}', '{"custom_id": "2"}'])
+        mock_client.files.with_streaming_response.content.assert_called_once_with("file-1")
+        self.assertEqual(list(self.provider.iter_file_lines("")), [])
+
     def test_get_file_content_empty_id(self) -> None:
         self.provider._client = MagicMock()
         result = self.provider.get_file_content("")
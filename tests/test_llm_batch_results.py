@@ -0,0 +1,188 @@
+import json
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import MagicMock, patch
+
+import mongomock
+
+from rsstag.llm.batch import BatchInput
+from rsstag.tasks import RssTagTasks, TASK_TAG_CLASSIFICATION_BATCH
+from rsstag.workers.llm_worker import (
+    _LLMBatchStorage,
+    _LLMResponseParser,
+    _TagClassificationWorker,
+)
+
+OWNER = "alice"
+
+
+def _result_line(custom_id: str, category: str) -> str:
+    return json.dumps(
+        {
+            "custom_id": custom_id,
+            "response": {
+                "status_code": 200,
+                "body": {"output": [{"content": [{"type": "output_text", "text": category}]}]},
+            },
+        }
+    )
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo UpdateOne ops, apply them one by one
+    for request in requests:
+        collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+class _FakeBatchProvider:
+    name = "fake"
+    model = "fake-model"
+
+    def __init__(self, max_requests: int) -> None:
+        self.max_requests = max_requests
+        self.uploaded: List[bytes] = []
+        self.results: List[str] = []
+
+    def new_batch_input(self) -> BatchInput:
+        return BatchInput(self.max_requests, 10**6)
+
+    def upload_batch(self, batch_input: BatchInput, endpoint: str, **kwargs: Any) -> dict:
+        batch_input.file.seek(0)
+        self.uploaded.append(batch_input.file.read())
+        return {"batch": MagicMock(id="batch-1"), "input_file_id": "file-1"}
+
+    def iter_file_lines(self, file_id: str):
+        return iter(self.results if file_id == "out" else [])
+
+
+class TestBatchRawResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = mongomock.MongoClient().rsstag
+        self.storage = _LLMBatchStorage(self.db)
+        self.task: Dict[str, Any] = {
+            "_id": "task-1",
+            "type": TASK_TAG_CLASSIFICATION_BATCH,
+            "user": {"sid": OWNER},
+        }
+
+    def test_results_are_stored_in_parts_and_read_back_in_order(self) -> None:
+        lines = [f'{{"n": {i}}}' for i in range(50)]
+
+        with patch("rsstag.workers.llm_worker.RAW_PART_BYTES", 100):
+            raw_id = self.storage.store_batch_raw_results(
+                self.task, {"step": "classification"}, iter(lines), iter(["err"])
+            )
+
+        raw_doc = self.storage.load_batch_raw_results(str(raw_id))
+        self.assertEqual(list(self.storage.iter_batch_raw_lines(raw_doc, "output")), lines)
+        self.assertEqual(list(self.storage.iter_batch_raw_lines(raw_doc, "error")), ["err"])
+        self.assertGreater(self.db.llm_batch_results.count_documents({"raw_id": raw_id}), 5)
+
+        self.storage.delete_batch_raw_results(raw_id)
+
+        self.assertEqual(self.db.llm_batch_results.count_documents({}), 0)
+
+    def test_results_stored_in_one_document_are_still_read(self) -> None:
+        raw_id = self.db.llm_batch_results.insert_one(
+            {"owner": OWNER, "output": "a\n\nb\n", "error": ""}
+        ).inserted_id
+
+        raw_doc = self.storage.load_batch_raw_results(raw_id)
+
+        self.assertEqual(list(self.storage.iter_batch_raw_lines(raw_doc, "output")), ["a", "b"])
+
+
+class TestTagsClassificationBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = mongomock.MongoClient().rsstag
+        self.tag_ids = self.db.tags.insert_many(
+            [
+                {"owner": OWNER, "tag": f"tag{i}", "processing": 1.0}
+                for i in range(3)
+            ]
+        ).inserted_ids
+        self.provider = _FakeBatchProvider(max_requests=4)
+        llm = MagicMock()
+        llm.get_batch_provider.return_value = self.provider
+        self.worker = _TagClassificationWorker(
+            self.db, {}, llm, _LLMBatchStorage(self.db), _LLMResponseParser()
+        )
+        self.task: Dict[str, Any] = {
+            "_id": self.db.tasks.insert_one({}).inserted_id,
+            "type": TASK_TAG_CLASSIFICATION_BATCH,
+            "user": {"sid": OWNER},
+            "data": list(self.db.tags.find()),
+        }
+
+    def _prompts(self, owner: str, tag_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [{"prompt": f"{tag_data['tag']} {i}", "pid": f"p{i}"} for i in range(2)]
+
+    def test_tags_over_the_batch_limit_are_left_for_a_later_batch(self) -> None:
+        with patch.object(self.worker, "_build_tag_classification_prompts", self._prompts):
+            self.assertFalse(self.worker.make_tags_classification_batch(self.task))
+
+        batch_state = self.db.tasks.find_one({"_id": self.task["_id"]})["batch"]
+        self.assertEqual(batch_state["item_ids"], [str(tag_id) for tag_id in self.tag_ids[:2]])
+        self.assertEqual(batch_state["prompt_count"], 4)
+        self.assertEqual(len(self.provider.uploaded[0].splitlines()), 4)
+        self.assertEqual(self.db.tags.find_one({"_id": self.tag_ids[2]})["processing"], 0)
+        self.assertEqual(self.db.tags.find_one({"_id": self.tag_ids[0]})["processing"], 1.0)
+
+    def test_streamed_results_are_classified(self) -> None:
+        tag_id = self.tag_ids[0]
+        self.provider.results = [
+            _result_line(f"tag:{tag_id}:pid:p0:seq:0", "Sport"),
+            _result_line(f"tag:{tag_id}:pid:p1:seq:1", "sport"),
+        ]
+        self.task["data"] = self.task["data"][:1]
+        self.task["batch"] = {"provider": "fake", "batch_id": "batch-1", "step": "classification"}
+        batch = MagicMock(status="completed", output_file_id="out", error_file_id="err")
+        self.provider.get_batch = MagicMock(return_value=batch)
+
+        self.assertFalse(self.worker.make_tags_classification_batch(self.task))
+        self.task["batch"] = self.db.tasks.find_one({"_id": self.task["_id"]})["batch"]
+        self.assertTrue(self.worker.make_tags_classification_batch(self.task))
+
+        classifications = self.db.tags.find_one({"_id": tag_id})["classifications"]
+        self.assertEqual(classifications[0]["category"], "sport")
+        self.assertEqual(classifications[0]["count"], 2)
+        self.assertEqual(self.db.llm_batch_results.count_documents({}), 0)
+
+    def test_task_is_kept_until_tags_over_the_batch_limit_are_classified(self) -> None:
+        self.db.tasks.update_one(
+            {"_id": self.task["_id"]},
+            {"$set": {"user": OWNER, "type": TASK_TAG_CLASSIFICATION_BATCH}},
+        )
+        with patch.object(self.worker, "_build_tag_classification_prompts", self._prompts):
+            self.worker.make_tags_classification_batch(self.task)
+        self.provider.results = [
+            _result_line(f"tag:{tag_id}:pid:p0:seq:0", "sport") for tag_id in self.tag_ids[:2]
+        ]
+        self.provider.get_batch = MagicMock(
+            return_value=MagicMock(status="completed", output_file_id="out", error_file_id="err")
+        )
+        self.task["data"] = self.task["data"][:2]
+        for _ in range(2):
+            self.task["batch"] = self.db.tasks.find_one({"_id": self.task["_id"]})["batch"]
+            self.worker.make_tags_classification_batch(self.task)
+        self.task["batch"] = self.db.tasks.find_one({"_id": self.task["_id"]})["batch"]
+        tasks = RssTagTasks(self.db)
+        bulk_patch = patch.object(mongomock.collection.Collection, "bulk_write", _apply_updates)
+        bulk_patch.start()
+        self.addCleanup(bulk_patch.stop)
+
+        self.assertTrue(tasks.finish_task(self.task))
+
+        task_doc = self.db.tasks.find_one({"_id": self.task["_id"]})
+        self.assertIsNotNone(task_doc)
+        self.assertNotIn("batch", task_doc)
+        self.assertNotIn("classifications", self.db.tags.find_one({"_id": self.tag_ids[2]}))
+
+        self.db.tags.update_one({"_id": self.tag_ids[2]}, {"$set": {"classifications": []}})
+        self.assertTrue(tasks.finish_task(self.task))
+
+        self.assertIsNone(self.db.tasks.find_one({"_id": self.task["_id"]}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from rsstag.llm.http_pool import HTTPConnectionPool
+from rsstag.llm.llamacpp import LLamaCPP
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.open += 1
+            server.peak = max(server.peak, server.open)
+
+    def finish(self) -> None:
+        super().finish()
+        with self.server.lock:
+            self.server.open -= 1
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        prompt = json.loads(self.rfile.read(length))["messages"][0]["content"]
+        time.sleep(self.server.latency)
+        body = json.dumps(
+            {"choices": [{"message": {"content": f"echo {prompt}"}}]}
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_after_response:
+            # Close the kept-alive socket silently, like an idle timeout
+            self.close_connection = True
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = self.server.open = self.server.peak = 0
+        self.server.latency = 0.0
+        self.server.drop_after_response = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.pool = HTTPConnectionPool(max_per_host=2)
+        self.addCleanup(self.pool.close)
+        self.llm = LLamaCPP(self.url, timeout=5.0, pool=self.pool)
+
+    def test_sequential_calls_reuse_one_connection(self) -> None:
+        for i in range(20):
+            self.assertEqual(self.llm.call([f"q{i}"]), f"echo q{i}")
+
+        self.assertEqual(self.pool.created, 1)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_connections_per_host_are_bounded(self) -> None:
+        self.server.latency = 0.05
+
+        with ThreadPoolExecutor(8) as executor:
+            answers = list(executor.map(lambda i: self.llm.call([f"q{i}"]), range(16)))
+
+        self.assertEqual(answers, [f"echo q{i}" for i in range(16)])
+        self.assertLessEqual(self.server.peak, 2)
+        self.assertLessEqual(self.pool.created, 2)
+
+    def test_connection_closed_by_server_is_replaced(self) -> None:
+        self.server.drop_after_response = True
+
+        self.assertEqual(self.llm.call(["a"]), "echo a")
+        time.sleep(0.1)
+        self.assertEqual(self.llm.call(["b"]), "echo b")
+
+        self.assertEqual(self.pool.created, 2)
+
+    def test_idle_connections_expire(self) -> None:
+        self.pool.configure(max_per_host=2, idle_seconds=0.0)
+
+        self.llm.call(["a"])
+        time.sleep(0.01)
+        self.llm.call(["b"])
+
+        self.assertEqual(self.pool.created, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
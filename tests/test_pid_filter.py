@@ -0,0 +1,169 @@
+import time
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import MagicMock
+
+import mongomock
+from bson import ObjectId
+
+from rsstag.pid_filter import CATCH_UP_MARGIN, PidFilter, RssTagPidFilters
+from rsstag.workers.provider_worker import ProviderWorker
+
+OWNER = "alice"
+
+
+def _pids(prefix: str, count: int) -> List[str]:
+    return [f"{prefix}-{i}" for i in range(count)]
+
+
+class TestPidFilter(unittest.TestCase):
+    def test_added_pids_are_always_found(self) -> None:
+        pid_filter = PidFilter(1000)
+        pids = _pids("known", 5000)
+        pid_filter.add(pids)
+
+        self.assertTrue(all(pid_filter.might_contain(pids)))
+
+    def test_false_positive_rate_is_low(self) -> None:
+        pid_filter = PidFilter(100000)
+        pid_filter.add(_pids("known", 100000))
+
+        hits = sum(pid_filter.might_contain(_pids("new", 20000)))
+
+        self.assertLess(hits / 20000, 0.02)
+
+    def test_count_estimates_added_pids(self) -> None:
+        pid_filter = PidFilter(100000)
+        pid_filter.add(_pids("known", 50000))
+
+        self.assertAlmostEqual(pid_filter.count(), 50000, delta=1000)
+        self.assertFalse(pid_filter.full())
+
+    def test_merge_keeps_pids_of_both_filters(self) -> None:
+        first, second = PidFilter(1000), PidFilter(1000)
+        first.add(["a"])
+        second.add(["b"])
+        second.synced_at = 10.0
+
+        self.assertTrue(first.merge(second))
+
+        self.assertEqual(first.might_contain(["a", "b"]), [True, True])
+        self.assertEqual(first.synced_at, 10.0)
+        self.assertFalse(first.merge(PidFilter(10**6)))
+
+
+class TestRssTagPidFilters(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = mongomock.MongoClient().rsstag
+        self.filters = RssTagPidFilters(self.db)
+        self.filters.prepare()
+
+    def _insert_posts(self, pids: List[str], at: float) -> None:
+        self.db.posts.insert_many(
+            [
+                # ObjectIds stamped with the insert time, like the client does
+                {"_id": ObjectId(f"{int(at):08x}{i:016x}"), "owner": OWNER, "pid": pid}
+                for i, pid in enumerate(pids)
+            ]
+        )
+
+    def test_missing_filter_is_rebuilt_from_posts(self) -> None:
+        self._insert_posts(_pids("old", 50), time.time() - 3600)
+
+        pid_filter = self.filters.load(OWNER)
+
+        self.assertTrue(all(pid_filter.might_contain(_pids("old", 50))))
+
+    def test_posts_inserted_after_a_save_are_caught_up(self) -> None:
+        pid_filter = self.filters.load(OWNER)
+        pid_filter.synced_at = time.time() - 3 * CATCH_UP_MARGIN
+        self.filters.save(OWNER, pid_filter)
+        # Inserted by another worker, or by a task that crashed before saving
+        self._insert_posts(["late"], time.time() - CATCH_UP_MARGIN)
+        self._insert_posts(["too-old"], time.time() - 5 * CATCH_UP_MARGIN)
+
+        loaded = self.filters.load(OWNER)
+
+        self.assertEqual(loaded.might_contain(["late"]), [True])
+        self.assertEqual(loaded.might_contain(["too-old"]), [False])
+
+    def test_concurrent_saves_keep_each_others_pids(self) -> None:
+        first = self.filters.load(OWNER)
+        second = self.filters.load(OWNER)
+        first.add(["from-first"])
+        second.add(["from-second"])
+
+        self.filters.save(OWNER, first)
+        self.filters.save(OWNER, second)
+        loaded = self.filters.load(OWNER)
+
+        self.assertEqual(loaded.might_contain(["from-first", "from-second"]), [True, True])
+        self.assertEqual(self.db.pid_filters.count_documents({}), 1)
+
+    def test_remove_owner_drops_the_filter(self) -> None:
+        self.filters.save(OWNER, self.filters.load(OWNER))
+
+        self.filters.remove_owner(OWNER)
+
+        self.assertIsNone(self.db.pid_filters.find_one({"owner": OWNER}))
+
+
+class TestDownloadDeduplication(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = mongomock.MongoClient().rsstag
+        self.provider = MagicMock()
+        users = MagicMock()
+        users.get_provider_user.return_value = {"token": "t"}
+        self.worker = ProviderWorker(
+            db=self.db,
+            config={},
+            providers={"test_provider": self.provider},
+            users=users,
+            tasks=MagicMock(),
+            record_bulk_write=MagicMock(),
+        )
+        self.task: Dict[str, Any] = {
+            "user": {"sid": OWNER},
+            "data": {"provider": "test_provider"},
+        }
+        self.lookups: List[List[str]] = []
+        find = self.db.posts.find
+
+        def tracking_find(query: Dict[str, Any], *args: Any, **kwargs: Any) -> Any:
+            if "pid" in query:
+                self.lookups.append(query["pid"]["$in"])
+            return find(query, *args, **kwargs)
+
+        self.db.posts.find = tracking_find
+
+    def _download(self, pids: List[str]) -> None:
+        self.provider.download.return_value = [
+            ([{"pid": pid, "owner": OWNER, "content": {}} for pid in pids], [])
+        ]
+        self.assertTrue(self.worker.handle_download(self.task))
+
+    def test_only_possible_hits_are_looked_up(self) -> None:
+        self._download(_pids("first", 100))
+        self.assertEqual(self.lookups, [])
+
+        self._download(_pids("first", 100) + _pids("second", 100))
+
+        self.assertEqual(self.db.posts.count_documents({"owner": OWNER}), 200)
+        looked_up = self.lookups[-1]
+        self.assertTrue(set(_pids("first", 100)) <= set(looked_up))
+        self.assertLess(len(looked_up), 110)
+
+    def test_posts_stored_without_the_filter_are_not_duplicated(self) -> None:
+        self._download(_pids("first", 10))
+        self.db.posts.insert_one({"owner": OWNER, "pid": "raw-converted"})
+
+        self._download(["raw-converted", "new"])
+
+        self.assertEqual(
+            self.db.posts.count_documents({"owner": OWNER, "pid": "raw-converted"}), 1
+        )
+        self.assertEqual(self.db.posts.count_documents({"owner": OWNER}), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
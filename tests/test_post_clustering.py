@@ -0,0 +1,130 @@
+import random
+import time
+import unittest
+from typing import List
+from unittest.mock import MagicMock
+
+import mongomock
+
+from rsstag.post_clustering import (
+    ENGINE_DBSCAN,
+    ENGINE_MINIBATCH,
+    RssTagPostClusterModels,
+    StreamingPostClustering,
+)
+from rsstag.text_codec import encode_lemmas
+from rsstag.workers.tag_worker import TagWorker
+
+OWNER = "alice"
+TOPICS = [
+    [f"{topic}{i}" for i in range(12)] for topic in ("football", "election", "galaxy")
+]
+
+
+class TestStreamingPostClustering(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = mongomock.MongoClient().rsstag
+        self.rnd = random.Random(1)
+        self.pids_by_topic: List[List[str]] = [[] for _ in TOPICS]
+        for _ in range(20):
+            self._add_posts(tagged_at=1000.0)
+
+    def _add_posts(self, tagged_at: float) -> None:
+        for topic, words in enumerate(TOPICS):
+            pid = f"p{self.db.posts.count_documents({})}"
+            self.pids_by_topic[topic].append(pid)
+            self.db.posts.insert_one(
+                {
+                    "owner": OWNER,
+                    "pid": pid,
+                    "lemmas": encode_lemmas(" ".join(self.rnd.sample(words, 8))),
+                    "tagged_at": tagged_at,
+                }
+            )
+
+    def _clusters(self, pids: List[str]) -> set:
+        return {
+            tuple(post.get("clusters", []))
+            for post in self.db.posts.find({"pid": {"$in": pids}})
+        }
+
+    def test_posts_of_a_topic_share_a_cluster(self) -> None:
+        self.assertTrue(StreamingPostClustering(self.db, []).run(OWNER))
+
+        topic_clusters = [self._clusters(pids) for pids in self.pids_by_topic]
+        for clusters in topic_clusters:
+            self.assertEqual(len(clusters), 1)
+            self.assertEqual(len(next(iter(clusters))), 1)
+        self.assertEqual(len(set.union(*topic_clusters)), 3)
+        model = RssTagPostClusterModels(self.db).load(OWNER)
+        self.assertEqual(model.fitted_posts, 60)
+
+    def test_new_posts_are_assigned_without_a_refit(self) -> None:
+        StreamingPostClustering(self.db, []).run(OWNER)
+        centers = RssTagPostClusterModels(self.db).load(OWNER).centers
+        self._add_posts(tagged_at=time.time() + 3600)
+
+        StreamingPostClustering(self.db, [], refit_growth=0.5).run(OWNER)
+
+        model = RssTagPostClusterModels(self.db).load(OWNER)
+        self.assertTrue((model.centers == centers).all())
+        self.assertEqual(model.assigned_posts, 3)
+        for pids in self.pids_by_topic:
+            self.assertEqual(len(self._clusters(pids)), 1)
+
+    def test_reassigned_posts_keep_only_their_new_cluster(self) -> None:
+        StreamingPostClustering(self.db, []).run(OWNER)
+        self.db.posts.update_many(
+            {}, {"$set": {"clusters": ["stale"], "tagged_at": time.time() + 3600}}
+        )
+
+        StreamingPostClustering(self.db, [], refit_growth=2).run(OWNER)
+
+        self.assertEqual(self.db.posts.count_documents({"clusters": "stale"}), 0)
+        for pids in self.pids_by_topic:
+            clusters = self._clusters(pids)
+            self.assertEqual(len(clusters), 1)
+            self.assertEqual(len(next(iter(clusters))), 1)
+
+    def test_model_is_refitted_once_new_posts_outgrow_it(self) -> None:
+        StreamingPostClustering(self.db, []).run(OWNER)
+        self._add_posts(tagged_at=time.time() + 3600)
+
+        StreamingPostClustering(self.db, [], refit_growth=0.01).run(OWNER)
+
+        model = RssTagPostClusterModels(self.db).load(OWNER)
+        self.assertEqual(model.fitted_posts, 63)
+        self.assertEqual(model.assigned_posts, 0)
+        for pids in self.pids_by_topic:
+            self.assertEqual(len(self._clusters(pids)), 1)
+
+    def test_too_few_posts_are_left_unclustered(self) -> None:
+        self.db.posts.delete_many({"pid": {"$nin": ["p0", "p1"]}})
+
+        self.assertTrue(StreamingPostClustering(self.db, []).run(OWNER))
+
+        self.assertIsNone(RssTagPostClusterModels(self.db).load(OWNER))
+        self.assertEqual(self.db.posts.count_documents({"clusters": {"$exists": True}}), 0)
+
+
+class TestClusteringSettings(unittest.TestCase):
+    def _settings(self, settings: dict) -> tuple:
+        return TagWorker(MagicMock(), {"settings": settings})._get_clustering_settings()
+
+    def test_dbscan_is_the_default(self) -> None:
+        self.assertEqual(self._settings({}), (ENGINE_DBSCAN, 0.5))
+
+    def test_minibatch_engine_is_selected(self) -> None:
+        settings = {"clustering_engine": ENGINE_MINIBATCH, "clustering_refit_growth": "0.2"}
+
+        self.assertEqual(self._settings(settings), (ENGINE_MINIBATCH, 0.2))
+
+    def test_invalid_settings_fall_back(self) -> None:
+        settings = {"clustering_engine": "hdbscan", "clustering_refit_growth": "x"}
+
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(self._settings(settings), (ENGINE_DBSCAN, 0.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
+import threading
+import time
 import unittest
 from typing import Any
 from unittest.mock import patch
 
-from rsstag.post_splitter import ParsingError, PostSplitter
+from rsstag.post_splitter import LLMRequestError, ParsingError, PostSplitter
 
 
 class _DummyLLMHandler:
@@ -68,6 +70,68 @@ class _FakeLLMCallable:
         return "llm response"
 
 
+class _ChunkRequest:
+    def __init__(self, prompt: str) -> None:
+        self.prompt = prompt
+        self.temperature = 0.0
+
+
+class _ChunksSession:
+    """One round of independent chunk requests, like a long post."""
+
+    def __init__(self, chunks: int) -> None:
+        self.chunks = chunks
+        self.responses: list[Any] = []
+
+    def is_complete(self) -> bool:
+        return bool(self.responses)
+
+    def pending_requests(self) -> tuple[_ChunkRequest, ...]:
+        return tuple(_ChunkRequest(f"chunk {i}") for i in range(self.chunks))
+
+    def submit_responses(self, responses: list[Any]) -> None:
+        self.responses = responses
+
+    def result(self) -> list[str]:
+        return [response.content for response in self.responses]
+
+
+class _ChunksPipeline:
+    start_calls = 0
+
+    def __init__(self, chunks: int) -> None:
+        self.chunks = chunks
+
+    def start(self, text: str) -> _ChunksSession:
+        _ChunksPipeline.start_calls += 1
+        return _ChunksSession(self.chunks)
+
+
+class _SlowLLMCallable:
+    def __init__(self, failures: dict[str, int] | None = None) -> None:
+        self.failures = dict(failures or {})
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls: list[str] = []
+        self._lock = threading.Lock()
+
+    def call(self, prompt: str, temperature: float) -> str:
+        with self._lock:
+            self.calls.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.05)
+            with self._lock:
+                if self.failures.get(prompt, 0) > 0:
+                    self.failures[prompt] -= 1
+                    raise RuntimeError("connection reset")
+            return f"topics of {prompt}"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
 class TestPostSplitterTopicValidation(unittest.TestCase):
     def setUp(self):
         _FakePipeline.start_calls = 0
@@ -133,5 +197,40 @@ class TestPostSplitterTopicValidation(unittest.TestCase):
         self.assertEqual(llm_callable.prompts, [("prompt text", 0.0)])
 
 
+    def test_session_requests_are_sent_concurrently_in_order(self):
+        splitter = PostSplitter(_DummyLLMHandler(), max_in_flight=3)
+        llm_callable = _SlowLLMCallable()
+
+        result = splitter._run_pipeline_session(_ChunksPipeline(6), "text", llm_callable)
+
+        self.assertEqual(result, [f"topics of chunk {i}" for i in range(6)])
+        self.assertEqual(llm_callable.max_in_flight, 3)
+
+    def test_failed_request_is_retried_alone(self):
+        splitter = PostSplitter(_DummyLLMHandler(), max_in_flight=4)
+        llm_callable = _SlowLLMCallable(failures={"chunk 2": 2})
+
+        result = splitter._run_pipeline_session(_ChunksPipeline(4), "text", llm_callable)
+
+        self.assertEqual(result[2], "topics of chunk 2")
+        self.assertEqual(llm_callable.calls.count("chunk 2"), 3)
+        self.assertEqual(llm_callable.calls.count("chunk 0"), 1)
+
+    def test_exhausted_request_retries_do_not_restart_pipeline(self):
+        _ChunksPipeline.start_calls = 0
+        splitter = PostSplitter(_DummyLLMHandler())
+        llm_callable = _SlowLLMCallable(failures={"chunk 1": splitter.MAX_REQUEST_RETRIES})
+
+        with self._patch_pipeline_dependencies(), patch(
+            "rsstag.post_splitter.TracingLLMCallable", return_value=llm_callable
+        ), patch(
+            "rsstag.post_splitter.build_pipeline", return_value=_ChunksPipeline(2)
+        ):
+            with self.assertRaises(LLMRequestError):
+                splitter.generate_grouped_data("text", "title")
+
+        self.assertEqual(_ChunksPipeline.start_calls, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import MagicMock
 
 from rsstag.posts import RssTagPosts
+from rsstag.indexes import COMPOUND_INDEXES
 
 
 class TestRssTagPostsStorage(unittest.TestCase):
@@ -51,6 +52,16 @@ class TestRssTagPostsStorage(unittest.TestCase):
             operations[0]._doc,
         )
 
+    def test_replace_clusters_sets_the_single_cluster(self):
+        self.storage.replace_clusters("alice", {"cluster-a": ["p1"]})
+
+        operations = self.db.posts.bulk_write.call_args.args[0]
+        self.assertEqual(1, len(operations))
+        self.assertEqual(
+            {"$set": {"clusters": ["cluster-a"]}},
+            operations[0]._doc,
+        )
+
     def test_get_neighbors_by_unix_date_combines_before_and_after(self):
         before_cursor = MagicMock()
         before_cursor.sort.return_value.limit.return_value = [{"pid": "before"}]
@@ -83,14 +94,20 @@ class TestRssTagPostsStorage(unittest.TestCase):
     def test_prepare(self):
         from unittest.mock import call
         self.storage.prepare()
-        self.assertEqual(self.db.posts.create_index.call_count, len(self.storage.indexes))
+        self.assertEqual(
+            self.db.posts.create_index.call_count,
+            len(self.storage.indexes) + len(COMPOUND_INDEXES["posts"]),
+        )
         calls = [call(idx) for idx in self.storage.indexes]
         self.db.posts.create_index.assert_has_calls(calls, any_order=True)
 
     def test_prepare_exception(self):
         self.db.posts.create_index.side_effect = Exception("test error")
         self.storage.prepare()
-        self.assertEqual(self.db.posts.create_index.call_count, len(self.storage.indexes))
+        self.assertEqual(
+            self.db.posts.create_index.call_count,
+            len(self.storage.indexes) + len(COMPOUND_INDEXES["posts"]),
+        )
 
     def test_get_by_category(self):
         cursor = MagicMock()
@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, call
 import gzip
 
 from rsstag.posts import RssTagPosts, PostLemmaSentence
+from rsstag.indexes import COMPOUND_INDEXES
 
 class TestRssTagPostsExtra(unittest.TestCase):
     def setUp(self):
@@ -11,15 +12,24 @@ class TestRssTagPostsExtra(unittest.TestCase):
 
     def test_prepare(self):
         self.storage.prepare()
-        self.assertEqual(self.db.posts.create_index.call_count, len(self.storage.indexes))
+        self.assertEqual(
+            self.db.posts.create_index.call_count,
+            len(self.storage.indexes) + len(COMPOUND_INDEXES["posts"]),
+        )
         calls = [call(idx) for idx in self.storage.indexes]
+        calls += [
+            call(keys, name=name) for name, keys in COMPOUND_INDEXES["posts"].items()
+        ]
         self.db.posts.create_index.assert_has_calls(calls, any_order=True)
 
     def test_prepare_exception(self):
         self.db.posts.create_index.side_effect = Exception("test error")
         # Should not raise
         self.storage.prepare()
-        self.assertEqual(self.db.posts.create_index.call_count, len(self.storage.indexes))
+        self.assertEqual(
+            self.db.posts.create_index.call_count,
+            len(self.storage.indexes) + len(COMPOUND_INDEXES["posts"]),
+        )
 
     def test_get_by_category(self):
         cursor = MagicMock()
@@ -275,5 +285,16 @@ class TestPostLemmaSentence(unittest.TestCase):
         self.assertEqual(result, 42)
         self.db.posts.count_documents.assert_called_once_with({"owner": "alice"})
 
+    def test_tagged_since_selects_recently_tagged_posts(self):
+        sentence = PostLemmaSentence(self.db, "alice", split=True, tagged_since=100.0)
+        self.db.posts.find.return_value = []
+
+        list(sentence)
+        sentence.count()
+
+        query = {"owner": "alice", "tagged_at": {"$gt": 100.0}}
+        self.db.posts.find.assert_called_once_with(query, projection={"lemmas": True})
+        self.db.posts.count_documents.assert_called_once_with(query)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,258 @@
+import random
+import time
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from rsstag import prefix_index as prefix_index_module
+from rsstag.prefix_index import (
+    DEFAULT_PREFIX_CACHE_MB,
+    PrefixIndex,
+    PrefixIndexCache,
+    RssTagPrefixIndex,
+    init_prefix_cache,
+)
+from rsstag.prefix_tree import PrefixTreeBuilder
+from rsstag.text_codec import encode_text
+
+OWNER = "alice"
+
+
+def _builder(words: list) -> PrefixTreeBuilder:
+    # PrefixIndex orders alphabetically, the trie by insertion
+    builder = PrefixTreeBuilder()
+    for word in sorted(words):
+        builder.add_words_from_doc(word)
+    return builder
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def test_queries_match_prefix_tree_builder(self) -> None:
+        rnd = random.Random(3)
+        for _ in range(300):
+            words = [
+                "".join(rnd.choice("abc") for _ in range(rnd.randint(1, 5)))
+                for _ in range(rnd.randint(1, 15))
+            ]
+            builder = _builder(words)
+            index = PrefixIndex.from_counts(Counter(words))
+            for n in (1, 2, 3):
+                self.assertEqual(
+                    sorted(index.get_top_n(n)), sorted(builder.get_top_n(n)), words
+                )
+            for prefix in ("a", "ab", "b", "cab", "abcabc"):
+                self.assertEqual(
+                    sorted(index.get_tails(prefix)), sorted(builder.get_tails(prefix))
+                )
+                self.assertEqual(
+                    index.get_compact_tree(prefix), builder.get_compact_tree(prefix), words
+                )
+
+    def test_top_n_is_ordered_by_count(self) -> None:
+        index = PrefixIndex.from_counts(Counter(["hello", "help", "help", "world"]))
+
+        self.assertEqual(index.get_top_n(3), [("hel", 3), ("wor", 1)])
+        self.assertEqual(index.count("he"), 3)
+        self.assertEqual(index.count("x"), 0)
+
+    def test_doc_round_trip(self) -> None:
+        index = PrefixIndex.from_counts({"привет": 2, "мир": 1, "world": 7})
+
+        restored = PrefixIndex.from_doc(index.to_doc())
+
+        self.assertEqual(list(restored.words), ["world", "мир", "привет"])
+        self.assertEqual(list(restored.counts()), [7, 1, 2])
+        self.assertEqual(len(PrefixIndex.from_doc(PrefixIndex([], []).to_doc())), 0)
+
+    def test_merge_adds_counts(self) -> None:
+        index = PrefixIndex.from_counts({"apple": 1, "banana": 2})
+
+        merged = index.merge({"banana": 1, "cherry": 4})
+
+        self.assertEqual(
+            dict(zip(merged.words, merged.counts())), {"apple": 1, "banana": 3, "cherry": 4}
+        )
+        self.assertEqual(len(index), 2)
+
+    def test_merge_matches_summed_counts(self) -> None:
+        rnd = random.Random(7)
+        for _ in range(200):
+            base = Counter(rnd.choice("abcdef") * rnd.randint(1, 3) for _ in range(10))
+            added = Counter(rnd.choice("abcdefg") * rnd.randint(1, 3) for _ in range(5))
+
+            merged = PrefixIndex.from_counts(base).merge(added)
+
+            self.assertEqual(dict(zip(merged.words, merged.counts())), dict(base + added))
+
+
+class TestPrefixIndexCache(unittest.TestCase):
+    def test_least_recently_used_indexes_are_evicted(self) -> None:
+        first = PrefixIndex.from_counts({"alpha": 1})
+        cache = PrefixIndexCache(capacity_bytes=first.nbytes * 2)
+        cache.put("a", 1, first)
+        cache.put("b", 1, PrefixIndex.from_counts({"bravo": 1}))
+        self.assertIs(cache.get("a", 1), first)
+
+        cache.put("c", 1, PrefixIndex.from_counts({"gamma": 1}))
+
+        self.assertIsNone(cache.get("b", 1))
+        self.assertIs(cache.get("a", 1), first)
+        self.assertLessEqual(cache.size, cache.capacity_bytes)
+
+    def test_stale_version_and_oversized_index_are_not_served(self) -> None:
+        cache = PrefixIndexCache(capacity_bytes=64)
+        cache.put("a", 1, PrefixIndex.from_counts({"alpha": 1}))
+
+        self.assertIsNone(cache.get("a", 2))
+        cache.put("a", 2, PrefixIndex.from_counts({f"word{i}": 1 for i in range(100)}))
+        self.assertIsNone(cache.get("a", 2))
+        self.assertEqual(cache.size, 0)
+
+    def test_init_prefix_cache_falls_back_on_invalid_size(self) -> None:
+        self.addCleanup(
+            setattr,
+            prefix_index_module.prefix_cache,
+            "capacity_bytes",
+            prefix_index_module.prefix_cache.capacity_bytes,
+        )
+        init_prefix_cache({"settings": {"prefix_index_cache_mb": "2"}})
+        self.assertEqual(prefix_index_module.prefix_cache.capacity_bytes, 2 * 1024 * 1024)
+
+        with self.assertLogs(level="WARNING"):
+            init_prefix_cache({"settings": {"prefix_index_cache_mb": "lots"}})
+        self.assertEqual(
+            prefix_index_module.prefix_cache.capacity_bytes,
+            DEFAULT_PREFIX_CACHE_MB * 1024 * 1024,
+        )
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestRssTagPrefixIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        self.store = RssTagPrefixIndex(self.db)
+        self.store.prepare()
+        prefix_index_module.prefix_cache.clear()
+        self.addCleanup(prefix_index_module.prefix_cache.clear)
+        self.db.posts.insert_many(
+            [
+                self._post("1", "Hello world", "<p>hello <b>again</b></p>", tagged_at=1.0),
+                self._post("2", "Untagged", "never counted"),
+            ]
+        )
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    @staticmethod
+    def _post(pid: str, title: str, content: str, tagged_at: float = None) -> dict:
+        post = {
+            "owner": OWNER,
+            "pid": pid,
+            "content": {"title": title, "content": encode_text(content)},
+            "tags": [],
+        }
+        if tagged_at is not None:
+            post["tagged_at"] = tagged_at
+        return post
+
+    def _counts(self) -> dict:
+        index = self.store.load(OWNER)
+        return dict(zip(index.words, index.counts()))
+
+    def test_rebuild_counts_tagged_posts(self) -> None:
+        self.assertIsNone(self.store.load(OWNER))
+
+        self.assertTrue(self.store.rebuild(OWNER))
+
+        self.assertEqual(self._counts(), {"again": 1, "hello": 2, "world": 1})
+
+    def test_add_posts_merges_newly_tagged_posts(self) -> None:
+        self.store.rebuild(OWNER)
+        built_at = self.db.prefix_index.find_one({"owner": OWNER})["built_at"]
+        self.assertEqual(self.store.load(OWNER).count("hel"), 2)
+
+        posts = [self._post("3", "Help", "world"), self._post("1", "Hello", "x", 1.0)]
+        self.assertTrue(self.store.add_posts(OWNER, posts, built_at + 1))
+
+        self.assertEqual(self.store.load(OWNER).count("hel"), 3)
+        self.assertEqual(self._counts()["world"], 2)
+
+    def test_deltas_are_folded_into_the_index(self) -> None:
+        self.store.rebuild(OWNER)
+        built_at = self.db.prefix_index.find_one({"owner": OWNER})["built_at"]
+
+        with patch.object(prefix_index_module, "MAX_DELTAS", 3):
+            for pid in range(4):
+                self.store.add_posts(OWNER, [self._post(str(10 + pid), "Help", "")], built_at + 1)
+                doc = self.db.prefix_index.find_one({"owner": OWNER})
+                self.assertEqual(len(doc.get("deltas", [])), [1, 2, 0, 1][pid])
+                self.assertEqual(self._counts()["help"], pid + 1)
+
+        self.assertEqual(self._counts(), {"again": 1, "hello": 2, "help": 4, "world": 1})
+
+    def test_rebuild_keeps_deltas_of_posts_tagged_after_it_started(self) -> None:
+        self.store.rebuild(OWNER)
+        tagged_at = time.time() + 100
+        self.store.add_posts(OWNER, [self._post("3", "Late", "")], tagged_at)
+        self.db.posts.insert_one(self._post("3", "Late", "", tagged_at))
+
+        self.store.rebuild(OWNER)
+
+        self.assertEqual(len(self.db.prefix_index.find_one({"owner": OWNER})["deltas"]), 1)
+        self.assertEqual(self._counts()["late"], 1)
+        self.assertEqual(self._counts()["hello"], 2)
+
+    def test_legacy_posts_are_not_counted_twice(self) -> None:
+        legacy = self._post("3", "Legacy", "")
+        legacy["tags"] = ["legacy"]
+        self.db.posts.insert_one(legacy)
+        self.store.rebuild(OWNER)
+        built_at = self.db.prefix_index.find_one({"owner": OWNER})["built_at"]
+
+        # Tags of the post are cleared and it is claimed for tagging again
+        self.db.posts.update_one({"pid": "3"}, {"$set": {"tags": []}})
+        claimed = self.db.posts.find_one({"pid": "3"})
+        self.store.add_posts(OWNER, [claimed], built_at + 1)
+
+        self.assertEqual(self._counts()["legacy"], 1)
+        self.store.rebuild(OWNER)
+        self.assertEqual(self._counts()["legacy"], 1)
+
+    def test_add_posts_skips_posts_counted_by_rebuild(self) -> None:
+        self.assertTrue(self.store.add_posts(OWNER, [self._post("3", "Help", "")], 1.0))
+        self.assertIsNone(self.store.load(OWNER))
+
+        self.store.rebuild(OWNER)
+        built_at = self.db.prefix_index.find_one({"owner": OWNER})["built_at"]
+        self.store.add_posts(OWNER, [self._post("3", "Help", "")], built_at - 1)
+
+        self.assertNotIn("help", self._counts())
+
+    def test_load_reloads_changed_index(self) -> None:
+        self.store.rebuild(OWNER)
+        first = self.store.load(OWNER)
+        self.assertIs(self.store.load(OWNER), first)
+
+        self.db.posts.update_one({"pid": "2"}, {"$set": {"tagged_at": 2.0}})
+        self.store.rebuild(OWNER)
+
+        self.assertIsNot(self.store.load(OWNER), first)
+        self.assertIn("untagged", self._counts())
+
+    def test_remove_owner(self) -> None:
+        self.store.rebuild(OWNER)
+
+        self.store.remove_owner(OWNER)
+
+        self.assertIsNone(self.store.load(OWNER))
+
+
+if __name__ == "__main__":
+    unittest.main()
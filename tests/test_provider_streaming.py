@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from rsstag.providers.bazqux import BazquxProvider
+from rsstag.providers.providers import BAZQUX
+from rsstag.providers.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    download_chunk_size,
+    iter_async_items,
+    iter_chunks,
+)
+
+
+def _item(stream: str, number: int) -> Dict[str, Any]:
+    return {
+        "id": f"{stream}-{number}",
+        "title": f"Post {number}",
+        "summary": {"content": "<p>text</p>"},
+        "canonical": [{"href": f"http://{stream}/{number}"}],
+        "origin": {"streamId": f"feed/{stream}", "title": stream},
+        "published": 1700000000,
+    }
+
+
+class TestIterChunks(unittest.TestCase):
+    def test_batches_are_regrouped_by_size(self) -> None:
+        batches = [([1, 2, 3], ["a"]), ([], ["b"]), ([4, 5], []), ([6], ["c"])]
+
+        chunks = list(iter_chunks(batches, 2))
+
+        self.assertEqual(
+            chunks,
+            [([1, 2], ["a"]), ([3, 4], ["b"]), ([5, 6], ["c"])],
+        )
+
+    def test_trailing_feeds_are_yielded(self) -> None:
+        self.assertEqual(list(iter_chunks([([], ["a"])], 2)), [([], ["a"])])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+    def test_chunk_size_setting(self) -> None:
+        self.assertEqual(
+            download_chunk_size({"settings": {"download_chunk_size": "50"}}), 50
+        )
+        self.assertEqual(
+            download_chunk_size({"settings": {"download_chunk_size": "x"}}),
+            DEFAULT_CHUNK_SIZE,
+        )
+        self.assertEqual(download_chunk_size({}), DEFAULT_CHUNK_SIZE)
+
+
+class TestIterAsyncItems(unittest.TestCase):
+    def test_items_are_handed_out_while_producing(self) -> None:
+        produced: List[int] = []
+
+        async def produce(queue: asyncio.Queue) -> None:
+            for number in range(10):
+                produced.append(number)
+                await queue.put(number)
+
+        consumed = []
+        for item in iter_async_items(produce, max_items=2):
+            # The bounded queue keeps the producer close to the consumer.
+            self.assertLessEqual(len(produced) - len(consumed), 4)
+            consumed.append(item)
+
+        self.assertEqual(consumed, list(range(10)))
+
+    def test_producer_errors_follow_the_items_put_before(self) -> None:
+        async def produce(queue: asyncio.Queue) -> None:
+            await queue.put(1)
+            raise RuntimeError("stream failed")
+
+        items = iter_async_items(produce)
+
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(RuntimeError):
+            next(items)
+
+    def test_closing_early_cancels_the_producer(self) -> None:
+        cancelled: List[bool] = []
+
+        async def produce(queue: asyncio.Queue) -> None:
+            try:
+                while True:
+                    await queue.put(0)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        items = iter_async_items(produce)
+        next(items)
+        items.close()
+
+        self.assertEqual(cancelled, [True])
+
+
+class TestBazquxStreamingDownload(unittest.TestCase):
+    def setUp(self) -> None:
+        self.provider = BazquxProvider(
+            {
+                "settings": {
+                    "host_name": "rsstag.test",
+                    "no_category_name": "",
+                    "download_chunk_size": 3,
+                },
+                BAZQUX: {"api_host": "bazqux.test"},
+            }
+        )
+        subscriptions = {
+            "subscriptions": [
+                {"id": "feed/a", "title": "A", "categories": [{"label": "Tech"}]},
+                {"id": "feed/b", "title": "B", "categories": []},
+            ]
+        }
+        patcher = patch.object(
+            self.provider, "_require_subscriptions", return_value=subscriptions
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_posts_are_yielded_in_bounded_chunks(self) -> None:
+        async def fetch(data: dict, pages: asyncio.Queue) -> int:
+            stream = "a" if "label" in data["url"] else "b"
+            for page in range(2):
+                await pages.put(
+                    ([_item(stream, page * 2 + i) for i in range(2)], data["category"])
+                )
+            return 4
+
+        with patch.object(self.provider, "fetch", side_effect=fetch):
+            chunks = list(self.provider.download({"sid": "alice", "token": "t"}))
+
+        self.assertEqual([len(posts) for posts, _ in chunks], [3, 3, 2])
+        feeds = [feed for _, chunk_feeds in chunks for feed in chunk_feeds]
+        self.assertEqual(sorted(feed["title"] for feed in feeds), ["a", "b"])
+        pids = {post["pid"] for posts, _ in chunks for post in posts}
+        self.assertEqual(len(pids), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
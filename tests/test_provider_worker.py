@@ -112,6 +112,7 @@ def test_handle_download_success(
                 "id": 1,
                 "pid": "test-provider:f1:1",
                 "provider": "test_provider",
+                "codecs": {"version": 1},
             }
         ],
         ordered=False,
@@ -133,9 +133,10 @@ class TestQualityTaskClaim(unittest.TestCase):
         self.storage._state.claim.return_value = self.task_doc
 
     def _set_pending_posts(self, posts):
-        cursor = MagicMock()
-        cursor.limit.return_value = posts
-        self.db.posts.find.return_value = cursor
+        # First find() lists candidate ids, the second reads back the claim.
+        candidates = MagicMock()
+        candidates.limit.return_value = [{"_id": post["_id"]} for post in posts]
+        self.db.posts.find.side_effect = [candidates, posts]
         self.db.posts.count_documents.return_value = len(posts)
 
     def test_claims_unscored_posts_within_scope(self):
@@ -145,7 +146,7 @@ class TestQualityTaskClaim(unittest.TestCase):
 
         self.assertEqual(task["type"], TASK_POST_QUALITY)
         self.assertEqual(len(task["data"]), 1)
-        query = self.db.posts.find.call_args[0][0]
+        query = self.db.posts.find.call_args_list[0][0][0]
         self.assertEqual(query["quality"], {"$exists": False})
         self.assertEqual(query["feed_id"], {"$in": ["f1"]})
 
@@ -155,8 +156,10 @@ class TestQualityTaskClaim(unittest.TestCase):
         self.storage.get_task(self.users)
 
         query, update = self.db.posts.update_many.call_args[0]
-        self.assertEqual(query, {"_id": {"$in": ["p1"]}})
+        self.assertEqual(query["_id"], {"$in": ["p1"]})
+        self.assertIn("$lt", query["processing"])
         self.assertGreater(update["$set"]["processing"], 0)
+        self.assertTrue(update["$set"]["claim_token"])
 
     def test_completes_once_every_post_in_scope_is_scored(self):
         self._set_pending_posts([])
@@ -0,0 +1,173 @@
+import unittest
+from typing import Any, Dict, List, Tuple
+from unittest.mock import MagicMock, patch
+
+import mongomock
+
+from rsstag.providers import providers as data_providers
+from rsstag.providers.telegram import TelegramProvider
+from rsstag.text_codec import CODEC_ZLIB, decode_text, detect_codec
+from rsstag.workers.provider_worker import ProviderWorker
+from rsstag.workers.raw_posts_pipeline import RawPostsPipeline, iter_raw_batches
+
+OWNER = "alice"
+
+
+def _raw_message(chat_id: int, msg_id: int) -> Dict[str, Any]:
+    return {
+        "id": msg_id,
+        "chat_id": chat_id,
+        "date": 1700000000 + msg_id,
+        "content": {
+            "@type": "messageText",
+            "text": {"text": f"message {msg_id}", "entities": []},
+        },
+    }
+
+
+def _simple_transform(
+    owner: str, messages: List[dict], chat_by_stream: Dict[str, dict]
+) -> Tuple[List[dict], List[dict]]:
+    posts = [
+        {"pid": f"{m['chat_id']}:{m['id']}", "owner": owner, "content": {}}
+        for m in messages
+    ]
+    feeds = [{"feed_id": str(m["chat_id"]), "owner": owner} for m in messages[:1]]
+    return posts, feeds
+
+
+class TestIterRawBatches(unittest.TestCase):
+    def test_batches_keep_ids_of_docs_without_raw(self) -> None:
+        docs = [{"_id": 1, "raw": {"id": 1}}, {"_id": 2}, {"_id": 3, "raw": {"id": 3}}]
+
+        batches = list(iter_raw_batches(docs, 2))
+
+        self.assertEqual(batches, [([1, 2], [{"id": 1}]), ([3], [{"id": 3}])])
+
+
+class TestRawPostsPipeline(unittest.TestCase):
+    def test_batches_are_stored_in_read_order(self) -> None:
+        docs = [{"_id": i, "raw": _raw_message(1, i)} for i in range(25)]
+        stored: List[List[int]] = []
+        pipeline = RawPostsPipeline(_simple_transform, OWNER, {}, batch_size=4)
+        try:
+            count = pipeline.run(docs, lambda ids, posts, feeds: stored.append(ids))
+        finally:
+            pipeline.close()
+
+        self.assertEqual(count, 25)
+        self.assertEqual([i for ids in stored for i in ids], list(range(25)))
+
+    def test_transform_errors_stop_the_pipeline(self) -> None:
+        def transform(owner: str, messages: List[dict], chats: Dict[str, dict]) -> Any:
+            if messages[0]["id"] >= 4:
+                raise ValueError("bad message")
+            return _simple_transform(owner, messages, chats)
+
+        docs = [{"_id": i, "raw": _raw_message(1, i)} for i in range(100)]
+        stored: List[List[int]] = []
+        pipeline = RawPostsPipeline(transform, OWNER, {}, batch_size=4)
+        try:
+            with self.assertRaises(ValueError):
+                pipeline.run(docs, lambda ids, posts, feeds: stored.append(ids))
+        finally:
+            pipeline.close()
+
+        self.assertEqual(stored, [[0, 1, 2, 3]])
+
+    def test_process_pool_converts_telegram_messages(self) -> None:
+        provider = TelegramProvider(
+            {"settings": {"host_name": "rsstag.test", "no_category_name": ""}},
+            MagicMock(),
+        )
+        docs = [{"_id": i, "raw": _raw_message(10, i)} for i in range(6)]
+        converted: List[dict] = []
+        pipeline = RawPostsPipeline(
+            provider.raw_messages_to_posts,
+            OWNER,
+            {"10": {"id": 10, "title": "Chat"}},
+            pool_size=2,
+            batch_size=2,
+            config={"settings": {"content_codec": CODEC_ZLIB}},
+        )
+        try:
+            pipeline.run(docs, lambda ids, posts, feeds: converted.extend(posts))
+        finally:
+            pipeline.close()
+
+        self.assertEqual([post["id"] for post in converted], list(range(6)))
+        self.assertTrue(all(post["owner"] == OWNER for post in converted))
+        blob = converted[0]["content"]["content"]
+        self.assertEqual(detect_codec(blob), CODEC_ZLIB)
+        self.assertEqual(decode_text(blob), "message 0")
+
+
+class TestHandleRawToPosts(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch("rsstag.workers.provider_worker.RAW_BATCH_SIZE", 50)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = mongomock.MongoClient().rsstag
+        self.provider = MagicMock()
+        self.provider.raw_messages_to_posts.side_effect = _simple_transform
+        self.tasks = MagicMock()
+        self.worker = ProviderWorker(
+            db=self.db,
+            config={},
+            providers={data_providers.TELEGRAM: self.provider},
+            users=MagicMock(),
+            tasks=self.tasks,
+            record_bulk_write=MagicMock(),
+        )
+        self.db.raw_posts.insert_many(
+            [
+                {
+                    "owner": OWNER,
+                    "provider": data_providers.TELEGRAM,
+                    "stream_id": "1",
+                    "external_id": f"1:{i}",
+                    "raw": _raw_message(1, i),
+                }
+                for i in range(120)
+            ]
+        )
+        self.task = {
+            "_id": "task",
+            "user": {"sid": OWNER},
+            "data": {"provider": data_providers.TELEGRAM},
+        }
+
+    def test_every_raw_doc_is_converted_once(self) -> None:
+        self.assertTrue(self.worker.handle_raw_to_posts(self.task))
+
+        self.assertEqual(self.db.posts.count_documents({"owner": OWNER}), 120)
+        self.assertEqual(self.db.feeds.count_documents({"owner": OWNER}), 1)
+        self.assertEqual(
+            self.db.raw_posts.count_documents({"posts_converted": {"$exists": False}}),
+            0,
+        )
+
+    def test_interrupted_run_resumes_from_unmarked_batches(self) -> None:
+        store = self.worker._store_converted_posts
+        calls: List[int] = []
+
+        def failing_store(*args: Any) -> None:
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            store(*args)
+
+        self.worker._store_converted_posts = failing_store
+        self.assertFalse(self.worker.handle_raw_to_posts(self.task))
+        self.assertEqual(
+            self.db.raw_posts.count_documents({"posts_converted": 1}), 50
+        )
+
+        self.worker._store_converted_posts = store
+        self.assertTrue(self.worker.handle_raw_to_posts(self.task))
+        self.assertEqual(self.db.posts.count_documents({"owner": OWNER}), 120)
+        self.assertEqual(self.db.raw_posts.count_documents({"posts_converted": 1}), 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,19 @@
 import unittest
 from typing import Any, Dict, List, Optional
-from unittest.mock import MagicMock
-
+from unittest.mock import MagicMock, patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from rsstag.bi_grams import RssTagBiGrams
+from rsstag.cooccurrence import RssTagCooccurrence
+from rsstag.letters import RssTagLetters
+from rsstag.post_grouping import RssTagPostGrouping
+from rsstag.posts import RssTagPosts
 from rsstag.read_state import ReadStateService
+from rsstag.tags import RssTagTags
 from rsstag.tasks import TASK_MARK, TASK_MARK_TELEGRAM, TASK_NOT_IN_PROCESSING
 
 
@@ -130,9 +141,14 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         }
         if provider is not None:
             post["provider"] = provider
-        self.posts.get_by_pid.return_value = post
+        self.posts.get_by_pids.return_value = [post]
         return post
 
+    def _set_all_read(self, all_read: Optional[bool]) -> None:
+        self.post_grouping.update_snippets_read_statuses.return_value = (
+            {} if all_read is None else {self.post_id: all_read}
+        )
+
     def _mark(
         self, sentence_indices: List[int], readed: bool, provider: str = "bazqux"
     ) -> Dict[str, Any]:
@@ -148,7 +164,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
 
     def test_partial_read_does_not_reach_provider(self) -> None:
         """Sentences left unread: grouping is updated, provider is not called."""
-        self.post_grouping.update_snippets_read_status.return_value = False
+        self._set_all_read(False)
         self._set_post(read=False)
 
         result: Dict[str, Any] = self._mark([0, 1], True)
@@ -159,17 +175,17 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.posts.change_status.assert_not_called()
 
     def test_partial_read_still_persists_sentences(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = False
+        self._set_all_read(False)
         self._set_post(read=False)
 
         self._mark([2, 0], True)
 
-        self.post_grouping.update_snippets_read_status.assert_called_once_with(
-            self.owner, self.post_id, [0, 2], True
+        self.post_grouping.update_snippets_read_statuses.assert_called_once_with(
+            self.owner, {self.post_id: [0, 2]}, True
         )
 
     def test_last_unread_sentence_marks_post_and_queues_task(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = True
+        self._set_all_read(True)
         self._set_post(read=False)
 
         result: Dict[str, Any] = self._mark([2], True)
@@ -197,7 +213,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         )
 
     def test_no_task_when_post_is_already_read(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = True
+        self._set_all_read(True)
         self._set_post(read=True)
 
         result: Dict[str, Any] = self._mark([2], True)
@@ -207,7 +223,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.tasks.add_task.assert_not_called()
 
     def test_unmarking_a_sentence_reopens_the_post(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = False
+        self._set_all_read(False)
         self._set_post(read=True)
 
         result: Dict[str, Any] = self._mark([0], False)
@@ -217,7 +233,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.assertFalse(self._queued_tasks()[0]["data"][0]["status"])
 
     def test_unmarking_an_already_unread_post_queues_nothing(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = False
+        self._set_all_read(False)
         self._set_post(read=False)
 
         self._mark([0], False)
@@ -226,7 +242,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
 
     def test_unmatched_sentence_numbers_skip_the_post(self) -> None:
         """No sentence changed, so the post's read state must not move."""
-        self.post_grouping.update_snippets_read_status.return_value = None
+        self._set_all_read(None)
         self._set_post(read=True)
 
         result: Dict[str, Any] = self._mark([99], False)
@@ -237,8 +253,8 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.posts.change_status.assert_not_called()
 
     def test_missing_post_is_skipped(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = True
-        self.posts.get_by_pid.return_value = None
+        self._set_all_read(True)
+        self.posts.get_by_pids.return_value = []
 
         result: Dict[str, Any] = self._mark([0], True)
 
@@ -246,7 +262,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.tasks.add_task.assert_not_called()
 
     def test_post_provider_wins_over_session_provider(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = True
+        self._set_all_read(True)
         self._set_post(read=False, provider="gmail")
 
         self._mark([0], True, provider="bazqux")
@@ -254,7 +270,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.assertEqual(self._queued_tasks()[0]["data"][0]["provider"], "gmail")
 
     def test_session_provider_used_when_post_has_none(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = True
+        self._set_all_read(True)
         self._set_post(read=False, provider=None)
 
         self._mark([0], True, provider="bazqux")
@@ -263,7 +279,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
 
     def test_telegram_sentences_never_queue_a_full_sync(self) -> None:
         """Telegram syncs through the manual TASK_MARK_TELEGRAM task only."""
-        self.post_grouping.update_snippets_read_status.return_value = True
+        self._set_all_read(True)
         self._set_post(read=False, provider="telegram")
 
         self._mark([0], True, provider="telegram")
@@ -273,7 +289,7 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.assertNotIn(TASK_MARK_TELEGRAM, queued_types)
 
     def test_failed_enqueue_reports_error(self) -> None:
-        self.post_grouping.update_snippets_read_status.return_value = True
+        self._set_all_read(True)
         self._set_post(read=False)
         self.tasks.add_task.return_value = False
 
@@ -283,5 +299,194 @@ class TestReadStateServiceMarkSentences(unittest.TestCase):
         self.posts.change_status.assert_not_called()
 
 
+class TestReadStateServiceBulk(unittest.TestCase):
+    owner: str = "user-1"
+
+    def setUp(self) -> None:
+        self.posts: MagicMock = MagicMock()
+        self.tags: MagicMock = MagicMock()
+        self.bi_grams: MagicMock = MagicMock()
+        self.letters: MagicMock = MagicMock()
+        self.tasks: MagicMock = MagicMock()
+        self.post_grouping: MagicMock = MagicMock()
+        self.posts.change_status.return_value = True
+        self.tags.change_unread.return_value = True
+        self.bi_grams.change_unread.return_value = True
+        self.tasks.add_task.return_value = True
+        self.service: ReadStateService = ReadStateService(
+            self.posts,
+            self.tags,
+            self.bi_grams,
+            self.letters,
+            self.tasks,
+            self.post_grouping,
+        )
+        self.posts.get_by_pids.return_value = [
+            {"pid": "1", "id": "a", "read": False, "tags": ["x", "y"], "bi_grams": ["x y"]},
+            {"pid": "2", "id": "b", "read": True, "tags": ["x"], "bi_grams": []},
+            {"pid": "3", "id": "c", "read": False, "tags": ["x"], "bi_grams": ["x y"]},
+        ]
+
+    def test_mark_posts_applies_one_write_per_collection(self) -> None:
+        result: Dict[str, Any] = self.service.mark_posts(
+            self.owner, "bazqux", ["1", "2", "3", "1"], True
+        )
+
+        self.assertEqual(result, {"ok": True, "changed_posts": ["1", "3"]})
+        self.tasks.add_task.assert_called_once()
+        queued = self.tasks.add_task.call_args.args[0]["data"]
+        self.assertEqual([task["id"] for task in queued], ["a", "c"])
+        self.posts.get_by_pids.assert_called_once()
+        self.posts.change_status.assert_called_once_with(self.owner, ["1", "3"], True)
+        self.tags.change_unread.assert_called_once_with(self.owner, {"x": 2, "y": 1}, True)
+        self.bi_grams.change_unread.assert_called_once_with(self.owner, {"x y": 2}, True)
+        self.letters.change_unread.assert_called_once_with(self.owner, {"x": 2, "y": 1}, True)
+        self.post_grouping.mark_posts_sequences_read.assert_called_once_with(
+            self.owner, ["1", "2", "3"], True
+        )
+
+    def test_mark_posts_unread_changes_read_posts_only(self) -> None:
+        result: Dict[str, Any] = self.service.mark_posts(self.owner, "bazqux", ["2"], False)
+
+        self.assertEqual(result["changed_posts"], ["2"])
+        self.tags.change_unread.assert_called_once_with(self.owner, {"x": 1}, False)
+
+    def test_mark_posts_without_changes_queues_nothing(self) -> None:
+        self.posts.get_by_pids.return_value = []
+
+        result: Dict[str, Any] = self.service.mark_posts(self.owner, "bazqux", ["4"], True)
+
+        self.assertEqual(result, {"ok": True, "changed_posts": []})
+        self.tasks.add_task.assert_not_called()
+        self.posts.change_status.assert_not_called()
+        self.post_grouping.mark_posts_sequences_read.assert_called_once()
+
+    def test_mark_sentences_of_many_posts_at_once(self) -> None:
+        self.post_grouping.update_snippets_read_statuses.return_value = {
+            "1": True,
+            "2": True,
+            "3": False,
+        }
+        selections = [
+            {"post_id": pid, "sentence_indices": [0]} for pid in ("1", "2", "3", "4")
+        ]
+
+        result: Dict[str, Any] = self.service.mark_sentences(
+            self.owner, "bazqux", selections, True
+        )
+
+        self.assertEqual(result["changed_posts"], ["1"])
+        self.assertEqual(result["skipped_posts"], ["4"])
+        self.post_grouping.update_snippets_read_statuses.assert_called_once()
+        self.posts.get_by_pids.assert_called_once()
+        self.tasks.add_task.assert_called_once()
+        self.posts.change_status.assert_called_once_with(self.owner, ["1"], True)
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo bulk ops, apply them one by one
+    for request in requests:
+        collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestReadStateServiceStorage(unittest.TestCase):
+    owner: str = "user-1"
+
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        bulk_patch = patch.object(
+            mongomock.collection.Collection, "bulk_write", _apply_updates
+        )
+        bulk_patch.start()
+        self.addCleanup(bulk_patch.stop)
+        self.grouping = RssTagPostGrouping(self.db)
+        self.tasks: MagicMock = MagicMock()
+        self.tasks.add_task.return_value = True
+        self.service = ReadStateService(
+            RssTagPosts(self.db),
+            RssTagTags(self.db),
+            RssTagBiGrams(self.db),
+            RssTagLetters(self.db),
+            self.tasks,
+            self.grouping,
+            RssTagCooccurrence(self.db),
+        )
+        for pid, tags in (("1", ["apple", "pear"]), ("2", ["apple"]), ("3", ["plum"])):
+            self.db.posts.insert_one(
+                {
+                    "owner": self.owner,
+                    "pid": pid,
+                    "id": f"p{pid}",
+                    "read": False,
+                    "tags": tags,
+                    "keywords": tags,
+                    "bi_grams": [],
+                }
+            )
+            self.grouping.save_grouped_posts(
+                self.owner,
+                [pid],
+                [{"number": 0, "text": "One.", "read": False}, {"number": 1, "text": "Two."}],
+                {"Topic": [0, 1]},
+            )
+        for tag, count in (("apple", 2), ("pear", 1), ("plum", 1)):
+            self.db.tags.insert_one({"owner": self.owner, "tag": tag, "unread_count": count})
+        self.db.letters.insert_one(
+            {
+                "owner": self.owner,
+                "letters": {"a": {"unread_count": 2}, "p": {"unread_count": 2}},
+            }
+        )
+        self.db.tag_cooccurrence.insert_one(
+            {
+                "owner": self.owner,
+                "pair": "apple pear",
+                "tags": ["apple", "pear"],
+                "posts_count": 1,
+                "unread_count": 1,
+            }
+        )
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def _sentences_read(self, pid: str) -> List[bool]:
+        doc = self.grouping.get_grouped_posts(self.owner, [pid])
+        return [sentence.get("read", False) for sentence in doc["sentences"]]
+
+    def test_mark_posts_updates_counters_and_groupings(self) -> None:
+        result: Dict[str, Any] = self.service.mark_posts(self.owner, "", ["1", "2"], True)
+
+        self.assertEqual(sorted(result["changed_posts"]), ["1", "2"])
+        unread = {tag["tag"]: tag["unread_count"] for tag in self.db.tags.find()}
+        self.assertEqual(unread, {"apple": 0, "pear": 0, "plum": 1})
+        letters = self.db.letters.find_one()["letters"]
+        self.assertEqual(letters["a"]["unread_count"], 0)
+        self.assertEqual(letters["p"]["unread_count"], 1)
+        self.assertEqual(self._sentences_read("1"), [True, True])
+        self.assertEqual(self._sentences_read("3"), [False, False])
+        self.assertEqual(self.db.posts.count_documents({"read": True}), 2)
+        self.assertEqual(self.db.tag_cooccurrence.find_one()["unread_count"], 0)
+
+    def test_mark_sentences_rolls_fully_read_posts_up(self) -> None:
+        selections = [
+            {"post_id": "1", "sentence_indices": [0, 1]},
+            {"post_id": "3", "sentence_indices": [0]},
+        ]
+
+        result: Dict[str, Any] = self.service.mark_sentences(self.owner, "", selections, True)
+
+        self.assertEqual(result["changed_posts"], ["1"])
+        self.assertEqual(self._sentences_read("3"), [True, False])
+        self.assertTrue(self.db.posts.find_one({"pid": "1"})["read"])
+        self.assertFalse(self.db.posts.find_one({"pid": "3"})["read"])
+        self.assertEqual(self.db.tags.find_one({"tag": "pear"})["unread_count"], 0)
+        self.assertEqual(
+            self.grouping.update_snippets_read_status(self.owner, "3", [7], True), None
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
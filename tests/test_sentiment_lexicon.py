@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from rsstag import sentiment_lexicon as lexicon_module
+from rsstag.sentiment import RuSentiLex, SentimentConverter, WordNetAffectRuRom
+from rsstag.sentiment_lexicon import (
+    SentimentLexicon,
+    compile_sentiment_lexicon,
+    load_sentiment_lexicon,
+)
+from rsstag.workers.tag_worker import TagWorker
+
+SENTILEX = "./data/rusentilex.txt"
+WORDNET_DIR = "./data/wordnet/lilu.fcim.utm.md"
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo bulk ops, apply them one by one
+    for request in requests:
+        collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+class TestSentimentLexicon(unittest.TestCase):
+    def test_compiled_lexicon_matches_source_dictionaries(self) -> None:
+        with open(SENTILEX, "r", encoding="utf-8") as f:
+            ru_sent = RuSentiLex(f.read().splitlines())
+        wn_en = WordNetAffectRuRom("en", 4)
+        wn_en.load_dicts_from_dir(WORDNET_DIR)
+        wn_ru = WordNetAffectRuRom("ru", 4)
+        wn_ru.load_dicts_from_dir(WORDNET_DIR)
+        conv = SentimentConverter()
+        sentiments = compile_sentiment_lexicon(SENTILEX, WORDNET_DIR)
+        lexicon = SentimentLexicon(SentimentLexicon.build(sentiments))
+
+        self.assertEqual(len(lexicon), len(sentiments))
+        for word in list(sentiments) + ["", "nothing", "атакa", "horrors"]:
+            expected = ru_sent.get_sentiment(word)
+            if not expected:
+                affects = wn_en.get_affects_by_word(word) or wn_ru.get_affects_by_word(word)
+                expected = conv.convert_sentiment(affects)
+            self.assertEqual(lexicon.get(word), sorted(set(expected)), word)
+
+    def test_build_drops_words_without_known_sentiment(self) -> None:
+        lexicon = SentimentLexicon(
+            SentimentLexicon.build(
+                {"атака": ["positive", "negative"], "x": ["unknown"], "y": []}
+            )
+        )
+
+        self.assertEqual(len(lexicon), 1)
+        self.assertEqual(lexicon.get("атака"), ["negative", "positive"])
+        self.assertEqual(lexicon.get("x"), [])
+        self.assertEqual(SentimentLexicon(SentimentLexicon.build({})).get("x"), [])
+
+    def test_not_a_lexicon_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            SentimentLexicon(b"garbage")
+
+
+class TestLoadSentimentLexicon(unittest.TestCase):
+    def setUp(self) -> None:
+        self._dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._dir)
+        self.addCleanup(setattr, lexicon_module, "_lexicon", None)
+        lexicon_module._lexicon = None
+        self.sentilex = os.path.join(self._dir, "rusentilex.txt")
+        self._write_sentilex("атака, Noun, атака, negative, fact")
+        self.config = {
+            "settings": {
+                "sentilex": self.sentilex,
+                "lilu_wordnet": WORDNET_DIR,
+                "sentiment_lexicon_path": os.path.join(self._dir, "lexicon.bin"),
+            }
+        }
+
+    def _write_sentilex(self, *lines: str) -> None:
+        with open(self.sentilex, "w", encoding="utf-8") as f:
+            f.write("! comment\n" + "\n".join(lines) + "\n")
+
+    def test_lexicon_is_compiled_once_and_mapped_from_file(self) -> None:
+        lexicon = load_sentiment_lexicon(self.config)
+
+        self.assertEqual(lexicon.get("атака"), ["negative"])
+        self.assertEqual(lexicon.get("horror"), ["negative"])
+        self.assertTrue(os.path.exists(self.config["settings"]["sentiment_lexicon_path"]))
+        self.assertIs(load_sentiment_lexicon(self.config), lexicon)
+
+        lexicon_module._lexicon = None
+        with patch.object(lexicon_module, "compile_sentiment_lexicon") as compile_lexicon:
+            mapped = load_sentiment_lexicon(self.config)
+        compile_lexicon.assert_not_called()
+        self.assertEqual(mapped.get("атака"), ["negative"])
+
+    def test_changed_source_is_compiled_again(self) -> None:
+        load_sentiment_lexicon(self.config)
+
+        self._write_sentilex("атака, Noun, атака, positive, fact", "мир, Noun, мир, neutral, fact")
+
+        lexicon = load_sentiment_lexicon(self.config)
+        self.assertEqual(lexicon.get("атака"), ["positive"])
+        self.assertEqual(lexicon.get("мир"), ["neutral"])
+
+    def test_invalid_sentilex_and_memory_only_lexicon(self) -> None:
+        self.config["settings"]["sentiment_lexicon_path"] = ""
+        self.assertEqual(load_sentiment_lexicon(self.config).get("атака"), ["negative"])
+        self.assertEqual(os.listdir(self._dir), ["rusentilex.txt"])
+
+        self._write_sentilex("атака, Noun, атака, bad, fact")
+
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(load_sentiment_lexicon(self.config))
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestMakeTagsSentiment(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        self.addCleanup(setattr, lexicon_module, "_lexicon", None)
+        lexicon_module._lexicon = None
+        self.db.tags.insert_many(
+            [
+                {"owner": "alice", "tag": tag}
+                for tag in ("атака", "horror", "joy", "nothing")
+            ]
+        )
+        self.worker = TagWorker(
+            self.db,
+            {
+                "settings": {
+                    "host_name": "localhost",
+                    "sentilex": SENTILEX,
+                    "lilu_wordnet": WORDNET_DIR,
+                    "sentiment_lexicon_path": "",
+                }
+            },
+        )
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def test_sentiments_are_written_in_one_bulk(self) -> None:
+        with patch.object(
+            mongomock.collection.Collection,
+            "bulk_write",
+            autospec=True,
+            side_effect=_apply_updates,
+        ) as bulk_write:
+            self.assertTrue(self.worker.make_tags_sentiment("alice"))
+
+        bulk_write.assert_called_once()
+        sentiments = {
+            tag["tag"]: tag.get("sentiment") for tag in self.db.tags.find({"owner": "alice"})
+        }
+        self.assertEqual(
+            sentiments,
+            {
+                "атака": ["negative", "positive"],
+                "horror": ["negative"],
+                "joy": ["positive"],
+                "nothing": None,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
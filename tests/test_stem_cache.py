@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from rsstag.entity_extractor import RssTagEntityExtractor
+from rsstag.stem_cache import (
+    DEFAULT_STEM_CACHE_SIZE,
+    STEMS_EN,
+    STEMS_TAGS,
+    StemCache,
+    StemTable,
+    stem_cache_settings,
+)
+from rsstag.tags_builder import TagsBuilder
+
+
+class TestStemTable(unittest.TestCase):
+    def test_counts_hits_and_misses(self) -> None:
+        table = StemTable(10)
+
+        self.assertEqual(table.get("running", lambda w: w[:3]), "run")
+        self.assertEqual(table.get("running", lambda w: "unused"), "run")
+
+        self.assertEqual((table.hits, table.misses, len(table)), (1, 1, 1))
+
+    def test_evicts_oldest_word_at_capacity(self) -> None:
+        table = StemTable(2)
+        for word in ("a", "b", "c"):
+            table.get(word, str.upper)
+
+        self.assertEqual(table.items(), {"b": "B", "c": "C"})
+
+    def test_failed_stem_is_not_cached(self) -> None:
+        table = StemTable(10)
+
+        def broken(word: str) -> str:
+            raise IndexError(word)
+
+        with self.assertRaises(IndexError):
+            table.get("word", broken)
+        self.assertEqual(len(table), 0)
+
+
+class TestStemCachePersistence(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "stems.json.gz")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_saved_stems_are_preloaded(self) -> None:
+        cache = StemCache(100)
+        cache.table(STEMS_TAGS).get("тестирование", lambda w: "тестирован")
+        self.assertTrue(cache.save(self.path))
+
+        restored = StemCache(100)
+
+        self.assertEqual(restored.load(self.path), 1)
+        self.assertEqual(
+            restored.table(STEMS_TAGS).get("тестирование", lambda w: "miss"),
+            "тестирован",
+        )
+
+    def test_save_keeps_stems_of_other_processes(self) -> None:
+        first, second = StemCache(100), StemCache(100)
+        first.table(STEMS_EN).put("cats", "cat")
+        second.table(STEMS_EN).put("dogs", "dog")
+        first.save(self.path)
+        second.save(self.path)
+
+        restored = StemCache(100)
+        restored.load(self.path)
+
+        self.assertEqual(
+            restored.table(STEMS_EN).items(), {"cats": "cat", "dogs": "dog"}
+        )
+
+    def test_missing_or_corrupt_file_loads_nothing(self) -> None:
+        with open(self.path, "wb") as f:
+            f.write(b"not gzip")
+
+        self.assertEqual(StemCache(100).load(self.path), 0)
+        self.assertEqual(StemCache(100).load(self.path + ".absent"), 0)
+
+    def test_shrinking_capacity_keeps_newest_words(self) -> None:
+        cache = StemCache(10)
+        for word in ("a", "b", "c"):
+            cache.table(STEMS_TAGS).put(word, word)
+
+        cache.configure(2)
+
+        self.assertEqual(cache.table(STEMS_TAGS).items(), {"b": "b", "c": "c"})
+
+    def test_invalid_size_falls_back_to_default(self) -> None:
+        settings = stem_cache_settings({"settings": {"stem_cache_size": "big"}})
+
+        self.assertEqual(settings["size"], DEFAULT_STEM_CACHE_SIZE)
+        self.assertEqual(settings["path"], "")
+
+
+class TestSharedStemCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = StemCache(100)
+        for module in ("rsstag.tags_builder", "rsstag.entity_extractor"):
+            patcher = patch(f"{module}.stem_cache", self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_tags_builders_share_one_table(self) -> None:
+        first = TagsBuilder()
+        first.prepare_text("Testing testing")
+        second = TagsBuilder()
+        second.prepare_text("testing")
+
+        self.assertEqual(second.get_prepared_text(), "test")
+        stats = self.cache.stats()[STEMS_TAGS]
+        self.assertEqual((stats["misses"], stats["hits"]), (1, 2))
+
+    def test_entity_extractor_output_is_unchanged(self) -> None:
+        extractor = RssTagEntityExtractor()
+        entities = [["Running", "Москвы"], ["Cats"]]
+
+        first = extractor.treat_entities(entities)
+        second = RssTagEntityExtractor().treat_entities(entities)
+
+        self.assertEqual(first, [["run", "москв"], ["cat"]])
+        self.assertEqual(second, first)
+        self.assertEqual(self.cache.stats()[STEMS_EN]["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
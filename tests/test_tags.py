@@ -20,6 +20,18 @@ class TestRssTagTagsStorage(unittest.TestCase):
         self.assertEqual({"owner": "alice", "tag": "ai"}, updates[1]._filter)
         self.assertEqual({"$inc": {"unread_count": -5}}, updates[1]._doc)
 
+    def test_add_sentiments_creates_one_bulk_write(self):
+        self.storage.add_sentiments("alice", {"joy": ["positive"], "war": ["negative"]})
+
+        self.db.tags.bulk_write.assert_called_once()
+        updates = self.db.tags.bulk_write.call_args.args[0]
+        self.assertEqual({"owner": "alice", "tag": "joy"}, updates[0]._filter)
+        self.assertEqual({"$set": {"sentiment": ["positive"]}}, updates[0]._doc)
+        self.assertEqual({"owner": "alice", "tag": "war"}, updates[1]._filter)
+
+        self.storage.add_sentiments("alice", {})
+        self.db.tags.bulk_write.assert_called_once()
+
     def test_get_all_builds_query_sort_and_options(self):
         cursor = MagicMock()
         cursor.allow_disk_use.return_value = cursor
@@ -1,5 +1,8 @@
+import random
 import unittest
-from rsstag.tags_builder import TagsBuilder
+from unittest.mock import patch
+
+from rsstag.tags_builder import ENGINE_NUMPY, ENGINE_PYTHON, TagsBuilder
 
 
 class TestTagsBuilder(unittest.TestCase):
@@ -132,5 +135,62 @@ class TestTagsBuilder(unittest.TestCase):
         )
 
 
+
+class TestNumpyEngine(unittest.TestCase):
+    def _build(self, engine: str, text: str) -> tuple:
+        builder = TagsBuilder(engine=engine)
+        builder.build_tags_and_bi_grams(text)
+        # Lists of items, so dict order has to match too.
+        return (
+            list(builder.get_tags().items()),
+            list(builder.get_words().items()),
+            list(builder.get_bi_grams().items()),
+            list(builder.get_bi_grams_words().items()),
+            builder.get_prepared_text(),
+        )
+
+    def assertSameAsPython(self, text: str) -> None:
+        self.assertEqual(
+            self._build(ENGINE_NUMPY, text), self._build(ENGINE_PYTHON, text)
+        )
+
+    def test_edge_cases_match_python_engine(self):
+        texts = [
+            "",
+            "single",
+            "two words",
+            "cat cat cat",
+            "тестировали? тестировала тестировал testing, tested оно 2016 Pokémon",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertSameAsPython(text)
+
+    def test_random_texts_match_python_engine(self):
+        rnd = random.Random(7)
+        vocabulary = [
+            "test", "tests", "testing", "tested", "тест", "тестировали",
+            "код", "кода", "python", "pythons", "2016", "pokémon", "ab", "x",
+        ]
+        for _ in range(50):
+            words = [rnd.choice(vocabulary) for _ in range(rnd.randint(0, 60))]
+            self.assertSameAsPython(", ".join(words))
+
+    def test_words_without_tag_match_python_engine(self):
+        process_word_ = TagsBuilder.process_word_
+
+        def failing(builder, word):
+            return "" if word == "broken" else process_word_(builder, word)
+
+        with patch.object(TagsBuilder, "process_word_", failing), patch(
+            "rsstag.tags_builder.stem_cache.table"
+        ) as table:
+            table.return_value.get.side_effect = lambda word, stem: stem(word)
+            self.assertSameAsPython("alpha broken beta gamma broken delta")
+
+    def test_unknown_engine_falls_back_to_python(self):
+        self.assertEqual(TagsBuilder(engine="simd")._engine, ENGINE_PYTHON)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,123 @@
+import threading
+import unittest
+from typing import Any, Dict, Iterator, List, Tuple
+from unittest.mock import MagicMock, patch
+
+import mongomock
+
+from rsstag.llm import LLMCache
+from rsstag.workers.llm_worker import _TagClassificationWorker
+
+OWNER = "alice"
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo UpdateOne ops, apply them one by one
+    for request in requests:
+        collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+class _FakeLLM:
+    def __init__(self) -> None:
+        self.prompts: List[str] = []
+        self._lock = threading.Lock()
+
+    def call(self, settings: Any, user_msgs: List[str], provider_key: str = "") -> str:
+        with self._lock:
+            self.prompts.append(user_msgs[0])
+        return "Sport." if "match" in user_msgs[0] else "medicine"
+
+
+class TestTagsClassificationCache(unittest.TestCase):
+    def setUp(self) -> None:
+        bulk_patch = patch.object(
+            mongomock.collection.Collection, "bulk_write", _apply_updates
+        )
+        bulk_patch.start()
+        self.addCleanup(bulk_patch.stop)
+        self.db = mongomock.MongoClient().rsstag
+        self.llm = _FakeLLM()
+        self.worker = _TagClassificationWorker(
+            self.db,
+            {"settings": {"tags_classification_concurrency": "2"}},
+            self.llm,
+            MagicMock(),
+            MagicMock(),
+        )
+        self.snippets: List[Tuple[str, str]] = [
+            ("p1", "the match was  great"),
+            ("p2", "The match was great"),  # a repost
+            ("p3", "the match was great"),  # a forward
+            ("p4", "new vaccine trial"),
+        ]
+        self.task: Dict[str, Any] = {
+            "user": {"sid": OWNER, "settings": {"worker_llm": "llamacpp"}},
+            "data": [{"tag": "team", "words": []}],
+        }
+        self.saved: List[Any] = []
+        tags_patch = patch("rsstag.workers.llm_worker.RssTagTags")
+        tags_h = tags_patch.start().return_value
+        tags_h.add_classifications.side_effect = (
+            lambda owner, tag, classifications: self.saved.append(classifications)
+        )
+        self.addCleanup(tags_patch.stop)
+
+    def _snippets(self, owner: str, tag_data: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+        return iter(self.snippets)
+
+    def _classify(self) -> Dict[str, Dict[str, Any]]:
+        with patch.object(self.worker, "_tag_context_snippets", self._snippets):
+            self.assertTrue(self.worker.make_tags_classification(self.task))
+        return {item["category"]: item for item in self.saved[-1]}
+
+    def test_repeated_snippets_are_classified_once(self) -> None:
+        classifications = self._classify()
+
+        self.assertEqual(len(self.llm.prompts), 2)
+        self.assertEqual(classifications["sport"]["count"], 3)
+        self.assertEqual(sorted(classifications["sport"]["pids"]), ["p1", "p2", "p3"])
+        self.assertEqual(classifications["medicine"]["pids"], ["p4"])
+
+    def test_prompt_keeps_the_original_snippet(self) -> None:
+        self.snippets = [("p2", "The match was  Great")]
+
+        self._classify()
+
+        self.assertIn("The match was  Great", self.llm.prompts[0])
+
+    def test_cached_categories_are_not_sent_again(self) -> None:
+        self._classify()
+        self.snippets.append(("p5", "match report"))
+
+        classifications = self._classify()
+
+        self.assertEqual(len(self.llm.prompts), 3)
+        self.assertIn("match report", self.llm.prompts[-1])
+        self.assertEqual(classifications["sport"]["count"], 4)
+        self.assertEqual(self.db.llm_cache.count_documents({"owner": OWNER}), 3)
+
+    def test_cache_is_per_owner(self) -> None:
+        self._classify()
+        self.task["user"]["sid"] = "bob"
+
+        self._classify()
+
+        self.assertEqual(len(self.llm.prompts), 4)
+
+
+class TestLLMCacheBulk(unittest.TestCase):
+    def test_get_many_returns_only_stored_keys(self) -> None:
+        with patch.object(mongomock.collection.Collection, "bulk_write", _apply_updates):
+            cache = LLMCache(mongomock.MongoClient().rsstag)
+            cache.set_many(OWNER, {"a": "sport", "b": "medicine"})
+            cache.set(OWNER, "c", "")
+
+            self.assertEqual(
+                cache.get_many(OWNER, ["a", "b", "c", "d"]),
+                {"a": "sport", "b": "medicine"},
+            )
+            self.assertEqual(cache.get_many("bob", ["a"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
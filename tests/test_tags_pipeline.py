@@ -0,0 +1,124 @@
+import gzip
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import MagicMock, patch
+
+from rsstag.html_cleaner import HTMLCleaner
+from rsstag.tags_builder import TagsBuilder
+from rsstag.workers.tag_worker import TagWorker
+from rsstag.workers.tags_pipeline import TagsPool, build_posts_tags, merge_tags_sums
+
+
+def _post(_id: int, title: str, html: str) -> Dict[str, Any]:
+    return {
+        "_id": _id,
+        "owner": "alice",
+        "content": {"title": title, "content": gzip.compress(html.encode("utf-8"))},
+    }
+
+
+POSTS: List[Dict[str, Any]] = [
+    _post(1, "Testing tags", "<p>tested <b>python</b> code</p>"),
+    _post(2, "Python", "<div>python testing again<script>skip()</script></div>"),
+    _post(3, "Тестирование", "<p>тестировали код python</p>"),
+    _post(4, "", "<p></p>"),
+]
+
+
+def _serial() -> Any:
+    return build_posts_tags(POSTS, TagsBuilder(), HTMLCleaner())
+
+
+class TestBuildPostsTags(unittest.TestCase):
+    def test_sums_tags_over_posts(self) -> None:
+        posts_tags, sum_tags, _ = _serial()
+
+        self.assertEqual([post_id for post_id, _ in posts_tags], [1, 2, 3, 4])
+        self.assertEqual(sum_tags["python"]["posts"], 3)
+        self.assertEqual(sum_tags["test"]["freq"], 3)
+        self.assertEqual(sum_tags["test"]["words"], {"testing", "tested"})
+
+    def test_html_is_cleaned_before_tagging(self) -> None:
+        _, sum_tags, _ = _serial()
+
+        self.assertNotIn("skip", sum_tags)
+
+    def test_post_payload_has_lemmas_and_bigrams(self) -> None:
+        posts_tags, _, sum_bigrams = _serial()
+        post_tags = dict(posts_tags)[1]
+
+        self.assertEqual(
+            gzip.decompress(post_tags["lemmas"]).decode("utf-8"),
+            "test tag test python code",
+        )
+        self.assertIn("python test", post_tags["bi_grams"])
+        self.assertEqual(sum_bigrams["python test"]["posts"], 2)
+
+    def test_empty_post_keeps_placeholder_tag(self) -> None:
+        posts_tags, _, _ = _serial()
+
+        self.assertEqual(dict(posts_tags)[4]["tags"], [""])
+
+
+class TestMergeTagsSums(unittest.TestCase):
+    def test_split_batches_merge_to_serial_result(self) -> None:
+        builder, cleaner = TagsBuilder(), HTMLCleaner()
+        _, serial_tags, serial_bigrams = _serial()
+        sum_tags: Dict[str, Any] = {}
+        sum_bigrams: Dict[str, Any] = {}
+        for chunk in (POSTS[:1], POSTS[1:3], POSTS[3:]):
+            _, part_tags, part_bigrams = build_posts_tags(chunk, builder, cleaner)
+            merge_tags_sums(sum_tags, part_tags)
+            merge_tags_sums(sum_bigrams, part_bigrams)
+
+        self.assertEqual(sum_tags, serial_tags)
+        self.assertEqual(
+            {key: (v["posts"], v["words"]) for key, v in sum_bigrams.items()},
+            {key: (v["posts"], v["words"]) for key, v in serial_bigrams.items()},
+        )
+
+
+class TestTagsPool(unittest.TestCase):
+    def test_pool_matches_serial_build(self) -> None:
+        pool = TagsPool(2)
+        try:
+            posts_tags, sum_tags, sum_bigrams = pool.build(POSTS)
+        finally:
+            pool.close()
+        serial_posts, serial_tags, serial_bigrams = _serial()
+
+        self.assertEqual(posts_tags, serial_posts)
+        self.assertEqual(sum_tags, serial_tags)
+        self.assertEqual(set(sum_bigrams), set(serial_bigrams))
+
+
+class TestTagWorkerTagsPool(unittest.TestCase):
+    def _worker(self, pool_size: str) -> TagWorker:
+        config = {"settings": {"host_name": "localhost", "tags_pool_size": pool_size}}
+        return TagWorker(MagicMock(), config)
+
+    def test_pool_is_disabled_by_default(self) -> None:
+        worker = self._worker("0")
+
+        self.assertIsNone(worker._get_tags_pool())
+
+    def test_invalid_pool_size_builds_in_process(self) -> None:
+        self.assertEqual(self._worker("many")._get_tags_pool_size(), 0)
+
+    def test_failed_pool_falls_back_to_in_process_build(self) -> None:
+        worker = self._worker("2")
+        broken = MagicMock()
+        broken.build.side_effect = RuntimeError("pool died")
+        worker._tags_pool = broken
+
+        with patch.object(worker, "_get_tags_pool", return_value=broken):
+            self.assertTrue(worker.make_tags(POSTS))
+
+        broken.close.assert_called_once_with()
+        self.assertIsNone(worker._tags_pool)
+        posts_updates = worker._db.posts.bulk_write.call_args[0][0]
+        self.assertEqual(len(posts_updates), len(POSTS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pymongo.errors import OperationFailure
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+import rsstag.task_wakeup as task_wakeup
+from rsstag.task_state import TaskStateMachine
+from rsstag.task_wakeup import (
+    ENQUEUED_AT_FIELD,
+    ChangeStreamWakeup,
+    SleepWakeup,
+    SocketWakeup,
+    configure_task_wakeup,
+    notify_new_task,
+    open_task_wakeup,
+)
+
+
+def _config(**settings: str) -> dict:
+    return {"settings": settings}
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "unix sockets are required")
+class TestSocketWakeup(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        configure_task_wakeup(_config(task_wakeup="socket", task_wakeup_dir=self.dir))
+        self.listener = SocketWakeup(self.dir, max_wait=5)
+
+    def tearDown(self) -> None:
+        self.listener.close()
+        configure_task_wakeup(_config(task_wakeup="off"))
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_wait_times_out_without_signal(self) -> None:
+        self.assertFalse(self.listener.wait(0.05))
+
+    def test_signal_sent_while_busy_is_not_lost(self) -> None:
+        notify_new_task()
+
+        self.assertTrue(self.listener.wait(0.05))
+
+    def test_burst_of_signals_collapses_into_one_wakeup(self) -> None:
+        for _ in range(5):
+            notify_new_task()
+
+        self.assertTrue(self.listener.wait(0.05))
+        self.assertFalse(self.listener.wait(0.05))
+
+    def test_blocked_wait_returns_as_soon_as_notified(self) -> None:
+        timer = threading.Timer(0.05, notify_new_task)
+        timer.start()
+        started = time.monotonic()
+
+        woken = self.listener.wait(5)
+
+        timer.join()
+        self.assertTrue(woken)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_stale_socket_of_a_dead_worker_is_removed(self) -> None:
+        stale_path = os.path.join(self.dir, "999999.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+
+        notify_new_task()
+
+        self.assertFalse(os.path.exists(stale_path))
+
+    def test_close_removes_socket_file(self) -> None:
+        path = self.listener._path
+        self.listener.close()
+
+        self.assertFalse(os.path.exists(path))
+
+
+class TestOpenTaskWakeup(unittest.TestCase):
+    def test_off_mode_uses_sleep_polling(self) -> None:
+        listener = open_task_wakeup(MagicMock(), _config(task_wakeup="off"))
+
+        self.assertIsInstance(listener, SleepWakeup)
+
+    def test_auto_prefers_change_stream(self) -> None:
+        db = MagicMock()
+
+        listener = open_task_wakeup(db, _config())
+
+        self.assertIsInstance(listener, ChangeStreamWakeup)
+        pipeline = db.tasks.watch.call_args[0][0]
+        self.assertIn(
+            f"updateDescription.updatedFields.{ENQUEUED_AT_FIELD}",
+            str(pipeline),
+        )
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "unix sockets are required")
+    def test_auto_falls_back_to_socket_on_standalone_server(self) -> None:
+        db = MagicMock()
+        db.tasks.watch.side_effect = OperationFailure(
+            "The $changeStream stage is only supported on replica sets", 40573
+        )
+        wakeup_dir = tempfile.mkdtemp()
+        try:
+            listener = open_task_wakeup(
+                db, _config(task_wakeup="auto", task_wakeup_dir=wakeup_dir)
+            )
+            self.assertIsInstance(listener, SocketWakeup)
+            # Producers may not share the directory, keep polling short
+            self.assertEqual(
+                listener._max_wait, task_wakeup.AUTO_SOCKET_MAX_WAIT_SECONDS
+            )
+            listener.close()
+        finally:
+            shutil.rmtree(wakeup_dir, ignore_errors=True)
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "unix sockets are required")
+    def test_socket_mode_waits_the_configured_max(self) -> None:
+        wakeup_dir = tempfile.mkdtemp()
+        try:
+            listener = open_task_wakeup(
+                MagicMock(), _config(task_wakeup="socket", task_wakeup_dir=wakeup_dir)
+            )
+            self.assertEqual(
+                listener._max_wait, task_wakeup.DEFAULT_WAKEUP_MAX_WAIT_SECONDS
+            )
+            listener.close()
+        finally:
+            shutil.rmtree(wakeup_dir, ignore_errors=True)
+
+    def test_change_stream_event_wakes_waiter(self) -> None:
+        db = MagicMock()
+        db.tasks.watch.return_value.try_next.side_effect = [None, {"_id": "evt"}]
+
+        listener = open_task_wakeup(db, _config(task_wakeup="change_stream"))
+
+        self.assertTrue(listener.wait(5))
+
+    def test_invalid_max_wait_falls_back_to_default(self) -> None:
+        settings = task_wakeup._wakeup_settings(
+            _config(task_wakeup_max_wait_seconds="soon")
+        )
+
+        self.assertEqual(
+            settings["max_wait"], task_wakeup.DEFAULT_WAKEUP_MAX_WAIT_SECONDS
+        )
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestEnqueueSignalsWorkers(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.sm = TaskStateMachine(self._client["rsstag_test"])
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def test_enqueue_stamps_enqueued_at_and_notifies(self) -> None:
+        with patch("rsstag.task_state.notify_new_task") as notify:
+            self.sm.enqueue({"user": "u", "type": 3}, {"manual": True})
+
+        notify.assert_called_once_with()
+        doc = self._client["rsstag_test"].tasks.find_one({"user": "u"})
+        self.assertGreater(doc[ENQUEUED_AT_FIELD], 0)
+
+    def test_enqueue_of_live_running_task_does_not_notify(self) -> None:
+        self._client["rsstag_test"].tasks.insert_one(
+            {
+                "user": "u",
+                "type": 3,
+                "status": "running",
+                "lease_until": time.time() + 60,
+            }
+        )
+
+        with patch("rsstag.task_state.notify_new_task") as notify:
+            self.sm.enqueue({"user": "u", "type": 3}, {"manual": True})
+
+        notify.assert_not_called()
+
+    def test_release_stamps_enqueued_at_and_notifies(self) -> None:
+        tasks = self._client["rsstag_test"].tasks
+        tid = tasks.insert_one(
+            {"user": "u", "type": 3, "status": "running", "worker_id": "w"}
+        ).inserted_id
+
+        with patch("rsstag.task_state.notify_new_task") as notify:
+            self.assertTrue(self.sm.release(tid))
+            self.sm.release(tid)
+
+        notify.assert_called_once_with()
+        self.assertGreater(tasks.find_one({"_id": tid})[ENQUEUED_AT_FIELD], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import sys
+import time
 import types
 import unittest
 from unittest.mock import MagicMock, patch
@@ -9,8 +10,14 @@ sys.modules.setdefault("rsstag.tags", types.SimpleNamespace(RssTagTags=object))
 
 from typing import Any, Dict, List
 
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
 from rsstag.task_state import TASK_STATUS_PENDING
 from rsstag.tasks import (
+    ITEM_LOCK_MAX_AGE_SECONDS,
     RssTagTasks,
     TASK_ANTHOLOGY,
     TASK_MARK,
@@ -23,6 +30,7 @@ from rsstag.tasks import (
     SCOPE_MODE_FEEDS,
     SCOPE_MODE_CATEGORIES,
     SCOPE_MODE_PROVIDER,
+    claim_items,
 )
 
 
@@ -240,5 +248,62 @@ class TestRssTagTasksMarkStatus(unittest.TestCase):
         self.assertIsInstance(data["status"], bool)
 
 
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestClaimItems(unittest.TestCase):
+    """Concurrent claims must hand out disjoint item batches."""
+
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.posts = self._client["rsstag_test"].posts
+        self.posts.insert_many(
+            [{"owner": "alice", "tags": [], "processing": 0} for _ in range(10)]
+        )
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def test_consecutive_claims_are_disjoint(self) -> None:
+        first = claim_items(self.posts, {"owner": "alice", "tags": []}, 4)
+        second = claim_items(self.posts, {"owner": "alice", "tags": []}, 4)
+
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 4)
+        self.assertFalse({p["_id"] for p in first} & {p["_id"] for p in second})
+
+    def test_items_locked_by_a_racing_worker_are_not_returned(self) -> None:
+        original_update_many = self.posts.update_many
+        stolen: List[Any] = []
+
+        def racing_update_many(query, update):
+            # Another worker locks one candidate between our find and update.
+            stolen.append(query["_id"]["$in"][0])
+            original_update_many(
+                {"_id": stolen[0]}, {"$set": {"processing": time.time()}}
+            )
+            return original_update_many(query, update)
+
+        with patch.object(self.posts, "update_many", side_effect=racing_update_many):
+            claimed = claim_items(self.posts, {"owner": "alice", "tags": []}, 3)
+
+        self.assertEqual(len(claimed), 2)
+        self.assertNotIn(stolen[0], {p["_id"] for p in claimed})
+
+    def test_stale_lock_is_reclaimed(self) -> None:
+        self.posts.update_many(
+            {}, {"$set": {"processing": 1.0 + ITEM_LOCK_MAX_AGE_SECONDS}}
+        )
+
+        claimed = claim_items(self.posts, {"owner": "alice"}, 20)
+
+        self.assertEqual(len(claimed), 10)
+
+    def test_projection_is_applied_to_claimed_items(self) -> None:
+        claimed = claim_items(
+            self.posts, {"owner": "alice"}, 1, projection={"owner": True}
+        )
+
+        self.assertEqual(set(claimed[0]), {"_id", "owner"})
+
+
 if __name__ == "__main__":
     unittest.main()
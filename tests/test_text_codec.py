@@ -0,0 +1,144 @@
+import gzip
+import unittest
+from unittest.mock import MagicMock
+
+from rsstag.text_codec import (
+    CODEC_GZIP,
+    CODEC_RAW,
+    CODEC_TOKENS,
+    CODEC_ZLIB,
+    CODECS,
+    codecs_marker,
+    configure_codecs,
+    content_codec,
+    corrupt_marker,
+    decode_text,
+    decode_words,
+    detect_codec,
+    encode_text,
+    lemmas_codec,
+    pending_recode_query,
+    recode_post,
+)
+from rsstag.workers.tag_worker import TagWorker
+
+TEXTS = ["", "word", "test tag test python code", "привет мир привет", "a  b"]
+
+
+class TestTextCodec(unittest.TestCase):
+    def tearDown(self) -> None:
+        configure_codecs({})
+
+    def test_round_trip_for_every_codec(self) -> None:
+        for codec in CODECS:
+            for text in TEXTS:
+                with self.subTest(codec=codec, text=text):
+                    blob = encode_text(text, codec)
+
+                    self.assertEqual(detect_codec(blob), codec)
+                    self.assertEqual(decode_text(blob), text)
+                    self.assertEqual(decode_words(blob), text.split())
+
+    def test_legacy_gzip_blobs_are_decoded(self) -> None:
+        blob = gzip.compress("old post".encode("utf-8"))
+
+        self.assertEqual(detect_codec(blob), CODEC_GZIP)
+        self.assertEqual(decode_text(blob), "old post")
+        self.assertEqual(gzip.decompress(encode_text("old post")), b"old post")
+
+    def test_tokens_fall_back_to_zlib_for_nul(self) -> None:
+        blob = encode_text("a\x00b", CODEC_TOKENS)
+
+        self.assertEqual(detect_codec(blob), CODEC_ZLIB)
+        self.assertEqual(decode_text(blob), "a\x00b")
+
+    def test_corrupt_blobs_raise_value_error(self) -> None:
+        for codec in (CODEC_ZLIB, CODEC_TOKENS):
+            with self.subTest(codec=codec):
+                blob = encode_text("some words here", codec)
+
+                with self.assertRaises(ValueError):
+                    decode_text(blob[:-3] if codec == CODEC_ZLIB else blob[:8])
+
+    def test_unknown_version_is_rejected(self) -> None:
+        blob = bytearray(encode_text("text", CODEC_RAW))
+        blob[3] = 99
+
+        with self.assertRaises(ValueError):
+            decode_text(bytes(blob))
+
+    def test_invalid_settings_fall_back_to_gzip(self) -> None:
+        configure_codecs(
+            {"settings": {"content_codec": CODEC_TOKENS, "lemmas_codec": "lz4"}}
+        )
+
+        self.assertEqual(content_codec(), CODEC_GZIP)
+        self.assertEqual(lemmas_codec(), CODEC_GZIP)
+
+    def test_recode_post_moves_blobs_to_configured_codecs(self) -> None:
+        configure_codecs(
+            {"settings": {"content_codec": CODEC_ZLIB, "lemmas_codec": CODEC_RAW}}
+        )
+        post = {
+            "content": {"content": encode_text("<p>Body</p>")},
+            "lemmas": encode_text("body"),
+        }
+
+        update = recode_post(post)
+
+        self.assertEqual(detect_codec(update["content.content"]), CODEC_ZLIB)
+        self.assertEqual(decode_text(update["content.content"]), "<p>Body</p>")
+        self.assertEqual(detect_codec(update["lemmas"]), CODEC_RAW)
+        self.assertEqual(
+            update["codecs"], {"version": 1, "content": CODEC_ZLIB, "lemmas": CODEC_RAW}
+        )
+
+    def test_recode_post_skips_blobs_already_in_place(self) -> None:
+        configure_codecs({"settings": {"content_codec": CODEC_ZLIB}})
+        post = {"content": {"content": encode_text("x", CODEC_ZLIB)}}
+
+        self.assertEqual(
+            recode_post(post), {"codecs": {"version": 1, "content": CODEC_ZLIB}}
+        )
+
+    def test_codecs_marker_describes_blobs(self) -> None:
+        post = {
+            "content": {"content": encode_text("x", CODEC_RAW)},
+            "lemmas": encode_text("x", CODEC_TOKENS),
+        }
+
+        self.assertEqual(
+            codecs_marker(post),
+            {"version": 1, "content": CODEC_RAW, "lemmas": CODEC_TOKENS},
+        )
+
+    def test_pending_query_skips_corrupt_posts(self) -> None:
+        query = pending_recode_query()
+
+        self.assertEqual(query["codecs.corrupt"], {"$ne": True})
+        self.assertEqual(corrupt_marker(), {"codecs.corrupt": True})
+
+
+class TestTagWorkerRecodePosts(unittest.TestCase):
+    def tearDown(self) -> None:
+        configure_codecs({})
+
+    def test_posts_are_recoded_and_corrupt_ones_flagged(self) -> None:
+        configure_codecs({"settings": {"content_codec": CODEC_RAW}})
+        worker = TagWorker(MagicMock(), {"settings": {"host_name": "localhost"}})
+        posts = [
+            {"_id": 1, "content": {"content": encode_text("body")}},
+            {"_id": 2, "content": {"content": b"\x1f\x8bnot gzip"}},
+        ]
+
+        self.assertTrue(worker.make_recode_posts(posts))
+
+        updates = worker._db.posts.bulk_write.call_args[0][0]
+        recoded = updates[0]._doc["$set"]
+        self.assertEqual(decode_text(recoded["content.content"]), "body")
+        self.assertEqual(detect_codec(recoded["content.content"]), CODEC_RAW)
+        self.assertEqual(updates[1]._doc, {"$set": {"codecs.corrupt": True}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -244,6 +244,29 @@ class TestBucketStateFollowsRedirect(unittest.TestCase):
         self.assertNotIn("[E] Beta", second_prompt)
 
 
+class TestTopicMergeWorkerRefreshesIndex(unittest.TestCase):
+    def _handle(self, merged: bool, aliases_changed: bool) -> MagicMock:
+        from rsstag.workers.llm_worker import _TopicMergeWorker
+
+        agent = MagicMock()
+        agent.run.return_value = merged
+        agent.aliases_changed = aliases_changed
+        with patch("rsstag.topic_merge.TopicMergeAgent", return_value=agent), patch(
+            "rsstag.post_grouping.RssTagPostGrouping"
+        ) as grouping:
+            result = _TopicMergeWorker(MagicMock(), MagicMock()).handle_topic_merge(
+                {"user": {"sid": "u"}}
+            )
+        self.assertEqual(result, merged)
+        return grouping.return_value.refresh_topics_index
+
+    def test_failed_run_that_wrote_aliases_marks_the_index(self) -> None:
+        self._handle(False, True).assert_called_once_with("u", aliases_changed=True)
+
+    def test_failed_run_without_alias_writes_leaves_the_index(self) -> None:
+        self._handle(False, False).assert_not_called()
+
+
 class MongoBackedTestCase(unittest.TestCase):
     db_helper: DBHelper
 
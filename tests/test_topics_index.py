@@ -0,0 +1,163 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - optional test dependency
+    mongomock = None
+
+from pymongo import DeleteOne, ReplaceOne
+
+from rsstag.feeds import RssTagFeeds
+from rsstag.post_grouping import RssTagPostGrouping
+from rsstag.posts import RssTagPosts
+from rsstag.topic_aliases import RssTagTopicAliases
+from rsstag.topics_index import RssTagTopicsIndex
+from rsstag.web.posts import _build_topics_index, _get_topic_counts
+
+OWNER = "alice"
+
+
+def _apply_updates(collection, requests, ordered=True):
+    # mongomock can't build recent pymongo bulk ops, apply them one by one
+    for request in requests:
+        if isinstance(request, DeleteOne):
+            collection.delete_one(request._filter)
+        elif isinstance(request, ReplaceOne):
+            collection.replace_one(request._filter, request._doc, upsert=request._upsert)
+        else:
+            collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+def _sentences(*texts: str) -> list:
+    return [{"number": i, "text": text, "read": False} for i, text in enumerate(texts)]
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestRssTagTopicsIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self._client = mongomock.MongoClient()
+        self.db = self._client["rsstag_test"]
+        bulk_patch = patch.object(
+            mongomock.collection.Collection, "bulk_write", _apply_updates
+        )
+        bulk_patch.start()
+        self.addCleanup(bulk_patch.stop)
+        self.index = RssTagTopicsIndex(self.db)
+        self.index.prepare()
+        self.grouping = RssTagPostGrouping(self.db)
+        self.db.feeds.insert_one({"owner": OWNER, "feed_id": "f1", "title": "Feed"})
+        for pid in ("1", "2", "3"):
+            self.db.posts.insert_one(
+                {"owner": OWNER, "pid": pid, "feed_id": "f1", "read": False}
+            )
+        self.grouping.save_grouped_posts(
+            OWNER, ["1"], _sentences("Goals.", "Votes."), {"Sport": [0], "Politics": [1]}
+        )
+        self.grouping.save_grouped_posts(
+            OWNER, ["2"], _sentences("Match report."), {"Sport": [0]}
+        )
+        self.grouping.save_grouped_posts(
+            OWNER, ["3"], _sentences("Cup final.", "Transfer."), {"Sport > Football": [0, 1]}
+        )
+
+    def tearDown(self) -> None:
+        self._client.close()
+
+    def _per_request(self, only_unread: bool = False) -> dict:
+        app = SimpleNamespace(
+            db=self.db,
+            posts=RssTagPosts(self.db),
+            feeds=RssTagFeeds(self.db),
+            post_grouping=self.grouping,
+            topic_aliases=RssTagTopicAliases(self.db),
+        )
+        topic_counts, _ = _build_topics_index(
+            app, {"sid": OWNER}, None, only_unread=only_unread
+        )
+        return topic_counts
+
+    def _assert_matches_per_request(self) -> None:
+        for only_unread in (False, True):
+            self.assertEqual(
+                self.index.get_topics(OWNER, only_unread=only_unread),
+                self._per_request(only_unread),
+            )
+
+    def test_topics_match_the_per_request_build(self) -> None:
+        topics = self.index.get_topics(OWNER)
+
+        self.assertEqual(
+            topics["Sport"],
+            {"count": 2, "posts": ["1", "2"], "text_length": 19, "sentences_count": 2},
+        )
+        self.assertEqual(topics["Sport > Football"]["sentences_count"], 2)
+        self._assert_matches_per_request()
+
+    def test_index_is_built_for_groupings_saved_before_it(self) -> None:
+        self.db.topics_index_groupings.delete_many({})
+
+        self.assertEqual(self.index.refresh(OWNER), 3)
+        self._assert_matches_per_request()
+        self.assertEqual(self.index.refresh(OWNER), 0)
+
+    def test_read_state_changes_are_counted(self) -> None:
+        self.index.get_topics(OWNER)
+
+        self.grouping.update_snippets_read_status(OWNER, "1", [0], True)
+        RssTagPosts(self.db).change_status(OWNER, ["2"], True)
+
+        unread = self.index.get_topics(OWNER, only_unread=True)
+        self.assertNotIn("Sport", unread)
+        self.assertEqual(unread["Politics"]["count"], 1)
+        self.assertEqual(self.index.get_topics(OWNER)["Sport"]["count"], 2)
+        self._assert_matches_per_request()
+
+    def test_deleted_groupings_leave_the_index(self) -> None:
+        self.index.get_topics(OWNER)
+
+        self.grouping.delete_grouped_posts_by_post_ids(OWNER, ["1", "3"])
+
+        self.assertEqual(list(self.index.get_topics(OWNER)), ["Sport"])
+        self.assertEqual(self.db.topics_index_groupings.count_documents({}), 1)
+        self._assert_matches_per_request()
+
+    def test_alias_changes_are_applied_on_refresh(self) -> None:
+        self.index.get_topics(OWNER)
+        aliases = RssTagTopicAliases(self.db)
+        aliases.upsert_alias(OWNER, 0, "", "Politics", "news", "News")
+        aliases.upsert_alias(OWNER, 0, "", "Sport", "news", "News")
+
+        self.grouping.refresh_topics_index(OWNER, aliases_changed=True)
+
+        topics = self.db.topics_index.find_one({"owner": OWNER, "topic": "News"})
+        self.assertEqual(topics["count"], 2)
+        self.assertEqual(topics["sentences_count"], 3)
+        self.assertIsNone(self.db.topics_index.find_one({"topic": "Politics"}))
+        self._assert_matches_per_request()
+
+    def test_remove_owner(self) -> None:
+        self.index.get_topics(OWNER)
+        version = self.index.version(OWNER)
+
+        self.index.remove_owner(OWNER)
+
+        self.assertEqual(self.db.topics_index.count_documents({}), 0)
+        self.assertEqual(self.db.topics_index_groupings.count_documents({}), 0)
+        self.assertNotIn(self.index.version(OWNER), (None, version))
+
+    def test_pages_with_context_filters_build_topics_per_request(self) -> None:
+        app = SimpleNamespace(topics_index=self.index)
+        filtered = {"sid": OWNER, "settings": {"context_filter": {"feeds": {"feed_ids": ["f1"]}}}}
+
+        with patch("rsstag.web.posts._build_topics_index", return_value=({}, {})) as build:
+            self.assertEqual(_get_topic_counts(app, filtered, None), {})
+            build.assert_called_once()
+            build.reset_mock()
+            self.assertIn("Sport", _get_topic_counts(app, {"sid": OWNER, "settings": {}}, None))
+            build.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -222,12 +222,20 @@ class TestPruneDownloadedData(MongoWebTestCase):
             "anthologies",
             "anthology_runs",
             "llm_batch_results",
+            "topics_index",
+            "topics_index_groupings",
+            "prefix_index",
+            "lemma_vocab",
+            "lemma_vocab_state",
+            "pid_filters",
+            "post_cluster_models",
         ]
         for collection_name in derived_collections:
             self.test_db[collection_name].insert_one(
                 {"owner": owner, "value": collection_name}
             )
         self.test_db.words.insert_one({"owner": owner, "word": "testtag", "numbers": [2]})
+        topics_version = self.app.topics_index.version(owner)
         self.test_db.tasks.insert_one(
             {"user": owner, "type": TASK_LETTERS, "processing": 0}
         )
@@ -250,6 +258,7 @@ class TestPruneDownloadedData(MongoWebTestCase):
                 )
         self.assertEqual(0, self.test_db.tasks.count_documents({"user": owner}))
         self.assertEqual(1, self.test_db.feeds.count_documents({"owner": owner}))
+        self.assertNotIn(self.app.topics_index.version(owner), (None, topics_version))
 
         user: Optional[dict] = self.app.users.get_by_sid(owner)
         self.assertIsNotNone(user)
@@ -4,6 +4,7 @@ import re
 import unittest
 from unittest import mock
 
+from rsstag.tasks import TASK_TAG_COOCCURRENCE
 from tests.web_test_utils import MongoWebTestCase
 
 
@@ -490,6 +491,26 @@ class TestWebTags(MongoWebTestCase):
         response = self.client.get("/tag-tfidf/testtag")
         self.assertIn(response.status_code, [200, 500])
 
+    def test_on_tag_tfidf_get_counts_posts_until_cooccurrence_is_built(self) -> None:
+        self._seed_post_with_lemmas("post-tfidf-1", ["python"], "python code python")
+        self._seed_post_with_lemmas("post-tfidf-2", ["python"], "python code rust")
+        self.test_db.posts.update_many({"owner": self.sid}, {"$set": {"read": False}})
+        for tag in ("python", "code", "rust"):
+            self._seed_tag(tag)
+
+        response = self.client.get("/tag-tfidf/python")
+        self.assertEqual(response.status_code, 200)
+        counted = {row["tag"]: row["count"] for row in json.loads(response.data)["data"]}
+        self.assertEqual(counted, {"python code": 2, "python rust": 1})
+        self.assertIsNotNone(
+            self.test_db.tasks.find_one({"user": self.sid, "type": TASK_TAG_COOCCURRENCE})
+        )
+
+        self.app.cooccurrence.rebuild(self.sid)
+        response = self.client.get("/tag-tfidf/python")
+        stored = {row["tag"]: row["count"] for row in json.loads(response.data)["data"]}
+        self.assertEqual(stored, counted)
+
     def test_on_tag_topics_get(self) -> None:
         response = self.client.get("/tag-topics/testtag")
         self.assertIn(response.status_code, [200, 500])
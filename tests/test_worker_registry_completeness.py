@@ -47,6 +47,9 @@ EXPECTED_INTERNAL_TASK_TYPES: List[int] = [
     task_module.TASK_TOPIC_MERGE,
     task_module.TASK_RAW_DOWNLOAD,
     task_module.TASK_RAW_TO_POSTS,
+    task_module.TASK_RECODE_POSTS,
+    task_module.TASK_PREFIX_INDEX,
+    task_module.TASK_TAG_COOCCURRENCE,
 ]
 
 
@@ -225,6 +228,9 @@ class TestWorkerRegistryCompleteness(unittest.TestCase):
             task_module.TASK_POST_QUALITY: llm_worker.handle_post_quality,
             task_module.TASK_SOURCE_QUALITY: llm_worker.handle_source_quality,
             task_module.TASK_DELETE_FEEDS: tag_worker.handle_delete_feeds,
+            task_module.TASK_RECODE_POSTS: tag_worker.handle_recode_posts,
+            task_module.TASK_PREFIX_INDEX: tag_worker.handle_prefix_index,
+            task_module.TASK_TAG_COOCCURRENCE: tag_worker.handle_tag_cooccurrence,
         }
 
         self.assertEqual(expected_sources, registry._handlers)